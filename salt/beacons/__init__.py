@@ -15,6 +15,11 @@ import salt.utils.minion
 from salt.ext.six.moves import map
 from salt.exceptions import CommandExecutionError
 
+# Import 3rd-party libs
+import tornado.gen
+import tornado.ioloop
+from concurrent.futures import ThreadPoolExecutor
+
 log = logging.getLogger(__name__)
 
 
@@ -27,6 +32,12 @@ class Beacon(object):
         self.functions = functions
         self.beacons = salt.loader.beacons(opts, functions)
         self.interval_map = dict()
+        # Used by process_async
+        self.executor = None
+        self.in_flight = {}
+        self.late = {}
+        self.sources = {}
+        self.io_loop = None
 
     def process(self, config, grains):
         '''
@@ -42,12 +53,97 @@ class Beacon(object):
                     - /var/cache/foo: {}
         '''
         ret = []
-        b_config = copy.deepcopy(config)
-        if 'enabled' in b_config and not b_config['enabled']:
+        if 'enabled' in config and not config['enabled']:
             return
+        for mod, beacon_name, fun_str, b_config, runonce in self._runs(config, grains):
+            # Fire the beacon!
+            raw = self.beacons[fun_str](b_config)
+            ret.extend(self._events(mod, beacon_name, raw))
+            if runonce:
+                self.disable_beacon(mod)
+        return ret
+
+    @tornado.gen.coroutine
+    def process_async(self, config, grains, triggered=None, on_ready=None):
+        '''
+        Process the configured beacons without blocking the io_loop
+
+        Every beacon which is due runs in a thread of its own. The events of
+        all beacons which finish within ``beacons_timeout`` seconds are
+        returned together, a beacon which takes longer is left running and
+        its events are returned by the first call after it finished.
+
+        triggered
+            Only run these beacons, regardless of their interval. Used to run
+            beacons whose event source became readable.
+
+        on_ready
+            Beacons which define a ``fileno`` function have the returned file
+            descriptor watched on the io_loop, ``on_ready`` is called with the
+            name of the beacon when it becomes readable.
+        '''
+        ret = self._collect_late()
+        if 'enabled' in config and not config['enabled']:
+            raise tornado.gen.Return(ret)
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.opts.get('beacons_threads', 4))
+        io_loop = tornado.ioloop.IOLoop.current()
+        deadline = io_loop.time() + self.opts.get('beacons_timeout', 10)
+
+        running = []
+        for mod, beacon_name, fun_str, b_config, runonce in self._runs(
+                config, grains, triggered=triggered, skip=self.in_flight):
+            if on_ready is not None:
+                self._watch_source(io_loop, mod, beacon_name, b_config, on_ready)
+            future = self.executor.submit(self.beacons[fun_str], b_config)
+            self.in_flight[mod] = future
+            running.append((mod, beacon_name, runonce, future))
+
+        for mod, beacon_name, runonce, future in running:
+            try:
+                raw = yield tornado.gen.with_timeout(deadline, future)
+            except tornado.gen.TimeoutError:
+                log.warning(
+                    'Beacon %s did not finish within %s seconds, its events '
+                    'will be sent once it does', mod, self.opts.get('beacons_timeout', 10)
+                )
+                self.late[mod] = (beacon_name, runonce, future)
+                continue
+            except Exception:
+                log.error('The beacon %s errored', mod, exc_info=True)
+                self.in_flight.pop(mod, None)
+                continue
+            self.in_flight.pop(mod, None)
+            ret.extend(self._events(mod, beacon_name, raw))
+            if runonce:
+                self.disable_beacon(mod)
+
+        if triggered is None:
+            # Event sources are resumed once per interval, so a beacon which
+            # does not drain its source is not run over and over again. Stop
+            # watching the sources of beacons which are gone.
+            for mod in list(self.sources):
+                if mod not in config:
+                    self._unwatch_source(mod)
+                elif mod not in self.in_flight:
+                    self._resume_source(mod)
+        raise tornado.gen.Return(ret)
+
+    def _runs(self, config, grains, triggered=None, skip=()):
+        '''
+        Yield the name, beacon module name, beacon function, configuration and
+        run_once setting of every configured beacon which is due to run
+        '''
+        b_config = copy.deepcopy(config)
         for mod in config:
             if mod == 'enabled':
                 continue
+            if triggered is not None and mod not in triggered:
+                continue
+            if mod in skip:
+                log.trace('Skipping beacon %s. Previous run not finished.', mod)
+                continue
 
             # Convert beacons that are lists to a dict to make processing easier
             current_beacon_config = None
@@ -60,6 +156,7 @@ class Beacon(object):
             if 'enabled' in current_beacon_config:
                 if not current_beacon_config['enabled']:
                     log.trace('Beacon %s disabled', mod)
+                    self._unwatch_source(mod)
                     continue
                 else:
                     # remove 'enabled' item before processing the beacon
@@ -81,7 +178,7 @@ class Beacon(object):
                 interval = self._determine_beacon_config(current_beacon_config, 'interval')
                 if interval:
                     b_config = self._trim_config(b_config, mod, 'interval')
-                    if not self._process_interval(mod, interval):
+                    if triggered is None and not self._process_interval(mod, interval):
                         log.trace('Skipping beacon %s. Interval not reached.', mod)
                         continue
                 if self._determine_beacon_config(current_beacon_config, 'disable_during_state_run'):
@@ -96,6 +193,7 @@ class Beacon(object):
                         close_str = '{0}.close'.format(beacon_name)
                         if close_str in self.beacons:
                             log.info('Closing beacon %s. State run in progress.', mod)
+                            self._unwatch_source(mod)
                             self.beacons[close_str](b_config[mod])
                         else:
                             log.info('Skipping beacon %s. State run in progress.', mod)
@@ -113,23 +211,95 @@ class Beacon(object):
                                  'not running.\n%s', mod, vcomment)
                         continue
 
-                # Fire the beacon!
-                raw = self.beacons[fun_str](b_config[mod])
-                for data in raw:
-                    tag = 'salt/beacon/{0}/{1}/'.format(self.opts['id'], mod)
-                    if 'tag' in data:
-                        tag += data.pop('tag')
-                    if 'id' not in data:
-                        data['id'] = self.opts['id']
-                    ret.append({'tag': tag,
-                                'data': data,
-                                'beacon_name': beacon_name})
-                if runonce:
-                    self.disable_beacon(mod)
+                yield mod, beacon_name, fun_str, b_config[mod], runonce
             else:
                 log.warning('Unable to process beacon %s', mod)
+
+    def _events(self, mod, beacon_name, raw):
+        '''
+        Turn the return of a beacon function into events
+        '''
+        ret = []
+        for data in raw:
+            tag = 'salt/beacon/{0}/{1}/'.format(self.opts['id'], mod)
+            if 'tag' in data:
+                tag += data.pop('tag')
+            if 'id' not in data:
+                data['id'] = self.opts['id']
+            ret.append({'tag': tag,
+                        'data': data,
+                        'beacon_name': beacon_name})
         return ret
 
+    def _collect_late(self):
+        '''
+        Return the events of beacons which finished after they timed out
+        '''
+        ret = []
+        for mod in list(self.late):
+            beacon_name, runonce, future = self.late[mod]
+            if not future.done():
+                continue
+            del self.late[mod]
+            self.in_flight.pop(mod, None)
+            try:
+                raw = future.result()
+            except Exception:
+                log.error('The beacon %s errored', mod, exc_info=True)
+                continue
+            ret.extend(self._events(mod, beacon_name, raw))
+            if runonce:
+                self.disable_beacon(mod)
+        return ret
+
+    def _watch_source(self, io_loop, mod, beacon_name, b_config, on_ready):
+        '''
+        Watch the event source of a beacon, if it has one
+        '''
+        fileno_str = '{0}.fileno'.format(beacon_name)
+        if mod in self.sources or fileno_str not in self.beacons:
+            return
+        try:
+            fd = self.beacons[fileno_str](b_config)
+        except Exception:
+            log.error('Unable to get the event source of beacon %s', mod, exc_info=True)
+            fd = None
+        if fd is None:
+            return
+
+        def handle_ready(fd, events):
+            # Stop watching until the beacon ran, it is the beacon which
+            # drains the source
+            io_loop.remove_handler(fd)
+            self.sources[mod][2] = False
+            on_ready(mod)
+
+        io_loop.add_handler(fd, handle_ready, io_loop.READ)
+        self.sources[mod] = [fd, handle_ready, True]
+        self.io_loop = io_loop
+        log.debug('Watching the event source of beacon %s', mod)
+
+    def _resume_source(self, mod):
+        if mod in self.sources and not self.sources[mod][2]:
+            fd, handle_ready, _ = self.sources[mod]
+            self.io_loop.add_handler(fd, handle_ready, self.io_loop.READ)
+            self.sources[mod][2] = True
+
+    def _unwatch_source(self, mod):
+        source = self.sources.pop(mod, None)
+        if source is not None and source[2]:
+            self.io_loop.remove_handler(source[0])
+
+    def stop(self):
+        '''
+        Stop watching event sources and release the beacon threads
+        '''
+        for mod in list(self.sources):
+            self._unwatch_source(mod)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
     def _trim_config(self, b_config, mod, key):
         '''
         Take a beacon configuration and strip out the interval bits
@@ -327,6 +327,16 @@ def beacon(config):
     return ret
 
 
+def fileno(config):
+    '''
+    Return the file descriptor of the inotify instance, so that the beacon can
+    be run as soon as events are waiting when ``beacons_async`` is enabled
+    '''
+    _config = {}
+    list(map(_config.update, config))
+    return _get_notifier(_config)._watch_manager.get_fd()
+
+
 def close(config):
     if 'inotify.notifier' in __context__:
         __context__['inotify.notifier'].stop()
@@ -61,6 +61,14 @@ def validate(config):
     return True, 'Valid beacon configuration'
 
 
+def fileno(config):
+    '''
+    Return the file descriptor of the journal, so that the beacon can be run
+    as soon as new entries are written when ``beacons_async`` is enabled
+    '''
+    return _get_journal().fileno()
+
+
 def beacon(config):
     '''
     The journald beacon allows for the systemd journal to be parsed and linked
@@ -79,6 +87,8 @@ def beacon(config):
     '''
     ret = []
     journal = _get_journal()
+    # Acknowledge the changes which made the journal file descriptor readable
+    journal.process()
 
     _config = {}
     list(map(_config.update, config))
@@ -17,9 +17,13 @@ from salt.payload import Serial
 from salt.utils.odict import OrderedDict
 import salt.loader
 import salt.syspaths
+import salt.utils.itertools
 
 log = logging.getLogger(__name__)
 
+# The number of keys fetched per request by Cache.fetch_many
+FETCH_CHUNK_SIZE = 500
+
 
 def factory(opts, **kwargs):
     '''
@@ -179,6 +183,56 @@ class Cache(object):
         fun = '{0}.fetch'.format(self.driver)
         return self.modules[fun](bank, key, **self._kwargs)
 
+    def store_many(self, items):
+        '''
+        Store the data of several keys at once, in a single request to the
+        backend when the driver supports it
+
+        .. versionadded:: Neon
+
+        :param items:
+            An iterable of ``(bank, key, data)`` tuples, as the arguments of
+            :py:meth:`store`.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        '''
+        fun = '{0}.store_many'.format(self.driver)
+        if fun in self.modules:
+            return self.modules[fun](items, **self._kwargs)
+        for bank, key, data in items:
+            self.store(bank, key, data)
+
+    def fetch_many(self, items):
+        '''
+        Fetch the data of several keys, ``FETCH_CHUNK_SIZE`` keys per request
+        to the backend when the driver supports it and one by one otherwise
+
+        .. versionadded:: Neon
+
+        :param items:
+            An iterable of ``(bank, key)`` tuples, as the arguments of
+            :py:meth:`fetch`.
+
+        :return:
+            Return a generator of the python objects fetched from the cache,
+            in the order of the items, with an empty dict for each path or key
+            not found. Only a chunk of the data is held at a time.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        '''
+        fun = '{0}.fetch_many'.format(self.driver)
+        if fun not in self.modules:
+            for bank, key in items:
+                yield self.fetch(bank, key)
+            return
+        for chunk in salt.utils.itertools.chunks(items, FETCH_CHUNK_SIZE):
+            for data in self.modules[fun](chunk, **self._kwargs):
+                yield data
+
     def updated(self, bank, key):
         '''
         Get the last updated epoch for the specified key
@@ -334,23 +388,59 @@ class MemCache(Cache):
 
         # Have no value for the key or value is expired
         data = super(MemCache, self).fetch(bank, key)
+        self._add(bank, key, data, now)
+        return data
+
+    def _add(self, bank, key, data, now):
         if len(self.storage) >= self.max:
             if self.cleanup:
                 MemCache.__cleanup(self.expire)
             if len(self.storage) >= self.max:
                 self.storage.popitem(last=False)
         self.storage[(bank, key)] = [now, data]
-        return data
+
+    def fetch_many(self, items):
+        for chunk in salt.utils.itertools.chunks(items, FETCH_CHUNK_SIZE):
+            for data in self._fetch_chunk(chunk):
+                yield data
+
+    def _fetch_chunk(self, items):
+        now = time.time()
+        ret = []
+        missing = []
+        for bank, key in items:
+            record = self.storage.pop((bank, key), None)
+            if record is not None and record[0] + self.expire >= now:
+                record[0] = now
+                self.storage[(bank, key)] = record
+                ret.append(record[1])
+            else:
+                missing.append(len(ret))
+                ret.append({})
+        if self.debug:
+            self.call += len(items)
+            self.hit += len(items) - len(missing)
+        if missing:
+            # The expired and missing keys are fetched in a single request
+            fetched = super(MemCache, self).fetch_many([items[index] for index in missing])
+            for index, data in zip(missing, fetched):
+                ret[index] = data
+                self._add(items[index][0], items[index][1], data, now)
+        return ret
 
     def store(self, bank, key, data):
         self.storage.pop((bank, key), None)
         super(MemCache, self).store(bank, key, data)
-        if len(self.storage) >= self.max:
-            if self.cleanup:
-                MemCache.__cleanup(self.expire)
-            if len(self.storage) >= self.max:
-                self.storage.popitem(last=False)
-        self.storage[(bank, key)] = [time.time(), data]
+        self._add(bank, key, data, time.time())
+
+    def store_many(self, items):
+        items = list(items)
+        for bank, key, _ in items:
+            self.storage.pop((bank, key), None)
+        super(MemCache, self).store_many(items)
+        now = time.time()
+        for bank, key, data in items:
+            self._add(bank, key, data, now)
 
     def flush(self, bank, key=None):
         self.storage.pop((bank, key), None)
@@ -104,6 +104,17 @@ unix_socket_path:
 
     Path to a UNIX socket for access. Overrides `host` / `port`.
 
+max_connections: ``None``
+
+    .. versionadded:: Neon
+
+    The maximum number of connections of the pool shared by the cache
+    operations of a process, unlimited by default.
+
+The ``fetch_many`` and ``store_many`` functions of the batch API of the cache
+read keys of any bank with a single ``MGET`` (a pipeline of ``GET`` in
+cluster mode), and write them in a single pipeline.
+
 Configuration Example:
 
 .. code-block:: yaml
@@ -112,6 +123,7 @@ Configuration Example:
     cache.redis.port: 6379
     cache.redis.db: '0'
     cache.redis.password: my pass
+    cache.redis.max_connections: 50
     cache.redis.bank_prefix: #BANK
     cache.redis.bank_keys_prefix: #BANKEYS
     cache.redis.key_prefix: #KEY
@@ -212,6 +224,7 @@ def _get_redis_cache_opts():
         'unix_socket_path': __opts__.get('cache.redis.unix_socket_path', None),
         'db': __opts__.get('cache.redis.db', '0'),
         'password': __opts__.get('cache.redis.password', ''),
+        'max_connections': __opts__.get('cache.redis.max_connections', None),
         'cluster_mode': __opts__.get('cache.redis.cluster_mode', False),
         'startup_nodes': __opts__.get('cache.redis.cluster.startup_nodes', {}),
         'skip_full_coverage_check': __opts__.get('cache.redis.cluster.skip_full_coverage_check', False),
@@ -237,7 +250,8 @@ def _get_redis_server(opts=None):
                                    opts['port'],
                                    unix_socket_path=opts['unix_socket_path'],
                                    db=opts['db'],
-                                   password=opts['password'])
+                                   password=opts['password'],
+                                   max_connections=opts.get('max_connections'))
     return REDIS_SERVER
 
 
@@ -290,16 +304,22 @@ def _get_bank_keys_redis_key(bank):
     )
 
 
-def _build_bank_hier(bank, redis_pipe):
+def _build_bank_hier(bank, redis_pipe, built=None):
     '''
     Build the bank hierarchy from the root of the tree.
     If already exists, it won't rewrite.
     It's using the Redis pipeline,
     so there will be only one interaction with the remote server.
+    The banks in ``built`` are skipped, the others are added to it.
     '''
     bank_list = bank.split('/')
     parent_bank_path = bank_list[0]
     for bank_name in bank_list[1:]:
+        if built is not None:
+            if (parent_bank_path, bank_name) in built:
+                parent_bank_path = '{0}/{1}'.format(parent_bank_path, bank_name)
+                continue
+            built.add((parent_bank_path, bank_name))
         prev_bank_redis_key = _get_bank_redis_key(parent_bank_path)
         redis_pipe.sadd(prev_bank_redis_key, bank_name)
         log.debug('Adding %s to %s', bank_name, prev_bank_redis_key)
@@ -376,6 +396,63 @@ def fetch(bank, key):
     return __context__['serial'].loads(redis_value)
 
 
+def store_many(items):
+    '''
+    Store the data of several keys, of any banks, in a single pipeline.
+
+    :param items: An iterable of ``(bank, key, data)`` tuples
+
+    .. versionadded:: Neon
+    '''
+    items = list(items)
+    redis_server = _get_redis_server()
+    redis_pipe = redis_server.pipeline()
+    built = set()
+    try:
+        for bank, key, data in items:
+            _build_bank_hier(bank, redis_pipe, built)
+            redis_pipe.set(_get_key_redis_key(bank, key), __context__['serial'].dumps(data))
+            redis_pipe.sadd(_get_bank_keys_redis_key(bank), key)
+        log.debug('Storing %d keys in a single pipeline', len(items))
+        redis_pipe.execute()
+    except (RedisConnectionError, RedisResponseError) as rerr:
+        mesg = 'Cannot set the Redis cache keys: {rerr}'.format(rerr=rerr)
+        log.error(mesg)
+        raise SaltCacheError(mesg)
+
+
+def fetch_many(items):
+    '''
+    Fetch the data of several keys, of any banks, in a single request.
+
+    :param items: An iterable of ``(bank, key)`` tuples
+
+    :return: The list of the data of the keys, in the same order, with an
+        empty dict for the keys which are not found
+
+    .. versionadded:: Neon
+    '''
+    redis_keys = [_get_key_redis_key(bank, key) for bank, key in items]
+    if not redis_keys:
+        return []
+    redis_server = _get_redis_server()
+    try:
+        if _get_redis_cache_opts()['cluster_mode']:
+            # The keys live on different nodes
+            redis_pipe = redis_server.pipeline()
+            for redis_key in redis_keys:
+                redis_pipe.get(redis_key)
+            redis_values = redis_pipe.execute()
+        else:
+            redis_values = redis_server.mget(redis_keys)
+    except (RedisConnectionError, RedisResponseError) as rerr:
+        mesg = 'Cannot fetch the Redis cache keys: {rerr}'.format(rerr=rerr)
+        log.error(mesg)
+        raise SaltCacheError(mesg)
+    return [{} if redis_value is None else __context__['serial'].loads(redis_value)
+            for redis_value in redis_values]
+
+
 def flush(bank, key=None):
     '''
     Remove the key from the cache bank with all the key content. If no key is specified, remove
@@ -15,6 +15,8 @@ import salt.utils.stringutils
 import salt.client
 import salt.output
 import salt.exceptions
+import salt.utils.minions
+import salt.utils.presence
 
 # Import 3rd-party libs
 # pylint: disable=import-error,no-name-in-module,redefined-builtin
@@ -112,10 +114,27 @@ class Batch(object):
         self.minions, self.ping_gen, self.down_minions = self.__gather_minions()
         self.options = parser
 
+    def __gather_present_minions(self):
+        '''
+        Return the list of minions to use for the batch run from the presence
+        table, without pinging them
+        '''
+        ckminions = salt.utils.minions.CkMinions(self.opts)
+        minions = ckminions.check_minions(self.opts['tgt'], 'glob')['minions']
+        present = salt.utils.presence.present(self.opts, minions)
+        if not present and not self.quiet:
+            salt.utils.stringutils.print_cli('No minions matched the target.')
+        return (present, iter([]), set(minions).difference(present))
+
     def __gather_minions(self):
         '''
         Return a list of minions to use for the batch run
         '''
+        tgt_type = self.opts.get('selected_target_option') or self.opts.get('tgt_type')
+        if tgt_type == 'presence':
+            # Only when asked for with --presence, the table may miss idle
+            # minions which are up
+            return self.__gather_present_minions()
         args = [self.opts['tgt'],
                 'test.ping',
                 [],
@@ -20,6 +20,7 @@ The data structure needs to be:
 #
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import contextlib
 import os
 import time
 import random
@@ -168,6 +169,10 @@ class LocalClient(object):
                 listen=False,
                 io_loop=io_loop,
                 keep_loop=keep_loop)
+        # Only receive the events of the jobs listened to, the number of
+        # jobs being published is counted as their jids are not known yet
+        self._publishing = 0
+        self.event.filter_publisher()
         self.utils = salt.loader.utils(self.opts)
         self.functions = salt.loader.minion_mods(self.opts, utils=self.utils)
         self.returners = salt.loader.returners(self.opts, self.functions)
@@ -247,6 +252,24 @@ class LocalClient(object):
 
         return pub_data
 
+    @contextlib.contextmanager
+    def _publishing_job(self, listen):
+        '''
+        Receive the events of all the jobs while publishing a job to listen
+        to, until its jid is subscribed
+        '''
+        if not listen or self.event.publisher_filter is None:
+            yield
+            return
+        self._publishing += 1
+        self.event.filter_publisher(['salt/job/'])
+        try:
+            yield
+        finally:
+            self._publishing -= 1
+            if not self._publishing and self.event.publisher_filter is not None:
+                self.event.filter_publisher()
+
     def _check_pub_data(self, pub_data, listen=True):
         '''
         Common checks on the pub_data data structure returned from running pub
@@ -321,31 +344,32 @@ class LocalClient(object):
         '''
         arg = salt.utils.args.parse_input(arg, kwargs=kwarg)
 
-        try:
-            pub_data = self.pub(
-                tgt,
-                fun,
-                arg,
-                tgt_type,
-                ret,
-                jid=jid,
-                timeout=self._get_timeout(timeout),
-                listen=listen,
-                **kwargs)
-        except SaltClientError:
-            # Re-raise error with specific message
-            raise SaltClientError(
-                'The salt master could not be contacted. Is master running?'
-            )
-        except AuthenticationError as err:
-            raise AuthenticationError(err)
-        except AuthorizationError as err:
-            raise AuthorizationError(err)
-        except Exception as general_exception:
-            # Convert to generic client error and pass along message
-            raise SaltClientError(general_exception)
+        with self._publishing_job(listen):
+            try:
+                pub_data = self.pub(
+                    tgt,
+                    fun,
+                    arg,
+                    tgt_type,
+                    ret,
+                    jid=jid,
+                    timeout=self._get_timeout(timeout),
+                    listen=listen,
+                    **kwargs)
+            except SaltClientError:
+                # Re-raise error with specific message
+                raise SaltClientError(
+                    'The salt master could not be contacted. Is master running?'
+                )
+            except AuthenticationError as err:
+                raise AuthenticationError(err)
+            except AuthorizationError as err:
+                raise AuthorizationError(err)
+            except Exception as general_exception:
+                # Convert to generic client error and pass along message
+                raise SaltClientError(general_exception)
 
-        return self._check_pub_data(pub_data, listen=listen)
+            return self._check_pub_data(pub_data, listen=listen)
 
     def gather_minions(self, tgt, expr_form):
         _res = salt.utils.minions.CkMinions(self.opts).check_minions(tgt, tgt_type=expr_form)
@@ -381,32 +405,33 @@ class LocalClient(object):
         '''
         arg = salt.utils.args.parse_input(arg, kwargs=kwarg)
 
-        try:
-            pub_data = yield self.pub_async(
-                  tgt,
-                  fun,
-                  arg,
-                  tgt_type,
-                  ret,
-                  jid=jid,
-                  timeout=self._get_timeout(timeout),
-                  io_loop=io_loop,
-                  listen=listen,
-                  **kwargs)
-        except SaltClientError:
-            # Re-raise error with specific message
-            raise SaltClientError(
-                'The salt master could not be contacted. Is master running?'
-            )
-        except AuthenticationError as err:
-            raise AuthenticationError(err)
-        except AuthorizationError as err:
-            raise AuthorizationError(err)
-        except Exception as general_exception:
-            # Convert to generic client error and pass along message
-            raise SaltClientError(general_exception)
+        with self._publishing_job(listen):
+            try:
+                pub_data = yield self.pub_async(
+                      tgt,
+                      fun,
+                      arg,
+                      tgt_type,
+                      ret,
+                      jid=jid,
+                      timeout=self._get_timeout(timeout),
+                      io_loop=io_loop,
+                      listen=listen,
+                      **kwargs)
+            except SaltClientError:
+                # Re-raise error with specific message
+                raise SaltClientError(
+                    'The salt master could not be contacted. Is master running?'
+                )
+            except AuthenticationError as err:
+                raise AuthenticationError(err)
+            except AuthorizationError as err:
+                raise AuthorizationError(err)
+            except Exception as general_exception:
+                # Convert to generic client error and pass along message
+                raise SaltClientError(general_exception)
 
-        raise tornado.gen.Return(self._check_pub_data(pub_data, listen=listen))
+            raise tornado.gen.Return(self._check_pub_data(pub_data, listen=listen))
 
     def cmd_async(
             self,
@@ -757,7 +782,8 @@ class LocalClient(object):
                     'nodegroup': '-N',
                     'pcre': '-E',
                     'pillar': '-I',
-                    'pillar_pcre': '-J'}
+                    'pillar_pcre': '-J',
+                    'presence': '--presence'}
             if HAS_RANGE:
                 ref['range'] = '-R'
             if ref[tgt_type].startswith('-'):
@@ -1611,6 +1637,8 @@ class LocalClient(object):
             yield {}
             # stop the iteration, since the jid is invalid
             raise StopIteration()
+        # The events of every job are returned
+        self.event.unfilter_publisher()
         # Wait for the hosts to check in
         while True:
             raw = self.event.get_event(timeout, auto_reconnect=self.auto_reconnect)
@@ -1662,6 +1690,13 @@ class LocalClient(object):
             tgt = self._convert_range_to_list(tgt)
             tgt_type = 'list'
 
+        # Convert a presence expression to the list of the matching minions
+        # which are present, so that only they get the job
+        if tgt_type == 'presence':
+            ckminions = salt.utils.minions.CkMinions(self.opts)
+            tgt = ckminions.check_minions(tgt, 'presence')['minions']
+            tgt_type = 'list'
+
         # If an external job cache is specified add it to the ret list
         if self.opts.get('ext_job_cache'):
             if ret:
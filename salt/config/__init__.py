@@ -356,6 +356,16 @@ VALID_OPTS = immutabletypes.freeze({
     # Whether or not processes should be forked when needed. The alternative is to use threading.
     'multiprocessing': bool,
 
+    # Functions, which are also marked inline_safe, that run in a thread pool of
+    # the minion process instead of a forked process when multiprocessing is on
+    'inline_functions': list,
+
+    # The number of seconds an inline function may take before it is forked instead
+    'inline_functions_timeout': (int, float),
+
+    # The number of threads available to inline functions
+    'inline_functions_threads': int,
+
     # Maximum number of concurrently active processes at any given point in time
     'process_count_max': int,
 
@@ -372,6 +382,12 @@ VALID_OPTS = immutabletypes.freeze({
     # The number of minutes between mine updates.
     'mine_interval': int,
 
+    # Only send the mine functions whose results changed to the master
+    'mine_delta': bool,
+
+    # The number of seconds after which mine_delta sends all mine data again
+    'mine_delta_full_interval': int,
+
     # The ipc strategy. (i.e., sockets versus tcp, etc)
     'ipc_mode': six.string_types,
 
@@ -546,6 +562,27 @@ VALID_OPTS = immutabletypes.freeze({
     'return_retry_timer': int,
     'return_retry_timer_max': int,
 
+    # Route job returns through a persistent queue in the main minion process
+    # which coalesces them into batched requests over a single channel
+    'return_queue': bool,
+    # The maximum number of returns sent to the master in a single request
+    'return_queue_batch_size': int,
+    # The number of seconds the return queue waits for more returns before flushing
+    'return_queue_flush_interval': float,
+    # Persist queued returns in the cachedir so they survive a minion restart
+    'return_queue_persist': bool,
+
+    # Send the events the minion fires on the master in batches
+    'master_event_batch': bool,
+    # The maximum number of events sent to the master in a single request
+    'master_event_batch_size': int,
+    # The number of seconds the minion waits for more events before sending a batch
+    'master_event_batch_interval': float,
+    # The tags of the events only the most recent of which is sent in a batch
+    'master_event_coalesce': list,
+    # Compress the batches of events larger than this number of bytes, 0 to disable
+    'master_event_compress_size': int,
+
     # Specify one or more returners in which all events will be sent to. Requires that the returners
     # in question have an event_return(event) function!
     'event_return': (list, six.string_types),
@@ -559,6 +596,15 @@ VALID_OPTS = immutabletypes.freeze({
     # `event_return_queue` events won't get stale.
     'event_return_queue_max_seconds': int,
 
+    # The number of batches of events queued in memory for each event returner, which stores
+    # them in its own thread. 0 stores them in the event return process, one returner after the
+    # other.
+    'event_return_queue_batches': int,
+
+    # Spool the batches of events to the cachedir when an event returner is not keeping up.
+    # When disabled, the batches which do not fit in the queue are dropped
+    'event_return_spool': bool,
+
     # Only forward events to an event returner if it matches one of the tags in this list
     'event_return_whitelist': list,
 
@@ -568,6 +614,10 @@ VALID_OPTS = immutabletypes.freeze({
     # default match type for filtering events tags: startswith, endswith, find, regex, fnmatch
     'event_match_type': six.string_types,
 
+    # Let the event subscribers ask the event publisher to only send them the
+    # events they want
+    'event_publisher_filter': bool,
+
     # This pidfile to write out to when a daemon starts
     'pidfile': six.string_types,
 
@@ -671,6 +721,49 @@ VALID_OPTS = immutabletypes.freeze({
     # Frequency of the proxy_keep_alive, in minutes
     'proxy_keep_alive_interval': int,
 
+    # Keep the trees of the file_roots in memory, updated through inotify,
+    # instead of walking them
+    'roots_inotify': bool,
+
+    # Answer the hash and stat requests for the files of the fileserver from
+    # an index updated with the fileserver backends
+    'file_hash_index': bool,
+
+    # The maximum size of the files sent at once by the master when minions
+    # fetch the files which differ from a manifest
+    'file_bundle_max_size': int,
+
+    # Distribute the large files of the fileserver through the minions which
+    # already hold them
+    'file_peer_distribution': bool,
+
+    # The size of the chunks the files distributed through peers are split in
+    'file_peer_chunk_size': int,
+
+    # The maximum number of peers the master returns for each chunk
+    'file_peer_max_peers': int,
+
+    # Seconds after which the master forgets that a minion holds a chunk
+    'file_peer_ttl': int,
+
+    # The length of the network prefix a minion and its peers have in common
+    'file_peer_prefixlen': int,
+
+    # The port and interface the minion serves its chunks to its peers on, the
+    # interface defaults to the one of file_peer_address
+    'file_peer_port': int,
+    'file_peer_interface': (type(None), six.string_types),
+
+    # The address the peers reach the minion at, defaults to its first IP. The
+    # master only hands it to the peers if the minion connects from it
+    'file_peer_address': (type(None), six.string_types),
+
+    # The size from which the minion fetches the files from its peers
+    'file_peer_min_size': int,
+
+    # The maximum size of the chunks kept by the minion
+    'file_peer_cache_size': int,
+
     # Update intervals
     'roots_update_interval': int,
     'azurefs_update_interval': int,
@@ -715,6 +808,16 @@ VALID_OPTS = immutabletypes.freeze({
     'gitfs_ref_types': list,
     'gitfs_refspecs': list,
     'gitfs_disable_saltenv_mapping': bool,
+
+    # The number of gitfs and git_pillar remotes fetched at the same time
+    'gitfs_fetch_workers': int,
+    'git_pillar_fetch_workers': int,
+
+    # The maximum number of seconds a gitfs or git_pillar remote which failed
+    # to fetch repeatedly is not fetched for, 0 disables the backoff
+    'gitfs_fetch_backoff': int,
+    'git_pillar_fetch_backoff': int,
+
     'hgfs_remotes': list,
     'hgfs_mountpoint': six.string_types,
     'hgfs_root': six.string_types,
@@ -742,6 +845,14 @@ VALID_OPTS = immutabletypes.freeze({
     # Specify a list of external pillar systems to use
     'ext_pillar': list,
 
+    # Concurrency, timeouts, circuit breakers and caching of the external
+    # pillars, by external pillar name
+    'ext_pillar_sources': dict,
+
+    # The number of threads running concurrent external pillars without a
+    # timeout, per process
+    'ext_pillar_workers': int,
+
     # Reserved for future use to version the pillar structure
     'pillar_version': int,
 
@@ -757,6 +868,35 @@ VALID_OPTS = immutabletypes.freeze({
     # Pillar cache backend. Defaults to `disk` which stores caches in the master cache
     'pillar_cache_backend': six.string_types,
 
+    # Cache rendered pillar SLS files and ext_pillar data with what they depend on
+    'pillar_render_cache': bool,
+
+    # Execution functions pillar SLS files may call and still be cached by the
+    # pillar render cache
+    'pillar_render_cache_functions': list,
+
+    # Share the pillar render cache between minions
+    'pillar_render_cache_shared': bool,
+
+    # The number of variants of a pillar SLS file the shared pillar render
+    # cache keeps, each rendered from different grains or pillar data
+    'pillar_render_cache_variants': int,
+
+    # The number of shared pillar render cache entries each master worker
+    # keeps in memory
+    'pillar_render_cache_size': int,
+
+    # Compile the pillar of minions in a dedicated process pool instead of in
+    # the master workers
+    'pillar_compile_async': bool,
+
+    # The number of processes compiling pillars with pillar_compile_async
+    'pillar_compile_workers': int,
+
+    # The number of seconds a minion waits for the master to compile its
+    # pillar with pillar_compile_async before giving up
+    'pillar_compile_timeout': int,
+
     'pillar_safe_render_error': bool,
 
     # When creating a pillar, there are several strategies to choose from when
@@ -782,6 +922,14 @@ VALID_OPTS = immutabletypes.freeze({
     'default_top': six.string_types,
 
     'ping_on_rotate': bool,
+
+    # Keep a table of the present minions, updated from the master event bus
+    'presence_table': bool,
+    # The number of seconds a minion which is not connected stays present after it was last seen
+    'presence_timeout': int,
+    # The number of seconds between the saves of the presence table
+    'presence_save_interval': float,
+
     'peer': dict,
     'preserve_minion_cache': bool,
     'syndic_master': (six.string_types, list),
@@ -864,6 +1012,10 @@ VALID_OPTS = immutabletypes.freeze({
     # reply from executions.
     'minion_data_cache': bool,
 
+    # Keep an index of the mine data by function, so that looking up a mine
+    # function across many minions takes a single cache read
+    'mine_index': bool,
+
     # The number of seconds between AES key rotations on the master
     'publish_session': int,
 
@@ -879,9 +1031,33 @@ VALID_OPTS = immutabletypes.freeze({
     # The queue size for workers in the reactor
     'reactor_worker_hwm': int,
 
+    # Cache the renderings of the reactor SLS files by event, for the files
+    # rendered with jinja, yaml and json only
+    'reactor_render_cache': bool,
+
+    # The number of seconds during which the reactor ignores the events
+    # repeating an event it handled, with the same tag and data
+    'reactor_coalesce_window': (int, float),
+
+    # The field of the event data whose value orders the reactions: the
+    # reactions to the events with the same value run in order. When set, the
+    # local and caller reactions are queued on the workers too.
+    'reactor_queue_key': (type(None), six.string_types),
+
+    # The maximum number of reactions of each type running at once
+    'reactor_worker_limits': dict,
+
+    # Spool the reactions to disk when the reactor workers queue is full,
+    # instead of dropping them
+    'reactor_spool': bool,
+
     # Defines engines. See https://docs.saltstack.com/en/latest/topics/engines/
     'engines': list,
 
+    # Run the engines in a single engine host process sharing one subscription to the event bus,
+    # instead of one process per engine
+    'engines_host': bool,
+
     # Whether or not to store runner returns in the job cache
     'runner_returns': bool,
 
@@ -1148,6 +1324,17 @@ VALID_OPTS = immutabletypes.freeze({
     # to the master is attempted.
     'beacons_before_connect': bool,
 
+    # Run beacons in threads and watch their event sources on the io_loop
+    # instead of running them one after another in the minion's main loop
+    'beacons_async': bool,
+
+    # The number of seconds the events of beacons run with beacons_async are
+    # waited for before they are sent with the next batch instead
+    'beacons_timeout': (int, float),
+
+    # The number of threads available to beacons run with beacons_async
+    'beacons_threads': int,
+
     # Controls whether the scheduler is set up before a connection
     # to the master is attempted.
     'scheduler_before_connect': bool,
@@ -1214,6 +1401,9 @@ VALID_OPTS = immutabletypes.freeze({
     # Thorium top file location
     'thorium_top': six.string_types,
 
+    # Only run the thorium states whose events or register entries changed
+    'thorium_incremental': bool,
+
     # Use Adler32 hashing algorithm for server_id (default False until Sodium, "adler32" after)
     # Possible values are: False, adler32, crc32
     'server_id_use_crc': (bool, six.string_types),
@@ -1269,6 +1459,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'lock_saltenv': False,
     'pillarenv': None,
     'pillarenv_from_saltenv': False,
+    'pillar_compile_timeout': 300,
     'pillar_opts': False,
     'pillar_source_merging_strategy': 'smart',
     'pillar_merge_lists': False,
@@ -1278,6 +1469,11 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'pillar_cache': False,
     'pillar_cache_ttl': 3600,
     'pillar_cache_backend': 'disk',
+    'pillar_render_cache': False,
+    'pillar_render_cache_functions': ['grains.get', 'grains.item', 'pillar.get', 'config.get'],
+    'pillar_render_cache_shared': False,
+    'pillar_render_cache_variants': 16,
+    'pillar_render_cache_size': 1000,
     'extension_modules': os.path.join(salt.syspaths.CACHE_DIR, 'minion', 'extmods'),
     'state_top': 'top.sls',
     'state_top_saltenv': None,
@@ -1287,10 +1483,17 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'thoriumenv': None,
     'thorium_top': 'top.sls',
     'thorium_interval': 0.5,
+    'thorium_incremental': True,
     'thorium_roots': {
         'base': [salt.syspaths.BASE_THORIUM_ROOTS_DIR],
         },
     'file_client': 'remote',
+    'file_peer_distribution': False,
+    'file_peer_port': 4507,
+    'file_peer_interface': None,
+    'file_peer_address': None,
+    'file_peer_min_size': 33554432,
+    'file_peer_cache_size': 1073741824,
     'local': False,
     'use_master_when_local': False,
     'file_roots': {
@@ -1341,6 +1544,8 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'git_pillar_passphrase': '',
     'git_pillar_refspecs': _DFLT_REFSPECS,
     'git_pillar_includes': True,
+    'git_pillar_fetch_workers': 1,
+    'git_pillar_fetch_backoff': 0,
     'gitfs_remotes': [],
     'gitfs_mountpoint': '',
     'gitfs_root': '',
@@ -1361,6 +1566,8 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'gitfs_ref_types': ['branch', 'tag', 'sha'],
     'gitfs_refspecs': _DFLT_REFSPECS,
     'gitfs_disable_saltenv_mapping': False,
+    'gitfs_fetch_workers': 1,
+    'gitfs_fetch_backoff': 0,
     'unique_jid': False,
     'hash_type': 'sha256',
     'optimization_order': [0, 1, 2],
@@ -1382,11 +1589,16 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'auto_accept': True,
     'autosign_timeout': 120,
     'multiprocessing': True,
+    'inline_functions': [],
+    'inline_functions_timeout': 10,
+    'inline_functions_threads': 4,
     'process_count_max': -1,
     'process_count_max_sleep_secs': 10,
     'mine_enabled': True,
     'mine_return_job': False,
     'mine_interval': 60,
+    'mine_delta': False,
+    'mine_delta_full_interval': 3600,
     'ipc_mode': _DFLT_IPC_MODE,
     'ipc_write_buffer': _DFLT_IPC_WBUFFER,
     'ipc_so_rcvbuf': None,
@@ -1441,6 +1653,15 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'recon_randomize': True,
     'return_retry_timer': 5,
     'return_retry_timer_max': 10,
+    'return_queue': False,
+    'return_queue_batch_size': 100,
+    'return_queue_flush_interval': 0.05,
+    'return_queue_persist': True,
+    'master_event_batch': False,
+    'master_event_batch_size': 100,
+    'master_event_batch_interval': 0.5,
+    'master_event_coalesce': [],
+    'master_event_compress_size': 4096,
     'random_reauth_delay': 10,
     'winrepo_source_dir': 'salt://win/repo-ng/',
     'winrepo_dir': os.path.join(salt.syspaths.BASE_FILE_ROOTS_DIR, 'win', 'repo'),
@@ -1464,7 +1685,13 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'reactor_refresh_interval': 60,
     'reactor_worker_threads': 10,
     'reactor_worker_hwm': 10000,
+    'reactor_render_cache': False,
+    'reactor_coalesce_window': 0,
+    'reactor_queue_key': None,
+    'reactor_worker_limits': {},
+    'reactor_spool': False,
     'engines': [],
+    'engines_host': False,
     'tcp_keepalive': True,
     'tcp_keepalive_idle': 300,
     'tcp_keepalive_cnt': -1,
@@ -1507,6 +1734,9 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'ssl': None,
     'multifunc_ordered': False,
     'beacons_before_connect': False,
+    'beacons_async': False,
+    'beacons_timeout': 10,
+    'beacons_threads': 4,
     'scheduler_before_connect': False,
     'cache': 'localfs',
     'salt_cp_chunk_size': 65536,
@@ -1562,6 +1792,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'thoriumenv': None,
     'thorium_top': 'top.sls',
     'thorium_interval': 0.5,
+    'thorium_incremental': True,
     'thorium_roots': {
         'base': [salt.syspaths.BASE_THORIUM_ROOTS_DIR],
         },
@@ -1574,6 +1805,15 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'file_client': 'local',
     'local': True,
 
+    'roots_inotify': False,
+    'file_hash_index': False,
+    'file_bundle_max_size': 10485760,
+    'file_peer_distribution': False,
+    'file_peer_chunk_size': 4194304,
+    'file_peer_max_peers': 3,
+    'file_peer_ttl': 86400,
+    'file_peer_prefixlen': 24,
+
     # Update intervals
     'roots_update_interval': DEFAULT_INTERVAL,
     'azurefs_update_interval': DEFAULT_INTERVAL,
@@ -1597,6 +1837,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'git_pillar_passphrase': '',
     'git_pillar_refspecs': _DFLT_REFSPECS,
     'git_pillar_includes': True,
+    'git_pillar_fetch_workers': 1,
+    'git_pillar_fetch_backoff': 0,
     'git_pillar_verify_config': True,
     'gitfs_remotes': [],
     'gitfs_mountpoint': '',
@@ -1618,6 +1860,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'gitfs_ref_types': ['branch', 'tag', 'sha'],
     'gitfs_refspecs': _DFLT_REFSPECS,
     'gitfs_disable_saltenv_mapping': False,
+    'gitfs_fetch_workers': 1,
+    'gitfs_fetch_backoff': 0,
     'hgfs_remotes': [],
     'hgfs_mountpoint': '',
     'hgfs_root': '',
@@ -1648,6 +1892,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'minionfs_whitelist': [],
     'minionfs_blacklist': [],
     'ext_pillar': [],
+    'ext_pillar_sources': {},
+    'ext_pillar_workers': 4,
     'pillar_version': 2,
     'pillar_opts': False,
     'pillar_safe_render_error': True,
@@ -1657,7 +1903,17 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'pillar_cache': False,
     'pillar_cache_ttl': 3600,
     'pillar_cache_backend': 'disk',
+    'pillar_render_cache': False,
+    'pillar_render_cache_functions': ['grains.get', 'grains.item', 'pillar.get', 'config.get'],
+    'pillar_render_cache_shared': False,
+    'pillar_render_cache_variants': 16,
+    'pillar_render_cache_size': 1000,
+    'pillar_compile_async': False,
+    'pillar_compile_workers': 4,
     'ping_on_rotate': False,
+    'presence_table': False,
+    'presence_timeout': 300,
+    'presence_save_interval': 1.0,
     'peer': {},
     'preserve_minion_cache': False,
     'syndic_master': 'masterofmasters',
@@ -1712,6 +1968,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'job_cache_store_endtime': False,
     'minion_data_cache': True,
     'enforce_mine_cache': False,
+    'mine_index': False,
     'ipc_mode': _DFLT_IPC_MODE,
     'ipc_write_buffer': _DFLT_IPC_WBUFFER,
     'ipc_so_rcvbuf': None,
@@ -1740,12 +1997,21 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'reactor_refresh_interval': 60,
     'reactor_worker_threads': 10,
     'reactor_worker_hwm': 10000,
+    'reactor_render_cache': False,
+    'reactor_coalesce_window': 0,
+    'reactor_queue_key': None,
+    'reactor_worker_limits': {},
+    'reactor_spool': False,
     'engines': [],
+    'engines_host': False,
     'event_return': '',
     'event_return_queue': 0,
+    'event_return_queue_batches': 10,
+    'event_return_spool': True,
     'event_return_whitelist': [],
     'event_return_blacklist': [],
     'event_match_type': 'startswith',
+    'event_publisher_filter': True,
     'runner_returns': True,
     'serial': 'msgpack',
     'test': False,
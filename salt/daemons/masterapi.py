@@ -36,6 +36,7 @@ import salt.utils.files
 import salt.utils.gitfs
 import salt.utils.verify
 import salt.utils.minions
+import salt.utils.mine_index
 import salt.utils.gzip_util
 import salt.utils.jid
 import salt.utils.minions
@@ -51,6 +52,7 @@ from salt.pillar import git_pillar
 
 # Import 3rd-party libs
 from salt.ext import six
+from salt.ext.six.moves import zip  # pylint: disable=redefined-builtin
 
 try:
     import pwd
@@ -474,6 +476,9 @@ class RemoteFuncs(object):
         self._serve_file = fs_.serve_file
         self._file_find = fs_._find_file
         self._file_hash = fs_.file_hash
+        self._file_hashes = fs_.file_hashes
+        self._file_manifest = fs_.file_manifest
+        self._file_bundle = fs_.file_bundle
         self._file_list = fs_.file_list
         self._file_list_emptydirs = fs_.file_list_emptydirs
         self._dir_list = fs_.dir_list
@@ -643,9 +648,20 @@ class RemoteFuncs(object):
                 greedy=False
                 )
         minions = _res['minions']
-        for minion in minions:
-            fdata = self.cache.fetch('minions/{0}'.format(minion), 'mine')
-
+        index = salt.utils.mine_index.get(
+            self.opts, minions, functions_allowed, cache=self.cache)
+        if index is not None:
+            for fun in functions_allowed:
+                if not _ret_dict:
+                    ret = index[fun]
+                    break
+                if index[fun]:
+                    ret[fun] = index[fun]
+            return ret
+        minions = list(minions)
+        fdatas = self.cache.fetch_many(
+            [('minions/{0}'.format(minion), 'mine') for minion in minions])
+        for minion, fdata in zip(minions, fdatas):
             if not isinstance(fdata, dict):
                 continue
 
@@ -673,6 +689,7 @@ class RemoteFuncs(object):
                     data.update(load['data'])
                     load['data'] = data
             self.cache.store(cbank, ckey, load['data'])
+            salt.utils.mine_index.mark(self.opts, load['id'], cache=self.cache)
         return True
 
     def _mine_delete(self, load):
@@ -691,6 +708,7 @@ class RemoteFuncs(object):
                 if load['fun'] in data:
                     del data[load['fun']]
                     self.cache.store(cbank, ckey, data)
+                    salt.utils.mine_index.mark(self.opts, load['id'], cache=self.cache)
             except OSError:
                 return False
         return True
@@ -702,7 +720,9 @@ class RemoteFuncs(object):
         if not skip_verify and 'id' not in load:
             return False
         if self.opts.get('minion_data_cache', False) or self.opts.get('enforce_mine_cache', False):
-            return self.cache.flush('minions/{0}'.format(load['id']), 'mine')
+            ret = self.cache.flush('minions/{0}'.format(load['id']), 'mine')
+            salt.utils.mine_index.mark(self.opts, load['id'], cache=self.cache)
+            return ret
         return True
 
     def _file_recv(self, load):
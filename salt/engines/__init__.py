@@ -5,17 +5,38 @@ complex services to be encapsulated within the salt plugin environment
 '''
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import fnmatch
 import multiprocessing
 import logging
+import threading
+import time
 
 # Import salt libs
 import salt
 import salt.loader
+import salt.utils.args
+import salt.utils.event
 import salt.utils.platform
+import salt.utils.process
+from salt.ext import six
+from salt.ext.six.moves import queue  # pylint: disable=import-error
 from salt.utils.process import SignalHandlingMultiprocessingProcess
 
 log = logging.getLogger(__name__)
 
+# The options of an engine only used by the engine host
+HOST_OPTIONS = ('engine_tags', 'engine_restart')
+
+
+def _pop_host_options(engine_opts):
+    '''
+    Pop the engine host options out of the options of an engine
+    '''
+    if not engine_opts:
+        return {}
+    return dict((key, engine_opts.pop(key))
+                for key in HOST_OPTIONS if key in engine_opts)
+
 
 def start_engines(opts, proc_mgr, proxy=None):
     '''
@@ -41,6 +62,7 @@ def start_engines(opts, proc_mgr, proxy=None):
         utils = None
         funcs = None
 
+    hosted = []
     for engine in engines_opt:
         if isinstance(engine, dict):
             engine, engine_opts = next(iter(engine.items()))
@@ -53,6 +75,7 @@ def start_engines(opts, proc_mgr, proxy=None):
             del engine_opts['engine_module']
         else:
             fun = '{0}.start'.format(engine)
+        host_opts = _pop_host_options(engine_opts)
         if fun in engines:
             start_func = engines[fun]
             if engine_name:
@@ -62,6 +85,9 @@ def start_engines(opts, proc_mgr, proxy=None):
             else:
                 name = '{0}.Engine({1})'.format(__name__,
                                                 start_func.__module__)
+            if opts.get('engines_host'):
+                hosted.append((name, fun, engine_opts, host_opts))
+                continue
             log.info('Starting Engine %s', name)
             proc_mgr.add_process(
                     Engine,
@@ -76,6 +102,20 @@ def start_engines(opts, proc_mgr, proxy=None):
                     name=name
                     )
 
+    if hosted:
+        log.info('Starting the engine host of %s engines', len(hosted))
+        proc_mgr.add_process(
+                EngineHost,
+                args=(
+                    opts,
+                    hosted,
+                    funcs,
+                    runners,
+                    proxy
+                    ),
+                name='{0}.EngineHost'.format(__name__)
+                )
+
 
 class Engine(SignalHandlingMultiprocessingProcess):
     '''
@@ -147,3 +187,160 @@ class Engine(SignalHandlingMultiprocessingProcess):
                 'Engine \'%s\' could not be started!',
                 self.fun.split('.')[0], exc_info=True
             )
+
+
+class EngineHost(SignalHandlingMultiprocessingProcess):
+    '''
+    Execute several engines in a single process, sharing one loader stack and
+    one subscription to the event bus
+
+    Each engine runs in its own thread. The host decodes each event once and
+    puts it on the queues of the engines whose ``engine_tags`` match its tag.
+    The engines whose ``start`` function takes a ``shared_event`` argument get
+    a SharedEvent reading from their queue, the others subscribe to the bus on
+    their own.
+    When an engine fails, the host restarts it according to its
+    ``engine_restart`` policy, ``always``, ``on-failure`` or ``never``, waiting
+    longer after each quick failure.
+    '''
+    # The number of events queued for an engine before they are dropped
+    queue_size = 10000
+    # The maximum number of seconds to wait before restarting an engine
+    max_restart_delay = 60
+
+    def __init__(self, opts, engines, funcs, runners, proxy, **kwargs):
+        '''
+        Set up the process executor
+        '''
+        super(EngineHost, self).__init__(**kwargs)
+        self.opts = opts
+        self.engines = engines
+        self.funcs = funcs
+        self.runners = runners
+        self.proxy = proxy
+        self.queues = []
+
+    # __setstate__ and __getstate__ are only used on Windows.
+    # We do this so that __init__ will be invoked on Windows in the child
+    # process so that a register_after_fork() equivalent will work on Windows.
+    def __setstate__(self, state):
+        self._is_child = True
+        self.__init__(
+            state['opts'],
+            state['engines'],
+            state['funcs'],
+            state['runners'],
+            state['proxy'],
+            log_queue=state['log_queue'],
+            log_queue_level=state['log_queue_level']
+        )
+
+    def __getstate__(self):
+        return {
+            'opts': self.opts,
+            'engines': self.engines,
+            'funcs': self.funcs,
+            'runners': self.runners,
+            'proxy': self.proxy,
+            'log_queue': self.log_queue,
+            'log_queue_level': self.log_queue_level
+        }
+
+    def supervise(self, name, fun, config, restart, events):
+        '''
+        Run an engine, restarting it according to its restart policy
+        '''
+        delay = 1
+        while True:
+            started = time.time()
+            failed = False
+            event = salt.utils.event.SharedEvent(
+                self.opts['__role'], self.opts['sock_dir'], self.opts, events=events)
+            start = self.engine[fun]
+            kwargs = dict(config or {})
+            if 'shared_event' in salt.utils.args.get_function_argspec(start).args:
+                # The engines reading the events of the host take it
+                kwargs['shared_event'] = event
+            try:
+                start(**kwargs)
+            except Exception:
+                failed = True
+                log.critical('Engine %s failed', name, exc_info=True)
+            finally:
+                event.close()
+            if restart == 'never' or (restart == 'on-failure' and not failed):
+                log.info('Engine %s stopped', name)
+                return
+            if time.time() - started > self.max_restart_delay:
+                # It ran for a while, this is not a crash loop
+                delay = 1
+            log.warning('Restarting engine %s in %s seconds', name, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_restart_delay)
+
+    def dispatch(self, data):
+        '''
+        Put an event on the queues of the engines it is for
+        '''
+        for tags, events in self.queues:
+            if tags and not any(fnmatch.fnmatch(data['tag'], tag) for tag in tags):
+                continue
+            payload = data['data']
+            if isinstance(payload, dict):
+                # Each engine gets its own copy of the top level of the data
+                payload = dict(payload)
+            try:
+                events.put_nowait({'tag': data['tag'], 'data': payload})
+            except queue.Full:
+                log.warning('Dropping event %s, an engine of the engine host '
+                            'is not keeping up', data['tag'])
+
+    def run(self):
+        '''
+        Run the engines and feed them the events
+        '''
+        salt.utils.process.appendproctitle(self.__class__.__name__)
+        self.utils = salt.loader.utils(self.opts, proxy=self.proxy)
+        if salt.utils.platform.is_windows():
+            # Calculate function references since they can't be pickled.
+            if self.opts['__role'] == 'master':
+                self.runners = salt.loader.runner(self.opts, utils=self.utils)
+            else:
+                self.runners = []
+            self.funcs = salt.loader.minion_mods(self.opts, utils=self.utils, proxy=self.proxy)
+
+        self.engine = salt.loader.engines(self.opts,
+                                          self.funcs,
+                                          self.runners,
+                                          self.utils,
+                                          proxy=self.proxy)
+        with salt.utils.event.get_event(
+                self.opts['__role'],
+                self.opts['sock_dir'],
+                self.opts['transport'],
+                opts=self.opts,
+                listen=True) as event:
+            filter_tags = []
+            for name, fun, config, host_opts in self.engines:
+                tags = host_opts.get('engine_tags')
+                if isinstance(tags, six.string_types):
+                    tags = [tags]
+                if filter_tags is not None and tags:
+                    filter_tags.extend(tags)
+                else:
+                    # This engine wants every event
+                    filter_tags = None
+                events = queue.Queue(self.queue_size)
+                self.queues.append((tags, events))
+                log.info('Starting Engine %s in the engine host', name)
+                thread = threading.Thread(
+                    target=self.supervise,
+                    args=(name, fun, config,
+                          host_opts.get('engine_restart', 'always'), events))
+                thread.daemon = True
+                thread.start()
+            if filter_tags is not None:
+                event.filter_publisher(filter_tags, match_type='fnmatch')
+
+            for data in event.iter_events(full=True, auto_reconnect=True):
+                self.dispatch(data)
@@ -25,7 +25,8 @@ from __future__ import absolute_import, print_function, unicode_literals
 import salt.utils.reactor
 
 
-def start(refresh_interval=None, worker_threads=None, worker_hwm=None):
+def start(refresh_interval=None, worker_threads=None, worker_hwm=None,
+          shared_event=None):
     if refresh_interval is not None:
         __opts__['reactor_refresh_interval'] = refresh_interval
     if worker_threads is not None:
@@ -33,4 +34,4 @@ def start(refresh_interval=None, worker_threads=None, worker_hwm=None):
     if worker_hwm is not None:
         __opts__['reactor_worker_hwm'] = worker_hwm
 
-    salt.utils.reactor.Reactor(__opts__).run()
+    salt.utils.reactor.Reactor(__opts__, shared_event=shared_event).run()
@@ -8,7 +8,8 @@ from __future__ import absolute_import, print_function, unicode_literals
 import salt.thorium
 
 
-def start(grains=False, grain_keys=None, pillar=False, pillar_keys=None):
+def start(grains=False, grain_keys=None, pillar=False, pillar_keys=None,
+          shared_event=None):
     '''
     Execute the Thorium runtime
     '''
@@ -17,5 +18,6 @@ def start(grains=False, grain_keys=None, pillar=False, pillar_keys=None):
             grains,
             grain_keys,
             pillar,
-            pillar_keys)
+            pillar_keys,
+            shared_event=shared_event)
     state.start_runtime()
@@ -7,11 +7,13 @@ from __future__ import absolute_import, print_function, unicode_literals
 # Import python libs
 import contextlib
 import errno
+import hashlib
 import logging
 import os
 import string
 import shutil
 import ftplib
+import zlib
 from tornado.httputil import parse_response_start_line, HTTPHeaders, HTTPInputError
 import salt.utils.atomicfile
 
@@ -30,6 +32,7 @@ import salt.utils.gzip_util
 import salt.utils.hashutils
 import salt.utils.http
 import salt.utils.path
+import salt.utils.peer_files
 import salt.utils.platform
 import salt.utils.stringutils
 import salt.utils.templates
@@ -192,6 +195,78 @@ class Client(object):
         return self.get_url(
             path, '', True, saltenv, cachedir=cachedir, source_hash=source_hash)
 
+    @contextlib.contextmanager
+    def _prefetch_hashes(self, paths, saltenv='base'):
+        '''
+        Get the hashes of files which are about to be cached one after the
+        other at once. Only the RemoteClient does.
+        '''
+        yield
+
+    def file_manifest(self, path='', saltenv='base'):
+        '''
+        Return the manifest of the files of a saltenv under a path, or None if
+        the file server does not provide one. Only the RemoteClient does.
+        '''
+        return None
+
+    def cache_bundle(self, paths, saltenv='base', cachedir=None):
+        '''
+        Cache many files at once, returning a dict mapping each of the paths
+        which were cached to its location in the cache. Only the RemoteClient
+        does.
+        '''
+        return {}
+
+    def cache_manifest(self, manifest, saltenv='base', cachedir=None,
+                       prefix='', include_pat=None, exclude_pat=None):
+        '''
+        Cache the files of a manifest starting with prefix, fetching the ones
+        missing from the cache or differing from it in a single bundle, and
+        return their locations in the cache
+        '''
+        hash_type = manifest['hash_type']
+        files = dict(
+            (path, hsum) for path, hsum in six.iteritems(manifest['files'])
+            if path.startswith(prefix)
+            and salt.utils.stringutils.check_include_exclude(
+                path, include_pat, exclude_pat))
+        ret = []
+        fetch = []
+        for path in sorted(files):
+            with self._cache_loc(path, saltenv, cachedir=cachedir) as dest:
+                if os.path.isfile(dest) and salt.utils.hashutils.get_hash(
+                        dest, hash_type) == files[path]:
+                    ret.append(dest)
+                else:
+                    fetch.append(path)
+        if not fetch:
+            return ret
+        log.debug(
+            'Fetching %d files from saltenv \'%s\' in a bundle',
+            len(fetch), saltenv
+        )
+        try:
+            bundled = self.cache_bundle(fetch, saltenv, cachedir=cachedir)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.warning('Unable to fetch a bundle of files: %s', exc)
+            bundled = {}
+        remaining = []
+        for path in fetch:
+            dest = bundled.get(path)
+            if dest and salt.utils.hashutils.get_hash(
+                    dest, hash_type) == files[path]:
+                ret.append(dest)
+            else:
+                remaining.append(salt.utils.url.create(path))
+        # The files which were left out of the bundle are fetched one by one
+        with self._prefetch_hashes(remaining, saltenv):
+            for path in remaining:
+                dest = self.cache_file(path, saltenv, cachedir=cachedir)
+                if dest:
+                    ret.append(dest)
+        return sorted(ret)
+
     def cache_files(self, paths, saltenv='base', cachedir=None):
         '''
         Download a list of files stored on the master and put them in the
@@ -200,20 +275,23 @@ class Client(object):
         ret = []
         if isinstance(paths, six.string_types):
             paths = paths.split(',')
-        for path in paths:
-            ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
+        with self._prefetch_hashes(paths, saltenv):
+            for path in paths:
+                ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
         return ret
 
     def cache_master(self, saltenv='base', cachedir=None):
         '''
         Download and cache all files on a master in a specified environment
         '''
+        manifest = self.file_manifest('', saltenv)
+        if manifest is not None:
+            return self.cache_manifest(manifest, saltenv, cachedir=cachedir)
         ret = []
-        for path in self.file_list(saltenv):
-            ret.append(
-                self.cache_file(
-                    salt.utils.url.create(path), saltenv, cachedir=cachedir)
-            )
+        paths = [salt.utils.url.create(path) for path in self.file_list(saltenv)]
+        with self._prefetch_hashes(paths, saltenv):
+            for path in paths:
+                ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
         return ret
 
     def cache_dir(self, path, saltenv='base', include_empty=False,
@@ -233,15 +311,24 @@ class Client(object):
         log.info(
             'Caching directory \'%s\' for environment \'%s\'', path, saltenv
         )
-        # go through the list of all files finding ones that are in
-        # the target directory and caching them
-        for fn_ in self.file_list(saltenv):
-            fn_ = salt.utils.data.decode(fn_)
-            if fn_.strip() and fn_.startswith(path):
-                if salt.utils.stringutils.check_include_exclude(
-                        fn_, include_pat, exclude_pat):
-                    fn_ = self.cache_file(
-                        salt.utils.url.create(fn_), saltenv, cachedir=cachedir)
+        manifest = self.file_manifest(path, saltenv)
+        if manifest is not None:
+            ret.extend(self.cache_manifest(
+                manifest, saltenv, cachedir=cachedir, prefix=path,
+                include_pat=include_pat, exclude_pat=exclude_pat))
+        else:
+            # go through the list of all files finding ones that are in
+            # the target directory and caching them
+            paths = []
+            for fn_ in self.file_list(saltenv):
+                fn_ = salt.utils.data.decode(fn_)
+                if fn_.strip() and fn_.startswith(path):
+                    if salt.utils.stringutils.check_include_exclude(
+                            fn_, include_pat, exclude_pat):
+                        paths.append(salt.utils.url.create(fn_))
+            with self._prefetch_hashes(paths, saltenv):
+                for fn_ in paths:
+                    fn_ = self.cache_file(fn_, saltenv, cachedir=cachedir)
                     if fn_:
                         ret.append(fn_)
 
@@ -1031,6 +1118,8 @@ class RemoteClient(Client):
     def __init__(self, opts):
         Client.__init__(self, opts)
         self._closing = False
+        # The results of _prefetch_hashes, by saltenv and path
+        self._prefetched = {}
         self.channel = salt.transport.client.ReqChannel.factory(self.opts)
         if hasattr(self.channel, 'auth'):
             self.auth = self.channel.auth
@@ -1139,6 +1228,23 @@ class RemoteClient(Client):
             if hash_local == hash_server:
                 return dest2check
 
+        if self.opts.get('file_peer_distribution') \
+                and not salt.utils.platform.is_windows() \
+                and dest2check and os.path.isdir(os.path.dirname(dest2check)):
+            try:
+                size = stat_server[6]
+            except (IndexError, TypeError):
+                size = 0
+            if size >= self.opts['file_peer_min_size']:
+                try:
+                    return self._get_file_from_peers(
+                        path, saltenv, dest2check, hash_server)
+                except MinionError as exc:
+                    log.warning(
+                        'Unable to fetch %s from the peers, fetching it from '
+                        'the master: %s', path, exc
+                    )
+
         log.debug(
             'Fetching file from saltenv \'%s\', ** attempting ** \'%s\'',
             saltenv, path
@@ -1260,6 +1366,91 @@ class RemoteClient(Client):
 
         return dest
 
+    def _get_chunk_from_master(self, path, saltenv, offset, size):
+        '''
+        Fetch a chunk of a file from the master
+        '''
+        load = {'path': path,
+                'saltenv': saltenv,
+                'cmd': '_serve_file'}
+        data = b''
+        while len(data) < size:
+            load['loc'] = offset + len(data)
+            ret = self.channel.send(load, raw=True)
+            if six.PY3 and isinstance(ret, dict):
+                ret = decode_dict_keys_to_str(ret)
+            try:
+                piece = ret['data']
+            except (KeyError, TypeError):
+                break
+            if not piece:
+                break
+            if six.PY3 and isinstance(piece, str):
+                piece = piece.encode()
+            data += piece
+        return data[:size]
+
+    def _get_file_from_peers(self, path, saltenv, dest, hash_server):
+        '''
+        Fetch a file in chunks from the peers which hold them, and from the
+        master for the chunks none of them does. Raises MinionError if the
+        file cannot be fetched this way.
+        '''
+        path = self._check_proto(path)
+        addr = salt.utils.peer_files.peer_address(self.opts)
+        load = {'path': path,
+                'saltenv': saltenv,
+                'id': self.opts['id'],
+                'addr': addr,
+                'cmd': '_file_peers'}
+        if self.auth:
+            load['tok'] = self.auth.gen_token(b'salt')
+        ret = self.channel.send(load)
+        if not isinstance(ret, dict) or not ret.get('chunks'):
+            raise MinionError('The master does not distribute it through peers')
+        store = salt.utils.peer_files.ChunkStore(self.opts)
+        hsum = hashlib.new(salt.utils.stringutils.to_str(
+            hash_server.get('hash_type', 'md5')))
+        chunks = []
+        from_peers = 0
+        with salt.utils.atomicfile.atomic_open(dest, 'wb+') as fp_:
+            for idx, (chunk, size) in enumerate(ret['chunks']):
+                data = store.get(chunk)
+                if data is None:
+                    for peer in ret.get('peers', {}).get(chunk, []):
+                        data = salt.utils.peer_files.fetch_chunk(peer, chunk)
+                        if data is not None:
+                            from_peers += 1
+                            break
+                    if data is None:
+                        data = self._get_chunk_from_master(
+                            path, saltenv, idx * ret['chunk_size'], size)
+                        if salt.utils.peer_files.chunk_hash(data) != chunk:
+                            raise MinionError(
+                                'Chunk {0} changed on the master'.format(idx))
+                    store.put(chunk, data)
+                hsum.update(data)
+                fp_.write(data)
+                chunks.append(chunk)
+            if hsum.hexdigest() != hash_server.get('hsum'):
+                raise MinionError('The file changed on the master')
+        log.info(
+            'Fetched %s from saltenv \'%s\', %d of %d chunks from the peers',
+            path, saltenv, from_peers, len(chunks)
+        )
+        load = {'id': self.opts['id'],
+                'addr': addr,
+                'chunks': chunks,
+                'cmd': '_file_peers_have'}
+        if self.auth:
+            load['tok'] = self.auth.gen_token(b'salt')
+        try:
+            self.channel.send(load)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug('Unable to register the chunks of %s: %s', path, exc)
+        store.prune()
+        return dest
+
     def file_list(self, saltenv='base', prefix=''):
         '''
         List the files on the master
@@ -1337,6 +1528,9 @@ class RemoteClient(Client):
         The same as hash_file, but also return the file's mode, or None if no
         mode data is present.
         '''
+        prefetched = self._prefetched.pop((saltenv, path), None)
+        if prefetched is not None:
+            return prefetched
         hash_result = self.hash_file(path, saltenv)
         try:
             path = self._check_proto(path)
@@ -1358,6 +1552,119 @@ class RemoteClient(Client):
             stat_result = None
         return hash_result, stat_result
 
+    def hash_and_stat_files(self, paths, saltenv='base'):
+        '''
+        Return the hashes and stat results of many files on the master at
+        once, as a dict mapping each salt:// path to what hash_and_stat_file
+        would return for it. Returns None if the master does not support it.
+
+        .. versionadded:: Neon
+        '''
+        rel_paths = {}
+        for path in paths:
+            try:
+                rel_paths[self._check_proto(path)] = path
+            except MinionError:
+                continue
+        if not rel_paths:
+            return {}
+        load = {'paths': list(rel_paths),
+                'saltenv': saltenv,
+                'cmd': '_file_hashes'}
+        ret = self.channel.send(load)
+        if not isinstance(ret, dict):
+            return None
+        return dict(
+            (rel_paths[rel_path], tuple(result))
+            for rel_path, result in six.iteritems(ret)
+            if rel_path in rel_paths and isinstance(result, (list, tuple))
+            and len(result) == 2)
+
+    def file_manifest(self, path='', saltenv='base'):
+        '''
+        Return the manifest of the files of a saltenv under a relative path,
+        a dict of the hash type, the hash of each file and a digest which only
+        changes when the files do. Returns None if the master does not
+        support it.
+
+        .. versionadded:: Neon
+        '''
+        load = {'prefix': path,
+                'saltenv': saltenv,
+                'cmd': '_file_manifest'}
+        ret = self.channel.send(load)
+        if not isinstance(ret, dict) or 'digest' not in ret \
+                or not isinstance(ret.get('files'), dict):
+            return None
+        return ret
+
+    def cache_bundle(self, paths, saltenv='base', cachedir=None):
+        '''
+        Fetch many files from the master in a single compressed bundle and
+        put them in the minion file cache. Returns a dict mapping each of the
+        paths which were cached to its location in the cache, the files which
+        did not fit in the bundle are left out.
+
+        .. versionadded:: Neon
+        '''
+        paths = set(paths)
+        load = {'paths': sorted(paths),
+                'saltenv': saltenv,
+                'cmd': '_file_bundle'}
+        data = self.channel.send(load, raw=True)
+        if six.PY3 and isinstance(data, dict):
+            data = decode_dict_keys_to_str(data)
+        try:
+            data = data['data']
+        except (KeyError, TypeError):
+            return {}
+        if not data:
+            return {}
+        files = salt.payload.Serial(self.opts).loads(
+            zlib.decompress(data), encoding='utf-8')
+        ret = {}
+        for path, contents in six.iteritems(files):
+            path = salt.utils.stringutils.to_unicode(path)
+            if path not in paths:
+                continue
+            with self._cache_loc(path, saltenv, cachedir=cachedir) as dest:
+                # If a directory was formerly cached at this path, then
+                # remove it to avoid a traceback trying to write the file
+                if os.path.isdir(dest):
+                    salt.utils.files.rm_rf(dest)
+                with salt.utils.atomicfile.atomic_open(dest, 'wb+') as fp_:
+                    fp_.write(salt.utils.stringutils.to_bytes(contents))
+            ret[path] = dest
+        return ret
+
+    @contextlib.contextmanager
+    def _prefetch_hashes(self, paths, saltenv='base'):
+        '''
+        Get the hashes and stat results of the files with a single request,
+        for the hash_and_stat_file calls made while caching them
+        '''
+        by_env = {}
+        for path in paths:
+            if not path.startswith('salt://'):
+                continue
+            path, senv = salt.utils.url.split_env(path)
+            by_env.setdefault(senv or saltenv, []).append(path)
+        try:
+            for env, env_paths in six.iteritems(by_env):
+                if len(env_paths) < 2:
+                    continue
+                try:
+                    ret = self.hash_and_stat_files(env_paths, env)
+                except Exception as exc:
+                    log.debug('Unable to get the hashes of %s: %s', env_paths, exc)
+                    ret = None
+                if ret:
+                    for path, result in six.iteritems(ret):
+                        self._prefetched[(env, path)] = result
+            yield
+        finally:
+            self._prefetched = {}
+
     def list_env(self, saltenv='base'):
         '''
         Return a list of the files in the file server's specified environment
@@ -1412,6 +1719,7 @@ class FSClient(RemoteClient):
     def __init__(self, opts):  # pylint: disable=W0231
         Client.__init__(self, opts)  # pylint: disable=W0233
         self._closing = False
+        self._prefetched = {}
         self.channel = salt.fileserver.FSChan(opts)
         self.auth = DumbAuth()
 
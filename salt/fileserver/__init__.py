@@ -8,16 +8,20 @@ from __future__ import absolute_import, print_function, unicode_literals
 
 import errno
 import fnmatch
+import hashlib
 import logging
 import os
 import re
 import sys
 import time
+import zlib
 
 # Import salt libs
 import salt.loader
+import salt.payload
 import salt.utils.data
 import salt.utils.files
+import salt.utils.hash_index
 import salt.utils.path
 import salt.utils.url
 import salt.utils.versions
@@ -35,6 +39,8 @@ from salt.ext import six
 
 log = logging.getLogger(__name__)
 
+MANIFEST_VERSION = 1
+
 
 def _unlock_cache(w_lock):
     '''
@@ -349,6 +355,9 @@ class Fileserver(object):
     def __init__(self, opts):
         self.opts = opts
         self.servers = salt.loader.fileserver(opts, opts['fileserver_backend'])
+        self.hash_index = None
+        if opts.get('file_hash_index', False):
+            self.hash_index = salt.utils.hash_index.HashIndex(self)
 
     def backends(self, back=None):
         '''
@@ -501,6 +510,22 @@ class Fileserver(object):
             if fstr in self.servers:
                 log.debug('Updating %s fileserver cache', fsb)
                 self.servers[fstr]()
+        self.update_hash_index(back)
+
+    def update_hash_index(self, back=None):
+        '''
+        Update the file hash index of the fileserver backends, if
+        :conf_master:`file_hash_index` is enabled
+        '''
+        if self.hash_index is None:
+            return
+        try:
+            self.hash_index.update(back)
+        except Exception as exc:
+            log.error(
+                'Exception caught while updating the file hash index',
+                exc_info=True
+            )
 
     def update_intervals(self, back=None):
         '''
@@ -565,6 +590,14 @@ class Fileserver(object):
             return {'path': '',
                     'rel': ''}
         tgt_env = load.get('saltenv', 'base')
+        if self.hash_index is not None and \
+                isinstance(path, six.string_types) and \
+                isinstance(tgt_env, six.string_types):
+            fnd = self.hash_index.find_file(
+                salt.utils.stringutils.to_unicode(path),
+                salt.utils.stringutils.to_unicode(tgt_env))
+            if fnd is not None:
+                return fnd
         return self.find_file(path, tgt_env)
 
     def file_find(self, load):
@@ -663,6 +696,12 @@ class Fileserver(object):
         if not isinstance(load['saltenv'], six.string_types):
             load['saltenv'] = six.text_type(load['saltenv'])
 
+        if self.hash_index is not None:
+            ret = self.hash_index.hash_and_stat(
+                salt.utils.stringutils.to_unicode(load['path']),
+                salt.utils.stringutils.to_unicode(load['saltenv']))
+            if ret is not None:
+                return ret
         fnd = self.find_file(salt.utils.stringutils.to_unicode(load['path']),
                 load['saltenv'])
         if not fnd.get('back'):
@@ -691,6 +730,99 @@ class Fileserver(object):
         except (IndexError, TypeError):
             return '', None
 
+    def file_hashes(self, load):
+        '''
+        Return the hashes and stat results of many files of a saltenv at once,
+        as a dict mapping each path to a list of its hash and stat result
+
+        .. versionadded:: Neon
+        '''
+        paths = load.get('paths')
+        if 'saltenv' not in load or not isinstance(paths, list):
+            return {}
+        ret = {}
+        for path in paths:
+            if not isinstance(path, six.string_types):
+                continue
+            ret[path] = list(self.file_hash_and_stat(
+                {'path': path, 'saltenv': load['saltenv']}))
+        return ret
+
+    def file_manifest(self, load):
+        '''
+        Return the hashes of the files of a saltenv under a prefix, with a
+        digest of them which only changes when the files do
+
+        .. versionadded:: Neon
+        '''
+        if 'env' in load:
+            # "env" is not supported; Use "saltenv".
+            load.pop('env')
+        if 'saltenv' not in load:
+            return {}
+        saltenv = load['saltenv']
+        if not isinstance(saltenv, six.string_types):
+            saltenv = six.text_type(saltenv)
+        prefix = load.get('prefix', '').strip('/')
+        if prefix:
+            prefix += '/'
+        files = {}
+        for path in self.file_list({'saltenv': saltenv, 'prefix': prefix}):
+            if not path.startswith(prefix):
+                continue
+            hsum = self.file_hash({'path': path, 'saltenv': saltenv})
+            if isinstance(hsum, dict) and hsum.get('hsum'):
+                files[path] = hsum['hsum']
+        digest = hashlib.sha256()
+        digest.update('{0}\0{1}\n'.format(
+            MANIFEST_VERSION, self.opts['hash_type']).encode('utf-8'))
+        for path in sorted(files):
+            digest.update('{0}\0{1}\n'.format(path, files[path]).encode('utf-8'))
+        return {'version': MANIFEST_VERSION,
+                'hash_type': self.opts['hash_type'],
+                'digest': digest.hexdigest(),
+                'files': files}
+
+    def file_bundle(self, load):
+        '''
+        Return many files of a saltenv at once, as a zlib compressed
+        serialized dict mapping each path to its contents. The files which do
+        not fit in :conf_master:`file_bundle_max_size` are left out and have
+        to be fetched one by one.
+
+        .. versionadded:: Neon
+        '''
+        ret = {'data': b''}
+        paths = load.get('paths')
+        if 'saltenv' not in load or not isinstance(paths, list):
+            return ret
+        saltenv = load['saltenv']
+        if not isinstance(saltenv, six.string_types):
+            saltenv = six.text_type(saltenv)
+        max_size = self.opts.get('file_bundle_max_size', 10485760)
+        size = 0
+        files = {}
+        for path in paths:
+            if not isinstance(path, six.string_types):
+                continue
+            fnd = self.find_file(path, saltenv)
+            if not fnd.get('path'):
+                continue
+            try:
+                if size + os.path.getsize(fnd['path']) > max_size:
+                    continue
+                with salt.utils.files.fopen(fnd['path'], 'rb') as fp_:
+                    data = fp_.read()
+            except (IOError, OSError) as exc:
+                log.debug('Unable to bundle %s: %s', path, exc)
+                continue
+            size += len(data)
+            files[path] = data
+        if files:
+            ret['data'] = zlib.compress(
+                salt.payload.Serial(self.opts).dumps(files, use_bin_type=True))
+        return ret
+
     def clear_file_list_cache(self, load):
         '''
         Deletes the file_lists cache files
@@ -126,11 +126,11 @@ def lock(remote=None):
     return _gitfs().lock(remote=remote)
 
 
-def update(remotes=None):
+def update(remotes=None, force=False):
     '''
     Execute a git fetch on all of the repos
     '''
-    _gitfs().update(remotes)
+    _gitfs().update(remotes, force=force)
 
 
 def update_intervals():
@@ -30,6 +30,7 @@ import salt.utils.gzip_util
 import salt.utils.hashutils
 import salt.utils.path
 import salt.utils.platform
+import salt.utils.roots_watch
 import salt.utils.stringutils
 import salt.utils.versions
 from salt.ext import six
@@ -97,7 +98,13 @@ def find_file(path, saltenv='base', **kwargs):
             fnd['rel'] = path
             return _add_file_stat(fnd)
         return fnd
-    for root in __opts__['file_roots'][saltenv]:
+    roots = __opts__['file_roots'][saltenv]
+    if __opts__.get('roots_inotify', False):
+        # Only look in the roots which have the file according to their trees
+        candidates = salt.utils.roots_watch.find_roots(__opts__, path, roots)
+        if candidates is not None:
+            roots = candidates
+    for root in roots:
         full = os.path.join(root, path)
         if os.path.isfile(full) and not salt.fileserver.is_file_ignored(__opts__, full):
             fnd['path'] = full
@@ -153,6 +160,11 @@ def update():
         # Hash file won't exist if no files have yet been served up
         pass
 
+    if __opts__.get('roots_inotify', False) \
+            and salt.utils.roots_watch.alive(__opts__):
+        # The file_roots watcher fires the events of the changes
+        return
+
     mtime_map_path = os.path.join(__opts__['cachedir'], 'roots', 'mtime_map')
     # data to send on event
     data = {'changed': False,
@@ -309,6 +321,11 @@ def _file_lists(load, form):
         else:
             return []
 
+    if __opts__.get('roots_inotify', False):
+        ret = salt.utils.roots_watch.cached_file_lists(__opts__, saltenv)
+        if ret is not None:
+            return ret.get(form, [])
+
     list_cachedir = os.path.join(__opts__['cachedir'], 'file_lists', 'roots')
     if not os.path.isdir(list_cachedir):
         try:
@@ -441,11 +441,12 @@ class Key(object):
                                         ex)
                             continue
             cache = salt.cache.factory(self.opts)
-            clist = cache.list(self.ACC)
-            if clist:
-                for minion in clist:
-                    if minion not in minions and minion not in preserve_minions:
-                        cache.flush('{0}/{1}'.format(self.ACC, minion))
+            for bank in (self.ACC, 'pillar_render'):
+                clist = cache.list(bank)
+                if clist:
+                    for minion in clist:
+                        if minion not in minions and minion not in preserve_minions:
+                            cache.flush('{0}/{1}'.format(bank, minion))
 
     def check_master(self):
         '''
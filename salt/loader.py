@@ -35,6 +35,7 @@ import salt.utils.files
 import salt.utils.lazy
 import salt.utils.odict
 import salt.utils.platform
+import salt.utils.render_cache
 import salt.utils.versions
 import salt.utils.stringutils
 from salt.exceptions import LoaderError
@@ -1244,7 +1245,9 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             opts = {}
         threadsafety = not opts.get('multiprocessing')
         self.context_dict = salt.utils.context.ContextDict(threadsafe=threadsafety)
-        self.opts = self.__prep_mod_opts(opts)
+        # Copying the grains and pillar for the modules is not reading them
+        with salt.utils.render_cache.paused():
+            self.opts = self.__prep_mod_opts(opts)
 
         self.module_dirs = module_dirs
         self.tag = tag
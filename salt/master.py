@@ -8,6 +8,7 @@ involves preparing the three listeners and the workers needed by the master.
 from __future__ import absolute_import, with_statement, print_function, unicode_literals
 import copy
 import ctypes
+import fnmatch
 import functools
 import os
 import re
@@ -53,15 +54,22 @@ import salt.utils.args
 import salt.utils.atomicfile
 import salt.utils.crypt
 import salt.utils.event
+import salt.utils.event_batcher
 import salt.utils.files
 import salt.utils.gitfs
 import salt.utils.gzip_util
 import salt.utils.jid
 import salt.utils.job
 import salt.utils.master
+import salt.utils.mine_index
 import salt.utils.minions
+import salt.utils.peer_files
+import salt.utils.pillar_compile
 import salt.utils.platform
+import salt.utils.presence
 import salt.utils.process
+import salt.utils.render_cache
+import salt.utils.roots_watch
 import salt.utils.schedule
 import salt.utils.ssdp
 import salt.utils.stringutils
@@ -97,6 +105,9 @@ from salt.utils.ctx import RequestContext
 
 log = logging.getLogger(__name__)
 
+# Events with this tag request a fetch of gitfs remotes
+GITFS_FETCH_TAG = tagify(['gitfs', 'fetch'], prefix='fileserver')
+
 
 class SMaster(object):
     '''
@@ -235,6 +246,7 @@ class Maintenance(salt.utils.process.SignalHandlingMultiprocessingProcess):
                 salt.daemons.masterapi.clean_expired_tokens(self.opts)
                 salt.daemons.masterapi.clean_pub_auth(self.opts)
                 salt.daemons.masterapi.clean_proc_dir(self.opts)
+            self.handle_mine_index()
             self.handle_git_pillar()
             self.handle_schedule()
             self.handle_key_cache()
@@ -309,6 +321,16 @@ class Maintenance(salt.utils.process.SignalHandlingMultiprocessingProcess):
                           'due to key rotation')
                 salt.utils.master.ping_all_connected_minions(self.opts)
 
+    def handle_mine_index(self):
+        '''
+        Fold changed mine data into the mine index
+        '''
+        try:
+            salt.utils.mine_index.update(self.opts)
+        except Exception as exc:
+            log.error('Exception caught while updating the mine index',
+                      exc_info=True)
+
     def handle_git_pillar(self):
         '''
         Update git pillar
@@ -463,6 +485,7 @@ class FileserverUpdate(salt.utils.process.SignalHandlingMultiprocessingProcess):
                         'Uncaught exception while updating %s fileserver '
                         'cache', backend_name
                     )
+                self.fileserver.update_hash_index(backend_name)
 
             log.debug(
                 'Completed fileserver updates for items with an update '
@@ -491,9 +514,72 @@ class FileserverUpdate(salt.utils.process.SignalHandlingMultiprocessingProcess):
             )
             self.update_threads[interval].start()
 
+        if self.opts.get('roots_inotify', False) \
+                and 'roots' in self.fileserver.backends():
+            self.start_roots_watcher()
+
         # Keep the process alive
+        self.handle_fetch_events()
+
+    def start_roots_watcher(self):
+        '''
+        Start the thread keeping the trees of the file_roots up to date
+        '''
+        if not salt.utils.roots_watch.HAS_PYINOTIFY:
+            log.error(
+                'roots_inotify is enabled but pyinotify is not installed, the '
+                'file_roots will be walked to list the files'
+            )
+            salt.utils.roots_watch.remove_snapshot(self.opts)
+            return
+        watcher = salt.utils.roots_watch.RootsWatcher(self.opts)
+        thread = threading.Thread(target=watcher.run)
+        thread.daemon = True
+        thread.start()
+
+    def handle_fetch_events(self):
+        '''
+        Fetch the gitfs remotes requested by ``salt/fileserver/gitfs/fetch``
+        events, for instance fired by a reactor when the git server calls a
+        webhook. The ``remote`` in the event data is the URL or name of the
+        remote, or a glob or a list of them.
+        '''
+        update_func = self.fileserver.servers.get('gitfs.update')
+        remotes = self.fileserver.update_intervals().get('gitfs')
+        if update_func is None or not remotes:
+            while True:
+                time.sleep(60)
+        event = salt.utils.event.get_master_event(
+            self.opts, self.opts['sock_dir'], listen=True)
         while True:
-            time.sleep(60)
+            ret = event.get_event(wait=60, tag=GITFS_FETCH_TAG, full=True)
+            if ret is None or not isinstance(ret.get('data'), dict):
+                continue
+            patterns = ret['data'].get('remote')
+            if not isinstance(patterns, list):
+                patterns = [patterns]
+            patterns = [six.text_type(x) for x in patterns if x]
+            matched = [
+                id_ for id_ in remotes
+                if any(fnmatch.fnmatch(six.text_type(x), pattern)
+                       for x in id_ if x is not None
+                       for pattern in patterns)
+            ]
+            if not matched:
+                log.warning(
+                    'No gitfs remote matches %s, ignoring the fetch request',
+                    patterns
+                )
+                continue
+            log.debug('Fetching gitfs remotes %s on request', matched)
+            try:
+                update_func(matched, force=True)
+            except Exception:
+                log.exception(
+                    'Uncaught exception while fetching gitfs remotes %s',
+                    matched
+                )
+            self.fileserver.update_hash_index('gitfs')
 
 
 class Master(SMaster):
@@ -671,6 +757,17 @@ class Master(SMaster):
                 ),
                 'reload': salt.crypt.Crypticle.generate_key_string
             }
+            if self.opts['pillar_compile_async']:
+                # Authenticates the MWorkers to the pillar compiler
+                SMaster.secrets['pillar_compile'] = {
+                    'secret': multiprocessing.Array(
+                        ctypes.c_char,
+                        salt.utils.stringutils.to_bytes(
+                            salt.crypt.Crypticle.generate_key_string()
+                        )
+                    ),
+                    'reload': salt.crypt.Crypticle.generate_key_string
+                }
             log.info('Creating master process manager')
             # Since there are children having their own ProcessManager we should wait for kill more time.
             self.process_manager = salt.utils.process.ProcessManager(wait_for_kill=5)
@@ -705,10 +802,26 @@ class Master(SMaster):
             log.info('Creating master maintenance process')
             self.process_manager.add_process(Maintenance, args=(self.opts,))
 
+            if self.opts['pillar_compile_async']:
+                log.info('Creating master pillar compiler process')
+                self.process_manager.add_process(
+                    salt.utils.pillar_compile.PillarCompiler,
+                    args=(self.opts, SMaster.secrets['pillar_compile']['secret']))
+
             if self.opts.get('event_return'):
                 log.info('Creating master event return process')
                 self.process_manager.add_process(salt.utils.event.EventReturn, args=(self.opts,))
 
+            if self.opts.get('presence_table'):
+                if not self.opts.get('presence_events'):
+                    log.warning(
+                        'presence_table is enabled without presence_events, '
+                        'the idle minions are only present in the table when '
+                        'their ping_interval is lower than presence_timeout'
+                    )
+                log.info('Creating master presence tracker process')
+                self.process_manager.add_process(salt.utils.presence.PresenceTracker, args=(self.opts,))
+
             ext_procs = self.opts.get('ext_processes', [])
             for proc in ext_procs:
                 log.info('Creating ext_processes process: %s', proc)
@@ -1061,7 +1174,9 @@ class MWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
         '''
         key = payload['enc']
         load = payload['load']
-        ret = {'aes': self._handle_aes,
+        # The transport passes the IP address it received the request from
+        ret = {'aes': functools.partial(self._handle_aes,
+                                        peer_ip=payload.get('peer_ip')),
                'clear': self._handle_clear}[key](load)
         raise tornado.gen.Return(ret)
 
@@ -1072,7 +1187,10 @@ class MWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
         end_time = time.time()
         if end_time - self.stat_clock > self.opts['master_stats_event_iter']:
             # Fire the event with the stats and wipe the tracker
-            self.aes_funcs.event.fire_event({'time': end_time - self.stat_clock, 'worker': self.name, 'stats': stats}, tagify(self.name, 'stats'))
+            data = {'time': end_time - self.stat_clock, 'worker': self.name, 'stats': stats}
+            if self.opts.get('pillar_render_cache', False):
+                data['pillar_render_cache'] = salt.utils.render_cache.stats(reset=True)
+            self.aes_funcs.event.fire_event(data, tagify(self.name, 'stats'))
             self.stats = collections.defaultdict(lambda: {'mean': 0, 'latency': 0, 'runs': 0})
             self.stat_clock = end_time
 
@@ -1096,11 +1214,13 @@ class MWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
             self._post_stats(stats)
         return ret
 
-    def _handle_aes(self, data):
+    def _handle_aes(self, data, peer_ip=None):
         '''
         Process a command sent via an AES key
 
         :param str load: Encrypted payload
+        :param str peer_ip: The IP address the payload was received from, if
+                            the transport knows it
         :return: The result of passing the load to a function in AESFuncs corresponding to
                  the command specified in the load's 'cmd' key.
         '''
@@ -1119,7 +1239,8 @@ class MWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
 
         with StackContext(functools.partial(RequestContext,
                                             {'data': data,
-                                             'opts': self.opts})):
+                                             'opts': self.opts,
+                                             'peer_ip': peer_ip})):
             ret = run_func(data)
 
         if self.opts['master_stats']:
@@ -1172,6 +1293,10 @@ class AESFuncs(object):
         )
         self.__setup_fileserver()
         self.masterapi = salt.daemons.masterapi.RemoteFuncs(opts)
+        if self.opts.get('file_peer_distribution'):
+            self.peer_tracker = salt.utils.peer_files.ChunkTracker(self.opts)
+        else:
+            self.peer_tracker = None
 
     def __setup_fileserver(self):
         '''
@@ -1184,6 +1309,9 @@ class AESFuncs(object):
         self._file_find = self.fs_._find_file
         self._file_hash = self.fs_.file_hash
         self._file_hash_and_stat = self.fs_.file_hash_and_stat
+        self._file_hashes = self.fs_.file_hashes
+        self._file_manifest = self.fs_.file_manifest
+        self._file_bundle = self.fs_.file_bundle
         self._file_list = self.fs_.file_list
         self._file_list_emptydirs = self.fs_.file_list_emptydirs
         self._dir_list = self.fs_.dir_list
@@ -1391,6 +1519,48 @@ class AESFuncs(object):
         else:
             return self.masterapi._mine_get(load, skip_verify=True)
 
+    def _file_peers(self, load):
+        '''
+        Return the chunks of a file of the fileserver and the peers of the
+        minion which hold each of them
+
+        :param dict load: A payload received from a minion
+
+        :rtype: dict
+        :return: The size and the list of the chunks, and the addresses of
+                 the peers by chunk
+        '''
+        load = self.__verify_load(load, ('id', 'path', 'saltenv', 'addr', 'tok'))
+        if load is False or self.peer_tracker is None:
+            return {}
+        fnd = self.fs_.find_file(load['path'], load['saltenv'])
+        if not fnd.get('path'):
+            return {}
+        hsum = self.fs_.file_hash({'path': load['path'],
+                                   'saltenv': load['saltenv']})
+        if not isinstance(hsum, dict) or not hsum.get('hsum'):
+            return {}
+        return self.peer_tracker.file_peers(
+            fnd['path'], hsum['hsum'], load['id'], load['addr'],
+            peer_ip=RequestContext.current.get('peer_ip'))
+
+    def _file_peers_have(self, load):
+        '''
+        Record the chunks a minion holds and serves to its peers
+
+        :param dict load: A payload received from a minion
+
+        :rtype: bool
+        :return: True if the chunks were recorded
+        '''
+        load = self.__verify_load(load, ('id', 'addr', 'chunks', 'tok'))
+        if load is False or self.peer_tracker is None \
+                or not isinstance(load['chunks'], list):
+            return False
+        return self.peer_tracker.register(
+            load['id'], load['addr'], load['chunks'],
+            peer_ip=RequestContext.current.get('peer_ip'))
+
     def _mine(self, load):
         '''
         Store the mine data
@@ -1528,24 +1698,19 @@ class AESFuncs(object):
             return False
         load['grains']['id'] = load['id']
 
-        pillar = salt.pillar.get_pillar(
-            self.opts,
-            load['grains'],
-            load['id'],
-            load.get('saltenv', load.get('env')),
-            ext=load.get('ext'),
-            pillar_override=load.get('pillar_override', {}),
-            pillarenv=load.get('pillarenv'),
-            extra_minion_data=load.get('extra_minion_data'))
-        data = pillar.compile_pillar()
+        if self.opts.get('pillar_compile_async') and load.get('nonce') \
+                and 'pillar_compile' in SMaster.secrets:
+            # Let the pillar compiler process compile it, the minion repeats
+            # its request until it is done
+            data = salt.utils.pillar_compile.request(
+                self.opts, load, SMaster.secrets['pillar_compile']['secret'])
+            if data is not None:
+                return data
+
+        data = salt.utils.pillar_compile.compile_pillar(self.opts, load)
         self.fs_.update_opts()
-        if self.opts.get('minion_data_cache', False):
-            self.masterapi.cache.store('minions/{0}'.format(load['id']),
-                                       'data',
-                                       {'grains': load['grains'],
-                                        'pillar': data})
-            if self.opts.get('minion_data_cache_events') is True:
-                self.event.fire_event({'Minion data cache refresh': load['id']}, tagify(load['id'], 'refresh', 'minion'))
+        salt.utils.pillar_compile.store_minion_data(
+            self.opts, load, data, self.masterapi.cache, self.event)
         return data
 
     def _minion_event(self, load):
@@ -1558,6 +1723,29 @@ class AESFuncs(object):
         load = self.__verify_load(load, ('id', 'tok'))
         if load is False:
             return {}
+        if 'batch' in load:
+            # The events batched by the minion, fired as if the minion had
+            # sent each of them on its own
+            try:
+                entries = salt.utils.event_batcher.unpack(self.serial, load['batch'])
+            except ValueError as exc:
+                log.error('Received an invalid event batch from %s: %s', load['id'], exc)
+                return {}
+            for entry in entries:
+                # A bad entry does not keep the others from being fired
+                if not salt.utils.event_batcher.valid_entry(entry):
+                    log.error('Skipping an invalid event in the event batch '
+                              'of %s', load['id'])
+                    continue
+                entry.update({'id': load['id'], 'cmd': '_minion_event'})
+                try:
+                    self.masterapi._minion_event(entry)
+                    self._handle_minion_event(entry)
+                except Exception as exc:  # pylint: disable=broad-except
+                    log.error('Failed to fire an event of the event batch of '
+                              '%s: %s', load['id'], exc,
+                              exc_info_on_loglevel=logging.DEBUG)
+            return
         # Route to master event bus
         self.masterapi._minion_event(load)
         # Process locally
@@ -1604,6 +1792,13 @@ class AESFuncs(object):
 
         :param dict load: The minion payload
         '''
+        loads = load.get('load')
+        if isinstance(loads, list) and 'jid' not in load:
+            # A batch of returns coalesced by the minion's return queue
+            for single in loads:
+                self._return(single)
+            return
+
         if self.opts['require_minion_sign_messages'] and 'sig' not in load:
             log.critical(
                 '_return: Master is requiring minions to sign their '
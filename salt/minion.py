@@ -12,6 +12,7 @@ import time
 import types
 import signal
 import random
+import fnmatch
 import logging
 import threading
 import traceback
@@ -78,13 +79,16 @@ import salt.utils.context
 import salt.utils.data
 import salt.utils.error
 import salt.utils.event
+import salt.utils.event_batcher
 import salt.utils.files
 import salt.utils.jid
 import salt.utils.minion
 import salt.utils.minions
 import salt.utils.network
+import salt.utils.peer_files
 import salt.utils.platform
 import salt.utils.process
+import salt.utils.return_queue
 import salt.utils.schedule
 import salt.utils.ssdp
 import salt.utils.user
@@ -95,6 +99,7 @@ import salt.cli.daemons
 import salt.log.setup
 
 import salt.utils.dictupdate
+from concurrent.futures import ThreadPoolExecutor
 from salt.config import DEFAULT_MINION_OPTS
 from salt.defaults import DEFAULT_TARGET_DELIM
 from salt.utils.debug import enable_sigusr1_handler
@@ -456,6 +461,20 @@ class MinionBase(object):
                 return self.beacons.process(b_conf, self.opts['grains'])  # pylint: disable=no-member
         return []
 
+    @tornado.gen.coroutine
+    def process_beacons_async(self, functions, triggered=None, on_ready=None):
+        '''
+        Evaluate the configured beacons in threads, without blocking the
+        io_loop. See :py:meth:`salt.beacons.Beacon.process_async`.
+        '''
+        ret = []
+        if 'config.merge' in functions:
+            b_conf = functions['config.merge']('beacons', self.opts['beacons'], omit_opts=True)
+            if b_conf:
+                ret = yield self.beacons.process_async(  # pylint: disable=no-member
+                    b_conf, self.opts['grains'], triggered=triggered, on_ready=on_ready)
+        raise tornado.gen.Return(ret)
+
     @tornado.gen.coroutine
     def eval_master(self,
                     opts,
@@ -977,6 +996,12 @@ class MinionManager(MinionBase):
         self.event = salt.utils.event.get_event('minion', opts=self.opts, io_loop=self.io_loop)
         self.event.subscribe('')
         self.event.set_event_handler(self.handle_event)
+        if self.opts.get('file_peer_distribution'):
+            # Serve the chunks of the files fetched from the peers
+            try:
+                salt.utils.peer_files.start_server(self.opts, io_loop=self.io_loop)
+            except Exception as exc:  # pylint: disable=broad-except
+                log.error('Unable to serve the file chunks to the peers: %s', exc)
 
     @tornado.gen.coroutine
     def handle_event(self, package):
@@ -1140,6 +1165,16 @@ class Minion(MinionBase):
         self.ready = False
         self.jid_queue = [] if jid_queue is None else jid_queue
         self.periodic_callbacks = {}
+        # Thread pool for functions run inline instead of in a forked process
+        self.inline_executor = None
+        # Inline functions that exceeded inline_functions_timeout
+        self.inline_demoted = set()
+        # Set while a regular beacon interval is processed
+        self.beacons_running = False
+        # Beacons whose event source became readable
+        self.beacons_ready = set()
+        # Seconds the last ping to the master took
+        self.ping_rtt = None
 
         if io_loop is None:
             install_zmq()
@@ -1428,7 +1463,8 @@ class Minion(MinionBase):
 
     def _send_req_sync(self, load, timeout):
 
-        if self.opts['minion_sign_messages']:
+        # The loads queued for the return queue are already signed
+        if self.opts['minion_sign_messages'] and 'sig' not in load:
             log.trace('Signing event to be published onto the bus.')
             minion_privkey_path = os.path.join(self.opts['pki_dir'], 'minion.pem')
             sig = salt.crypt.sign_message(minion_privkey_path, salt.serializers.msgpack.serialize(load))
@@ -1443,7 +1479,8 @@ class Minion(MinionBase):
     @tornado.gen.coroutine
     def _send_req_async(self, load, timeout):
 
-        if self.opts['minion_sign_messages']:
+        # The loads queued for the return queue are already signed
+        if self.opts['minion_sign_messages'] and 'sig' not in load:
             log.trace('Signing event to be published onto the bus.')
             minion_privkey_path = os.path.join(self.opts['pki_dir'], 'minion.pem')
             sig = salt.crypt.sign_message(minion_privkey_path, salt.serializers.msgpack.serialize(load))
@@ -1456,10 +1493,12 @@ class Minion(MinionBase):
         finally:
             channel.close()
 
-    def _fire_master(self, data=None, tag=None, events=None, pretag=None, timeout=60, sync=True, timeout_handler=None):
+    def _fire_master(self, data=None, tag=None, events=None, pretag=None, timeout=60, sync=True, timeout_handler=None, callback=None):
         '''
         Fire an event on the master, or drop message if unable to send.
         '''
+        if timeout_handler is None and self._batch_master_event(data, tag, events, pretag):
+            return True
         load = {'id': self.opts['id'],
                 'cmd': '_minion_event',
                 'pretag': pretag,
@@ -1496,7 +1535,22 @@ class Minion(MinionBase):
                 timeout_handler = handle_timeout
 
             with tornado.stack_context.ExceptionStackContext(timeout_handler):
-                self._send_req_async(load, timeout, callback=lambda f: None)  # pylint: disable=unexpected-keyword-arg
+                self._send_req_async(load, timeout, callback=callback or (lambda f: None))  # pylint: disable=unexpected-keyword-arg
+        return True
+
+    def _batch_master_event(self, data, tag, events, pretag):
+        '''
+        Hand an event to the event batcher of the main minion process, which
+        sends the events in batches. Returns ``False`` if the event has to be
+        sent on its own.
+        '''
+        event_batcher = getattr(self, 'event_batcher', None)
+        if event_batcher is None or event_batcher.pid != os.getpid():
+            return False
+        if not events and not tag:
+            return False
+        # Main minion process or a job thread, add_callback is thread safe
+        event_batcher.io_loop.add_callback(event_batcher.put, data, tag, events, pretag)
         return True
 
     @tornado.gen.coroutine
@@ -1536,6 +1590,10 @@ class Minion(MinionBase):
                 self.schedule.functions = self.functions
                 self.schedule.returners = self.returners
 
+        if self.opts.get('multiprocessing', True) and self._inline_safe(data):
+            yield self._run_inline(data)
+            return
+
         process_count_max = self.opts.get('process_count_max')
         process_count_max_sleep_secs = self.opts.get('process_count_max_sleep_secs')
         if process_count_max > 0:
@@ -1586,6 +1644,56 @@ class Minion(MinionBase):
         elif salt.utils.platform.is_windows():
             self.win_proc.append(process)
 
+    def _inline_safe(self, data):
+        '''
+        Return True if the job only calls a function that is both listed in
+        ``inline_functions`` and marked with the ``inline_safe`` decorator, and
+        may thus run in the minion's thread pool instead of a forked process.
+        '''
+        fun = data['fun']
+        if not isinstance(fun, six.string_types) or fun in self.inline_demoted:
+            return False
+        if data.get('module_executors') or self.opts.get('sudo_user'):
+            return False
+        if not any(fnmatch.fnmatch(fun, pattern)
+                   for pattern in self.opts.get('inline_functions') or []):
+            return False
+        try:
+            func = self.functions[fun]
+        except KeyError:
+            return False
+        return getattr(func, 'inline_safe', False) is True
+
+    @tornado.gen.coroutine
+    def _run_inline(self, data):
+        '''
+        Run a job in the minion's thread pool. A function which does not
+        finish within ``inline_functions_timeout`` seconds is left to finish
+        in its thread, but is run in a forked process from then on.
+        '''
+        if self.inline_executor is None:
+            self.inline_executor = ThreadPoolExecutor(
+                max_workers=self.opts.get('inline_functions_threads', 4))
+        # The job runs in this process, there is nothing to daemonize
+        opts = dict(self.opts, multiprocessing=False)
+        future = self.inline_executor.submit(
+            self._target, self, opts, data, self.connected)
+        timeout = self.opts.get('inline_functions_timeout', 10)
+        try:
+            yield tornado.gen.with_timeout(self.io_loop.time() + timeout, future)
+        except tornado.gen.TimeoutError:
+            log.warning(
+                'Function %s did not finish within %s seconds while running '
+                'inline for jid %s, it will run in a separate process from '
+                'now on', data['fun'], timeout, data['jid']
+            )
+            self.inline_demoted.add(data['fun'])
+        except Exception as exc:
+            log.error(
+                'Inline execution of %s for jid %s failed: %s',
+                data['fun'], data['jid'], exc, exc_info_on_loglevel=logging.DEBUG
+            )
+
     def ctx(self):
         '''
         Return a single context manager for the minion's data
@@ -2041,6 +2149,10 @@ class Minion(MinionBase):
         if not self.opts['pub_ret']:
             return ''
 
+        if ret_cmd == '_return' and self.opts.get('return_queue', False):
+            if self._queue_return(load):
+                return ''
+
         def timeout_handler(*_):
             log.warning(
                'The minion failed to return the job information for job %s. '
@@ -2063,6 +2175,40 @@ class Minion(MinionBase):
         log.trace('ret_val = %s', ret_val)  # pylint: disable=no-member
         return ret_val
 
+    def _queue_return(self, load):
+        '''
+        Hand a return load to the return queue of the main minion process,
+        which coalesces returns and sends them over a single channel. Job
+        processes reach the queue over the local minion event bus. Returns
+        ``False`` if the load could not be queued and has to be sent directly.
+        '''
+        if self.opts['minion_sign_messages']:
+            log.trace('Signing event to be published onto the bus.')
+            minion_privkey_path = os.path.join(self.opts['pki_dir'], 'minion.pem')
+            sig = salt.crypt.sign_message(minion_privkey_path, salt.serializers.msgpack.serialize(load))
+            load['sig'] = sig
+
+        return_queue = getattr(self, 'return_queue', None)
+        if return_queue is not None and return_queue.pid == os.getpid():
+            # Main minion process or a job thread, add_callback is thread safe
+            return_queue.io_loop.add_callback(return_queue.put, load)
+            return True
+
+        if len(self.serial.dumps(load)) > self.opts['max_event_size']:
+            # Would be trimmed on the event bus
+            load.pop('sig', None)
+            return False
+        try:
+            with salt.utils.event.get_event('minion', opts=self.opts, listen=False) as event:
+                return event.fire_event(
+                    {'master': self.opts['master'], 'load': load},
+                    '__return_queue'
+                )
+        except Exception as exc:
+            log.debug('Unable to queue return for job %s: %s', load.get('jid'), exc)
+            load.pop('sig', None)
+            return False
+
     def _return_pub_multi(self, rets, ret_cmd='_return', timeout=60, sync=True):
         '''
         Return the data from the executed command to the master server
@@ -2227,6 +2373,8 @@ class Minion(MinionBase):
         Refresh the functions and returners.
         '''
         log.debug('Refreshing beacons.')
+        if hasattr(self, 'beacons'):
+            self.beacons.stop()
         self.beacons = salt.beacons.Beacon(self.opts, self.functions)
 
     def matchers_refresh(self):
@@ -2631,6 +2779,18 @@ class Minion(MinionBase):
                 )
         self._return_pub(data, ret_cmd='_return', sync=False)
 
+    def _handle_tag_return_queue(self, tag, data):
+        '''
+        Handle a __return_queue event
+        '''
+        if data.get('master') != self.opts['master']:
+            # The job was run for another master of this minion
+            return
+        if getattr(self, 'return_queue', None) is not None:
+            self.return_queue.put(data['load'])
+        else:
+            self._send_req_async(data['load'], timeout=self._return_retry_timer(), callback=lambda f: None)  # pylint: disable=unexpected-keyword-arg
+
     def _handle_tag_salt_error(self, tag, data):
         '''
         Handle a _salt_error event
@@ -2676,6 +2836,7 @@ class Minion(MinionBase):
                          'salt/auth/creds': self._handle_tag_salt_auth_creds,
                          '_salt_error': self._handle_tag_salt_error,
                          '__schedule_return': self._handle_tag_schedule_return,
+                         '__return_queue': self._handle_tag_return_queue,
                          master_event(type='disconnected'): self._handle_tag_master_disconnected_failback,
                          master_event(type='failback'): self._handle_tag_master_disconnected_failback,
                          master_event(type='connected'): self._handle_tag_master_connected,
@@ -2721,6 +2882,18 @@ class Minion(MinionBase):
             uid = salt.utils.user.get_uid(user=self.opts.get('user', None))
             self.proc_dir = get_proc_dir(self.opts['cachedir'], uid=uid)
             self.grains_cache = self.opts['grains']
+            if self.opts.get('return_queue', False):
+                self.return_queue = salt.utils.return_queue.ReturnQueue(
+                    self.opts,
+                    io_loop=self.io_loop,
+                    retry_timer=self._return_retry_timer)
+                if self.return_queue.pending:
+                    self.io_loop.spawn_callback(self.return_queue.flush)
+            if self.opts.get('master_event_batch', False):
+                self.event_batcher = salt.utils.event_batcher.EventBatcher(
+                    self.opts,
+                    io_loop=self.io_loop,
+                    tok=lambda: self.tok)
             self.ready = True
 
     def setup_beacons(self, before_connect=False):
@@ -2737,6 +2910,9 @@ class Minion(MinionBase):
             self.beacons = salt.beacons.Beacon(self.opts, self.functions)
 
             def handle_beacons():
+                if self.opts.get('beacons_async', False):
+                    self.io_loop.spawn_callback(self.handle_beacons_async)
+                    return
                 # Process Beacons
                 beacons = None
                 try:
@@ -2762,6 +2938,42 @@ class Minion(MinionBase):
 
         self.periodic_callbacks.update(new_periodic_callbacks)
 
+    @tornado.gen.coroutine
+    def handle_beacons_async(self, triggered=None):
+        '''
+        Run the beacons which are due, or the ``triggered`` ones, and send
+        their events to the master in a single request
+        '''
+        if triggered is None:
+            if self.beacons_running:
+                log.debug('Skipping beacon interval, the previous one is still running')
+                return
+            self.beacons_running = True
+        beacons = None
+        try:
+            beacons = yield self.process_beacons_async(
+                self.functions, triggered=triggered, on_ready=self._beacon_ready)
+        except Exception:
+            log.critical('The beacon errored: ', exc_info=True)
+        finally:
+            if triggered is None:
+                self.beacons_running = False
+        if beacons and self.connected:
+            self._fire_master(events=beacons, sync=False)
+
+    def _beacon_ready(self, mod):
+        '''
+        Run a beacon whose event source became readable, beacons which become
+        readable at the same time are run together
+        '''
+        if not self.beacons_ready:
+            self.io_loop.add_callback(self._run_ready_beacons)
+        self.beacons_ready.add(mod)
+
+    def _run_ready_beacons(self):
+        triggered, self.beacons_ready = self.beacons_ready, set()
+        self.io_loop.spawn_callback(self.handle_beacons_async, triggered=triggered)
+
     def setup_scheduler(self, before_connect=False):
         '''
         Set up the scheduler.
@@ -2870,7 +3082,15 @@ class Minion(MinionBase):
                                     'minion is running under an init system.'
                                 )
 
-                    self._fire_master('ping', 'minion_ping', sync=False, timeout_handler=ping_timeout_handler)
+                    start = time.time()
+
+                    def ping_done(_):
+                        # Sent with the next ping, for the presence table of
+                        # the master
+                        self.ping_rtt = time.time() - start
+
+                    self._fire_master({'rtt': self.ping_rtt}, 'minion_ping', sync=False,
+                                      timeout_handler=ping_timeout_handler, callback=ping_done)
                 except Exception:
                     log.warning('Attempt to ping master failed.', exc_on_loglevel=logging.DEBUG)
             self.periodic_callbacks['ping'] = tornado.ioloop.PeriodicCallback(ping_master, ping_interval * 1000)
@@ -2951,6 +3171,17 @@ class Minion(MinionBase):
         if hasattr(self, 'periodic_callbacks'):
             for cb in six.itervalues(self.periodic_callbacks):
                 cb.stop()
+        if getattr(self, 'return_queue', None) is not None:
+            self.return_queue.close()
+            self.return_queue = None
+        if getattr(self, 'event_batcher', None) is not None:
+            self.event_batcher.close()
+            self.event_batcher = None
+        if getattr(self, 'inline_executor', None) is not None:
+            self.inline_executor.shutdown(wait=False)
+            self.inline_executor = None
+        if getattr(self, 'beacons', None) is not None:
+            self.beacons.stop()
 
     def __del__(self):
         self.destroy()
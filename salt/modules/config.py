@@ -13,6 +13,7 @@ import logging
 # Import salt libs
 import salt.config
 import salt.utils.data
+import salt.utils.decorators
 import salt.utils.dictupdate
 import salt.utils.files
 import salt.utils.platform
@@ -213,6 +214,7 @@ def merge(value,
     return ret
 
 
+@salt.utils.decorators.inline_safe
 def get(key, default='', delimiter=':', merge=None, omit_opts=False,
         omit_pillar=False, omit_master=False, omit_grains=False):
     '''
@@ -463,6 +465,7 @@ def gather_bootstrap_script(bootstrap=None):
         return ret['Success']['Files updated'][0]
 
 
+@salt.utils.decorators.inline_safe
 def items():
     '''
     Return the complete config from the currently running minion process.
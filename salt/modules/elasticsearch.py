@@ -55,6 +55,7 @@ import logging
 import sys
 
 # Import Salt Libs
+import salt.utils.json
 from salt.exceptions import CommandExecutionError, SaltInvocationError
 from salt.ext import six
 
@@ -406,6 +407,38 @@ def document_create(index, doc_type, body=None, id=None, hosts=None, profile=Non
         raise CommandExecutionError("Cannot create document in index {0}, server returned code {1} with message {2}".format(index, e.status_code, e.error))
 
 
+def document_bulk(index, doc_type, documents, hosts=None, profile=None):
+    '''
+    Create documents in a specified index with a single bulk request
+
+    .. versionadded:: Neon
+
+    index
+        Index name where the documents should reside
+    doc_type
+        Type of the documents
+    documents
+        List of the documents to store, as JSON strings or dicts
+
+    CLI example::
+
+        salt myminion elasticsearch.document_bulk testindex doctype1 '[{"a": 1}, {"b": 2}]'
+    '''
+    es = _get_instance(hosts, profile)
+    action = salt.utils.json.dumps({'index': {'_index': index, '_type': doc_type}})
+    body = ''.join(
+        '{0}\n{1}\n'.format(
+            action,
+            doc if isinstance(doc, six.string_types) else salt.utils.json.dumps(doc))
+        for doc in documents)
+    if not body:
+        return None
+    try:
+        return es.bulk(body=body)
+    except elasticsearch.TransportError as e:
+        raise CommandExecutionError("Cannot create documents in index {0}, server returned code {1} with message {2}".format(index, e.status_code, e.error))
+
+
 def document_delete(index, doc_type, id, hosts=None, profile=None):
     '''
     Delete a document from an index
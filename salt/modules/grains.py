@@ -24,6 +24,7 @@ from functools import reduce  # pylint: disable=redefined-builtin
 from salt.ext import six
 import salt.utils.compat
 import salt.utils.data
+import salt.utils.decorators
 import salt.utils.files
 import salt.utils.json
 import salt.utils.platform
@@ -77,6 +78,7 @@ _SANITIZERS = {
 }
 
 
+@salt.utils.decorators.inline_safe
 def get(key, default='', delimiter=DEFAULT_TARGET_DELIM, ordered=True):
     '''
     Attempt to retrieve the named value from grains, if the named value is not
@@ -147,6 +149,7 @@ def has_value(key):
         KeyError) is not KeyError
 
 
+@salt.utils.decorators.inline_safe
 def items(sanitize=False):
     '''
     Return all of the minion's grains
@@ -173,6 +176,7 @@ def items(sanitize=False):
         return __grains__
 
 
+@salt.utils.decorators.inline_safe
 def item(*args, **kwargs):
     '''
     Return one or more grains
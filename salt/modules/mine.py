@@ -7,6 +7,7 @@ The function cache system allows for data to be stored on the master so it can b
 from __future__ import absolute_import, print_function, unicode_literals
 import copy
 import logging
+import os
 import time
 import traceback
 
@@ -14,7 +15,10 @@ import traceback
 import salt.crypt
 import salt.payload
 import salt.utils.args
+import salt.utils.atomicfile
 import salt.utils.event
+import salt.utils.files
+import salt.utils.hashutils
 import salt.utils.network
 import salt.transport.client
 from salt.exceptions import SaltClientError
@@ -66,6 +70,49 @@ def _mine_send(load, opts):
     return event_ret
 
 
+def _hashes_path():
+    '''
+    Return the path of the file holding the hashes of the mine data last sent
+    to the configured master(s)
+    '''
+    master = __opts__.get('master', '')
+    if isinstance(master, list):
+        master = ','.join(master)
+    return os.path.join(
+        __opts__['cachedir'],
+        'mine_hashes_{0}.p'.format(
+            salt.utils.hashutils.sha1_digest(six.text_type(master))[:16])
+    )
+
+
+def _load_hashes():
+    '''
+    Return the hashes of the mine data last sent to the master and when all of
+    it was sent last
+    '''
+    try:
+        with salt.utils.files.fopen(_hashes_path(), 'rb') as fp_:
+            ret = salt.payload.Serial(__opts__).load(fp_)
+        if isinstance(ret, dict) and 'hashes' in ret:
+            return ret
+    except Exception:  # pylint: disable=broad-except
+        pass
+    return {'full': 0, 'hashes': {}}
+
+
+def _store_hashes(state):
+    try:
+        with salt.utils.atomicfile.atomic_open(_hashes_path(), 'wb') as fp_:
+            salt.payload.Serial(__opts__).dump(state, fp_)
+    except (IOError, OSError) as exc:
+        log.warning('Unable to store the mine data hashes: %s', exc)
+
+
+def _hash(data):
+    return salt.utils.hashutils.sha256_digest(
+        salt.payload.Serial(__opts__).dumps(data))
+
+
 def _mine_get(load, opts):
     if opts.get('transport', '') in ('zeromq', 'tcp'):
         try:
@@ -179,13 +226,36 @@ def update(clear=False, mine_functions=None):
                 old.update(data)
                 data = old
         return __salt__['data.update']('mine_cache', data)
+    state = None
+    if __opts__.get('mine_delta', False):
+        # Only send the functions whose results changed since they were last
+        # sent, unless it is time to send all of them again
+        state = _load_hashes()
+        hashes = dict((func, _hash(data[func])) for func in data)
+        full_interval = __opts__.get('mine_delta_full_interval', 3600)
+        if clear or (not mine_functions and time.time() - state['full'] >= full_interval):
+            state['full'] = time.time()
+            if clear:
+                state['hashes'] = {}
+        else:
+            data = dict(
+                (func, data[func]) for func in data
+                if state['hashes'].get(func) != hashes[func]
+            )
+            if not data:
+                log.debug('The mine data did not change, not sending it to the master')
+                return True
+        state['hashes'].update((func, hashes[func]) for func in data)
     load = {
             'cmd': '_mine',
             'data': data,
             'id': __opts__['id'],
             'clear': clear,
     }
-    return _mine_send(load, __opts__)
+    ret = _mine_send(load, __opts__)
+    if ret and state is not None:
+        _store_hashes(state)
+    return ret
 
 
 def send(func, *args, **kwargs):
@@ -239,7 +309,12 @@ def send(func, *args, **kwargs):
             'data': data,
             'id': __opts__['id'],
     }
-    return _mine_send(load, __opts__)
+    ret = _mine_send(load, __opts__)
+    if ret and __opts__.get('mine_delta', False):
+        state = _load_hashes()
+        state['hashes'][func] = _hash(data[func])
+        _store_hashes(state)
+    return ret
 
 
 def get(tgt,
@@ -359,7 +434,12 @@ def delete(fun):
             'id': __opts__['id'],
             'fun': fun,
     }
-    return _mine_send(load, __opts__)
+    ret = _mine_send(load, __opts__)
+    if __opts__.get('mine_delta', False):
+        state = _load_hashes()
+        if state['hashes'].pop(fun, None) is not None:
+            _store_hashes(state)
+    return ret
 
 
 def flush():
@@ -378,7 +458,10 @@ def flush():
             'cmd': '_mine_flush',
             'id': __opts__['id'],
     }
-    return _mine_send(load, __opts__)
+    ret = _mine_send(load, __opts__)
+    if __opts__.get('mine_delta', False):
+        _store_hashes({'full': 0, 'hashes': {}})
+    return ret
 
 
 def get_docker(interfaces=None, cidrs=None, with_container_id=False):
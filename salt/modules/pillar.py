@@ -17,6 +17,7 @@ from salt.ext import six
 import salt.pillar
 import salt.utils.crypt
 import salt.utils.data
+import salt.utils.decorators
 import salt.utils.dictupdate
 import salt.utils.functools
 import salt.utils.odict
@@ -29,6 +30,7 @@ __proxyenabled__ = ['*']
 log = logging.getLogger(__name__)
 
 
+@salt.utils.decorators.inline_safe
 def get(key,
         default=KeyError,
         merge=False,
@@ -347,6 +349,7 @@ def ls(*args):
     return list(items(*args))
 
 
+@salt.utils.decorators.inline_safe
 def item(*args, **kwargs):
     '''
     .. versionadded:: 0.16.2
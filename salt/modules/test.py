@@ -22,7 +22,7 @@ import salt.version
 import salt.loader
 from salt.ext import six
 from salt.ext.six.moves import builtins
-from salt.utils.decorators import depends
+from salt.utils.decorators import depends, inline_safe
 
 __proxyenabled__ = ['*']
 
@@ -106,6 +106,7 @@ def echo(text):
     return text
 
 
+@inline_safe
 def ping():
     '''
     Used to make sure the minion is up and responding. Not an ICMP ping.
@@ -597,6 +598,7 @@ def assertion(assertion):
     assert assertion
 
 
+@inline_safe
 def true_():
     '''
     Always return True
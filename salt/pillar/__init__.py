@@ -12,19 +12,27 @@ import collections
 import logging
 import tornado.gen
 import sys
+import time
 import traceback
 import inspect
+import uuid
 
 # Import salt libs
+import salt.cache
 import salt.loader
 import salt.fileclient
 import salt.minion
+import salt.payload
 import salt.transport.client
 import salt.utils.args
 import salt.utils.cache
 import salt.utils.crypt
 import salt.utils.data
 import salt.utils.dictupdate
+import salt.utils.ext_pillar
+import salt.utils.hashutils
+import salt.utils.pillar_compile
+import salt.utils.render_cache
 import salt.utils.url
 from salt.exceptions import SaltClientError
 from salt.template import compile_template
@@ -83,6 +91,41 @@ def get_async_pillar(opts, grains, minion_id, saltenv=None, ext=None, funcs=None
                  extra_minion_data=extra_minion_data)
 
 
+def _pillar_pending(ret):
+    '''
+    Return the number of seconds after which to repeat a pillar request the
+    master is still compiling the pillar for, None if ``ret`` is the pillar
+    '''
+    if isinstance(ret, dict) and len(ret) == 1 \
+            and salt.utils.pillar_compile.PENDING in ret:
+        try:
+            return min(max(float(ret[salt.utils.pillar_compile.PENDING]['retry']), 0), 30)
+        except (KeyError, TypeError, ValueError):
+            return 1
+    return None
+
+
+def _pillar_deadline(opts):
+    '''
+    Return the time after which a minion stops waiting for the master to
+    compile its pillar
+    '''
+    return time.time() + opts.get('pillar_compile_timeout', 300)
+
+
+def _check_pillar_deadline(deadline, retry, opts):
+    '''
+    Raise SaltClientError if repeating a pending pillar request after
+    ``retry`` seconds would go past the deadline
+    '''
+    if time.time() + retry > deadline:
+        msg = ('The master did not compile the pillar within {0} seconds, '
+               'see pillar_compile_timeout').format(
+                   opts.get('pillar_compile_timeout', 300))
+        log.error(msg)
+        raise SaltClientError(msg)
+
+
 class RemotePillarMixin(object):
     '''
     Common remote pillar functionality
@@ -168,18 +211,26 @@ class AsyncRemotePillar(RemotePillarMixin):
                 'pillarenv': self.opts['pillarenv'],
                 'pillar_override': self.pillar_override,
                 'extra_minion_data': self.extra_minion_data,
+                'nonce': uuid.uuid4().hex,
                 'ver': '2',
                 'cmd': '_pillar'}
         if self.ext:
             load['ext'] = self.ext
-        try:
-            ret_pillar = yield self.channel.crypted_transfer_decode_dictentry(
-                load,
-                dictkey='pillar',
-            )
-        except Exception:
-            log.exception('Exception getting pillar:')
-            raise SaltClientError('Exception getting pillar.')
+        deadline = _pillar_deadline(self.opts)
+        while True:
+            try:
+                ret_pillar = yield self.channel.crypted_transfer_decode_dictentry(
+                    load,
+                    dictkey='pillar',
+                )
+            except Exception:
+                log.exception('Exception getting pillar:')
+                raise SaltClientError('Exception getting pillar.')
+            retry = _pillar_pending(ret_pillar)
+            if retry is None:
+                break
+            _check_pillar_deadline(deadline, retry, self.opts)
+            yield tornado.gen.sleep(retry)
 
         if not isinstance(ret_pillar, dict):
             msg = ('Got a bad pillar from master, type {0}, expecting dict: '
@@ -238,13 +289,21 @@ class RemotePillar(RemotePillarMixin):
                 'pillarenv': self.opts['pillarenv'],
                 'pillar_override': self.pillar_override,
                 'extra_minion_data': self.extra_minion_data,
+                'nonce': uuid.uuid4().hex,
                 'ver': '2',
                 'cmd': '_pillar'}
         if self.ext:
             load['ext'] = self.ext
-        ret_pillar = self.channel.crypted_transfer_decode_dictentry(load,
-                                                                    dictkey='pillar',
-                                                                    )
+        deadline = _pillar_deadline(self.opts)
+        while True:
+            ret_pillar = self.channel.crypted_transfer_decode_dictentry(load,
+                                                                        dictkey='pillar',
+                                                                        )
+            retry = _pillar_pending(ret_pillar)
+            if retry is None:
+                break
+            _check_pillar_deadline(deadline, retry, self.opts)
+            time.sleep(retry)
 
         if not isinstance(ret_pillar, dict):
             log.error(
@@ -339,9 +398,17 @@ class PillarCache(object):
         log.debug('Scanning pillar cache for information about minion %s and pillarenv %s', self.minion_id, self.pillarenv)
         log.debug('Scanning cache for minion %s: %s', self.minion_id, self.cache[self.minion_id] or '*empty*')
 
+        # The pillar is cached with the grains it was compiled for, a change
+        # of the grains invalidates all pillarenvs of the minion
+        grains_hash = salt.utils.hashutils.sha256_digest(
+            salt.payload.Serial(self.opts).dumps(self.grains or {}))
+        if self.minion_id in self.cache \
+                and self.cache[self.minion_id].get('__grains__') != grains_hash:
+            log.debug('Grains of minion %s changed, discarding its cached pillar', self.minion_id)
+            self.cache[self.minion_id] = {'__grains__': grains_hash}
+
         # Check the cache!
         if self.minion_id in self.cache:  # Keyed by minion_id
-            # TODO Compare grains, etc?
             if self.pillarenv in self.cache[self.minion_id]:
                 # We have a cache hit! Send it back.
                 log.debug('Pillar cache hit for minion %s and pillarenv %s', self.minion_id, self.pillarenv)
@@ -355,7 +422,8 @@ class PillarCache(object):
         else:
             # We haven't seen this minion yet in the cache. Store it.
             pillar_data = self.fetch_pillar()
-            self.cache[self.minion_id] = {self.pillarenv: pillar_data}
+            self.cache[self.minion_id] = {self.pillarenv: pillar_data,
+                                          '__grains__': grains_hash}
             log.debug('Pillar cache has been added for minion %s', self.minion_id)
             log.debug('Current pillar cache: %s', self.cache[self.minion_id])
 
@@ -404,7 +472,11 @@ class Pillar(object):
 
         self.opts['minion_id'] = minion_id
         self.matchers = salt.loader.matchers(self.opts)
-        self.rend = salt.loader.render(self.opts, self.functions)
+        self.render_cache = None
+        if self.opts.get('pillar_render_cache', False):
+            self.render_cache = salt.utils.render_cache.RenderCache(
+                self.opts, minion_id)
+        self.rend = self._load_renderers()
         ext_pillar_opts = copy.deepcopy(self.opts)
         # Keep the incoming opts ID intact, ie, the master id
         if 'id' in opts:
@@ -425,6 +497,40 @@ class Pillar(object):
             log.error('Extra minion data must be a dictionary')
         self._closing = False
 
+    def _load_renderers(self):
+        '''
+        Load the renderers. With the render cache enabled they are handed
+        grains, pillar and execution functions which record what a render
+        reads.
+        '''
+        if self.render_cache is None:
+            return salt.loader.render(self.opts, self.functions)
+        opts = dict(self.opts)
+        opts['grains'] = salt.utils.render_cache.TrackingDict(
+            'grains', self.opts.get('grains', {}))
+        opts['pillar'] = salt.utils.render_cache.TrackingDict(
+            'pillar', self._render_inputs()['pillar'])
+        rend = salt.loader.render(
+            opts, salt.utils.render_cache.TrackingFunctions(self.functions))
+        # Of the opts of the renderers only the options which differ between
+        # minions are tracked. The renderers already loaded to check the
+        # renderer pipe are loaded again to pick them up.
+        rend._dict.pack['__opts__'] = salt.utils.render_cache.TrackingDict(
+            'opts', rend._dict.opts, watch=salt.utils.render_cache.MINION_OPTS)
+        rend._dict.clear()
+        return rend
+
+    def _render_inputs(self):
+        '''
+        Return the grains, pillar and opts the renderers read
+        '''
+        pillar = self.opts.get('pillar')
+        return {
+            'grains': self.opts.get('grains', {}),
+            'pillar': pillar if isinstance(pillar, dict) else {},
+            'opts': self.opts,
+        }
+
     def __valid_on_demand_ext_pillar(self, opts):
         '''
         Check to see if the on demand external pillar is allowed
@@ -718,7 +824,9 @@ class Pillar(object):
         errors = []
         state_data = self.client.get_state(sls, saltenv)
         fn_ = state_data.get('dest', False)
-        if not fn_:
+        if fn_:
+            salt.utils.render_cache.note('files', fn_)
+        else:
             if sls in self.ignored_pillars.get(saltenv, []):
                 log.debug('Skipping ignored and missing SLS \'%s\' in '
                           'environment \'%s\'', sls, saltenv)
@@ -883,7 +991,7 @@ class Pillar(object):
                     pstatefiles.append(sls_match)
 
             for sls in pstatefiles:
-                pstate, mods, err = self.render_pstate(sls, saltenv, mods)
+                pstate, mods, err = self._render_pstate_cached(sls, saltenv, mods)
 
                 if err:
                     errors += err
@@ -908,40 +1016,97 @@ class Pillar(object):
 
         return pillar, errors
 
-    def _external_pillar_data(self, pillar, val, key):
+    def _render_pstate_cached(self, sls, saltenv, mods):
+        '''
+        Render a pillar sls file with render_pstate, reusing the output of a
+        previous compilation if nothing it depends on changed
+        '''
+        if self.render_cache is None:
+            return self.render_pstate(sls, saltenv, mods)
+        # Includes are matched against the available sls files, adding one
+        # must invalidate the renders of the environment
+        key = ['sls', saltenv, sls, sorted(mods),
+               sorted(self.avail.get(saltenv, []))]
+        inputs = self._render_inputs()
+        cached = self.render_cache.fetch(key, inputs)
+        if cached is not None:
+            log.debug('Using the cached render of pillar SLS \'%s\'', sls)
+            pstate, cached_mods = cached
+            mods.update(cached_mods)
+            return pstate, mods, []
+        with salt.utils.render_cache.Recorder() as recorder:
+            pstate, mods, err = self.render_pstate(sls, saltenv, mods)
+        if not err and pstate is not None:
+            deps = self.render_cache.deps(recorder, inputs)
+            if deps is not None:
+                self.render_cache.store(key, deps, [pstate, sorted(mods)])
+        return pstate, mods, err
+
+    def _external_pillar_cached(self, pillar, val, key):
+        '''
+        Run an external pillar, reusing its output of a previous compilation
+        if the external pillar module has a ``fingerprint`` function and it
+        returns the same value
+        '''
+        fingerprint = None
+        if self.render_cache is not None:
+            loader = getattr(self.ext_pillars, '_dict', {})
+            fp_fun = '{0}.fingerprint'.format(key)
+            if fp_fun in loader:
+                try:
+                    fingerprint = self._external_pillar_data(
+                        pillar, val, key, fun=loader[fp_fun])
+                except Exception as exc:
+                    log.warning(
+                        'Unable to fingerprint ext_pillar \'%s\': %s', key, exc)
+        if fingerprint is None:
+            return self._external_pillar_data(pillar, val, key)
+        cache_key = ['ext', key, val, self.render_cache.hash(pillar)]
+        ext = self.render_cache.fetch_ext(cache_key, fingerprint)
+        if ext is not None:
+            log.debug('Using the cached data of ext_pillar \'%s\'', key)
+            return ext
+        ext = self._external_pillar_data(pillar, val, key)
+        if ext is not None:
+            self.render_cache.store_ext(cache_key, fingerprint, ext)
+        return ext
+
+    def _external_pillar_data(self, pillar, val, key, fun=None):
         '''
         Builds actual pillar data structure and updates the ``pillar`` variable
         '''
         ext = None
+        if fun is None:
+            fun = self.ext_pillars[key]
         args = salt.utils.args.get_function_argspec(self.ext_pillars[key]).args
 
         if isinstance(val, dict):
             if ('extra_minion_data' in args) and self.extra_minion_data:
-                ext = self.ext_pillars[key](
+                ext = fun(
                     self.minion_id, pillar,
                     extra_minion_data=self.extra_minion_data, **val)
             else:
-                ext = self.ext_pillars[key](self.minion_id, pillar, **val)
+                ext = fun(self.minion_id, pillar, **val)
         elif isinstance(val, list):
             if ('extra_minion_data' in args) and self.extra_minion_data:
-                ext = self.ext_pillars[key](
+                ext = fun(
                     self.minion_id, pillar, *val,
                     extra_minion_data=self.extra_minion_data)
             else:
-                ext = self.ext_pillars[key](self.minion_id,
-                                            pillar,
-                                            *val)
+                ext = fun(self.minion_id,
+                          pillar,
+                          *val)
         else:
             if ('extra_minion_data' in args) and self.extra_minion_data:
-                ext = self.ext_pillars[key](
+                ext = fun(
                     self.minion_id,
                     pillar,
                     val,
                     extra_minion_data=self.extra_minion_data)
             else:
-                ext = self.ext_pillars[key](self.minion_id,
-                                            pillar,
-                                            val)
+                ext = fun(self.minion_id,
+                          pillar,
+                          val)
         return ext
 
     def ext_pillar(self, pillar, errors=None):
@@ -956,15 +1121,16 @@ class Pillar(object):
             # the git ext_pillar() func is run, but only for masterless.
             if self.ext and 'git' in self.ext \
                     and self.opts.get('__role') != 'minion':
-                # Avoid circular import
-                import salt.utils.gitfs
-                import salt.pillar.git_pillar
-                git_pillar = salt.utils.gitfs.GitPillar(
+                # Avoid circular import. Importing the modules by their full
+                # name would make salt a local name of this function.
+                from salt.utils.gitfs import GitPillar
+                from salt.pillar import git_pillar as git_pillar_mod
+                git_pillar = GitPillar(
                     self.opts,
                     self.ext['git'],
-                    per_remote_overrides=salt.pillar.git_pillar.PER_REMOTE_OVERRIDES,
-                    per_remote_only=salt.pillar.git_pillar.PER_REMOTE_ONLY,
-                    global_only=salt.pillar.git_pillar.GLOBAL_ONLY)
+                    per_remote_overrides=git_pillar_mod.PER_REMOTE_OVERRIDES,
+                    per_remote_only=git_pillar_mod.PER_REMOTE_ONLY,
+                    global_only=git_pillar_mod.GLOBAL_ONLY)
                 git_pillar.fetch_remotes()
         except TypeError:
             # Handle malformed ext_pillar
@@ -975,7 +1141,6 @@ class Pillar(object):
             errors.append('The "ext_pillar" option is malformed')
             log.critical(errors[-1])
             return pillar, errors
-        ext = None
         # Bring in CLI pillar data
         if self.pillar_override:
             pillar = merge(
@@ -985,7 +1150,8 @@ class Pillar(object):
                 self.opts.get('renderer', 'yaml'),
                 self.opts.get('pillar_merge_lists', False))
 
-        for run in self.opts['ext_pillar']:
+        sources = []
+        for index, run in enumerate(self.opts['ext_pillar']):
             if not isinstance(run, dict):
                 errors.append('The "ext_pillar" option is malformed')
                 log.critical(errors[-1])
@@ -999,21 +1165,38 @@ class Pillar(object):
                         key
                     )
                     continue
-                try:
-                    ext = self._external_pillar_data(pillar,
-                                                     val,
-                                                     key)
-                except Exception as exc:
-                    errors.append(
-                        'Failed to load ext_pillar {0}: {1}'.format(
-                            key,
-                            exc.__str__(),
-                        )
-                    )
-                    log.error(
-                        'Exception caught loading ext_pillar \'%s\':\n%s',
-                        key, ''.join(traceback.format_tb(sys.exc_info()[2]))
+                sources.append(
+                    salt.utils.ext_pillar.Source(self, key, val, index=index))
+
+        cache = None
+        for source in sources:
+            if source.opts['cache_ttl']:
+                if cache is None:
+                    cache = salt.cache.factory(self.opts)
+                source.cache = cache
+        # The concurrent external pillars only get the pillar data compiled
+        # before any external pillar ran, each their own copy of it
+        for source in sources:
+            if source.concurrent:
+                source.start(copy.deepcopy(pillar))
+
+        for source in sources:
+            if not source.concurrent:
+                source.start(pillar)
+            try:
+                ext = source.result()
+            except Exception as exc:
+                ext = None
+                errors.append(
+                    'Failed to load ext_pillar {0}: {1}'.format(
+                        source.key,
+                        exc.__str__(),
                     )
+                )
+                log.error(
+                    'Exception caught loading ext_pillar \'%s\':\n%s',
+                    source.key, ''.join(traceback.format_tb(sys.exc_info()[2]))
+                )
             if ext:
                 pillar = merge(
                     pillar,
@@ -1021,7 +1204,6 @@ class Pillar(object):
                     self.merge_strategy,
                     self.opts.get('renderer', 'yaml'),
                     self.opts.get('pillar_merge_lists', False))
-                ext = None
         return pillar, errors
 
     def compile_pillar(self, ext=True):
@@ -1032,7 +1214,7 @@ class Pillar(object):
         if ext:
             if self.opts.get('ext_pillar_first', False):
                 self.opts['pillar'], errors = self.ext_pillar(self.pillar_override)
-                self.rend = salt.loader.render(self.opts, self.functions)
+                self.rend = self._load_renderers()
                 matches = self.top_matches(top, reload=True)
                 pillar, errors = self.render_pillar(matches, errors=errors)
                 pillar = merge(
@@ -1079,6 +1261,9 @@ class Pillar(object):
         if decrypt_errors:
             pillar.setdefault('_errors', []).extend(decrypt_errors)
 
+        if self.render_cache is not None:
+            self.render_cache.save()
+
         return pillar
 
     def decrypt_pillar(self, pillar):
@@ -11,14 +11,24 @@ It's possible to store the sqlite3 database files by setting `sqlite_queue_dir`
 to another location::
 
     sqlite_queue_dir: /home/myuser/salt/master/queues
+
+.. versionchanged:: Neon
+    The databases use write-ahead logging and a persistent connection per
+    process, the items are popped in insertion order, and ``pop`` accepts a
+    ``visibility_timeout`` for at-least-once processing: the popped items are
+    hidden for ``visibility_timeout`` seconds instead of being removed, and
+    come back to the queue unless they are deleted before then.
 '''
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import contextlib
 import glob
 import logging
 import os
 import re
 import sqlite3
+import threading
+import time
 import salt.utils.json
 from salt.exceptions import SaltInvocationError
 
@@ -30,6 +40,12 @@ log = logging.getLogger(__name__)
 # Define the module's virtual name
 __virtualname__ = 'sqlite'
 
+# The connections to the queue databases, by process and database
+_CONNECTIONS = {}
+_LOCK = threading.RLock()
+
+_QUEUE_RE = re.compile(r'^[\w.-]+$')
+
 
 def __virtual__():
     # All python servers should have sqlite3 and so be able to use
@@ -37,53 +53,88 @@ def __virtual__():
     return __virtualname__
 
 
+def _table(queue):
+    '''
+    Return the quoted name of the table of a queue
+    '''
+    if not isinstance(queue, six.string_types) or not _QUEUE_RE.match(queue):
+        raise SaltInvocationError('Invalid queue name: {0}'.format(queue))
+    return '"{0}"'.format(queue)
+
+
 def _conn(queue):
     '''
-    Return an sqlite connection
+    Return the sqlite connection to the database of a queue, which stays open
+    for the life of the process
     '''
+    table = _table(queue)
     queue_dir = __opts__['sqlite_queue_dir']
     db = os.path.join(queue_dir, '{0}.db'.format(queue))
-    log.debug('Connecting to: %s', db)
-
-    con = sqlite3.connect(db)
-    tables = _list_tables(con)
-    if queue not in tables:
-        _create_table(con, queue)
-    return con
-
-
-def _list_tables(con):
-    with con:
-        cur = con.cursor()
-        cmd = 'SELECT name FROM sqlite_master WHERE type = "table"'
-        log.debug('SQL Query: %s', cmd)
-        cur.execute(cmd)
-        result = cur.fetchall()
-        return [x[0] for x in result]
-
-
-def _create_table(con, queue):
-    with con:
-        cur = con.cursor()
-        cmd = 'CREATE TABLE {0}(id INTEGER PRIMARY KEY, '\
-              'name TEXT UNIQUE)'.format(queue)
-        log.debug('SQL Query: %s', cmd)
-        cur.execute(cmd)
+    key = (os.getpid(), db)
+    with _LOCK:
+        if key not in _CONNECTIONS:
+            log.debug('Connecting to: %s', db)
+            # Transactions are started explicitly
+            con = sqlite3.connect(db, timeout=30, isolation_level=None,
+                                  check_same_thread=False)
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            _create_table(con, table)
+            _CONNECTIONS[key] = con
+        return _CONNECTIONS[key]
+
+
+def _create_table(con, table):
+    cmd = 'CREATE TABLE IF NOT EXISTS {0}(id INTEGER PRIMARY KEY, '\
+          'name TEXT UNIQUE, visible REAL NOT NULL DEFAULT 0)'.format(table)
+    log.debug('SQL Query: %s', cmd)
+    con.execute(cmd)
+    columns = [row[1] for row in con.execute('PRAGMA table_info({0})'.format(table))]
+    if 'visible' not in columns:
+        # A queue created by an earlier release
+        con.execute('ALTER TABLE {0} ADD COLUMN visible REAL NOT NULL DEFAULT 0'.format(table))
     return True
 
 
+@contextlib.contextmanager
+def _transaction(queue):
+    '''
+    Run the statements of the block in a transaction holding the write lock
+    of the database, so that concurrent pops do not get the same items
+    '''
+    con = _conn(queue)
+    with _LOCK:
+        con.execute('BEGIN IMMEDIATE')
+        try:
+            yield con.cursor()
+        except Exception:
+            con.execute('ROLLBACK')
+            raise
+        con.execute('COMMIT')
+
+
+def _encode(item):
+    if isinstance(item, dict):
+        return salt.utils.json.dumps(item)
+    return item
+
+
+def _decode(item):
+    try:
+        return salt.utils.json.loads(item)
+    except ValueError:
+        # Stored with single quotes by an earlier release
+        return salt.utils.json.loads(item.replace("'", '"'))
+
+
 def _list_items(queue):
     '''
     Private function to list contents of a queue
     '''
-    con = _conn(queue)
-    with con:
-        cur = con.cursor()
-        cmd = 'SELECT name FROM {0}'.format(queue)
-        log.debug('SQL Query: %s', cmd)
-        cur.execute(cmd)
-        contents = cur.fetchall()
-    return contents
+    cmd = 'SELECT name FROM {0} ORDER BY id'.format(_table(queue))
+    log.debug('SQL Query: %s', cmd)
+    with _LOCK:
+        return _conn(queue).execute(cmd).fetchall()
 
 
 def _list_queues():
@@ -119,60 +170,31 @@ def list_length(queue):
     '''
     Provide the number of items in a queue
     '''
-    items = _list_items(queue)
-    return len(items)
-
-
-def _quote_escape(item):
-    '''
-    Make sure single quotes are escaped properly in sqlite3 fashion.
-    e.g.: ' becomes ''
-    '''
-
-    rex_sqlquote = re.compile("'", re.M)
-
-    return rex_sqlquote.sub("''", item)
+    cmd = 'SELECT COUNT(*) FROM {0}'.format(_table(queue))
+    log.debug('SQL Query: %s', cmd)
+    with _LOCK:
+        return _conn(queue).execute(cmd).fetchone()[0]
 
 
 def insert(queue, items):
     '''
     Add an item or items to a queue
     '''
-    con = _conn(queue)
-    with con:
-        cur = con.cursor()
-        if isinstance(items, six.string_types):
-            items = _quote_escape(items)
-            cmd = '''INSERT INTO {0}(name) VALUES('{1}')'''.format(queue, items)
-            log.debug('SQL Query: %s', cmd)
-            try:
-                cur.execute(cmd)
-            except sqlite3.IntegrityError as esc:
-                return('Item already exists in this queue. '
-                       'sqlite error: {0}'.format(esc))
-        if isinstance(items, list):
-            items = [_quote_escape(el) for el in items]
-            cmd = "INSERT INTO {0}(name) VALUES(?)".format(queue)
-            log.debug('SQL Query: %s', cmd)
-            newitems = []
-            for item in items:
-                newitems.append((item,))
-                # we need a list of one item tuples here
-            try:
-                cur.executemany(cmd, newitems)
-            except sqlite3.IntegrityError as esc:
-                return('One or more items already exists in this queue. '
-                       'sqlite error: {0}'.format(esc))
-        if isinstance(items, dict):
-            items = salt.utils.json.dumps(items).replace('"', "'")
-            items = _quote_escape(items)
-            cmd = str('''INSERT INTO {0}(name) VALUES('{1}')''').format(queue, items)  # future lint: disable=blacklisted-function
-            log.debug('SQL Query: %s', cmd)
-            try:
-                cur.execute(cmd)
-            except sqlite3.IntegrityError as esc:
-                return('Item already exists in this queue. '
-                       'sqlite error: {0}'.format(esc))
+    if isinstance(items, list):
+        params = [(_encode(item),) for item in items]
+        error = 'One or more items already exists in this queue.'
+    elif isinstance(items, (six.string_types, dict)):
+        params = [(_encode(items),)]
+        error = 'Item already exists in this queue.'
+    else:
+        return True
+    cmd = 'INSERT INTO {0}(name) VALUES(?)'.format(_table(queue))
+    log.debug('SQL Query: %s', cmd)
+    try:
+        with _transaction(queue) as cur:
+            cur.executemany(cmd, params)
+    except sqlite3.IntegrityError as esc:
+        return '{0} sqlite error: {1}'.format(error, esc)
     return True
 
 
@@ -180,39 +202,29 @@ def delete(queue, items):
     '''
     Delete an item or items from a queue
     '''
-    con = _conn(queue)
-    with con:
-        cur = con.cursor()
-        if isinstance(items, six.string_types):
-            items = _quote_escape(items)
-            cmd = """DELETE FROM {0} WHERE name = '{1}'""".format(queue, items)
-            log.debug('SQL Query: %s', cmd)
-            cur.execute(cmd)
-            return True
-        if isinstance(items, list):
-            items = [_quote_escape(el) for el in items]
-            cmd = 'DELETE FROM {0} WHERE name = ?'.format(queue)
-            log.debug('SQL Query: %s', cmd)
-            newitems = []
-            for item in items:
-                newitems.append((item,))
-                # we need a list of one item tuples here
-            cur.executemany(cmd, newitems)
-        if isinstance(items, dict):
-            items = salt.utils.json.dumps(items).replace('"', "'")
-            items = _quote_escape(items)
-            cmd = ("""DELETE FROM {0} WHERE name = '{1}'""").format(queue, items)  # future lint: disable=blacklisted-function
-            log.debug('SQL Query: %s', cmd)
-            cur.execute(cmd)
-            return True
+    if isinstance(items, list):
+        params = [(_encode(item),) for item in items]
+    elif isinstance(items, (six.string_types, dict)):
+        params = [(_encode(items),)]
+    else:
         return True
+    cmd = 'DELETE FROM {0} WHERE name = ?'.format(_table(queue))
+    log.debug('SQL Query: %s', cmd)
+    with _transaction(queue) as cur:
+        cur.executemany(cmd, params)
+    return True
 
 
-def pop(queue, quantity=1, is_runner=False):
+def pop(queue, quantity=1, is_runner=False, visibility_timeout=None):
     '''
-    Pop one or more or all items from the queue return them.
+    Pop one or more or all items from the queue return them, oldest first.
+
+    With ``visibility_timeout``, the items stay in the queue, hidden for
+    ``visibility_timeout`` seconds, and are popped again after that unless
+    they were deleted in the meantime.
     '''
-    cmd = 'SELECT name FROM {0}'.format(queue)
+    table = _table(queue)
+    cmd = 'SELECT id, name FROM {0} WHERE visible <= ? ORDER BY id'.format(table)
     if quantity != 'all':
         try:
             quantity = int(quantity)
@@ -222,23 +234,21 @@ def pop(queue, quantity=1, is_runner=False):
             raise SaltInvocationError(error_txt)
         cmd = ''.join([cmd, ' LIMIT {0}'.format(quantity)])
     log.debug('SQL Query: %s', cmd)
-    con = _conn(queue)
-    items = []
-    with con:
-        cur = con.cursor()
-        result = cur.execute(cmd).fetchall()
+    now = time.time()
+    with _transaction(queue) as cur:
+        result = cur.execute(cmd, (now,)).fetchall()
         if result:
-            items = [item[0] for item in result]
-            itemlist = '","'.join(items)
-            _quote_escape(itemlist)
-            del_cmd = '''DELETE FROM {0} WHERE name IN ("{1}")'''.format(
-                queue, itemlist)
-
-            log.debug('SQL Query: %s', del_cmd)
-
-            cur.execute(del_cmd)
-        con.commit()
+            # The popped items are all the visible ones up to the last of them
+            if visibility_timeout:
+                upd_cmd = 'UPDATE {0} SET visible = ? WHERE id <= ? AND visible <= ?'.format(table)
+                log.debug('SQL Query: %s', upd_cmd)
+                cur.execute(upd_cmd, (now + float(visibility_timeout), result[-1][0], now))
+            else:
+                del_cmd = 'DELETE FROM {0} WHERE id <= ? AND visible <= ?'.format(table)
+                log.debug('SQL Query: %s', del_cmd)
+                cur.execute(del_cmd, (result[-1][0], now))
+    items = [item[1] for item in result]
     if is_runner:
-        items = [salt.utils.json.loads(item[0].replace("'", '"')) for item in result]
+        items = [_decode(item) for item in items]
     log.info(items)
     return items
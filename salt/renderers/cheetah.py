@@ -14,6 +14,7 @@ except ImportError:
 
 # Import salt libs
 from salt.ext import six
+import salt.utils.render_cache
 
 
 def render(cheetah_data, saltenv='base', sls='', method='xml', **kws):
@@ -22,6 +23,7 @@ def render(cheetah_data, saltenv='base', sls='', method='xml', **kws):
 
     :rtype: A Python data structure
     '''
+    salt.utils.render_cache.note_uncacheable('Cheetah templates can embed Python statements')
     if not HAS_LIBS:
         return {}
 
@@ -16,6 +16,7 @@ except ImportError:
 
 # Import salt libs
 from salt.ext import six
+import salt.utils.render_cache
 
 
 def render(genshi_data, saltenv='base', sls='', method='xml', **kws):
@@ -37,6 +38,7 @@ def render(genshi_data, saltenv='base', sls='', method='xml', **kws):
 
     :rtype: A Python data structure
     '''
+    salt.utils.render_cache.note_uncacheable('Genshi templates can embed Python code blocks')
     if not HAS_LIBS:
         return {}
 
@@ -8,6 +8,7 @@ from __future__ import absolute_import, print_function, unicode_literals
 
 # Import salt libs
 from salt.ext import six
+import salt.utils.render_cache
 import salt.utils.templates
 from salt.exceptions import SaltRenderError
 
@@ -19,6 +20,7 @@ def render(template_file, saltenv='base', sls='', context=None, tmplpath=None, *
 
     :rtype: string
     '''
+    salt.utils.render_cache.note_uncacheable('Mako templates can embed Python blocks')
     tmp_data = salt.utils.templates.MAKO(template_file, to_str=True,
                     salt=__salt__,
                     grains=__grains__,
@@ -117,6 +117,7 @@ import os
 
 # Import salt libs
 from salt.exceptions import SaltRenderError
+import salt.utils.render_cache
 import salt.utils.templates
 
 
@@ -126,6 +127,7 @@ def render(template, saltenv='base', sls='', tmplpath=None, **kws):
 
     :rtype: string
     '''
+    salt.utils.render_cache.note_uncacheable('the py renderer runs arbitrary Python')
     template = tmplpath
     if not os.path.isfile(template):
         raise SaltRenderError('Template {0} is not a file!'.format(template))
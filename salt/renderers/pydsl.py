@@ -338,6 +338,7 @@ from __future__ import absolute_import, print_function, unicode_literals
 
 import types
 import salt.utils.pydsl as pydsl
+import salt.utils.render_cache
 import salt.utils.stringutils
 from salt.ext.six import exec_
 from salt.utils.pydsl import PyDslError
@@ -347,6 +348,7 @@ __all__ = ['render']
 
 
 def render(template, saltenv='base', sls='', tmplpath=None, rendered_sls=None, **kws):
+    salt.utils.render_cache.note_uncacheable('the pydsl renderer runs arbitrary Python')
     sls = salt.utils.stringutils.to_str(sls)
     mod = types.ModuleType(sls)
     # Note: mod object is transient. It's existence only lasts as long as
@@ -307,6 +307,7 @@ import re
 # Import Salt Libs
 from salt.ext import six
 import salt.utils.files
+import salt.utils.render_cache
 import salt.loader
 from salt.fileclient import get_file_client
 from salt.utils.pyobjects import Registry, StateFactory, SaltObject, Map
@@ -366,6 +367,7 @@ def load_states():
 
 
 def render(template, saltenv='base', sls='', salt_data=True, **kwargs):
+    salt.utils.render_cache.note_uncacheable('the pyobjects renderer runs arbitrary Python')
     if 'pyobjects_states' not in __context__:
         load_states()
 
@@ -6,6 +6,7 @@ from __future__ import absolute_import, print_function, unicode_literals
 # Import salt libs
 from salt.ext import six
 from salt.exceptions import SaltRenderError
+import salt.utils.render_cache
 import salt.utils.templates
 
 
@@ -20,6 +21,7 @@ def render(template_file,
 
     :rtype: string
     '''
+    salt.utils.render_cache.note_uncacheable('wempy templates can embed Python code')
     tmp_data = salt.utils.templates.WEMPY(template_file, to_str=True,
             salt=__salt__,
             grains=__grains__,
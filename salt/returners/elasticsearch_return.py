@@ -98,11 +98,11 @@ Minion configuration:
 from __future__ import absolute_import, print_function, unicode_literals
 import datetime
 from datetime import tzinfo, timedelta
-import uuid
 import logging
 
 # Import Salt libs
 import salt.returners
+import salt.utils.event
 import salt.utils.jid
 import salt.utils.json
 
@@ -348,16 +348,11 @@ def event_return(events):
 
     _ensure_index(index)
 
-    for event in events:
-        data = {
-            'tag': event.get('tag', ''),
-            'data': event.get('data', '')
-        }
-
-    ret = __salt__['elasticsearch.document_create'](index=index,
-                                                    doc_type=doc_type,
-                                                    id=uuid.uuid4(),
-                                                    body=salt.utils.json.dumps(data))
+    # Index all the events with a single bulk request
+    __salt__['elasticsearch.document_bulk'](
+        index=index,
+        doc_type=doc_type,
+        documents=salt.utils.event.event_batch(events).json_events())
 
 
 def prep_jid(nocache=False, passed_jid=None):  # pylint: disable=unused-argument
@@ -149,6 +149,7 @@ import logging
 
 # Import salt libs
 import salt.returners
+import salt.utils.event
 import salt.utils.jid
 import salt.utils.json
 import salt.exceptions
@@ -318,13 +319,15 @@ def event_return(events):
     Requires that configuration be enabled via 'event_return'
     option in master config.
     '''
+    batch = salt.utils.event.event_batch(events)
+    if not batch:
+        return
     with _get_serv(events, commit=True) as cur:
-        for event in events:
-            tag = event.get('tag', '')
-            data = event.get('data', '')
-            sql = '''INSERT INTO `salt_events` (`tag`, `data`, `master_id`)
-                     VALUES (%s, %s, %s)'''
-            cur.execute(sql, (tag, salt.utils.json.dumps(data), __opts__['id']))
+        # executemany inserts all the events with a single statement
+        sql = '''INSERT INTO `salt_events` (`tag`, `data`, `master_id`)
+                 VALUES (%s, %s, %s)'''
+        cur.executemany(sql, [(tag, data, __opts__['id'])
+                              for tag, data in zip(batch.tags, batch.json_data())])
 
 
 def save_load(jid, load, minions=None):
@@ -166,12 +166,14 @@ from __future__ import absolute_import, print_function, unicode_literals
 
 # Import python libs
 from contextlib import contextmanager
+import io
 import sys
 import time
 import logging
 
 # Import salt libs
 import salt.returners
+import salt.utils.event
 import salt.utils.jid
 import salt.exceptions
 from salt.ext import six
@@ -312,14 +314,27 @@ def event_return(events):
     Requires that configuration be enabled via 'event_return'
     option in master config.
     '''
+    batch = salt.utils.event.event_batch(events)
+    if not batch:
+        return
+    # Load all the events with a single COPY, alter_time defaulting to the
+    # time of the transaction
+    rows = io.StringIO()
+    master_id = _copy_field(__opts__['id'])
+    for tag, data in zip(batch.tags, batch.json_data()):
+        rows.write('\t'.join((_copy_field(tag), _copy_field(data), master_id)))
+        rows.write('\n')
+    rows.seek(0)
     with _get_serv(events, commit=True) as cur:
-        for event in events:
-            tag = event.get('tag', '')
-            data = event.get('data', '')
-            sql = '''INSERT INTO salt_events (tag, data, master_id, alter_time)
-                     VALUES (%s, %s, %s, to_timestamp(%s))'''
-            cur.execute(sql, (tag, psycopg2.extras.Json(data),
-                              __opts__['id'], time.time()))
+        cur.copy_expert('COPY salt_events (tag, data, master_id) FROM STDIN', rows)
+
+
+def _copy_field(value):
+    '''
+    Escape a field of a row loaded by COPY in the text format
+    '''
+    return six.text_type(value).replace('\\', '\\\\') \
+        .replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
 
 
 def save_load(jid, load, minions=None):
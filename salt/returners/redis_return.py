@@ -101,6 +101,7 @@ import logging
 
 # Import Salt libs
 import salt.returners
+import salt.utils.event
 import salt.utils.jid
 import salt.utils.json
 import salt.utils.platform
@@ -216,6 +217,27 @@ def returner(ret):
     pipeline.execute()
 
 
+def event_return(events):
+    '''
+    Return events to a redis data store, in a single pipeline
+
+    The events are appended to the ``event:<tag>`` lists, which expire with
+    the jobs.
+
+    .. versionadded:: Neon
+    '''
+    batch = salt.utils.event.event_batch(events)
+    if not batch:
+        return
+    serv = _get_serv()
+    pipeline = serv.pipeline(transaction=False)
+    for tag, event in zip(batch.tags, batch.json_events()):
+        pipeline.rpush('event:{0}'.format(tag), event)
+    for tag in set(batch.tags):
+        pipeline.expire('event:{0}'.format(tag), _get_ttl())
+    pipeline.execute()
+
+
 def save_load(jid, load, minions=None):
     '''
     Save the load to the specified jid
@@ -260,15 +282,23 @@ def get_fun(fun):
     '''
     serv = _get_serv(ret=None)
     ret = {}
-    for minion in serv.smembers('minions'):
-        ind_str = '{0}:{1}'.format(minion, fun)
-        try:
-            jid = serv.get(ind_str)
-        except Exception:
-            continue
-        if not jid:
+    minions = list(serv.smembers('minions'))
+    if not minions:
+        return ret
+    # The last jids and their returns are read in two pipelines, rather than
+    # two requests per minion
+    pipeline = serv.pipeline(transaction=False)
+    for minion in minions:
+        pipeline.get('{0}:{1}'.format(minion, fun))
+    jids = pipeline.execute(raise_on_error=False)
+    pipeline = serv.pipeline(transaction=False)
+    found = []
+    for minion, jid in zip(minions, jids):
+        if not jid or isinstance(jid, Exception):
             continue
-        data = serv.get('{0}:{1}'.format(minion, jid))
+        found.append(minion)
+        pipeline.hget('ret:{0}'.format(jid), minion)
+    for minion, data in zip(found, pipeline.execute()):
         if data:
             ret[minion] = salt.utils.json.loads(data)
     return ret
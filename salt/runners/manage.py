@@ -27,10 +27,11 @@ import salt.utils.compat
 import salt.utils.files
 import salt.utils.minions
 import salt.utils.path
+import salt.utils.presence
 import salt.utils.versions
 import salt.wheel
 import salt.version
-from salt.exceptions import SaltClientError, SaltSystemExit
+from salt.exceptions import SaltClientError, SaltInvocationError, SaltSystemExit
 FINGERPRINT_REGEX = re.compile(r'^([a-f0-9]{2}:){15}([a-f0-9]{2})$')
 
 log = logging.getLogger(__name__)
@@ -68,14 +69,27 @@ def _ping(tgt, tgt_type, timeout, gather_job_timeout):
     return returned, not_returned
 
 
-def status(output=True, tgt='*', tgt_type='glob', timeout=None, gather_job_timeout=None):
+def _presence(tgt, tgt_type):
+    ckminions = salt.utils.minions.CkMinions(__opts__)
+    minions = ckminions.check_minions(tgt, tgt_type)['minions']
+    present = salt.utils.presence.present(__opts__, minions)
+    return present, sorted(set(minions).difference(present))
+
+
+def status(output=True, tgt='*', tgt_type='glob', timeout=None, gather_job_timeout=None, presence=False):
     '''
     .. versionchanged:: 2017.7.0
         The ``expr_form`` argument has been renamed to ``tgt_type``, earlier
         releases must use ``expr_form``.
+    .. versionchanged:: Neon
+        The ``presence`` argument was added.
 
     Print the status of all known salt minions
 
+    presence : False
+        Tell which minions are up from the presence table of the master
+        instead of pinging them. Requires ``presence_table``.
+
     CLI Example:
 
     .. code-block:: bash
@@ -83,9 +97,14 @@ def status(output=True, tgt='*', tgt_type='glob', timeout=None, gather_job_timeo
         salt-run manage.status
         salt-run manage.status tgt="webservers" tgt_type="nodegroup"
         salt-run manage.status timeout=5 gather_job_timeout=10
+        salt-run manage.status presence=True
     '''
     ret = {}
 
+    if presence:
+        ret['up'], ret['down'] = _presence(tgt, tgt_type)
+        return ret
+
     if not timeout:
         timeout = __opts__['timeout']
     if not gather_job_timeout:
@@ -148,7 +167,7 @@ def key_regen():
     return msg
 
 
-def down(removekeys=False, tgt='*', tgt_type='glob', timeout=None, gather_job_timeout=None):
+def down(removekeys=False, tgt='*', tgt_type='glob', timeout=None, gather_job_timeout=None, presence=False):
     '''
     .. versionchanged:: 2017.7.0
         The ``expr_form`` argument has been renamed to ``tgt_type``, earlier
@@ -157,6 +176,13 @@ def down(removekeys=False, tgt='*', tgt_type='glob', timeout=None, gather_job_ti
     Print a list of all the down or unresponsive salt minions
     Optionally remove keys of down minions
 
+    presence : False
+        .. versionadded:: Neon
+
+        Tell which minions are down from the presence table of the master
+        instead of pinging them. Cannot be used with ``removekeys``, the keys
+        are only removed for the minions which do not answer a ping.
+
     CLI Example:
 
     .. code-block:: bash
@@ -164,13 +190,20 @@ def down(removekeys=False, tgt='*', tgt_type='glob', timeout=None, gather_job_ti
         salt-run manage.down
         salt-run manage.down removekeys=True
         salt-run manage.down tgt="webservers" tgt_type="nodegroup"
+        salt-run manage.down presence=True
 
     '''
+    if removekeys and presence:
+        raise SaltInvocationError(
+            'The keys of the down minions can only be removed after pinging '
+            'them, not from the presence table'
+        )
     ret = status(output=False,
                  tgt=tgt,
                  tgt_type=tgt_type,
                  timeout=timeout,
-                 gather_job_timeout=gather_job_timeout
+                 gather_job_timeout=gather_job_timeout,
+                 presence=presence
     ).get('down', [])
     for minion in ret:
         if removekeys:
@@ -179,7 +212,7 @@ def down(removekeys=False, tgt='*', tgt_type='glob', timeout=None, gather_job_ti
     return ret
 
 
-def up(tgt='*', tgt_type='glob', timeout=None, gather_job_timeout=None):  # pylint: disable=C0103
+def up(tgt='*', tgt_type='glob', timeout=None, gather_job_timeout=None, presence=False):  # pylint: disable=C0103
     '''
     .. versionchanged:: 2017.7.0
         The ``expr_form`` argument has been renamed to ``tgt_type``, earlier
@@ -187,6 +220,12 @@ def up(tgt='*', tgt_type='glob', timeout=None, gather_job_timeout=None):  # pyli
 
     Print a list of all of the minions that are up
 
+    presence : False
+        .. versionadded:: Neon
+
+        Tell which minions are up from the presence table of the master
+        instead of pinging them. Requires ``presence_table``.
+
     CLI Example:
 
     .. code-block:: bash
@@ -194,17 +233,54 @@ def up(tgt='*', tgt_type='glob', timeout=None, gather_job_timeout=None):  # pyli
         salt-run manage.up
         salt-run manage.up tgt="webservers" tgt_type="nodegroup"
         salt-run manage.up timeout=5 gather_job_timeout=10
+        salt-run manage.up presence=True
     '''
     ret = status(
         output=False,
         tgt=tgt,
         tgt_type=tgt_type,
         timeout=timeout,
-        gather_job_timeout=gather_job_timeout
+        gather_job_timeout=gather_job_timeout,
+        presence=presence
     ).get('up', [])
     return ret
 
 
+def presence_table(tgt='*', tgt_type='glob'):
+    '''
+    .. versionadded:: Neon
+
+    Return the entries of the presence table of the master for the targeted
+    minions, without sending any command to them. Requires ``presence_table``.
+
+    Each entry holds when the minion was last ``seen``, whether its transport
+    connection is ``connected``, the estimated round trip time of its
+    requests in seconds, ``rtt``, and whether it is ``present``.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run manage.presence_table
+        salt-run manage.presence_table tgt="webservers" tgt_type="nodegroup"
+    '''
+    ckminions = salt.utils.minions.CkMinions(__opts__)
+    minions = ckminions.check_minions(tgt, tgt_type)['minions']
+    table = salt.utils.presence.load(__opts__)
+    present = set(salt.utils.presence.present(__opts__, minions))
+    ret = {}
+    for minion in minions:
+        entry = table.get(minion)
+        if entry is None:
+            ret[minion] = {'seen': None, 'connected': False, 'rtt': None, 'present': False}
+            continue
+        ret[minion] = {'seen': entry['seen'],
+                       'connected': entry.get('connected', False),
+                       'rtt': entry.get('rtt'),
+                       'present': minion in present}
+    return ret
+
+
 def _show_ip_migration(show_ip, show_ipv4):
     if show_ipv4 is not None:
         salt.utils.versions.warn_until(
@@ -15,6 +15,19 @@ and creates a Salt Event that can then be processed by a Reactor. The
 a schedule with the Salt Scheduler or regular system cron. It is also possible
 to use the peer system to allow a minion to call the runner.
 
+.. versionadded:: Neon
+
+When the items of the queue are minion IDs, `process_queue` can also run a
+function on them: with ``fun`` (and its ``arg``), the popped items are targeted
+by a single job, published with a ``list`` target, instead of a job per item.
+With a ``visibility_timeout``, the items are only removed from the queue once
+the job was published, and are popped again after ``visibility_timeout``
+seconds otherwise.
+
+.. code-block:: bash
+
+    salt-run queue.process_queue myqueue 100 fun=state.apply arg='[webserver]' visibility_timeout=60
+
 This runner, as well as the Queues system, is not api stable at this time.
 
 There are many things that could potentially be done with queues within Salt.
@@ -64,12 +77,16 @@ still running from the last time the process_runner task was executed.
 
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import logging
 
 # Import salt libs
+import salt.client
 import salt.loader
 from salt.ext import six
 from salt.utils.event import get_event, tagify
-from salt.exceptions import SaltInvocationError
+from salt.exceptions import SaltClientError, SaltInvocationError
+
+log = logging.getLogger(__name__)
 
 
 def insert(queue, items, backend='sqlite'):
@@ -170,10 +187,17 @@ def list_items(queue, backend='sqlite'):
     return ret
 
 
-def pop(queue, quantity=1, backend='sqlite', is_runner=False):
+def pop(queue, quantity=1, backend='sqlite', is_runner=False, visibility_timeout=None):
     '''
     Pop one or more or all items from a queue
 
+    visibility_timeout
+        .. versionadded:: Neon
+
+        Hide the popped items for this many seconds instead of removing them,
+        they come back to the queue unless they are deleted in the meantime.
+        Only supported by the sqlite backend.
+
     CLI Example:
 
     .. code-block:: bash
@@ -183,20 +207,43 @@ def pop(queue, quantity=1, backend='sqlite', is_runner=False):
         salt-run queue.pop myqueue all
         salt-run queue.pop myqueue 6 backend=sqlite
         salt-run queue.pop myqueue all backend=sqlite
+        salt-run queue.pop myqueue 6 visibility_timeout=60
     '''
     queue_funcs = salt.loader.queues(__opts__)
     cmd = '{0}.pop'.format(backend)
     if cmd not in queue_funcs:
         raise SaltInvocationError('Function "{0}" is not available'.format(cmd))
-    ret = queue_funcs[cmd](quantity=quantity, queue=queue, is_runner=is_runner)
+    kwargs = {}
+    if visibility_timeout:
+        kwargs['visibility_timeout'] = visibility_timeout
+    ret = queue_funcs[cmd](quantity=quantity, queue=queue, is_runner=is_runner, **kwargs)
     return ret
 
 
-def process_queue(queue, quantity=1, backend='sqlite', is_runner=False):
+def process_queue(queue, quantity=1, backend='sqlite', is_runner=False,
+                  fun=None, arg=None, visibility_timeout=None):
     '''
     Pop items off a queue and create an event on the Salt event bus to be
     processed by a Reactor.
 
+    fun
+        .. versionadded:: Neon
+
+        Run this function on the popped items, which are minion IDs, in a
+        single job targeting them as a list. The jid of the job is added to
+        the event.
+
+    arg
+        .. versionadded:: Neon
+
+        The list of the arguments of ``fun``
+
+    visibility_timeout
+        .. versionadded:: Neon
+
+        Only remove the items from the queue once the job of ``fun`` was
+        published, they are popped again after this many seconds otherwise
+
     CLI Example:
 
     .. code-block:: bash
@@ -204,6 +251,7 @@ def process_queue(queue, quantity=1, backend='sqlite', is_runner=False):
         salt-run queue.process_queue myqueue
         salt-run queue.process_queue myqueue 6
         salt-run queue.process_queue myqueue all backend=sqlite
+        salt-run queue.process_queue myqueue 100 fun=test.ping visibility_timeout=60
     '''
     # get ready to send an event
     with get_event(
@@ -212,8 +260,12 @@ def process_queue(queue, quantity=1, backend='sqlite', is_runner=False):
                 __opts__['transport'],
                 opts=__opts__,
                 listen=False) as event_bus:
+        pop_kwargs = {}
+        if visibility_timeout:
+            pop_kwargs['visibility_timeout'] = visibility_timeout
         try:
-            items = pop(queue=queue, quantity=quantity, backend=backend, is_runner=is_runner)
+            items = pop(queue=queue, quantity=quantity, backend=backend,
+                        is_runner=is_runner, **pop_kwargs)
         except SaltInvocationError as exc:
             error_txt = '{0}'.format(exc)
             __jid_event__.fire_event({'errors': error_txt}, 'progress')
@@ -223,10 +275,35 @@ def process_queue(queue, quantity=1, backend='sqlite', is_runner=False):
                 'backend': backend,
                 'queue': queue,
                 }
+        if fun and items:
+            data['jid'] = __publish_items(items, fun, arg)
+            if visibility_timeout and data['jid']:
+                delete(queue=queue, items=items, backend=backend)
         event_bus.fire_event(data, tagify([queue, 'process'], prefix='queue'))
     return data
 
 
+def __publish_items(items, fun, arg=None):
+    '''
+    Publish a single job running fun on the minions of the items, return its
+    jid or an empty string if it could not be published
+    '''
+    if arg is None:
+        arg = []
+    elif isinstance(arg, six.string_types):
+        arg = arg.split(',')
+    client = salt.client.get_local_client(__opts__['conf_file'])
+    try:
+        jid = client.cmd_async(items, fun, arg=arg, tgt_type='list')
+    except SaltClientError as exc:
+        log.error('Unable to publish %s to the queued minions: %s', fun, exc)
+        return ''
+    if not jid:
+        log.error('Unable to publish %s to the queued minions', fun)
+        return ''
+    return jid
+
+
 def __get_queue_opts(queue=None, backend=None):
     '''
     Get consistent opts for the queued runners
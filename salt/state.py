@@ -4239,6 +4239,8 @@ class HighState(BaseHighState):
     '''
     # a stack of active HighState objects during a state.highstate run
     stack = []
+    # the class of the State running the compiled states
+    state_class = State
 
     def __init__(
             self,
@@ -4254,15 +4256,15 @@ class HighState(BaseHighState):
         self.opts = opts
         self.client = salt.fileclient.get_file_client(self.opts)
         BaseHighState.__init__(self, opts)
-        self.state = State(self.opts,
-                           pillar_override,
-                           jid,
-                           pillar_enc,
-                           proxy=proxy,
-                           context=context,
-                           mocked=mocked,
-                           loader=loader,
-                           initial_pillar=initial_pillar)
+        self.state = self.state_class(self.opts,
+                                      pillar_override,
+                                      jid,
+                                      pillar_enc,
+                                      proxy=proxy,
+                                      context=context,
+                                      mocked=mocked,
+                                      loader=loader,
+                                      initial_pillar=initial_pillar)
         self.matchers = salt.loader.matchers(self.opts)
         self.proxy = proxy
 
@@ -21,6 +21,7 @@ import salt.cache
 import salt.state
 import salt.loader
 import salt.payload
+import salt.utils.stringutils
 from salt.exceptions import SaltRenderError
 
 # Import 3rd-party libs
@@ -28,18 +29,161 @@ from salt.ext import six
 
 log = logging.getLogger(__name__)
 
+# The functions storing the events matching one of their arguments in the
+# register, with the argument and their result when no event matches
+CONSUMERS = {
+    'reg.set': ('match', True),
+    'reg.list': ('match', True),
+    'reg.mean': ('match', True),
+    'reg.window': ('match', True),
+    'check.event': ('name', False),
+}
+# The functions only reading the register, which return the same result as
+# long as the register entries they read do not change
+READERS = ('calc.', 'check.')
+
+
+class Register(dict):
+    '''
+    The thorium register, recording the entries the states access
+    '''
+    def __init__(self, *args, **kwargs):
+        super(Register, self).__init__(*args, **kwargs)
+        self.accessed = set()
+
+    def __getitem__(self, key):
+        self.accessed.add(key)
+        return super(Register, self).__getitem__(key)
+
+    def __setitem__(self, key, value):
+        self.accessed.add(key)
+        super(Register, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.accessed.add(key)
+        super(Register, self).__delitem__(key)
+
+    def __contains__(self, key):
+        self.accessed.add(key)
+        return super(Register, self).__contains__(key)
+
+    def get(self, key, default=None):
+        self.accessed.add(key)
+        return super(Register, self).get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed.add(key)
+        return super(Register, self).setdefault(key, default)
+
+    def pop(self, key, *args):
+        self.accessed.add(key)
+        return super(Register, self).pop(key, *args)
+
+
+class ThorRuntime(salt.state.State):
+    '''
+    Run the thorium states incrementally
+
+    The states storing events in the register only run when an event they
+    match arrived, and the states reading the register only run when the
+    entries they read changed since they last ran, the others return their
+    previous result. The other states, and all the states when
+    thorium_incremental is disabled, run on every tick.
+    '''
+    def __init__(self, *args, **kwargs):
+        super(ThorRuntime, self).__init__(*args, **kwargs)
+        self.incremental = self.opts.get('thorium_incremental', True)
+        self.events = []
+        self.reset()
+
+    def reset(self):
+        '''
+        Forget the results of the states, running them all on the next tick
+        '''
+        # The last result of each state
+        self.results = {}
+        # The version of each register entry, bumped whenever a state which
+        # may have changed it runs
+        self.versions = {}
+        # The versions of the register entries each reader read
+        self.seen = {}
+        self._matched = {}
+
+    def call_events(self, chunks, events):
+        '''
+        Run the chunks on the events which arrived since the last tick
+        '''
+        self.events = events
+        self._matched = {}
+        self.inject_globals['__events__'] = events
+        return self.call_chunks(chunks)
+
+    def _match(self, match):
+        if match not in self._matched:
+            self._matched[match] = any(
+                salt.utils.stringutils.expr_match(event['tag'], match)
+                for event in self.events)
+        return self._matched[match]
+
+    def _idle_result(self, low, tag):
+        '''
+        Return the result of a state whose inputs did not change, or None if
+        it has to run
+        '''
+        if not self.incremental or tag not in self.results:
+            return None
+        fun = '{0[state]}.{0[fun]}'.format(low)
+        if fun in CONSUMERS:
+            arg, result = CONSUMERS[fun]
+            if self._match(low.get(arg)):
+                return None
+            return dict(self.results[tag], changes={}, result=result)
+        if fun.startswith(READERS):
+            for key, version in six.iteritems(self.seen[tag]):
+                if self.versions.get(key, 0) != version:
+                    return None
+            return dict(self.results[tag])
+        return None
+
+    def call(self, low, chunks=None, running=None, retries=1):
+        '''
+        Call a state, unless its previous result still holds
+        '''
+        tag = salt.state._gen_tag(low)  # pylint: disable=protected-access
+        ret = self._idle_result(low, tag)
+        if ret is not None:
+            return ret
+        register = self.inject_globals.get('__reg__')
+        if not isinstance(register, Register):
+            return super(ThorRuntime, self).call(low, chunks, running, retries)
+        register.accessed.clear()
+        ret = super(ThorRuntime, self).call(low, chunks, running, retries)
+        self.results[tag] = ret
+        fun = '{0[state]}.{0[fun]}'.format(low)
+        if fun.startswith(READERS) and fun not in CONSUMERS:
+            self.seen[tag] = dict((key, self.versions.get(key, 0))
+                                  for key in register.accessed)
+        else:
+            # The state may have changed any entry it accessed
+            for key in register.accessed:
+                self.versions[key] = self.versions.get(key, 0) + 1
+        return ret
+
 
 class ThorState(salt.state.HighState):
     '''
     Compile the thorium state and manage it in the thorium runtime
     '''
+    state_class = ThorRuntime
+
     def __init__(
             self,
             opts,
             grains=False,
             grain_keys=None,
             pillar=False,
-            pillar_keys=None):
+            pillar_keys=None,
+            shared_event=None):
         self.grains = grains
         self.grain_keys = grain_keys
         self.pillar = pillar
@@ -62,10 +206,14 @@ class ThorState(salt.state.HighState):
             except Exception as exc:
                 log.error(exc)
 
-        self.state.inject_globals = {'__reg__': regdata}
-        self.event = salt.utils.event.get_master_event(
-                self.opts,
-                self.opts['sock_dir'])
+        self.state.inject_globals = {'__reg__': Register(regdata)}
+        if shared_event is not None:
+            # Run by an engine host, which shares its subscription
+            self.event = shared_event
+        else:
+            self.event = salt.utils.event.get_master_event(
+                    self.opts,
+                    self.opts['sock_dir'])
 
     def gather_cache(self):
         '''
@@ -175,8 +323,7 @@ class ThorState(salt.state.HighState):
                 time.sleep(interval)
                 continue
             start = time.time()
-            self.state.inject_globals['__events__'] = events
-            self.state.call_chunks(chunks)
+            self.state.call_events(chunks, events)
             elapsed = time.time() - start
             left = interval - elapsed
             if left > 0:
@@ -185,6 +332,7 @@ class ThorState(salt.state.HighState):
             if (start - r_start) > recompile:
                 cache = self.gather_cache()
                 chunks = self.get_chunks()
+                self.state.reset()
                 if self.reg_ret is not None:
                     self.returners['{0}.save_reg'.format(self.reg_ret)](chunks)
                 r_start = time.time()
@@ -10,6 +10,8 @@ values are stored and computed, such as averages etc.
 
 # import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import itertools
+import math
 
 try:
     import statistics
@@ -25,7 +27,21 @@ def __virtual__():
     return HAS_STATS
 
 
-def calc(name, num, oper, minimum=0, maximum=0, ref=None):
+def _percentile(vals, percent):
+    '''
+    Return the ``percent`` percentile of the values, interpolating between the
+    closest ranks
+    '''
+    vals = sorted(vals)
+    if not vals:
+        raise statistics.StatisticsError('percentile requires at least one data point')
+    rank = (len(vals) - 1) * percent / 100.0
+    low = int(math.floor(rank))
+    high = int(math.ceil(rank))
+    return vals[low] + (vals[high] - vals[low]) * (rank - low)
+
+
+def calc(name, num, oper, minimum=0, maximum=0, ref=None, percent=95):
     '''
     Perform a calculation on the ``num`` most recent values. Requires a list.
     Valid values for ``oper`` are:
@@ -38,6 +54,7 @@ def calc(name, num, oper, minimum=0, maximum=0, ref=None):
     - median_high: Calculate high median of last ``num`` values
     - median_grouped: Calculate grouped median of last ``num`` values
     - mode: Calculate mode of last ``num`` values
+    - percentile: Calculate the ``percent`` percentile of last ``num`` values
 
     USAGE:
 
@@ -56,6 +73,7 @@ def calc(name, num, oper, minimum=0, maximum=0, ref=None):
     if name not in __reg__:
         ret['comment'] = '{0} not found in register'.format(name)
         ret['result'] = False
+        return ret
 
     def opadd(vals):
         sum = 0
@@ -78,15 +96,12 @@ def calc(name, num, oper, minimum=0, maximum=0, ref=None):
         'median_high': statistics.median_high,
         'median_grouped': statistics.median_grouped,
         'mode': statistics.mode,
+        'percentile': lambda vals: _percentile(vals, percent),
     }
 
-    count = 0
     vals = []
-    __reg__[name]['val'].reverse()
-    for regitem in __reg__[name]['val']:
-        count += 1
-        if count > num:
-            break
+    # Only read the most recent values, leaving the register untouched
+    for regitem in itertools.islice(reversed(__reg__[name]['val']), num):
         if ref is None:
             vals.append(regitem)
         else:
@@ -291,3 +306,31 @@ def mode(name, num, minimum=0, maximum=0, ref=None):
         maximum=maximum,
         ref=ref
     )
+
+
+def percentile(name, num, percent=95, minimum=0, maximum=0, ref=None):
+    '''
+    Calculates the ``percent`` percentile of the ``num`` most recent values.
+    Requires a list.
+
+    .. versionadded:: Neon
+
+    USAGE:
+
+    .. code-block:: yaml
+
+        foo:
+          calc.percentile:
+            - name: myregentry
+            - num: 100
+            - percent: 99
+    '''
+    return calc(
+        name=name,
+        num=num,
+        oper='percentile',
+        minimum=minimum,
+        maximum=maximum,
+        ref=ref,
+        percent=percent
+    )
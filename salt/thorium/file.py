@@ -40,6 +40,7 @@ that can be re-imported into Python.
 
 # import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import collections
 import os
 
 # Import salt libs
@@ -48,6 +49,15 @@ import salt.utils.files
 import salt.utils.json
 
 
+def _default(obj):
+    '''
+    Save the pruned lists of the register, which are deques, as lists
+    '''
+    if isinstance(obj, collections.deque):
+        return list(obj)
+    raise TypeError('{0!r} is not JSON serializable'.format(obj))
+
+
 def save(name, filter=False):
     '''
     Save the register to <salt cachedir>/thorium/saves/<name>, or to an
@@ -82,5 +92,5 @@ def save(name, filter=False):
         if filter is True:
             salt.utils.json.dump(salt.utils.data.simple_types_filter(__reg__), fp_)
         else:
-            salt.utils.json.dump(__reg__, fp_)
+            salt.utils.json.dump(__reg__, fp_, default=_default)
     return ret
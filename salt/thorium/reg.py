@@ -6,6 +6,9 @@ values are stored and computed, such as averages etc.
 
 # import python libs
 from __future__ import absolute_import, division, print_function, unicode_literals
+import collections
+
+# import salt libs
 import salt.utils.stringutils
 
 __func_alias__ = {
@@ -55,6 +58,11 @@ def list_(name, add, match, stamp=False, prune=0):
     if ``prune`` is set to an integer higher than ``0``, then only the last
     ``prune`` values will be kept in the list.
 
+    .. versionchanged:: Neon
+        With ``prune``, the values are kept in a deque of ``prune`` items
+        instead of a list, and the last values are kept rather than the first
+        ones.
+
     USAGE:
 
     .. code-block:: yaml
@@ -74,6 +82,9 @@ def list_(name, add, match, stamp=False, prune=0):
     if name not in __reg__:
         __reg__[name] = {}
         __reg__[name]['val'] = []
+    if prune > 0 and getattr(__reg__[name]['val'], 'maxlen', None) != prune:
+        # Drop the oldest values as the new ones are appended
+        __reg__[name]['val'] = collections.deque(__reg__[name]['val'], prune)
     for event in __events__:
         try:
             event_data = event['data']['data']
@@ -87,8 +98,6 @@ def list_(name, add, match, stamp=False, prune=0):
                     if stamp is True:
                         item['time'] = event['data']['_stamp']
             __reg__[name]['val'].append(item)
-    if prune > 0:
-        __reg__[name]['val'] = __reg__[name]['val'][:prune]
     return ret
 
 
@@ -122,17 +131,71 @@ def mean(name, add, match):
         except KeyError:
             event_data = event['data']
         if salt.utils.stringutils.expr_match(event['tag'], match):
-            if add in event_data:
-                try:
-                    comp = int(event_data)
-                except ValueError:
-                    continue
+            try:
+                comp = float(event_data[add])
+            except (KeyError, TypeError, ValueError):
+                continue
             __reg__[name]['total'] += comp
             __reg__[name]['count'] += 1
             __reg__[name]['val'] = __reg__[name]['total'] / __reg__[name]['count']
     return ret
 
 
+def window(name, add, match, size=100):
+    '''
+    Accept a numeric value from the matched events and keep the last ``size``
+    values in the given register, along with their running count, total and
+    mean. If the specified value is not numeric it will be skipped
+
+    .. versionadded:: Neon
+
+    USAGE:
+
+    .. code-block:: yaml
+
+        foo:
+          reg.window:
+            - add: data_field
+            - match: my/custom/event
+            - size: 100
+    '''
+    ret = {'name': name,
+           'changes': {},
+           'comment': '',
+           'result': True}
+    if name not in __reg__ or \
+            getattr(__reg__[name].get('val'), 'maxlen', None) != size:
+        # Create or resize the window, keeping its last values
+        vals = collections.deque(__reg__.get(name, {}).get('val', []), size)
+        __reg__[name] = {}
+        __reg__[name]['val'] = vals
+        __reg__[name]['total'] = sum(vals)
+        __reg__[name]['count'] = len(vals)
+        __reg__[name]['mean'] = 0
+    entry = __reg__[name]
+    for event in __events__:
+        try:
+            event_data = event['data']['data']
+        except KeyError:
+            event_data = event['data']
+        if salt.utils.stringutils.expr_match(event['tag'], match):
+            try:
+                comp = float(event_data[add])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if len(entry['val']) == size:
+                # The oldest value leaves the window
+                entry['total'] -= entry['val'][0]
+                entry['count'] -= 1
+            entry['val'].append(comp)
+            entry['total'] += comp
+            entry['count'] += 1
+            ret['changes'][add] = comp
+    if entry['count']:
+        entry['mean'] = entry['total'] / entry['count']
+    return ret
+
+
 def clear(name):
     '''
     Clear the namespace from the register
@@ -6,6 +6,7 @@ IPC transport classes
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
 import errno
+import fnmatch
 import logging
 import socket
 import time
@@ -446,10 +447,31 @@ class IPCMessageServer(IPCServer):
     '''
 
 
+def match_subscription(tag, subscription):
+    '''
+    Return whether a tag matches the subscription of an IPC subscriber, a list
+    of ``[match_type, tag]`` pairs where the match type is either
+    ``startswith`` or ``fnmatch``. A subscription of None matches every tag.
+    '''
+    if subscription is None:
+        return True
+    for match_type, search_tag in subscription:
+        if match_type == 'fnmatch':
+            if fnmatch.fnmatch(tag, search_tag):
+                return True
+        elif tag.startswith(search_tag):
+            return True
+    return False
+
+
 class IPCMessagePublisher(object):
     '''
     A Tornado IPC Publisher similar to Tornado's TCPServer class
     but using either UNIX domain sockets or TCP sockets
+
+    The subscribers may send the publisher a subscription, in which case they
+    are only sent the messages published with a matching tag. See
+    IPCMessageSubscriber.subscribe().
     '''
     def __init__(self, opts, socket_path, io_loop=None):
         '''
@@ -474,6 +496,8 @@ class IPCMessagePublisher(object):
         self.io_loop = io_loop or IOLoop.current()
         self._closing = False
         self.streams = set()
+        # The subscriptions of the streams which sent one
+        self.subscriptions = {}
 
     def start(self):
         '''
@@ -511,23 +535,65 @@ class IPCMessagePublisher(object):
             yield stream.write(pack)
         except StreamClosedError:
             log.trace('Client disconnected from IPC %s', self.socket_path)
-            self.streams.discard(stream)
+            self._discard(stream)
         except Exception as exc:
             log.error('Exception occurred while handling stream: %s', exc)
             if not stream.closed():
                 stream.close()
-            self.streams.discard(stream)
+            self._discard(stream)
+
+    def _discard(self, stream):
+        self.streams.discard(stream)
+        self.subscriptions.pop(stream, None)
 
-    def publish(self, msg):
+    @tornado.gen.coroutine
+    def _read_subscriptions(self, stream):
+        '''
+        Read the subscriptions a subscriber sends
+        '''
+        if six.PY2:
+            encoding = None
+        else:
+            encoding = 'utf-8'
+        unpacker = msgpack.Unpacker(encoding=encoding)
+        while not stream.closed():
+            try:
+                wire_bytes = yield stream.read_bytes(4096, partial=True)
+                unpacker.feed(wire_bytes)
+                for framed_msg in unpacker:
+                    body = framed_msg['body']
+                    if not isinstance(body, dict) or 'subscribe' not in body:
+                        continue
+                    if body['subscribe'] is None:
+                        self.subscriptions.pop(stream, None)
+                    else:
+                        self.subscriptions[stream] = [
+                            tuple(item) for item in body['subscribe']]
+            except StreamClosedError:
+                break
+            except Exception as exc:
+                log.error('Exception occurred while reading the '
+                          'subscriptions on IPC %s: %s', self.socket_path, exc)
+                break
+
+    def publish(self, msg, tag=None):
         '''
         Send message to all connected sockets
+
+        :param str tag: The tag of the message, matched against the
+                        subscriptions of the subscribers. Without a tag, the
+                        message is sent to all the subscribers.
         '''
         if not self.streams:
             return
 
-        pack = salt.transport.frame.frame_msg_ipc(msg, raw_body=True)
-
+        pack = None
         for stream in self.streams:
+            if tag is not None and \
+                    not match_subscription(tag, self.subscriptions.get(stream)):
+                continue
+            if pack is None:
+                pack = salt.transport.frame.frame_msg_ipc(msg, raw_body=True)
             self.io_loop.spawn_callback(self._write, stream, pack)
 
     def handle_connection(self, connection, address):
@@ -545,9 +611,10 @@ class IPCMessagePublisher(object):
             self.streams.add(stream)
 
             def discard_after_closed():
-                self.streams.discard(stream)
+                self._discard(stream)
 
             stream.set_close_callback(discard_after_closed)
+            self.io_loop.spawn_callback(self._read_subscriptions, stream)
         except Exception as exc:
             log.error('IPC streaming error: %s', exc)
 
@@ -563,6 +630,7 @@ class IPCMessagePublisher(object):
         for stream in self.streams:
             stream.close()
         self.streams.clear()
+        self.subscriptions.clear()
         if hasattr(self.sock, 'close'):
             self.sock.close()
 
@@ -615,6 +683,40 @@ class IPCMessageSubscriber(IPCClient):
         self._saved_data = []
         self._read_in_progress = Lock()
         self.callbacks = set()
+        self.subscription = None
+        # The stream the subscription was last sent on
+        self._subscribed_stream = None
+
+    def subscribe(self, subscription):
+        '''
+        Ask the publisher to only send the messages matching a subscription
+
+        :param list subscription: A list of ``[match_type, tag]`` pairs, the
+                                  match type being either ``startswith`` or
+                                  ``fnmatch``, or None to receive all the
+                                  messages.
+
+        The subscription is sent again when the subscriber reconnects. The
+        messages published before the publisher receives it are matched
+        against the previous subscription.
+        '''
+        self.subscription = subscription
+        self._subscribed_stream = None
+        self._send_subscription()
+
+    def _send_subscription(self):
+        if not self.connected() or self._subscribed_stream is self.stream:
+            return
+        self._subscribed_stream = self.stream
+        pack = salt.transport.frame.frame_msg_ipc(
+            {'subscribe': self.subscription}, raw_body=True)
+        try:
+            future = self.stream.write(pack)
+        except StreamClosedError:
+            log.trace('Subscriber disconnected from IPC %s', self.socket_path)
+            return
+        # The read loop reports the closed streams
+        future.add_done_callback(lambda future: future.exception())
 
     @tornado.gen.coroutine
     def _read(self, timeout, callback=None):
@@ -623,6 +725,9 @@ class IPCMessageSubscriber(IPCClient):
         except tornado.gen.TimeoutError:
             raise tornado.gen.Return(None)
 
+        # Make sure the publisher knows the subscription after a reconnection
+        self._send_subscription()
+
         log.debug('IPC Subscriber is starting reading')
         exc_to_raise = None
         ret = None
@@ -694,6 +694,10 @@ class TCPReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin, salt.tra
                     'payload and load must be a dict', header=header))
                 raise tornado.gen.Return()
 
+            # The IP address the request was received from, never the one in
+            # the payload
+            payload['peer_ip'] = _peer_ip(stream)
+
             try:
                 id_ = payload['load'].get('id', '')
                 if str('\0') in id_:
@@ -751,6 +755,16 @@ class TCPReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin, salt.tra
         raise tornado.gen.Return()
 
 
+def _peer_ip(stream):
+    '''
+    Return the IP address of the other end of a stream, or None
+    '''
+    try:
+        return stream.socket.getpeername()[0]
+    except (AttributeError, socket.error, IndexError, TypeError):
+        return None
+
+
 class SaltMessageServer(tornado.tcpserver.TCPServer, object):
     '''
     Raw TCP server which will receive all of the TCP streams and re-assemble
@@ -620,7 +620,10 @@ class ZeroMQReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin,
             if self.clients.closed or self.workers.closed:
                 break
             try:
-                zmq.device(zmq.QUEUE, self.clients, self.workers)
+                if self.opts.get('file_peer_distribution'):
+                    self._peer_device()
+                else:
+                    zmq.device(zmq.QUEUE, self.clients, self.workers)
             except zmq.ZMQError as exc:
                 if exc.errno == errno.EINTR:
                     continue
@@ -628,6 +631,30 @@ class ZeroMQReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin,
             except (KeyboardInterrupt, SystemExit):
                 break
 
+    def _peer_device(self):
+        '''
+        Forward the requests to the workers like the queue device, adding the
+        IP address each request was received from as its last frame, so that
+        the workers can check the addresses the minions report
+        '''
+        poller = zmq.Poller()
+        poller.register(self.clients, zmq.POLLIN)
+        poller.register(self.workers, zmq.POLLIN)
+        while True:
+            socks = dict(poller.poll())
+            if socks.get(self.clients) == zmq.POLLIN:
+                frames = self.clients.recv_multipart(copy=False)
+                try:
+                    peer_ip = frames[-1].get('Peer-Address')
+                except (AttributeError, zmq.ZMQError):
+                    # The libzmq version does not provide it
+                    peer_ip = ''
+                frames.append(salt.utils.stringutils.to_bytes(peer_ip or ''))
+                self.workers.send_multipart(frames, copy=False)
+            if socks.get(self.workers) == zmq.POLLIN:
+                self.clients.send_multipart(
+                    self.workers.recv_multipart(copy=False), copy=False)
+
     def close(self):
         '''
         Cleanly shutdown the router socket
@@ -721,6 +748,10 @@ class ZeroMQReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin,
 
         :param dict payload: A payload to process
         '''
+        # The queue device adds the IP address it received the request from
+        peer_ip = None
+        if len(payload) > 1 and self.opts.get('file_peer_distribution'):
+            peer_ip = salt.utils.stringutils.to_str(payload[-1]) or None
         try:
             payload = self.serial.loads(payload[0])
             payload = self._decode_payload(payload)
@@ -761,6 +792,9 @@ class ZeroMQReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin,
             stream.send(self.serial.dumps(self._auth(payload['load'])))
             raise tornado.gen.Return()
 
+        # Never the one in the payload
+        payload['peer_ip'] = peer_ip
+
         # TODO: test
         try:
             # Take the payload_handler function that was registered when we created the channel
@@ -693,3 +693,21 @@ def external(func):
     f.__doc__ = func.__doc__
 
     return f
+
+
+def inline_safe(func):
+    '''
+    Mark an execution module function as cheap and side-effect free, so the
+    minion may run it in its own thread pool instead of forking a job
+    process when the function is also listed in ``inline_functions``.
+
+    .. versionadded:: Neon
+
+    .. code-block:: python
+
+        @salt.utils.decorators.inline_safe
+        def ping():
+            return True
+    '''
+    func.inline_safe = True
+    return func
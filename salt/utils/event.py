@@ -53,6 +53,7 @@ Namespaced tag
 from __future__ import absolute_import, unicode_literals, print_function
 
 # Import python libs
+import collections
 import os
 import time
 import fnmatch
@@ -60,6 +61,8 @@ import hashlib
 import logging
 import datetime
 import sys
+import threading
+import zlib
 
 try:
     from collections.abc import MutableMapping
@@ -67,7 +70,7 @@ except ImportError:
     from collections import MutableMapping
 
 from multiprocessing.util import Finalize
-from salt.ext.six.moves import range
+from salt.ext.six.moves import queue, range  # pylint: disable=import-error,redefined-builtin
 
 # Import third party libs
 from salt.ext import six
@@ -78,9 +81,11 @@ import tornado.iostream
 import salt.config
 import salt.payload
 import salt.utils.asynchronous
+import salt.utils.atomicfile
 import salt.utils.cache
 import salt.utils.dicttrim
 import salt.utils.files
+import salt.utils.json
 import salt.utils.platform
 import salt.utils.process
 import salt.utils.stringutils
@@ -116,6 +121,21 @@ TAGS = {
 }
 
 
+def _event_tag(package):
+    '''
+    Return the tag of a packed event, without unpacking its data
+    '''
+    if isinstance(package, bytes):
+        tag, sep, _ = package.partition(salt.utils.stringutils.to_bytes(TAGEND))
+    elif isinstance(package, six.string_types):
+        tag, sep, _ = package.partition(TAGEND)
+    else:
+        return None
+    if not sep:
+        return None
+    return salt.utils.stringutils.to_unicode(tag, errors='replace')
+
+
 def get_event(
         node, sock_dir=None, transport='zeromq',
         opts=None, listen=True, io_loop=None, keep_loop=False, raise_errors=False):
@@ -279,6 +299,9 @@ class SaltEvent(object):
         self.puburi, self.pulluri = self.__load_uri(sock_dir, node)
         self.pending_tags = []
         self.pending_events = []
+        # The tags the publisher is asked to filter the events on, in
+        # addition to the pending tags, None when it sends every event
+        self.publisher_filter = None
         self.__load_cache_regex()
         if listen and not self.cpub:
             # Only connect to the publisher at initialization time if
@@ -352,6 +375,7 @@ class SaltEvent(object):
             return
         match_func = self._get_match_func(match_type)
         self.pending_tags.append([tag, match_func])
+        self._update_publisher_filter()
 
     def unsubscribe(self, tag, match_type=None):
         '''
@@ -362,6 +386,7 @@ class SaltEvent(object):
         match_func = self._get_match_func(match_type)
 
         self.pending_tags.remove([tag, match_func])
+        self._update_publisher_filter()
 
         old_events = self.pending_events
         self.pending_events = []
@@ -369,6 +394,68 @@ class SaltEvent(object):
             if any(pmatch_func(evt['tag'], ptag) for ptag, pmatch_func in self.pending_tags):
                 self.pending_events.append(evt)
 
+    def filter_publisher(self, tags=(), match_type=None):
+        '''
+        Ask the event publisher to only send the events matching the passed
+        tags or a subscribed tag, instead of every event. The other events are
+        neither sent to nor unpacked by this instance.
+
+        The publisher only handles the ``startswith`` and ``fnmatch`` match
+        types, it keeps sending every event while a tag of another match type
+        is subscribed. Calling get_event with a tag which is not filtered on
+        stops the filtering, while calling it without a tag returns the events
+        passing the filter.
+
+        .. versionadded:: Neon
+        '''
+        if not self.opts.get('event_publisher_filter', True):
+            return
+        match_func = self._get_match_func(match_type)
+        self.publisher_filter = [[tag, match_func] for tag in tags]
+        self._update_publisher_filter()
+
+    def unfilter_publisher(self):
+        '''
+        Ask the event publisher to send every event again
+        '''
+        self.publisher_filter = None
+        self._update_publisher_filter()
+
+    def _publisher_subscription(self):
+        '''
+        Return the subscription matching the publisher filter
+        '''
+        if self.publisher_filter is None:
+            return None
+        subscription = set()
+        for tag, match_func in self.publisher_filter + self.pending_tags:
+            match_type = getattr(match_func, '__name__', '')[len('_match_tag_'):]
+            if match_type not in ('startswith', 'fnmatch'):
+                return None
+            subscription.add((match_type, tag))
+        return sorted(subscription)
+
+    def _update_publisher_filter(self):
+        if self.subscriber is None:
+            return
+        subscription = self._publisher_subscription()
+        if subscription != self.subscriber.subscription:
+            self.subscriber.subscribe(subscription)
+
+    def _publisher_filters(self, tag, match_func):
+        '''
+        Return whether the events matching a tag pass the publisher filter
+        '''
+        if self.publisher_filter is None or not tag:
+            return True
+        for ptag, pmatch_func in self.publisher_filter + self.pending_tags:
+            if pmatch_func == match_func and ptag == tag:
+                return True
+            if pmatch_func == match_func == self._match_tag_startswith \
+                    and tag.startswith(ptag):
+                return True
+        return False
+
     def connect_pub(self, timeout=None):
         '''
         Establish the publish connection
@@ -383,6 +470,7 @@ class SaltEvent(object):
                     self.puburi,
                     io_loop=self.io_loop
                 )
+                    self._update_publisher_filter()
                 try:
                     self.io_loop.run_sync(
                         lambda: self.subscriber.connect(timeout=timeout))
@@ -395,6 +483,7 @@ class SaltEvent(object):
                 self.puburi,
                 io_loop=self.io_loop
             )
+                self._update_publisher_filter()
 
             # For the asynchronous case, the connect will be defered to when
             # set_event_handler() is invoked.
@@ -642,6 +731,10 @@ class SaltEvent(object):
         assert self._run_io_loop_sync
 
         match_func = self._get_match_func(match_type)
+        if not self._publisher_filters(tag, match_func):
+            log.debug('Waiting for events not filtered by the publisher, '
+                      'asking it for every event')
+            self.unfilter_publisher()
 
         ret = self._check_pending(tag, match_func)
         if ret is None:
@@ -975,6 +1068,109 @@ class MinionEvent(SaltEvent):
             raise_errors=raise_errors)
 
 
+class SharedEvent(SaltEvent):
+    '''
+    The events of a subscription shared between the engines of an engine
+    host, with the interface of SaltEvent
+
+    The host decodes each event once and puts it on the queue of every
+    engine, and passes the SharedEvent of an engine to the ``start`` function
+    of the engine as its ``shared_event`` argument. The events are fired on
+    the bus as usual.
+
+    .. versionadded:: Neon
+    '''
+    # The number of events kept for the next calls of get_event, while waiting
+    # for an event with another tag
+    pending_size = 10000
+
+    def __init__(self, node, sock_dir=None, opts=None, events=None):
+        super(SharedEvent, self).__init__(node, sock_dir, opts, listen=False)
+        self.events = events if events is not None else queue.Queue()
+        self.pending_events = collections.deque(maxlen=self.pending_size)
+        self._destroyed = False
+
+    def connect_pub(self, timeout=None):
+        # The host is subscribed to the bus
+        return True
+
+    def destroy(self):
+        # The engine may destroy the event it got, which still serves its next
+        # calls of get_event, the host closes it
+        pass
+
+    def close(self):
+        '''
+        Close the event, called by the engine host
+        '''
+        if not self._destroyed:
+            self._destroyed = True
+            super(SharedEvent, self).destroy()
+
+    def _passes_filter(self, tag):
+        if self.publisher_filter is None:
+            return True
+        return any(match_func(tag, ptag) for ptag, match_func
+                   in self.publisher_filter + self.pending_tags)
+
+    def _matches(self, evt, tag, match_func):
+        if tag:
+            return match_func(evt['tag'], tag)
+        return self._passes_filter(evt['tag'])
+
+    def _check_pending(self, tag, match_func=None):
+        '''
+        Pop the first kept event matching the tag, or passing the filter
+        without a tag
+        '''
+        if match_func is None:
+            match_func = self._get_match_func()
+        for idx, evt in enumerate(self.pending_events):
+            if self._matches(evt, tag, match_func):
+                del self.pending_events[idx]
+                return evt
+        return None
+
+    def get_event(self,
+                  wait=5,
+                  tag='',
+                  full=False,
+                  match_type=None,
+                  no_block=False,
+                  auto_reconnect=False):
+        '''
+        Get a single event from the queue of the engine, see
+        SaltEvent.get_event
+
+        The events read while waiting for a tag are kept for the next calls,
+        so that a caller waiting for its own event does not take the events
+        of the other callers sharing this SharedEvent.
+        '''
+        match_func = self._get_match_func(match_type)
+        ret = self._check_pending(tag, match_func)
+        timeout_at = None if wait == 0 and not no_block else time.time() + wait
+        while ret is None:
+            try:
+                if no_block:
+                    ret = self.events.get_nowait()
+                elif timeout_at is None:
+                    ret = self.events.get()
+                else:
+                    ret = self.events.get(timeout=max(timeout_at - time.time(), 0))
+            except queue.Empty:
+                return None
+            if self._matches(ret, tag, match_func):
+                break
+            if tag:
+                if len(self.pending_events) == self.pending_size:
+                    log.warning('Dropping the event %s, too many events are '
+                                'kept for the other callers',
+                                self.pending_events[0]['tag'])
+                self.pending_events.append(ret)
+            ret = None
+        return ret if full else ret['data']
+
+
 class AsyncEventPublisher(object):
     '''
     An event publisher class intended to run in an ioloop (within a single process)
@@ -1061,7 +1257,7 @@ class AsyncEventPublisher(object):
         Get something from epull, publish it out epub, and return the package (or None)
         '''
         try:
-            self.publisher.publish(package)
+            self.publisher.publish(package, tag=_event_tag(package))
             return package
         # Add an extra fallback in case a forked process leeks through
         except Exception:
@@ -1165,7 +1361,7 @@ class EventPublisher(salt.utils.process.SignalHandlingMultiprocessingProcess):
         Get something from epull, publish it out epub, and return the package (or None)
         '''
         try:
-            self.publisher.publish(package)
+            self.publisher.publish(package, tag=_event_tag(package))
             return package
         # Add an extra fallback in case a forked process leeks through
         except Exception:
@@ -1192,6 +1388,196 @@ class EventPublisher(salt.utils.process.SignalHandlingMultiprocessingProcess):
         self.close()
 
 
+class EventBatch(list):
+    '''
+    A batch of events passed to the event returners
+
+    The batch is a list of event dicts, which also hands out the tags of the
+    events and their JSON serialization, as columns. The events are only
+    serialized once, however many returners store them.
+    '''
+    def __init__(self, events=()):
+        super(EventBatch, self).__init__(events)
+        self._lock = threading.Lock()
+        self._json_data = None
+
+    @property
+    def tags(self):
+        '''
+        The tags of the events, in order
+        '''
+        return [event.get('tag', '') for event in self]
+
+    def json_data(self):
+        '''
+        Return the data of the events serialized in JSON, in order
+        '''
+        with self._lock:
+            if self._json_data is None or len(self._json_data) != len(self):
+                self._json_data = [salt.utils.json.dumps(event.get('data', ''))
+                                   for event in self]
+            return self._json_data
+
+    def json_events(self):
+        '''
+        Return the events serialized in JSON objects holding their tag and
+        data, in order
+        '''
+        return ['{{"tag": {0}, "data": {1}}}'.format(salt.utils.json.dumps(tag), data)
+                for tag, data in zip(self.tags, self.json_data())]
+
+
+def event_batch(events):
+    '''
+    Return the events passed to an event returner as an EventBatch
+    '''
+    if isinstance(events, EventBatch):
+        return events
+    return EventBatch(events)
+
+
+class EventReturnQueue(object):
+    '''
+    Store the batches of events with an event returner in a thread, so that a
+    slow returner holds up neither the other returners nor the event bus
+
+    Up to event_return_queue_batches batches wait in memory. The batches which
+    do not fit are spooled to disk when event_return_spool is enabled, and
+    dropped otherwise.
+    '''
+    # Spooled batches larger than this are compressed
+    compress_size = 65536
+
+    def __init__(self, opts, name, store):
+        self.opts = opts
+        self.name = name
+        self.store = store
+        self.queue = queue.Queue(opts['event_return_queue_batches'])
+        self.serial = salt.payload.Serial(opts)
+        self.spool_dir = os.path.join(opts['cachedir'], 'event_return_spool', name)
+        self._lock = threading.Lock()
+        self._spool_seq = 0
+        # Once a batch is spooled the next ones are too, until the spool is
+        # drained, so that the batches are stored in order
+        self._spooling = bool(opts.get('event_return_spool') and self._spooled())
+        self._stopping = False
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, batch):
+        '''
+        Queue a batch of events, returning False if it is dropped
+        '''
+        with self._lock:
+            if not self._spooling:
+                try:
+                    self.queue.put_nowait(batch)
+                    return True
+                except queue.Full:
+                    pass
+            if self.opts.get('event_return_spool') and self._spool(batch):
+                self._spooling = True
+                return True
+        log.error('Dropping %s events, the event returner %s is not keeping up',
+                  len(batch), self.name)
+        return False
+
+    def stop(self, timeout=10):
+        '''
+        Wait for the queued batches to be stored, spooling the ones left after
+        the timeout when event_return_spool is enabled
+        '''
+        self._stopping = True
+        self.thread.join(timeout)
+        if not self.thread.is_alive() or not self.opts.get('event_return_spool'):
+            return
+        with self._lock:
+            self._spooling = True
+            while True:
+                try:
+                    self._spool(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+    def _spooled(self):
+        '''
+        Return the paths of the spooled batches, in order
+        '''
+        try:
+            names = sorted(os.listdir(self.spool_dir))
+        except OSError:
+            return []
+        return [os.path.join(self.spool_dir, name) for name in names
+                if name.endswith(('.p', '.pz'))]
+
+    def _spool(self, batch):
+        if not os.path.isdir(self.spool_dir):
+            os.makedirs(self.spool_dir)
+        self._spool_seq += 1
+        path = os.path.join(
+            self.spool_dir,
+            '{0:020d}-{1:010d}.p'.format(int(time.time() * 1000000), self._spool_seq))
+        try:
+            data = self.serial.dumps(list(batch))
+            if len(data) > self.compress_size:
+                data = zlib.compress(data, 1)
+                path += 'z'
+            with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+                fp_.write(data)
+        except Exception as exc:
+            log.error('Failed to spool %s events for the event returner %s: %s',
+                      len(batch), self.name, exc)
+            return False
+        return True
+
+    def _drain_spool(self):
+        '''
+        Store the oldest spooled batch
+        '''
+        with self._lock:
+            paths = self._spooled()
+            if not paths:
+                self._spooling = False
+                return
+        path = paths[0]
+        try:
+            with salt.utils.files.fopen(path, 'rb') as fp_:
+                data = fp_.read()
+            if path.endswith('.pz'):
+                data = zlib.decompress(data)
+            batch = EventBatch(self.serial.loads(data))
+        except Exception as exc:
+            log.error('Failed to load the spooled events %s: %s', path, exc)
+        else:
+            self._store(batch)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _store(self, batch):
+        try:
+            self.store(batch)
+        except Exception as exc:
+            log.error('Failed to store %s events with the event returner %s: %s',
+                      len(batch), self.name, exc)
+
+    def _run(self):
+        while True:
+            if self.queue.empty():
+                if self._spooling:
+                    self._drain_spool()
+                    continue
+                if self._stopping:
+                    break
+            try:
+                batch = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self._store(batch)
+
+
 class EventReturn(salt.utils.process.SignalHandlingMultiprocessingProcess):
     '''
     A dedicated process which listens to the master event bus and queues
@@ -1222,6 +1608,8 @@ class EventReturn(salt.utils.process.SignalHandlingMultiprocessingProcess):
         local_minion_opts['file_client'] = 'local'
         self.minion = salt.minion.MasterMinion(local_minion_opts)
         self.event_queue = []
+        # The queues of the event returners storing the events in threads
+        self.returner_queues = {}
         self.stop = False
 
     # __setstate__ and __getstate__ are only used on Windows.
@@ -1246,30 +1634,56 @@ class EventReturn(salt.utils.process.SignalHandlingMultiprocessingProcess):
         # Flush and terminate
         if self.event_queue:
             self.flush_events()
+        self.stop_returner_queues()
         self.stop = True
         super(EventReturn, self)._handle_signals(signum, sigframe)
 
     def flush_events(self):
         if isinstance(self.opts['event_return'], list):
             # Multiple event returners
-            for r in self.opts['event_return']:
-                log.debug('Calling event returner %s, one of many.', r)
-                event_return = '{0}.event_return'.format(r)
-                self._flush_event_single(event_return)
+            event_returns = self.opts['event_return']
         else:
             # Only a single event returner
-            log.debug('Calling event returner %s, only one configured.',
-                      self.opts['event_return'])
-            event_return = '{0}.event_return'.format(
-                self.opts['event_return']
-                )
-            self._flush_event_single(event_return)
+            event_returns = [self.opts['event_return']]
+        batch = EventBatch(self.event_queue)
+        for r in event_returns:
+            event_return = '{0}.event_return'.format(r)
+            if self.opts.get('event_return_queue_batches', 0) > 0:
+                log.debug('Queueing %s events for event returner %s.',
+                          len(batch), r)
+                self._returner_queue(event_return).put(batch)
+            else:
+                log.debug('Calling event returner %s.', r)
+                self._flush_event_single(event_return, batch)
         del self.event_queue[:]
 
-    def _flush_event_single(self, event_return):
+    def _returner_queue(self, event_return):
+        '''
+        Return the queue of an event returner, starting its thread
+        '''
+        if event_return not in self.returner_queues:
+            # Looking the returner up loads it, before its thread uses it
+            self.minion.returners.get(event_return)
+            self.returner_queues[event_return] = EventReturnQueue(
+                self.opts,
+                event_return.split('.')[0],
+                lambda batch: self._flush_event_single(event_return, batch))
+        return self.returner_queues[event_return]
+
+    def stop_returner_queues(self):
+        '''
+        Wait for the event returners to store the queued events
+        '''
+        for returner_queue in six.itervalues(self.returner_queues):
+            returner_queue.stop()
+        self.returner_queues.clear()
+
+    def _flush_event_single(self, event_return, events=None):
+        if events is None:
+            events = self.event_queue
         if event_return in self.minion.returners:
             try:
-                self.minion.returners[event_return](self.event_queue)
+                self.minion.returners[event_return](events)
             except Exception as exc:
                 log.error('Could not store events - returner \'%s\' raised '
                           'exception: %s', event_return, exc)
@@ -1277,7 +1691,7 @@ class EventReturn(salt.utils.process.SignalHandlingMultiprocessingProcess):
                 # potentially huge dataset to a string
                 if log.level <= logging.DEBUG:
                     log.debug('Event data that caused an exception: %s',
-                              self.event_queue)
+                              events)
         else:
             log.error('Could not store return for event(s) - returner '
                       '\'%s\' not found.', event_return)
@@ -1288,6 +1702,11 @@ class EventReturn(salt.utils.process.SignalHandlingMultiprocessingProcess):
         '''
         salt.utils.process.appendproctitle(self.__class__.__name__)
         self.event = get_event('master', opts=self.opts, listen=True)
+        if self.opts['event_return_whitelist']:
+            # Only receive the events which may be stored
+            self.event.filter_publisher(
+                list(self.opts['event_return_whitelist']) + ['salt/event/exit'],
+                match_type='fnmatch')
         events = self.event.iter_events(full=True)
         self.event.fire_event({}, 'salt/event_listen/start')
         try:
@@ -1338,6 +1757,7 @@ class EventReturn(salt.utils.process.SignalHandlingMultiprocessingProcess):
                 log.debug('Flushing %s events.', len(self.event_queue))
 
                 self.flush_events()
+            self.stop_returner_queues()
 
     def _filter(self, event):
         '''
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+'''
+Batch the events a minion fires on the master event bus.
+
+When :conf_minion:`master_event_batch` is enabled, the events the minion fires
+on the master, like beacon events or the events of ``event.fire_master``, are
+collected by an :class:`EventBatcher` in the main minion process. The batcher
+sends them in a single ``_minion_event`` request once
+:conf_minion:`master_event_batch_size` events are pending or
+:conf_minion:`master_event_batch_interval` seconds after the first one,
+replacing the pending events whose tag matches
+:conf_minion:`master_event_coalesce` by newer ones with the same tag, and
+compressing the batch when it is larger than
+:conf_minion:`master_event_compress_size` bytes. The master fires each event of
+the batch on its event bus as if the minion had sent it on its own.
+
+.. versionadded:: Neon
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, unicode_literals
+import fnmatch
+import logging
+import os
+import zlib
+
+# Import Salt Libs
+import salt.payload
+import salt.transport.client
+from salt.exceptions import SaltReqTimeoutError
+from salt.ext import six
+from salt.utils.odict import OrderedDict
+
+# Import 3rd-party libs
+import tornado.gen
+import tornado.ioloop
+
+log = logging.getLogger(__name__)
+
+# The maximum size of an uncompressed batch accepted by the master
+MAX_BATCH_SIZE = 64 * 1024 * 1024
+
+
+def pack(serial, entries, compress_size=0):
+    '''
+    Return the ``batch`` of a ``_minion_event`` load holding the given
+    entries, compressed when their serialized size exceeds ``compress_size``
+    bytes
+    '''
+    if compress_size > 0:
+        data = serial.dumps(entries)
+        if len(data) > compress_size:
+            return {'zlib': zlib.compress(data)}
+    return {'entries': entries}
+
+
+def unpack(serial, batch):
+    '''
+    Return the entries of the ``batch`` of a ``_minion_event`` load, raising
+    ``ValueError`` if it is invalid
+    '''
+    if not isinstance(batch, dict):
+        raise ValueError('Invalid event batch')
+    if 'zlib' in batch:
+        decompressor = zlib.decompressobj()
+        try:
+            data = decompressor.decompress(batch['zlib'], MAX_BATCH_SIZE)
+        except (zlib.error, TypeError) as exc:
+            raise ValueError('Invalid compressed event batch: {0}'.format(exc))
+        if decompressor.unconsumed_tail:
+            raise ValueError('The event batch is larger than {0} bytes'.format(MAX_BATCH_SIZE))
+        entries = serial.loads(data)
+    else:
+        entries = batch.get('entries')
+    if not isinstance(entries, list):
+        raise ValueError('Invalid event batch')
+    return [entry for entry in entries if isinstance(entry, dict)]
+
+
+def valid_entry(entry):
+    '''
+    Return whether an entry of a batch is a valid ``_minion_event`` load, with
+    either a ``tag`` and its ``data`` or a list of ``events`` with a tag each
+    '''
+    if not isinstance(entry, dict):
+        return False
+    if not isinstance(entry.get('pretag'), (type(None), six.string_types)):
+        return False
+    if 'events' in entry:
+        return isinstance(entry['events'], list) and all(
+            isinstance(event, dict)
+            and isinstance(event.get('tag'), six.string_types)
+            for event in entry['events'])
+    return 'data' in entry and isinstance(entry.get('tag'), six.string_types)
+
+
+class EventBatcher(object):
+    '''
+    Collect the events fired on the master and send them in batches
+
+    :param dict opts: The minion options
+    :param io_loop: The io_loop the batcher flushes on, defaults to the current
+        io_loop
+    :param tok: A callable returning the token the minion authenticates its
+        requests with
+    '''
+    def __init__(self, opts, io_loop=None, tok=None):
+        self.opts = opts
+        self.tok = tok or (lambda: None)
+        self.io_loop = io_loop or tornado.ioloop.IOLoop.current()
+        self.serial = salt.payload.Serial(opts)
+        self.pid = os.getpid()
+        self.batch_size = max(1, opts.get('master_event_batch_size', 100))
+        self.interval = opts.get('master_event_batch_interval', 0.5)
+        self.coalesce = opts.get('master_event_coalesce') or []
+        if isinstance(self.coalesce, six.string_types):
+            self.coalesce = [self.coalesce]
+        self.compress_size = opts.get('master_event_compress_size', 4096)
+        self.pending = OrderedDict()
+        self.channel = None
+        self._seq = 0
+        self._flush_handle = None
+
+    def __len__(self):
+        return len(self.pending)
+
+    def _key(self, tag):
+        for pattern in self.coalesce:
+            if fnmatch.fnmatch(tag, pattern):
+                return tag
+        self._seq += 1
+        return self._seq
+
+    def _add(self, tag, entry):
+        key = self._key(tag)
+        if key in self.pending:
+            # Only the most recent event of a coalesced tag is sent, in the
+            # position of the new one
+            del self.pending[key]
+        self.pending[key] = entry
+
+    def put(self, data=None, tag=None, events=None, pretag=None):
+        '''
+        Queue the arguments of a ``fire_master`` call and schedule a flush
+        '''
+        if events:
+            for event in events:
+                self._add(event.get('tag', ''), {'events': [event], 'pretag': pretag})
+        elif tag:
+            self._add(tag, {'data': data or {}, 'tag': tag, 'pretag': pretag})
+        else:
+            return
+        if len(self.pending) >= self.batch_size:
+            self._schedule_flush(0)
+        else:
+            self._schedule_flush(self.interval)
+
+    def _schedule_flush(self, delay):
+        if self._flush_handle is not None:
+            if delay:
+                # A flush is already scheduled, the new event rides along
+                return
+            self.io_loop.remove_timeout(self._flush_handle)
+        self._flush_handle = self.io_loop.call_later(delay, self._run_flush)
+
+    def _run_flush(self):
+        self._flush_handle = None
+        self.io_loop.spawn_callback(self.flush)
+
+    def _get_channel(self):
+        if self.channel is None:
+            self.channel = salt.transport.client.AsyncReqChannel.factory(
+                self.opts, io_loop=self.io_loop)
+        return self.channel
+
+    def _close_channel(self):
+        if self.channel is not None:
+            self.channel.close()
+            self.channel = None
+
+    @tornado.gen.coroutine
+    def flush(self, timeout=60):
+        '''
+        Send the pending events, ``batch_size`` events per request. Like the
+        events fired on their own, the events which cannot be sent are
+        dropped.
+        '''
+        while self.pending:
+            keys = list(self.pending)[:self.batch_size]
+            entries = [self.pending.pop(key) for key in keys]
+            load = {'id': self.opts['id'],
+                    'cmd': '_minion_event',
+                    'tok': self.tok(),
+                    'batch': pack(self.serial, entries, self.compress_size)}
+            try:
+                yield self._get_channel().send(load, timeout=timeout)
+            except SaltReqTimeoutError:
+                log.info('fire_master failed: master could not be contacted. '
+                         'Request timed out, dropping %d event(s).', len(entries))
+            except Exception as exc:  # pylint: disable=broad-except
+                log.info('fire_master failed, dropping %d event(s): %s', len(entries), exc)
+                self._close_channel()
+            else:
+                log.debug('Fired %d batched event(s) on the master', len(entries))
+
+    def close(self):
+        '''
+        Stop flushing and release the channel
+        '''
+        if self._flush_handle is not None:
+            self.io_loop.remove_timeout(self._flush_handle)
+            self._flush_handle = None
+        self._close_channel()
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+'''
+Run the configured external pillars with timeouts, circuit breakers and a
+result cache, concurrently where they allow it.
+
+The behavior of each external pillar is set by its entry in
+:conf_master:`ext_pillar_sources`, keyed by the name of the external pillar,
+or by the name and the index of its entry in :conf_master:`ext_pillar`, like
+``git:1``, for a single entry.
+External pillars without an entry run just like before: one after the other,
+each receiving the pillar data compiled so far, without a timeout.
+
+.. versionadded:: Neon
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, unicode_literals
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Import Salt Libs
+import salt.payload
+import salt.utils.hashutils
+from salt.exceptions import SaltException, TimeoutError
+
+log = logging.getLogger(__name__)
+
+CACHE_BANK = 'ext_pillar_cache'
+
+DEFAULT_SOURCE_OPTS = {
+    # Run concurrently with the other external pillars. The external pillar
+    # then receives the pillar data compiled from the pillar SLS files only,
+    # instead of the data of the external pillars configured before it.
+    'concurrent': False,
+    # Seconds to wait for the data, 0 waits forever
+    'timeout': 0,
+    # Consecutive failures after which the external pillar is skipped, 0
+    # never skips it
+    'failures': 0,
+    # Seconds to skip the external pillar for after too many failures
+    'retry': 60,
+    # Seconds to cache the data for, 0 does not cache it
+    'cache_ttl': 0,
+    # Share the cached data between all minions (global), between minions
+    # with the same cache_grains (grains) or not at all (minion)
+    'cache_scope': 'minion',
+    'cache_grains': [],
+}
+
+# The circuit breakers of this process, by external pillar entry
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+# The thread pool of this process and the pid it was started in
+_POOL = [None, None]
+_POOL_LOCK = threading.Lock()
+
+
+def source_id(key, index=None):
+    '''
+    Return the identifier of the entry of the external pillar named ``key`` at
+    ``index`` in the ext_pillar option
+    '''
+    if index is None:
+        return key
+    return '{0}:{1}'.format(key, index)
+
+
+def source_opts(opts, key, index=None):
+    '''
+    Return the options of the external pillar named ``key``, of its entry at
+    ``index`` in the ext_pillar option overriding those of the name
+    '''
+    ret = dict(DEFAULT_SOURCE_OPTS)
+    sources = opts.get('ext_pillar_sources') or {}
+    for name in (key, source_id(key, index)):
+        if isinstance(sources.get(name), dict):
+            ret.update(sources[name])
+    return ret
+
+
+def _pool(opts):
+    '''
+    Return the thread pool running the external pillars of this process. A
+    pool inherited through a fork has no threads, a new one is started then.
+    '''
+    with _POOL_LOCK:
+        if _POOL[0] is None or _POOL[1] != os.getpid():
+            _POOL[0] = ThreadPoolExecutor(
+                max_workers=opts.get('ext_pillar_workers', 4) or 1)
+            _POOL[1] = os.getpid()
+        return _POOL[0]
+
+
+def _thread(fun, *args):
+    '''
+    Run a function in a thread of its own and return its future. The calls
+    with a timeout run this way, so that a call which never returns does not
+    keep a thread of the pool from the next pillar compilations.
+    '''
+    future = Future()
+
+    def _run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fun(*args))
+        except Exception as exc:  # pylint: disable=broad-except
+            future.set_exception(exc)
+
+    thread = threading.Thread(target=_run, name='ext_pillar')
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+def available(key):
+    '''
+    Return whether the circuit breaker of the external pillar entry lets it
+    run
+    '''
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(key)
+        if breaker is None or breaker['open_until'] is None:
+            return True
+        if time.time() < breaker['open_until']:
+            return False
+        # Let a single attempt through, it closes the breaker if it succeeds
+        breaker['open_until'] = time.time() + breaker['retry']
+        return True
+
+
+def succeeded(key):
+    '''
+    Close the circuit breaker of the external pillar entry
+    '''
+    with _BREAKERS_LOCK:
+        _BREAKERS.pop(key, None)
+
+
+def failed(key, sopts):
+    '''
+    Count a failure of the external pillar entry, opening its circuit breaker
+    after too many consecutive ones
+    '''
+    if not sopts['failures']:
+        return
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.setdefault(
+            key, {'failures': 0, 'open_until': None, 'retry': sopts['retry']})
+        breaker['failures'] += 1
+        if breaker['failures'] >= sopts['failures']:
+            if breaker['open_until'] is None:
+                log.warning(
+                    'ext_pillar \'%s\' failed %d times in a row, skipping it '
+                    'for %s seconds', key, breaker['failures'], sopts['retry'])
+            breaker['open_until'] = time.time() + sopts['retry']
+
+
+class Source(object):
+    '''
+    Collect the data of one configured external pillar
+
+    :param pillar: The :class:`salt.pillar.Pillar` compiling the pillar
+    :param str key: The name of the external pillar
+    :param val: The configuration of the external pillar
+    :param cache: The ``salt.cache`` instance the data is cached in, only
+        used if the external pillar has a ``cache_ttl``
+    :param int index: The index of the entry in the ext_pillar option, the
+        entries of the same external pillar have their own circuit breaker
+    '''
+    def __init__(self, pillar, key, val, cache=None, index=None):
+        self.pillar = pillar
+        self.key = key
+        self.val = val
+        self.id = source_id(key, index)
+        self.opts = source_opts(pillar.opts, key, index)
+        self.cache = cache
+        self.future = None
+        self.deadline = None
+        self.data = None
+        self.error = None
+        self.cache_key = None
+
+    @property
+    def concurrent(self):
+        return bool(self.opts['concurrent'])
+
+    def _cache_key(self, pillar_data):
+        scope = self.opts['cache_scope']
+        data = [self.key, self.val]
+        if scope == 'grains':
+            grains = self.pillar.opts.get('grains', {})
+            names = self.opts['cache_grains'] or sorted(grains)
+            data.append([grains.get(name) for name in names])
+        elif scope != 'global':
+            data.append(self.pillar.minion_id)
+        if not self.concurrent:
+            data.append(pillar_data)
+        serial = salt.payload.Serial(self.pillar.opts)
+        return salt.utils.hashutils.sha256_digest(serial.dumps(data))
+
+    def _cached(self):
+        try:
+            entry = self.cache.fetch(CACHE_BANK, self.cache_key)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.warning('Unable to read the ext_pillar cache: %s', exc)
+            return None
+        if not isinstance(entry, dict) \
+                or time.time() - entry.get('time', 0) > self.opts['cache_ttl']:
+            return None
+        return entry['data']
+
+    def start(self, pillar_data):
+        '''
+        Start collecting the data, on a thread of its own if the external
+        pillar has a timeout, or on the thread pool if it is concurrent
+        '''
+        if self.opts['cache_ttl'] and self.cache is not None:
+            self.cache_key = self._cache_key(pillar_data)
+            self.data = self._cached()
+            if self.data is not None:
+                log.debug('Using the cached data of ext_pillar \'%s\'', self.key)
+                return
+        if not available(self.id):
+            self.error = SaltException(
+                'too many failures, skipped for up to {0} seconds'.format(
+                    self.opts['retry']))
+            return
+        if self.opts['timeout']:
+            self.future = _thread(
+                self.pillar._external_pillar_cached, pillar_data, self.val, self.key)
+            self.deadline = time.time() + self.opts['timeout']
+        elif self.concurrent:
+            self.future = _pool(self.pillar.opts).submit(
+                self.pillar._external_pillar_cached, pillar_data, self.val, self.key)
+        else:
+            try:
+                self.data = self.pillar._external_pillar_cached(
+                    pillar_data, self.val, self.key)
+            except Exception as exc:  # pylint: disable=broad-except
+                self.error = exc
+            self._done()
+
+    def _done(self):
+        if self.error is None:
+            succeeded(self.id)
+            if self.cache_key is not None and self.data is not None:
+                try:
+                    self.cache.store(
+                        CACHE_BANK, self.cache_key,
+                        {'time': time.time(), 'data': self.data})
+                except Exception as exc:  # pylint: disable=broad-except
+                    log.warning('Unable to write the ext_pillar cache: %s', exc)
+        else:
+            failed(self.id, self.opts)
+
+    def result(self):
+        '''
+        Wait for and return the data, raising the exception it failed with
+        '''
+        if self.future is not None:
+            future, self.future = self.future, None
+            timeout = None
+            if self.deadline is not None:
+                timeout = max(self.deadline - time.time(), 0)
+            try:
+                self.data = future.result(timeout)
+            except FutureTimeoutError:
+                # The thread cannot be stopped, its result is dropped
+                self.error = TimeoutError(
+                    'timed out after {0} seconds'.format(self.opts['timeout']))
+            except Exception as exc:  # pylint: disable=broad-except
+                self.error = exc
+            self._done()
+        if self.error is not None:
+            raise self.error
+        return self.data
@@ -12,6 +12,9 @@ import sys
 
 # Import salt libs
 import salt.fileclient
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.data
 import salt.utils.files
 import salt.utils.hashutils
 import salt.utils.path
@@ -40,6 +43,51 @@ def _listdir_recursively(rootdir):
     return file_list
 
 
+def _manifests_path(opts, form):
+    return os.path.join(opts['cachedir'], 'extmods', '{0}.p'.format(form))
+
+
+def _read_manifests(opts, form):
+    '''
+    Return the digests of the manifests of the last sync of a type of
+    modules, by saltenv
+    '''
+    path = _manifests_path(opts, form)
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with salt.utils.files.fopen(path, 'rb') as fp_:
+            ret = salt.payload.Serial(opts).load(fp_)
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug('Unable to read %s: %s', path, exc)
+        return {}
+    ret = salt.utils.data.decode(ret)
+    return ret if isinstance(ret, dict) else {}
+
+
+def _write_manifests(opts, form, manifests):
+    path = _manifests_path(opts, form)
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+            fp_.write(salt.payload.Serial(opts).dumps(manifests))
+    except (IOError, OSError) as exc:
+        log.debug('Unable to write %s: %s', path, exc)
+
+
+def _unchanged(last, manifest, filters, mod_dir):
+    '''
+    Return whether the modules of a saltenv were synced from the same
+    manifest, with the same filters, and are still in place
+    '''
+    if not isinstance(last, dict) or last.get('digest') != manifest['digest'] \
+            or last.get('filters') != filters:
+        return False
+    return all(os.path.isfile(os.path.join(mod_dir, relpath))
+               for relpath in last.get('remote', []))
+
+
 def sync(opts,
          form,
          saltenv=None,
@@ -86,19 +134,49 @@ def sync(opts,
                         'permissions.', mod_dir
                     )
             fileclient = salt.fileclient.get_file_client(opts)
+            manifests = _read_manifests(opts, form)
+            filters = [
+                list(filter_[form])
+                if isinstance(filter_, dict) and form in filter_ else None
+                for filter_ in (extmod_whitelist, extmod_blacklist)]
             for sub_env in saltenv:
                 log.info(
                     'Syncing %s for environment \'%s\'', form, sub_env
                 )
+                # The master sends a digest of the files, if it did not
+                # change since the last sync there is nothing to do
+                manifest = fileclient.file_manifest('_' + form, sub_env)
+                last = manifests.pop(sub_env, None)
+                if manifest is not None \
+                        and _unchanged(last, manifest, filters, mod_dir):
+                    log.info(
+                        'The %s of environment \'%s\' are unchanged',
+                        form, sub_env
+                    )
+                    remote.update(last['remote'])
+                    manifests[sub_env] = last
+                    if last['remote']:
+                        for util_dir in opts['utils_dirs']:
+                            if mod_dir.endswith(util_dir) and mod_dir not in sys.path:
+                                sys.path.append(mod_dir)
+                    continue
                 cache = []
                 log.info('Loading cache from %s, for %s', source, sub_env)
                 # Grab only the desired files (.py, .pyx, .so)
-                cache.extend(
-                    fileclient.cache_dir(
-                        source, sub_env, include_empty=False,
-                        include_pat=r'E@\.(pyx?|so|zip)$', exclude_pat=None
+                if manifest is not None:
+                    cache.extend(
+                        fileclient.cache_manifest(
+                            manifest, sub_env, prefix='_{0}/'.format(form),
+                            include_pat=r'E@\.(pyx?|so|zip)$', exclude_pat=None
+                        )
+                    )
+                else:
+                    cache.extend(
+                        fileclient.cache_dir(
+                            source, sub_env, include_empty=False,
+                            include_pat=r'E@\.(pyx?|so|zip)$', exclude_pat=None
+                        )
                     )
-                )
                 local_cache_dir = os.path.join(
                         opts['cachedir'],
                         'files',
@@ -106,6 +184,7 @@ def sync(opts,
                         '_{0}'.format(form)
                         )
                 log.debug('Local cache dir: \'%s\'', local_cache_dir)
+                env_remote = set()
                 for fn_ in cache:
                     relpath = os.path.relpath(fn_, local_cache_dir)
                     relname = os.path.splitext(relpath)[0].replace(os.sep, '.')
@@ -114,6 +193,7 @@ def sync(opts,
                     if extmod_blacklist and form in extmod_blacklist and relname in extmod_blacklist[form]:
                         continue
                     remote.add(relpath)
+                    env_remote.add(relpath)
                     dest = os.path.join(mod_dir, relpath)
                     log.info('Copying \'%s\' to \'%s\'', fn_, dest)
                     if os.path.isfile(dest):
@@ -138,6 +218,12 @@ def sync(opts,
                         if mod_dir.endswith(util_dir) and mod_dir not in sys.path:
                             sys.path.append(mod_dir)
 
+                if manifest is not None:
+                    manifests[sub_env] = {'digest': manifest['digest'],
+                                          'filters': filters,
+                                          'remote': sorted(env_remote)}
+
+            _write_manifests(opts, form, manifests)
             touched = bool(ret)
             if opts['clean_dynamic_modules'] is True:
                 current = set(_listdir_recursively(mod_dir))
@@ -5,25 +5,29 @@ Classes which provide the shared base for GitFS, git_pillar, and winrepo
 
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import binascii
 import contextlib
 import copy
 import errno
 import fnmatch
-import glob
 import hashlib
 import logging
 import os
+import posixpath
 import shlex
 import shutil
 import stat
 import subprocess
 import sys
+import threading
 import time
 import tornado.ioloop
 import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Import salt libs
+import salt.utils.atomicfile
 import salt.utils.configparser
 import salt.utils.data
 import salt.utils.files
@@ -37,6 +41,7 @@ import salt.utils.url
 import salt.utils.user
 import salt.utils.versions
 import salt.fileserver
+from salt.config import DEFAULT_INTERVAL
 from salt.config import DEFAULT_MASTER_OPTS as _DEFAULT_MASTER_OPTS
 from salt.utils.odict import OrderedDict
 from salt.utils.process import os_is_running as pid_exists
@@ -61,6 +66,9 @@ GLOBAL_ONLY = ()
 
 SYMLINK_RECURSE_DEPTH = 100
 
+# Seconds after which a cached blob which no environment uses is removed
+BLOB_REAP_AGE = 3600
+
 # Auth support (auth params can be global or per-remote, too)
 AUTH_PROVIDERS = ('pygit2',)
 AUTH_PARAMS = ('user', 'password', 'pubkey', 'privkey', 'passphrase',
@@ -448,6 +456,16 @@ class GitProvider(object):
             self.hash = hash_type(self.id).hexdigest()
         self.cachedir_basename = getattr(self, 'name', self.hash)
         self.cachedir = salt.utils.path.join(cache_root, self.cachedir_basename)
+        # The tree SHA and tree index of each environment, see tree_index()
+        self._tree_indexes = {}
+        # Fetch statistics and backoff, see fetch(). The remote is fetched
+        # by the update threads and on fetch events, so they are only changed
+        # and read together under the lock.
+        self._fetch_lock = threading.Lock()
+        self.fetch_duration = None
+        self.fetch_failures = 0
+        self.last_fetch = None
+        self.next_fetch = None
         self.linkdir = salt.utils.path.join(cache_root,
                                             'links',
                                             self.cachedir_basename)
@@ -773,8 +791,16 @@ class GitProvider(object):
         try:
             with self.gen_lock(lock_type='update'):
                 log.debug('Fetching %s remote \'%s\'', self.role, self.id)
-                # Run provider-specific fetch code
-                return self._fetch()
+                start = time.time()
+                try:
+                    # Run provider-specific fetch code
+                    ret = self._fetch()
+                except Exception:
+                    self._fetched(start, False)
+                    raise
+                # The providers return False if the fetch failed
+                self._fetched(start, ret is not False)
+                return ret
         except GitLockError as exc:
             if exc.errno == errno.EEXIST:
                 log.warning(
@@ -791,6 +817,63 @@ class GitProvider(object):
                 )
             return False
 
+    def _fetched(self, start, success):
+        '''
+        Record the duration and the result of a fetch. After consecutive
+        failures, the remote is not fetched again for an exponentially growing
+        multiple of its update interval, up to ``<role>_fetch_backoff``
+        seconds.
+        '''
+        now = time.time()
+        with self._fetch_lock:
+            self.fetch_duration = now - start
+            if success:
+                self.last_fetch = now
+                self.fetch_failures = 0
+                self.next_fetch = None
+                return
+            self.fetch_failures += 1
+            failures = self.fetch_failures
+            max_backoff = self.opts.get('{0}_fetch_backoff'.format(self.role), 0)
+            if not max_backoff or failures < 2:
+                return
+            interval = getattr(self, 'update_interval', None) or DEFAULT_INTERVAL
+            backoff = min(interval * 2 ** (failures - 1), max_backoff)
+            self.next_fetch = now + backoff
+        log.warning(
+            'Fetching %s remote \'%s\' failed %d times in a row, not '
+            'fetching it again for %d seconds',
+            self.role, self.id, failures, backoff
+        )
+
+    def backoff(self, now=None):
+        '''
+        Return the number of seconds the remote is not fetched for anymore
+        after failed fetches, and the number of failed fetches, or None and
+        the failures if it may be fetched now
+        '''
+        if now is None:
+            now = time.time()
+        with self._fetch_lock:
+            if self.next_fetch is not None and self.next_fetch > now:
+                return self.next_fetch - now, self.fetch_failures
+            return None, self.fetch_failures
+
+    def fetch_stats(self):
+        '''
+        Return the statistics of the fetches of this remote. The staleness is
+        the number of seconds since the last successful fetch.
+        '''
+        with self._fetch_lock:
+            return {
+                'duration': self.fetch_duration,
+                'failures': self.fetch_failures,
+                'last_fetch': self.last_fetch,
+                'next_fetch': self.next_fetch,
+                'staleness': time.time() - self.last_fetch
+                             if self.last_fetch is not None else None,
+            }
+
     def _lock(self, lock_type='update', failhard=False):
         '''
         Place a lock file if (and only if) it does not already exist.
@@ -959,9 +1042,19 @@ class GitProvider(object):
 
     def dir_list(self, tgt_env):
         '''
-        This function must be overridden in a sub-class
+        Get list of directories for the target environment
         '''
-        raise NotImplementedError()
+        ret = set()
+        add_mountpoint = lambda path: salt.utils.path.join(
+            self.mountpoint(tgt_env), path, use_posixpath=True)
+        for path in self._index_paths(tgt_env):
+            parent = posixpath.dirname(path)
+            while parent and add_mountpoint(parent) not in ret:
+                ret.add(add_mountpoint(parent))
+                parent = posixpath.dirname(parent)
+        if self.mountpoint(tgt_env):
+            ret.add(self.mountpoint(tgt_env))
+        return ret
 
     def env_is_exposed(self, tgt_env):
         '''
@@ -989,13 +1082,168 @@ class GitProvider(object):
 
     def file_list(self, tgt_env):
         '''
-        This function must be overridden in a sub-class
+        Get file list for the target environment
         '''
-        raise NotImplementedError()
+        files = set()
+        symlinks = {}
+        index = self.tree_index(tgt_env)
+        add_mountpoint = lambda path: salt.utils.path.join(
+            self.mountpoint(tgt_env), path, use_posixpath=True)
+        for path, repo_path in six.iteritems(self._index_paths(tgt_env)):
+            file_path = add_mountpoint(path)
+            files.add(file_path)
+            link_tgt = index[repo_path][2]
+            if link_tgt is not None:
+                symlinks[file_path] = link_tgt
+        return files, symlinks
 
     def find_file(self, path, tgt_env):
         '''
-        This function must be overridden in a sub-class
+        Find the specified file in the specified environment, return the SHA
+        and the mode of its blob
+        '''
+        index = self.tree_index(tgt_env)
+        if not index:
+            # Branch/tag/SHA not found in repo
+            return None, None
+        depth = 0
+        while True:
+            depth += 1
+            if depth > SYMLINK_RECURSE_DEPTH:
+                return None, None
+            try:
+                blob_sha, mode, link_tgt = index[path]
+            except KeyError:
+                # File not found or path points to a directory
+                return None, None
+            if link_tgt is None:
+                return blob_sha, mode
+            # Path is a symlink, follow it
+            path = posixpath.normpath(salt.utils.path.join(
+                posixpath.dirname(path), link_tgt, use_posixpath=True))
+
+    def tree_index(self, tgt_env):
+        '''
+        Return the index of the files in the tree of the specified
+        environment, mapping the path of each file in the repo to the SHA and
+        the mode of its blob and, for symlinks, the link target. Submodules
+        are not included.
+
+        The index is kept in memory. When the environment moves to another
+        commit it is only updated for the paths which differ between the old
+        and the new tree, environments at the same tree share their index.
+        '''
+        tree = self.get_tree(tgt_env)
+        if not tree:
+            self._tree_indexes.pop(tgt_env, None)
+            return None
+        tree_sha = self.tree_sha(tree)
+        cached = self._tree_indexes.get(tgt_env)
+        if cached is not None and cached[0] == tree_sha:
+            return cached[1]
+
+        index = None
+        for other_sha, other_index in six.itervalues(self._tree_indexes):
+            if other_sha == tree_sha:
+                index = other_index
+                break
+        if index is None and cached is not None:
+            index = self._update_tree_index(cached, tree)
+        if index is None:
+            index = {}
+            for path, blob_sha, mode in self.walk_tree(tree):
+                index[path] = self._index_entry(blob_sha, mode)
+        self._tree_indexes[tgt_env] = (tree_sha, index)
+        return index
+
+    def _index_entry(self, blob_sha, mode):
+        '''
+        Return the tree index entry of a blob
+        '''
+        link_tgt = None
+        if stat.S_ISLNK(mode):
+            # The blob data of a symlink is the target of the symlink
+            link_tgt = salt.utils.stringutils.to_unicode(self.read_blob(blob_sha))
+        return blob_sha, mode, link_tgt
+
+    def _update_tree_index(self, cached, tree):
+        '''
+        Return a copy of a tree index updated for the paths which differ
+        between its tree and the new tree, or None if the trees could not be
+        compared
+        '''
+        old_sha, old_index = cached
+        try:
+            paths = self.diff_trees(old_sha, tree)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug(
+                'Unable to compare the trees %s and %s of %s remote \'%s\', '
+                'indexing the whole tree: %s',
+                old_sha, self.tree_sha(tree), self.role, self.id, exc)
+            return None
+        if paths is None:
+            return None
+        index = dict(old_index)
+        for path in paths:
+            entry = self.tree_entry(tree, path)
+            if entry is None:
+                index.pop(path, None)
+            else:
+                index[path] = self._index_entry(*entry)
+        return index
+
+    def _index_paths(self, tgt_env):
+        '''
+        Return the paths of the files in the tree index of the specified
+        environment which are within its root, mapped to their paths in the
+        repo. The returned paths are relative to the root.
+        '''
+        index = self.tree_index(tgt_env)
+        if not index:
+            return {}
+        root = self.root(tgt_env).strip('/') if self.root(tgt_env) else ''
+        if not root:
+            return dict((path, path) for path in index)
+        prefix = root + '/'
+        return dict(
+            (path[len(prefix):], path) for path in index
+            if path.startswith(prefix)
+        )
+
+    def diff_trees(self, old_sha, tree):
+        '''
+        Return the paths which differ between the tree with the SHA old_sha
+        and the tree object, or None if the old tree is not available. This
+        function must be overridden in a sub-class.
+        '''
+        raise NotImplementedError()
+
+    def read_blob(self, blob_sha):
+        '''
+        Return the data of the blob with the specified SHA. This function must
+        be overridden in a sub-class.
+        '''
+        raise NotImplementedError()
+
+    def tree_entry(self, tree, path):
+        '''
+        Return the SHA and the mode of the blob at the path of the tree
+        object, or None if it is not a file. This function must be overridden
+        in a sub-class.
+        '''
+        raise NotImplementedError()
+
+    def tree_sha(self, tree):
+        '''
+        Return the SHA of the tree object. This function must be overridden in
+        a sub-class.
+        '''
+        raise NotImplementedError()
+
+    def walk_tree(self, tree):
+        '''
+        Yield the path in the repo, the blob SHA and the mode of every file in
+        the tree object. This function must be overridden in a sub-class.
         '''
         raise NotImplementedError()
 
@@ -1110,11 +1358,13 @@ class GitProvider(object):
         self.credentials = None
         return True
 
-    def write_file(self, blob, dest):
+    def write_blob(self, blob_sha, dest):
         '''
-        This function must be overridden in a sub-class
+        Write the data of the blob with the specified SHA to the destination
+        path
         '''
-        raise NotImplementedError()
+        with salt.utils.atomicfile.atomic_open(dest, 'wb') as fp_:
+            fp_.write(self.read_blob(blob_sha))
 
 
 class GitPython(GitProvider):
@@ -1220,31 +1470,6 @@ class GitPython(GitProvider):
 
         return new
 
-    def dir_list(self, tgt_env):
-        '''
-        Get list of directories for the target environment using GitPython
-        '''
-        ret = set()
-        tree = self.get_tree(tgt_env)
-        if not tree:
-            return ret
-        if self.root(tgt_env):
-            try:
-                tree = tree / self.root(tgt_env)
-            except KeyError:
-                return ret
-            relpath = lambda path: os.path.relpath(path, self.root(tgt_env))
-        else:
-            relpath = lambda path: path
-        add_mountpoint = lambda path: salt.utils.path.join(
-            self.mountpoint(tgt_env), path, use_posixpath=True)
-        for blob in tree.traverse():
-            if isinstance(blob, git.Tree):
-                ret.add(add_mountpoint(relpath(blob.path)))
-        if self.mountpoint(tgt_env):
-            ret.add(self.mountpoint(tgt_env))
-        return ret
-
     def envs(self):
         '''
         Check the refs and return a list of the ones which can be used as salt
@@ -1291,83 +1516,6 @@ class GitPython(GitProvider):
         cleaned = self.clean_stale_refs()
         return True if (new_objs or cleaned) else None
 
-    def file_list(self, tgt_env):
-        '''
-        Get file list for the target environment using GitPython
-        '''
-        files = set()
-        symlinks = {}
-        tree = self.get_tree(tgt_env)
-        if not tree:
-            # Not found, return empty objects
-            return files, symlinks
-        if self.root(tgt_env):
-            try:
-                tree = tree / self.root(tgt_env)
-            except KeyError:
-                return files, symlinks
-            relpath = lambda path: os.path.relpath(path, self.root(tgt_env))
-        else:
-            relpath = lambda path: path
-        add_mountpoint = lambda path: salt.utils.path.join(
-            self.mountpoint(tgt_env), path, use_posixpath=True)
-        for file_blob in tree.traverse():
-            if not isinstance(file_blob, git.Blob):
-                continue
-            file_path = add_mountpoint(relpath(file_blob.path))
-            files.add(file_path)
-            if stat.S_ISLNK(file_blob.mode):
-                stream = six.StringIO()
-                file_blob.stream_data(stream)
-                stream.seek(0)
-                link_tgt = stream.read()
-                stream.close()
-                symlinks[file_path] = link_tgt
-        return files, symlinks
-
-    def find_file(self, path, tgt_env):
-        '''
-        Find the specified file in the specified environment
-        '''
-        tree = self.get_tree(tgt_env)
-        if not tree:
-            # Branch/tag/SHA not found in repo
-            return None, None, None
-        blob = None
-        depth = 0
-        while True:
-            depth += 1
-            if depth > SYMLINK_RECURSE_DEPTH:
-                blob = None
-                break
-            try:
-                file_blob = tree / path
-                if stat.S_ISLNK(file_blob.mode):
-                    # Path is a symlink. The blob data corresponding to
-                    # this path's object ID will be the target of the
-                    # symlink. Follow the symlink and set path to the
-                    # location indicated in the blob data.
-                    stream = six.StringIO()
-                    file_blob.stream_data(stream)
-                    stream.seek(0)
-                    link_tgt = stream.read()
-                    stream.close()
-                    path = salt.utils.path.join(
-                        os.path.dirname(path), link_tgt, use_posixpath=True)
-                else:
-                    blob = file_blob
-                    if isinstance(blob, git.Tree):
-                        # Path is a directory, not a file.
-                        blob = None
-                    break
-            except KeyError:
-                # File not found or repo_path points to a directory
-                blob = None
-                break
-        if isinstance(blob, git.Blob):
-            return blob, blob.hexsha, blob.mode
-        return None, None, None
-
     def get_tree_from_branch(self, ref):
         '''
         Return a git.Tree object matching a head ref fetched into
@@ -1400,12 +1548,53 @@ class GitPython(GitProvider):
         except (gitdb.exc.ODBError, AttributeError):
             return None
 
-    def write_file(self, blob, dest):
+    def diff_trees(self, old_sha, tree):
+        '''
+        Return the paths which differ between the tree with the SHA old_sha
+        and the tree object
+        '''
+        try:
+            old_tree = self.repo.tree(old_sha)
+        except (ValueError, gitdb.exc.ODBError):
+            return None
+        paths = set()
+        for diff in old_tree.diff(tree):
+            for blob in (diff.a_blob, diff.b_blob):
+                if blob is not None:
+                    paths.add(blob.path)
+        return paths
+
+    def read_blob(self, blob_sha):
         '''
-        Using the blob object, write the file to the destination path
+        Return the data of the blob with the specified SHA
         '''
-        with salt.utils.files.fopen(dest, 'wb+') as fp_:
-            blob.stream_data(fp_)
+        return self.repo.odb.stream(binascii.unhexlify(blob_sha)).read()
+
+    def tree_entry(self, tree, path):
+        '''
+        Return the SHA and the mode of the blob at the path of the tree
+        '''
+        try:
+            blob = tree / path
+        except KeyError:
+            return None
+        if not isinstance(blob, git.Blob):
+            return None
+        return blob.hexsha, blob.mode
+
+    def tree_sha(self, tree):
+        '''
+        Return the SHA of the tree
+        '''
+        return tree.hexsha
+
+    def walk_tree(self, tree):
+        '''
+        Yield the path, the blob SHA and the mode of every file in the tree
+        '''
+        for blob in tree.traverse():
+            if isinstance(blob, git.Blob):
+                yield blob.path, blob.hexsha, blob.mode
 
 
 class Pygit2(GitProvider):
@@ -1669,57 +1858,6 @@ class Pygit2(GitProvider):
 
         return new
 
-    def dir_list(self, tgt_env):
-        '''
-        Get a list of directories for the target environment using pygit2
-        '''
-        def _traverse(tree, blobs, prefix):
-            '''
-            Traverse through a pygit2 Tree object recursively, accumulating all
-            the empty directories within it in the "blobs" list
-            '''
-            for entry in iter(tree):
-                if entry.oid not in self.repo:
-                    # Entry is a submodule, skip it
-                    continue
-                blob = self.repo[entry.oid]
-                if not isinstance(blob, pygit2.Tree):
-                    continue
-                blobs.append(
-                    salt.utils.path.join(prefix, entry.name, use_posixpath=True)
-                )
-                if blob:
-                    _traverse(
-                        blob, blobs, salt.utils.path.join(
-                            prefix, entry.name, use_posixpath=True)
-                    )
-
-        ret = set()
-        tree = self.get_tree(tgt_env)
-        if not tree:
-            return ret
-        if self.root(tgt_env):
-            try:
-                oid = tree[self.root(tgt_env)].oid
-                tree = self.repo[oid]
-            except KeyError:
-                return ret
-            if not isinstance(tree, pygit2.Tree):
-                return ret
-            relpath = lambda path: os.path.relpath(path, self.root(tgt_env))
-        else:
-            relpath = lambda path: path
-        blobs = []
-        if tree:
-            _traverse(tree, blobs, self.root(tgt_env))
-        add_mountpoint = lambda path: salt.utils.path.join(
-            self.mountpoint(tgt_env), path, use_posixpath=True)
-        for blob in blobs:
-            ret.add(add_mountpoint(relpath(blob)))
-        if self.mountpoint(tgt_env):
-            ret.add(self.mountpoint(tgt_env))
-        return ret
-
     def envs(self):
         '''
         Check the refs and return a list of the ones which can be used as salt
@@ -1793,103 +1931,6 @@ class Pygit2(GitProvider):
             if (received_objects or refs_pre != refs_post or cleaned) \
             else None
 
-    def file_list(self, tgt_env):
-        '''
-        Get file list for the target environment using pygit2
-        '''
-        def _traverse(tree, blobs, prefix):
-            '''
-            Traverse through a pygit2 Tree object recursively, accumulating all
-            the file paths and symlink info in the "blobs" dict
-            '''
-            for entry in iter(tree):
-                if entry.oid not in self.repo:
-                    # Entry is a submodule, skip it
-                    continue
-                obj = self.repo[entry.oid]
-                if isinstance(obj, pygit2.Blob):
-                    repo_path = salt.utils.path.join(
-                        prefix, entry.name, use_posixpath=True)
-                    blobs.setdefault('files', []).append(repo_path)
-                    if stat.S_ISLNK(tree[entry.name].filemode):
-                        link_tgt = self.repo[tree[entry.name].oid].data
-                        blobs.setdefault('symlinks', {})[repo_path] = link_tgt
-                elif isinstance(obj, pygit2.Tree):
-                    _traverse(
-                        obj, blobs, salt.utils.path.join(
-                            prefix, entry.name, use_posixpath=True)
-                    )
-
-        files = set()
-        symlinks = {}
-        tree = self.get_tree(tgt_env)
-        if not tree:
-            # Not found, return empty objects
-            return files, symlinks
-        if self.root(tgt_env):
-            try:
-                # This might need to be changed to account for a root that
-                # spans more than one directory
-                oid = tree[self.root(tgt_env)].oid
-                tree = self.repo[oid]
-            except KeyError:
-                return files, symlinks
-            if not isinstance(tree, pygit2.Tree):
-                return files, symlinks
-            relpath = lambda path: os.path.relpath(path, self.root(tgt_env))
-        else:
-            relpath = lambda path: path
-        blobs = {}
-        if tree:
-            _traverse(tree, blobs, self.root(tgt_env))
-        add_mountpoint = lambda path: salt.utils.path.join(
-            self.mountpoint(tgt_env), path, use_posixpath=True)
-        for repo_path in blobs.get('files', []):
-            files.add(add_mountpoint(relpath(repo_path)))
-        for repo_path, link_tgt in six.iteritems(blobs.get('symlinks', {})):
-            symlinks[add_mountpoint(relpath(repo_path))] = link_tgt
-        return files, symlinks
-
-    def find_file(self, path, tgt_env):
-        '''
-        Find the specified file in the specified environment
-        '''
-        tree = self.get_tree(tgt_env)
-        if not tree:
-            # Branch/tag/SHA not found in repo
-            return None, None, None
-        blob = None
-        mode = None
-        depth = 0
-        while True:
-            depth += 1
-            if depth > SYMLINK_RECURSE_DEPTH:
-                blob = None
-                break
-            try:
-                entry = tree[path]
-                mode = entry.filemode
-                if stat.S_ISLNK(mode):
-                    # Path is a symlink. The blob data corresponding to this
-                    # path's object ID will be the target of the symlink. Follow
-                    # the symlink and set path to the location indicated
-                    # in the blob data.
-                    link_tgt = self.repo[entry.oid].data
-                    path = salt.utils.path.join(
-                        os.path.dirname(path), link_tgt, use_posixpath=True)
-                else:
-                    blob = self.repo[entry.oid]
-                    if isinstance(blob, pygit2.Tree):
-                        # Path is a directory, not a file.
-                        blob = None
-                    break
-            except KeyError:
-                blob = None
-                break
-        if isinstance(blob, pygit2.Blob):
-            return blob, blob.hex, mode
-        return None, None, None
-
     def get_tree_from_branch(self, ref):
         '''
         Return a pygit2.Tree object matching a head ref fetched into
@@ -2066,12 +2107,72 @@ class Pygit2(GitProvider):
             )
             failhard(self.role)
 
-    def write_file(self, blob, dest):
+    def diff_trees(self, old_sha, tree):
+        '''
+        Return the paths which differ between the tree with the SHA old_sha
+        and the tree object
+        '''
+        try:
+            old_tree = self.repo[old_sha]
+        except (KeyError, ValueError):
+            return None
+        if not isinstance(old_tree, pygit2.Tree):
+            return None
+        diff = old_tree.diff_to_tree(tree)
+        try:
+            deltas = diff.deltas
+        except AttributeError:
+            # pygit2 < 0.24
+            deltas = (patch.delta for patch in diff)
+        paths = set()
+        for delta in deltas:
+            paths.add(salt.utils.stringutils.to_unicode(delta.old_file.path))
+            paths.add(salt.utils.stringutils.to_unicode(delta.new_file.path))
+        return paths
+
+    def read_blob(self, blob_sha):
         '''
-        Using the blob object, write the file to the destination path
+        Return the data of the blob with the specified SHA
         '''
-        with salt.utils.files.fopen(dest, 'wb+') as fp_:
-            fp_.write(blob.data)
+        return self.repo[blob_sha].data
+
+    def tree_entry(self, tree, path):
+        '''
+        Return the SHA and the mode of the blob at the path of the tree
+        '''
+        try:
+            entry = tree[path]
+        except KeyError:
+            return None
+        if entry.oid not in self.repo \
+                or not isinstance(self.repo[entry.oid], pygit2.Blob):
+            # Directory or submodule
+            return None
+        return entry.hex, entry.filemode
+
+    def tree_sha(self, tree):
+        '''
+        Return the SHA of the tree
+        '''
+        return tree.hex
+
+    def walk_tree(self, tree):
+        '''
+        Yield the path, the blob SHA and the mode of every file in the tree
+        '''
+        stack = [('', tree)]
+        while stack:
+            prefix, subtree = stack.pop()
+            for entry in subtree:
+                if entry.oid not in self.repo:
+                    # Entry is a submodule, skip it
+                    continue
+                path = salt.utils.path.join(prefix, entry.name, use_posixpath=True)
+                obj = self.repo[entry.oid]
+                if isinstance(obj, pygit2.Blob):
+                    yield path, entry.hex, entry.filemode
+                elif isinstance(obj, pygit2.Tree):
+                    stack.append((path, obj))
 
 
 GIT_PROVIDERS = {
@@ -2138,6 +2239,7 @@ class GitBase(object):
             self.remote_root = salt.utils.path.join(self.cache_root, 'remotes')
         self.env_cache = salt.utils.path.join(self.cache_root, 'envs.p')
         self.hash_cachedir = salt.utils.path.join(self.cache_root, 'hash')
+        self.blob_cachedir = salt.utils.path.join(self.cache_root, 'blobs')
         self.file_list_cachedir = salt.utils.path.join(
             self.opts['cachedir'], 'file_lists', self.role)
         if init_remotes:
@@ -2288,7 +2390,7 @@ class GitBase(object):
                 pass
         to_remove = []
         for item in cachedir_ls:
-            if item in ('hash', 'refs'):
+            if item in ('hash', 'refs', 'blobs'):
                 continue
             path = salt.utils.path.join(self.cache_root, item)
             if os.path.isdir(path):
@@ -2350,10 +2452,15 @@ class GitBase(object):
             errors.extend(failed)
         return cleared, errors
 
-    def fetch_remotes(self, remotes=None):
+    def fetch_remotes(self, remotes=None, force=False):
         '''
         Fetch all remotes and return a boolean to let the calling function know
         whether or not any remotes were updated in the process of fetching
+
+        .. versionchanged:: Neon
+            Up to ``<role>_fetch_workers`` remotes are fetched at the same
+            time, and remotes which failed to fetch repeatedly are skipped
+            until their backoff expires, unless ``force`` is ``True``.
         '''
         if remotes is None:
             remotes = []
@@ -2364,26 +2471,79 @@ class GitBase(object):
             )
             remotes = []
 
-        changed = False
+        now = time.time()
+        repos = []
         for repo in self.remotes:
             name = getattr(repo, 'name', None)
-            if not remotes or (repo.id, name) in remotes:
-                try:
-                    if repo.fetch():
-                        # We can't just use the return value from repo.fetch()
-                        # because the data could still have changed if old
-                        # remotes were cleared above. Additionally, we're
-                        # running this in a loop and later remotes without
-                        # changes would override this value and make it
-                        # incorrect.
-                        changed = True
-                except Exception as exc:
-                    log.error(
-                        'Exception caught while fetching %s remote \'%s\': %s',
-                        self.role, repo.id, exc,
-                        exc_info=True
+            if remotes and (repo.id, name) not in remotes:
+                continue
+            if not force:
+                wait, failures = repo.backoff(now)
+                if wait is not None:
+                    log.debug(
+                        'Not fetching %s remote \'%s\' for another %d seconds '
+                        'after %d failed fetches',
+                        self.role, repo.id, wait, failures
                     )
-        return changed
+                    continue
+            repos.append(repo)
+
+        workers = min(
+            self.opts.get('{0}_fetch_workers'.format(self.role), 1) or 1,
+            len(repos))
+        if workers > 1:
+            pool = ThreadPoolExecutor(max_workers=workers)
+            try:
+                results = list(pool.map(self._fetch_remote, repos))
+            finally:
+                pool.shutdown()
+        else:
+            results = [self._fetch_remote(repo) for repo in repos]
+        self.fire_fetch_stats()
+        # We can't just use the return value from repo.fetch() because the
+        # data could still have changed if old remotes were cleared above.
+        return any(results)
+
+    def _fetch_remote(self, repo):
+        '''
+        Fetch a single remote, return whether it was updated
+        '''
+        try:
+            return bool(repo.fetch())
+        except Exception as exc:
+            log.error(
+                'Exception caught while fetching %s remote \'%s\': %s',
+                self.role, repo.id, exc,
+                exc_info=True
+            )
+            return False
+
+    def fetch_stats(self):
+        '''
+        Return the fetch statistics of each remote, keyed by its ID
+        '''
+        return {repo.id: repo.fetch_stats() for repo in self.remotes}
+
+    def fire_fetch_stats(self):
+        '''
+        Fire the fetch statistics of the remotes on the master event bus, if
+        :conf_master:`master_stats` is enabled
+        '''
+        if not self.opts.get('master_stats', False) \
+                or self.opts.get('__role') != 'master':
+            return
+        try:
+            with salt.utils.event.get_event(
+                    'master',
+                    self.opts['sock_dir'],
+                    self.opts['transport'],
+                    opts=self.opts,
+                    listen=False) as event:
+                event.fire_event(
+                    {'remotes': self.fetch_stats()},
+                    tagify([self.role, 'fetch'], prefix='stats'))
+        except Exception as exc:
+            log.debug('Unable to fire the %s fetch stats: %s', self.role, exc)
 
     def lock(self, remote=None):
         '''
@@ -2407,13 +2567,17 @@ class GitBase(object):
             errors.extend(failed)
         return locked, errors
 
-    def update(self, remotes=None):
+    def update(self, remotes=None, force=False):
         '''
         .. versionchanged:: 2018.3.0
             The remotes argument was added. This being a list of remote URLs,
             it will only update matching remotes. This actually matches on
             repo.id
 
+        .. versionchanged:: Neon
+            The force argument was added, to fetch remotes which are backing
+            off after failed fetches
+
         Execute a git fetch on all of the repos and perform maintenance on the
         fileserver cache.
         '''
@@ -2422,7 +2586,7 @@ class GitBase(object):
                 'backend': 'gitfs'}
 
         data['changed'] = self.clear_old_remotes()
-        if self.fetch_remotes(remotes=remotes):
+        if self.fetch_remotes(remotes=remotes, force=force):
             data['changed'] = True
 
         # A masterless minion will need a new env cache file even if no changes
@@ -2454,14 +2618,39 @@ class GitBase(object):
                 data,
                 tagify(['gitfs', 'update'], prefix='fileserver')
             )
-        try:
-            salt.fileserver.reap_fileserver_cache_dir(
-                self.hash_cachedir,
-                self.find_file
-            )
-        except (OSError, IOError):
-            # Hash file won't exist if no files have yet been served up
-            pass
+        self.reap_blobs()
+
+    def reap_blobs(self):
+        '''
+        Remove the cached blobs which none of the environments has used for
+        BLOB_REAP_AGE seconds, and the per-environment file caches of older
+        Salt versions
+        '''
+        for item in ('hash', 'refs'):
+            path = salt.utils.path.join(self.cache_root, item)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+        if not os.path.isdir(self.blob_cachedir):
+            return
+        used = set()
+        for repo in self.remotes:
+            for tgt_env in repo.envs():
+                index = repo.tree_index(tgt_env)
+                if index:
+                    used.update(entry[0] for entry in six.itervalues(index))
+        cutoff = time.time() - BLOB_REAP_AGE
+        for root, _, files in salt.utils.path.os_walk(self.blob_cachedir):
+            for name in files:
+                # The name of a blob is its SHA without the first two
+                # characters, which are the name of its directory
+                if os.path.basename(root) + name.split('.', 1)[0] in used:
+                    continue
+                path = salt.utils.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
 
     def update_intervals(self):
         '''
@@ -2757,8 +2946,8 @@ class GitFS(GitBase):
 
     def find_file(self, path, tgt_env='base', **kwargs):  # pylint: disable=W0613
         '''
-        Find the first file to match the path and ref, read the file out of git
-        and send the path to the newly cached file
+        Find the first file to match the path and ref and send the path to the
+        cached copy of its blob
         '''
         fnd = {'path': '',
                'rel': ''}
@@ -2766,33 +2955,6 @@ class GitFS(GitBase):
                 (not salt.utils.stringutils.is_hex(tgt_env) and tgt_env not in self.envs()):
             return fnd
 
-        dest = salt.utils.path.join(self.cache_root, 'refs', tgt_env, path)
-        hashes_glob = salt.utils.path.join(self.hash_cachedir,
-                                           tgt_env,
-                                           '{0}.hash.*'.format(path))
-        blobshadest = salt.utils.path.join(self.hash_cachedir,
-                                           tgt_env,
-                                           '{0}.hash.blob_sha1'.format(path))
-        lk_fn = salt.utils.path.join(self.hash_cachedir,
-                                     tgt_env,
-                                     '{0}.lk'.format(path))
-        destdir = os.path.dirname(dest)
-        hashdir = os.path.dirname(blobshadest)
-        if not os.path.isdir(destdir):
-            try:
-                os.makedirs(destdir)
-            except OSError:
-                # Path exists and is a file, remove it and retry
-                os.remove(destdir)
-                os.makedirs(destdir)
-        if not os.path.isdir(hashdir):
-            try:
-                os.makedirs(hashdir)
-            except OSError:
-                # Path exists and is a file, remove it and retry
-                os.remove(hashdir)
-                os.makedirs(hashdir)
-
         for repo in self.remotes:
             if repo.mountpoint(tgt_env) \
                     and not path.startswith(repo.mountpoint(tgt_env) + os.sep):
@@ -2801,60 +2963,59 @@ class GitFS(GitBase):
             if repo.root(tgt_env):
                 repo_path = salt.utils.path.join(repo.root(tgt_env), repo_path)
 
-            blob, blob_hexsha, blob_mode = repo.find_file(repo_path, tgt_env)
-            if blob is None:
+            blob_sha, blob_mode = repo.find_file(repo_path, tgt_env)
+            if blob_sha is None:
                 continue
 
-            def _add_file_stat(fnd, mode):
-                '''
-                Add a the mode to the return dict. In other fileserver backends
-                we stat the file to get its mode, and add the stat result
-                (passed through list() for better serialization) to the 'stat'
-                key in the return dict. However, since we aren't using the
-                stat result for anything but the mode at this time, we can
-                avoid unnecessary work by just manually creating the list and
-                not running an os.stat() on all files in the repo.
-                '''
-                if mode is not None:
-                    fnd['stat'] = [mode]
-                return fnd
-
-            salt.fileserver.wait_lock(lk_fn, dest)
+            # Blobs are cached by their SHA, so a file is only written once
+            # for all of the refs it is the same in
+            dest = self.blob_path(blob_sha)
             try:
-                with salt.utils.files.fopen(blobshadest, 'r') as fp_:
-                    sha = salt.utils.stringutils.to_unicode(fp_.read())
-                    if sha == blob_hexsha:
-                        fnd['rel'] = path
-                        fnd['path'] = dest
-                        return _add_file_stat(fnd, blob_mode)
-            except IOError as exc:
-                if exc.errno != errno.ENOENT:
-                    six.reraise(*sys.exc_info())
-
-            with salt.utils.files.fopen(lk_fn, 'w'):
-                pass
-
-            for filename in glob.glob(hashes_glob):
-                try:
-                    os.remove(filename)
-                except Exception:
-                    pass
-            # Write contents of file to their destination in the FS cache
-            repo.write_file(blob, dest)
-            with salt.utils.files.fopen(blobshadest, 'w+') as fp_:
-                fp_.write(blob_hexsha)
-            try:
-                os.remove(lk_fn)
+                mtime = os.stat(dest).st_mtime
             except OSError:
-                pass
+                mtime = None
+            if mtime is not None:
+                if mtime < time.time() - BLOB_REAP_AGE / 2:
+                    # The blob may no longer be in any environment, like the
+                    # blobs of a SHA or of a ref which just moved. Mark it as
+                    # used so that reap_blobs() does not remove it while it is
+                    # being served.
+                    try:
+                        os.utime(dest, None)
+                    except OSError:
+                        pass
+            else:
+                destdir = os.path.dirname(dest)
+                if not os.path.isdir(destdir):
+                    try:
+                        os.makedirs(destdir)
+                    except OSError as exc:
+                        if exc.errno != errno.EEXIST:
+                            raise
+                repo.write_blob(blob_sha, dest)
             fnd['rel'] = path
             fnd['path'] = dest
-            return _add_file_stat(fnd, blob_mode)
+            # In other fileserver backends we stat the file to get its mode,
+            # and add the stat result (passed through list() for better
+            # serialization) to the 'stat' key in the return dict. Since we
+            # aren't using the stat result for anything but the mode at this
+            # time, we can avoid unnecessary work by just manually creating
+            # the list.
+            if blob_mode is not None:
+                fnd['stat'] = [blob_mode]
+            return fnd
 
         # No matching file was found in tgt_env. Return a dict with empty paths
         # so the calling function knows the file could not be found.
         return fnd
 
+    def blob_path(self, blob_sha):
+        '''
+        Return the path of the cached copy of the blob with the specified SHA
+        '''
+        return salt.utils.path.join(
+            self.blob_cachedir, blob_sha[:2], blob_sha[2:])
+
     def serve_file(self, load, fnd):
         '''
         Return a chunk from a file based on the data received
@@ -2899,28 +3060,19 @@ class GitFS(GitBase):
         if not all(x in load for x in ('path', 'saltenv')):
             return '', None
         ret = {'hash_type': self.opts['hash_type']}
-        relpath = fnd['rel']
         path = fnd['path']
-        hashdest = salt.utils.path.join(self.hash_cachedir,
-                                        load['saltenv'],
-                                        '{0}.hash.{1}'.format(relpath,
-                                                              self.opts['hash_type']))
+        # The hash is cached next to the blob, and shared like it
+        hashdest = '{0}.hash.{1}'.format(path, self.opts['hash_type'])
         try:
             with salt.utils.files.fopen(hashdest, 'rb') as fp_:
-                ret['hsum'] = fp_.read()
+                ret['hsum'] = salt.utils.stringutils.to_unicode(fp_.read())
             return ret
         except IOError as exc:
             if exc.errno != errno.ENOENT:
                 six.reraise(*sys.exc_info())
 
-        try:
-            os.makedirs(os.path.dirname(hashdest))
-        except OSError as exc:
-            if exc.errno != errno.EEXIST:
-                six.reraise(*sys.exc_info())
-
         ret['hsum'] = salt.utils.hashutils.get_hash(path, self.opts['hash_type'])
-        with salt.utils.files.fopen(hashdest, 'w+') as fp_:
+        with salt.utils.atomicfile.atomic_open(hashdest, 'w') as fp_:
             fp_.write(ret['hsum'])
         return ret
 
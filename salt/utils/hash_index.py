@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+'''
+An index of the hashes and stat results of the files of all the fileserver
+backends, keyed by backend, saltenv and path.
+
+When :conf_master:`file_hash_index` is enabled, the index is updated after
+each update of a fileserver backend, only hashing the files which are new or
+were modified since the previous update, and written to the cachedir. The
+MWorkers keep it in memory and answer the hash and stat requests of the
+minions from it, without touching the files.
+
+.. versionadded:: Neon
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import logging
+import os
+import threading
+import time
+
+# Import Salt Libs
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.data
+import salt.utils.files
+import salt.utils.url
+from salt.ext import six
+
+log = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+# Seconds between the checks for a new index file
+CHECK_INTERVAL = 1
+
+# The elements of a stat result which tell whether a file was modified: the
+# mode, inode, device, size, mtime and ctime
+_STAT_KEYS = (0, 1, 2, 6, 8, 9)
+
+
+def index_path(opts):
+    '''
+    Return the path of the index file
+    '''
+    return os.path.join(opts['cachedir'], 'file_hash_index.p')
+
+
+def _unchanged(old, new):
+    '''
+    Return whether two stat results are of the same version of a file
+    '''
+    if not old or not new or len(old) < 10 or len(new) < 10:
+        return False
+    return all(old[idx] == new[idx] for idx in _STAT_KEYS)
+
+
+class HashIndex(object):
+    '''
+    The file hash index of a :class:`salt.fileserver.Fileserver`
+
+    Each entry of the index is a list of the hash, the stat result, the path
+    of the file on the master and its path relative to the saltenv.
+    '''
+    def __init__(self, fileserver):
+        self.fileserver = fileserver
+        self.opts = fileserver.opts
+        self.hash_type = self.opts['hash_type']
+        # Backend => saltenv => path => entry
+        self.backends = {}
+        self._key = None
+        self._checked = 0
+        self._lock = threading.Lock()
+
+    def _read(self):
+        '''
+        Read the index file if it was replaced since it was last read
+        '''
+        path = index_path(self.opts)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        key = (stat.st_ino, stat.st_mtime, stat.st_size)
+        if key == self._key:
+            return
+        try:
+            with salt.utils.files.fopen(path, 'rb') as fp_:
+                data = salt.utils.data.decode(
+                    salt.payload.Serial(self.opts).load(fp_))
+        except Exception as exc:  # pylint: disable=broad-except
+            log.warning('Unable to read the file hash index: %s', exc)
+            return
+        self._key = key
+        if isinstance(data, dict) and data.get('version') == INDEX_VERSION \
+                and data.get('hash_type') == self.hash_type:
+            self.backends = data['backends']
+        else:
+            self.backends = {}
+
+    def refresh(self):
+        '''
+        Read the index file again if it was replaced, checking at most every
+        CHECK_INTERVAL seconds
+        '''
+        now = time.time()
+        if now - self._checked < CHECK_INTERVAL:
+            return
+        with self._lock:
+            self._checked = now
+            self._read()
+
+    def write(self):
+        path = index_path(self.opts)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        data = {'version': INDEX_VERSION,
+                'hash_type': self.hash_type,
+                'backends': self.backends}
+        with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+            fp_.write(salt.payload.Serial(self.opts).dumps(data))
+
+    def update(self, back=None):
+        '''
+        Index the files of the fileserver backends, only hashing the new and
+        modified ones
+        '''
+        servers = self.fileserver.servers
+        with self._lock:
+            # Start from the latest index, it can be updated by other
+            # processes
+            self._read()
+            for fsb in self.fileserver.backends(back):
+                if '{0}.file_list'.format(fsb) not in servers:
+                    continue
+                start = time.time()
+                hashed = 0
+                old = self.backends.get(fsb, {})
+                new = {}
+                for saltenv in servers['{0}.envs'.format(fsb)]():
+                    saltenv = six.text_type(saltenv)
+                    previous = old.get(saltenv, {})
+                    entries = new[saltenv] = {}
+                    load = {'saltenv': saltenv}
+                    for path in servers['{0}.file_list'.format(fsb)](load):
+                        try:
+                            fnd = servers['{0}.find_file'.format(fsb)](
+                                path, saltenv)
+                        except Exception as exc:  # pylint: disable=broad-except
+                            log.debug(
+                                'Unable to find %s in saltenv %s of %s: %s',
+                                path, saltenv, fsb, exc)
+                            continue
+                        if not fnd.get('path'):
+                            continue
+                        stat = fnd.get('stat')
+                        entry = previous.get(path)
+                        if entry is None or entry[2] != fnd['path'] \
+                                or not _unchanged(entry[1], stat):
+                            fnd['back'] = fsb
+                            hsum = servers['{0}.file_hash'.format(fsb)](
+                                {'path': path, 'saltenv': saltenv}, fnd)
+                            if not isinstance(hsum, dict) or 'hsum' not in hsum:
+                                continue
+                            entry = [hsum['hsum'], stat, fnd['path'], fnd['rel']]
+                            hashed += 1
+                        entries[path] = entry
+                self.backends[fsb] = new
+                log.debug(
+                    'Updated the file hash index of the %s fileserver backend '
+                    'in %.2f seconds, %d files hashed', fsb,
+                    time.time() - start, hashed)
+            self.write()
+            self._checked = time.time()
+
+    def lookup(self, path, saltenv):
+        '''
+        Return the backend and the index entry of a file, an empty backend if
+        none of the backends has it, or None if the index cannot tell
+        '''
+        if os.path.isabs(path) or '../' in path or '?' in path \
+                or salt.utils.url.is_escaped(path):
+            # Let the fileserver parse the path
+            return None
+        self.refresh()
+        for fsb in self.fileserver.backends():
+            envs = self.backends.get(fsb)
+            if envs is None or saltenv not in envs:
+                # Not indexed, or the saltenv can be mapped to another one
+                return None
+            entry = envs[saltenv].get(path)
+            if entry is not None:
+                return fsb, entry
+        return '', None
+
+    def hash_and_stat(self, path, saltenv):
+        '''
+        Return the hash and the stat result of a file like
+        Fileserver.file_hash_and_stat, or None if the index cannot tell
+        '''
+        ret = self.lookup(path, saltenv)
+        if ret is None:
+            return None
+        fsb, entry = ret
+        if not fsb:
+            return '', None
+        return {'hsum': entry[0], 'hash_type': self.hash_type}, entry[1]
+
+    def find_file(self, path, saltenv):
+        '''
+        Return the fnd structure of a file like Fileserver.find_file, or None
+        if the index cannot tell
+        '''
+        ret = self.lookup(path, saltenv)
+        if ret is None:
+            return None
+        fsb, entry = ret
+        if not fsb:
+            return {'path': '', 'rel': ''}
+        fnd = {'path': entry[2], 'rel': entry[3], 'back': fsb}
+        if entry[1] is not None:
+            fnd['stat'] = entry[1]
+        return fnd
@@ -66,6 +66,21 @@ def read_file(fh_, chunk_size=1048576):
             pass
 
 
+def chunks(iterable, size):
+    '''
+    Generator function yielding the items of an iterable in lists of up to
+    ``size`` items
+    '''
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 def fnmatch_multiple(candidates, pattern):
     '''
     Convenience function which runs fnmatch.fnmatch() on each element of passed
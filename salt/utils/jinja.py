@@ -30,6 +30,7 @@ import salt.fileclient
 import salt.utils.data
 import salt.utils.files
 import salt.utils.json
+import salt.utils.render_cache
 import salt.utils.stringutils
 import salt.utils.url
 import salt.utils.yaml
@@ -152,6 +153,7 @@ class SaltCacheLoader(BaseLoader):
         # pylint: disable=cell-var-from-loop
         for spath in self.searchpath:
             filepath = os.path.join(spath, _template)
+            salt.utils.render_cache.note('files', filepath)
             try:
                 with salt.utils.files.fopen(filepath, 'rb') as ifile:
                     contents = ifile.read().decode(self.encoding)
@@ -21,6 +21,7 @@ import salt.client
 import salt.pillar
 import salt.utils.atomicfile
 import salt.utils.files
+import salt.utils.mine_index
 import salt.utils.minions
 import salt.utils.platform
 import salt.utils.stringutils
@@ -40,6 +41,7 @@ except ImportError:
 
 # Import third party libs
 from salt.ext import six
+from salt.ext.six.moves import zip  # pylint: disable=redefined-builtin
 from salt.utils.zeromq import zmq
 
 log = logging.getLogger(__name__)
@@ -200,10 +202,11 @@ class MasterPillarUtil(object):
             return mine_data
         if not minion_ids:
             minion_ids = self.cache.list('minions')
-        for minion_id in minion_ids:
-            if not salt.utils.verify.valid_id(self.opts, minion_id):
-                continue
-            mdata = self.cache.fetch('minions/{0}'.format(minion_id), 'mine')
+        minion_ids = [minion_id for minion_id in minion_ids
+                      if salt.utils.verify.valid_id(self.opts, minion_id)]
+        mdatas = self.cache.fetch_many(
+            [('minions/{0}'.format(minion_id), 'mine') for minion_id in minion_ids])
+        for minion_id, mdata in zip(minion_ids, mdatas):
             if isinstance(mdata, dict):
                 mine_data[minion_id] = mdata
         return mine_data
@@ -219,10 +222,11 @@ class MasterPillarUtil(object):
             return grains, pillars
         if not minion_ids:
             minion_ids = self.cache.list('minions')
-        for minion_id in minion_ids:
-            if not salt.utils.verify.valid_id(self.opts, minion_id):
-                continue
-            mdata = self.cache.fetch('minions/{0}'.format(minion_id), 'data')
+        minion_ids = [minion_id for minion_id in minion_ids
+                      if salt.utils.verify.valid_id(self.opts, minion_id)]
+        mdatas = self.cache.fetch_many(
+            [('minions/{0}'.format(minion_id), 'data') for minion_id in minion_ids])
+        for minion_id, mdata in zip(minion_ids, mdatas):
             if not isinstance(mdata, dict):
                 log.warning(
                     'cache.fetch should always return a dict. ReturnedType: %s, MinionId: %s',
@@ -465,12 +469,14 @@ class MasterPillarUtil(object):
                 if clear_mine:
                     # Delete the whole mine file
                     self.cache.flush(bank, 'mine')
+                    salt.utils.mine_index.mark(self.opts, minion_id, cache=self.cache)
                 elif clear_mine_func is not None:
                     # Delete a specific function from the mine file
                     mine_data = self.cache.fetch(bank, 'mine')
                     if isinstance(mine_data, dict):
                         if mine_data.pop(clear_mine_func, False):
                             self.cache.store(bank, 'mine', mine_data)
+                            salt.utils.mine_index.mark(self.opts, minion_id, cache=self.cache)
         except (OSError, IOError):
             return True
         return True
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+'''
+A master-side index of the mine, organized by mine function.
+
+The mine data of every minion is stored in the ``mine`` key of its
+``minions/<id>`` cache bank, so looking a function up across many minions
+takes one cache read per minion. With :conf_master:`mine_index` enabled the
+Maintenance process additionally keeps one ``{minion: data}`` entry per mine
+function in the ``mine_index/functions`` bank, so the same lookup takes one
+cache read per function.
+
+Writers of the mine only mark the minion in the ``mine_index/pending`` bank,
+which never needs a read-modify-write of a shared entry. The Maintenance
+process folds the pending minions into the index and readers take the data of
+minions still pending from their ``minions/<id>`` bank, so the index never
+returns stale data.
+
+.. versionadded:: Neon
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, unicode_literals
+import logging
+import time
+
+# Import Salt Libs
+import salt.cache
+from salt.ext import six
+from salt.ext.six.moves import zip  # pylint: disable=redefined-builtin
+
+log = logging.getLogger(__name__)
+
+INDEX_BANK = 'mine_index'
+FUNCTIONS_BANK = 'mine_index/functions'
+PENDING_BANK = 'mine_index/pending'
+
+
+def enabled(opts):
+    '''
+    Return whether the mine index is in use
+    '''
+    return opts.get('mine_index', False) and (
+        opts.get('minion_data_cache', False) or opts.get('enforce_mine_cache', False))
+
+
+def mark(opts, minion_id, cache=None):
+    '''
+    Mark the mine data of a minion as changed
+    '''
+    if not enabled(opts):
+        return
+    if cache is None:
+        cache = salt.cache.factory(opts)
+    cache.store(PENDING_BANK, minion_id, time.time())
+
+
+def update(opts, cache=None, full=False):
+    '''
+    Fold the minions whose mine data changed into the index. The index is
+    built from scratch if it does not exist yet or ``full`` is True.
+    '''
+    if not enabled(opts):
+        return
+    if cache is None:
+        cache = salt.cache.factory(opts)
+    full = full or not cache.contains(INDEX_BANK, 'built')
+
+    # Remember the marks as they are now, a minion which is marked again
+    # while the index is updated stays pending
+    pending_ids = list(cache.list(PENDING_BANK))
+    pending = dict(zip(
+        pending_ids,
+        cache.fetch_many([(PENDING_BANK, minion_id) for minion_id in pending_ids])))
+    if not pending and not full:
+        return
+
+    if full:
+        minion_ids = cache.list('minions')
+        index = {}
+    else:
+        minion_ids = list(pending)
+        funs = list(cache.list(FUNCTIONS_BANK))
+        index = dict(
+            (fun, data or {}) for fun, data in
+            zip(funs, cache.fetch_many([(FUNCTIONS_BANK, fun) for fun in funs]))
+        )
+
+    changed = set()
+    minion_ids = list(minion_ids)
+    mdatas = cache.fetch_many(
+        [('minions/{0}'.format(minion_id), 'mine') for minion_id in minion_ids])
+    for minion_id, mdata in zip(minion_ids, mdatas):
+        if not isinstance(mdata, dict):
+            mdata = {}
+        for fun in index:
+            if fun not in mdata and index[fun].pop(minion_id, None) is not None:
+                changed.add(fun)
+        for fun, data in six.iteritems(mdata):
+            index.setdefault(fun, {})[minion_id] = data
+            changed.add(fun)
+
+    cache.store_many([(FUNCTIONS_BANK, fun, index[fun]) for fun in changed if index[fun]])
+    for fun in changed:
+        if not index[fun]:
+            cache.flush(FUNCTIONS_BANK, fun)
+    if full:
+        for fun in cache.list(FUNCTIONS_BANK):
+            if fun not in index:
+                cache.flush(FUNCTIONS_BANK, fun)
+        cache.store(INDEX_BANK, 'built', time.time())
+
+    stamps = cache.fetch_many([(PENDING_BANK, minion_id) for minion_id in pending_ids])
+    for minion_id, stamp in zip(pending_ids, stamps):
+        if stamp == pending[minion_id]:
+            cache.flush(PENDING_BANK, minion_id)
+    log.debug(
+        'Updated the mine index with %d minion(s), %d function(s) changed',
+        len(minion_ids), len(changed)
+    )
+
+
+def get(opts, minion_ids, functions, cache=None):
+    '''
+    Return the mine data of the given functions for the given minions as
+    ``{function: {minion: data}}``, or None if no index has been built yet
+    '''
+    if not enabled(opts):
+        return None
+    if cache is None:
+        cache = salt.cache.factory(opts)
+    if not cache.contains(INDEX_BANK, 'built'):
+        return None
+    minion_ids = set(minion_ids)
+    pending = minion_ids.intersection(cache.list(PENDING_BANK))
+
+    ret = {}
+    fdatas = cache.fetch_many([(FUNCTIONS_BANK, fun) for fun in functions])
+    for fun, data in zip(functions, fdatas):
+        data = data or {}
+        ret[fun] = dict(
+            (minion_id, fdata) for minion_id, fdata in six.iteritems(data)
+            if minion_id in minion_ids and minion_id not in pending
+        )
+    pending = list(pending)
+    mdatas = cache.fetch_many(
+        [('minions/{0}'.format(minion_id), 'mine') for minion_id in pending])
+    for minion_id, mdata in zip(pending, mdatas):
+        if not isinstance(mdata, dict):
+            continue
+        for fun in functions:
+            if fun in mdata:
+                ret[fun][minion_id] = mdata[fun]
+    return ret
@@ -16,7 +16,10 @@ import salt.payload
 import salt.roster
 import salt.utils.data
 import salt.utils.files
+import salt.utils.itertools
+import salt.utils.mine_index
 import salt.utils.network
+import salt.utils.presence
 import salt.utils.stringutils
 import salt.utils.versions
 from salt.defaults import DEFAULT_TARGET_DELIM
@@ -24,6 +27,7 @@ from salt.exceptions import CommandExecutionError, SaltCacheError
 import salt.auth.ldap
 import salt.cache
 from salt.ext import six
+from salt.ext.six.moves import zip  # pylint: disable=redefined-builtin
 
 # Import 3rd-party libs
 from salt._compat import ipaddress
@@ -223,6 +227,15 @@ class CkMinions(object):
         return {'minions': [x for x in expr if x in minions],
                 'missing': [] if ignore_missing else [x for x in expr if x not in minions]}
 
+    def _check_presence_minions(self, expr, greedy):  # pylint: disable=unused-argument
+        '''
+        Return the minions matching a glob which are present according to the
+        presence table
+        '''
+        return {'minions': salt.utils.presence.present(
+                    self.opts, fnmatch.filter(self._pki_minions(), expr)),
+                'missing': []}
+
     def _check_pcre_minions(self, expr, greedy):  # pylint: disable=unused-argument
         '''
         Return the minions found by looking via regular expressions
@@ -301,10 +314,11 @@ class CkMinions(object):
                 return {'minions': minions,
                         'missing': []}
             minions = set(minions)
-            for id_ in cminions:
-                if greedy and id_ not in minions:
-                    continue
-                mdata = self.cache.fetch('minions/{0}'.format(id_), 'data')
+            if greedy:
+                cminions = [id_ for id_ in cminions if id_ in minions]
+            mdatas = self.cache.fetch_many(
+                [('minions/{0}'.format(id_), 'data') for id_ in cminions])
+            for id_, mdata in zip(cminions, mdatas):
                 if mdata is None:
                     if not greedy:
                         minions.remove(id_)
@@ -400,8 +414,9 @@ class CkMinions(object):
             proto = 'ipv{0}'.format(tgt.version)
 
             minions = set(minions)
-            for id_ in cminions:
-                mdata = self.cache.fetch('minions/{0}'.format(id_), 'data')
+            mdatas = self.cache.fetch_many(
+                [('minions/{0}'.format(id_), 'data') for id_ in cminions])
+            for id_, mdata in zip(cminions, mdatas):
                 if mdata is None:
                     if not greedy:
                         minions.remove(id_)
@@ -619,6 +634,33 @@ class CkMinions(object):
         return {'minions': list(minions),
                 'missing': []}
 
+    def _fetch_data(self, id_):
+        '''
+        Return the cached data of a minion, or None if it cannot be read
+        '''
+        try:
+            return self.cache.fetch('minions/{0}'.format(id_), 'data')
+        except SaltCacheError:
+            # If a SaltCacheError is explicitly raised during the fetch operation,
+            # permission was denied to open the cached data.p file. Continue on as
+            # in the releases <= 2016.3. (An explicit error raise was added in PR
+            # #35388. See issue #36867 for more information.
+            return None
+
+    def _iter_data(self, minion_ids):
+        '''
+        Yield the ids of the minions with their cached data, or None for the
+        minions whose data cannot be read, a chunk of minions at a time
+        '''
+        for chunk in salt.utils.itertools.chunks(minion_ids, salt.cache.FETCH_CHUNK_SIZE):
+            try:
+                mdatas = list(self.cache.fetch_many(
+                    [('minions/{0}'.format(id_), 'data') for id_ in chunk]))
+            except SaltCacheError:
+                mdatas = [self._fetch_data(id_) for id_ in chunk]
+            for id_, mdata in zip(chunk, mdatas):
+                yield id_, mdata
+
     def connected_ids(self, subset=None, show_ip=False, show_ipv4=None, include_localhost=None):
         '''
         Return a set of all connected minion ids, optionally within a subset
@@ -652,15 +694,7 @@ class CkMinions(object):
                 addrs.update(set(salt.utils.network.ip_addrs6(include_loopback=False)))
             if subset:
                 search = subset
-            for id_ in search:
-                try:
-                    mdata = self.cache.fetch('minions/{0}'.format(id_), 'data')
-                except SaltCacheError:
-                    # If a SaltCacheError is explicitly raised during the fetch operation,
-                    # permission was denied to open the cached data.p file. Continue on as
-                    # in the releases <= 2016.3. (An explicit error raise was added in PR
-                    # #35388. See issue #36867 for more information.
-                    continue
+            for id_, mdata in self._iter_data(search):
                 if mdata is None:
                     continue
                 grains = mdata.get('grains', {})
@@ -1150,14 +1184,23 @@ def mine_get(tgt, fun, tgt_type='glob', opts=None):
     else:
         return {}
 
-    for minion in minions:
-        mdata = cache.fetch('minions/{0}'.format(minion), 'mine')
+    index = salt.utils.mine_index.get(opts, minions, functions, cache=cache)
+    if index is not None:
+        for fun in functions:
+            if not _ret_dict:
+                return index[fun]
+            if index[fun]:
+                ret[fun] = index[fun]
+        return ret
 
+    minions = list(minions)
+    mdatas = cache.fetch_many([('minions/{0}'.format(minion), 'mine') for minion in minions])
+    for minion, mdata in zip(minions, mdatas):
         if not isinstance(mdata, dict):
             continue
 
         if not _ret_dict and functions and functions[0] in mdata:
-            ret[minion] = mdata.get(functions)
+            ret[minion] = mdata.get(functions[0])
         elif _ret_dict:
             for fun in functions:
                 if fun in mdata:
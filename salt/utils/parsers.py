@@ -1236,6 +1236,14 @@ class ExtendedTargetOptionsMixIn(TargetOptionsMixIn):
             action='store_true',
             help=('Match based on Subnet (CIDR notation) or IP address.')
         )
+        group.add_option(
+            '--presence',
+            default=False,
+            action='store_true',
+            help=('Only target the minions matching the glob which are present '
+                  'according to the presence table of the master, requires '
+                  'presence_table.')
+        )
 
         self._create_process_functions()
 
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+'''
+Peer-assisted distribution of the large files of the fileserver
+
+When :conf_master:`file_peer_distribution` is enabled on the master and the
+minions, the large files are split into chunks addressed by their SHA256
+hash. The master keeps track of the minions which hold each chunk, and the
+minions fetch the chunks from the peers of their network which already have
+them, falling back to the master. Each minion serves the chunks it holds over
+HTTP, and every chunk is verified by hash before it is used.
+
+.. versionadded:: Neon
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import contextlib
+import hashlib
+import logging
+import os
+import random
+import re
+import socket
+import time
+
+# Import Salt Libs
+import salt.cache
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.network
+import salt.utils.stringutils
+from salt._compat import ipaddress
+from salt.ext import six
+from salt.ext.six.moves.urllib.error import URLError  # pylint: disable=import-error,no-name-in-module
+from salt.ext.six.moves.urllib.request import urlopen  # pylint: disable=import-error,no-name-in-module
+
+log = logging.getLogger(__name__)
+
+# The banks of the master cache holding the chunk lists of the files and the
+# minions holding each chunk
+FILES_BANK = 'file_peers/files'
+CHUNKS_BANK = 'file_peers/chunks/{0}'
+
+# Seconds to wait for a peer to send a chunk
+FETCH_TIMEOUT = 30
+
+_CHUNK_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def chunk_hash(data):
+    '''
+    Return the hash of a chunk
+    '''
+    return hashlib.sha256(data).hexdigest()
+
+
+def valid_chunk(chunk):
+    '''
+    Return whether a string is the hash of a chunk
+    '''
+    return isinstance(chunk, six.string_types) and bool(_CHUNK_RE.match(chunk))
+
+
+def chunk_file(path, chunk_size):
+    '''
+    Return the list of the hashes and sizes of the chunks of a file
+    '''
+    ret = []
+    with salt.utils.files.fopen(path, 'rb') as fp_:
+        while True:
+            data = fp_.read(chunk_size)
+            if not data:
+                break
+            ret.append([chunk_hash(data), len(data)])
+    return ret
+
+
+def _host(addr):
+    return addr.rsplit(':', 1)[0].strip('[]')
+
+
+def _ip_address(addr):
+    '''
+    Parse an IP address, an IPv4 address mapped to IPv6 by a dual-stack socket
+    is the IPv4 address
+    '''
+    if addr is None:
+        raise ValueError('No IP address')
+    ret = ipaddress.ip_address(salt.utils.stringutils.to_unicode(addr))
+    return getattr(ret, 'ipv4_mapped', None) or ret
+
+
+def peer_address(opts):
+    '''
+    Return the address at which the peers reach the chunk server of a minion
+    '''
+    host = opts.get('file_peer_address')
+    if not host:
+        addrs = salt.utils.network.ip_addrs()
+        host = addrs[0] if addrs else '127.0.0.1'
+    if ':' in host:
+        host = '[{0}]'.format(host)
+    return '{0}:{1}'.format(host, opts['file_peer_port'])
+
+
+def server_interface(opts):
+    '''
+    Return the interface the chunk server of a minion listens on, by default
+    only the one of the address its peers reach it at
+    '''
+    return opts.get('file_peer_interface') or _host(peer_address(opts))
+
+
+def same_network(addr, other, prefixlen):
+    '''
+    Return whether the hosts of two peer addresses are in the same network
+    '''
+    try:
+        network = ipaddress.ip_network(
+            '{0}/{1}'.format(_host(addr), prefixlen), strict=False)
+        return ipaddress.ip_address(_host(other)) in network
+    except ValueError:
+        return False
+
+
+class ChunkTracker(object):
+    '''
+    Keep track of the minions holding the chunks of the files, in the master
+    cache
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.cache = salt.cache.factory(opts)
+        self.chunk_size = opts['file_peer_chunk_size']
+
+    def verify_addr(self, addr, peer_ip):
+        '''
+        Return whether the host of the peer address a minion reported is the IP
+        address the master received the request of the minion from
+        '''
+        try:
+            host = _ip_address(_host(addr))
+            peer_ip = _ip_address(peer_ip)
+        except ValueError:
+            return False
+        return host == peer_ip
+
+    def chunks(self, path, hsum):
+        '''
+        Return the chunks of a file, only reading it again when its hash
+        changed
+        '''
+        key = '{0}-{1}'.format(hsum, self.chunk_size)
+        ret = self.cache.fetch(FILES_BANK, key)
+        if not ret:
+            ret = chunk_file(path, self.chunk_size)
+            self.cache.store(FILES_BANK, key, ret)
+        return ret
+
+    def peers(self, chunk, minion_id, addr):
+        '''
+        Return the addresses of up to file_peer_max_peers peers holding a
+        chunk, in the network of a minion
+        '''
+        bank = CHUNKS_BANK.format(chunk)
+        peer_ids = self.cache.list(bank)
+        random.shuffle(peer_ids)
+        now = time.time()
+        ret = []
+        for peer_id in peer_ids:
+            if len(ret) >= self.opts['file_peer_max_peers']:
+                break
+            if peer_id == minion_id:
+                continue
+            data = self.cache.fetch(bank, peer_id)
+            if not data or now - data.get('time', 0) > self.opts['file_peer_ttl']:
+                self.cache.flush(bank, peer_id)
+                continue
+            if same_network(addr, data['addr'], self.opts['file_peer_prefixlen']):
+                ret.append(data['addr'])
+        return ret
+
+    def file_peers(self, path, hsum, minion_id, addr, peer_ip=None):
+        '''
+        Return the chunks of a file and the peers holding each of them
+        '''
+        chunks = self.chunks(path, hsum)
+        peers = {}
+        if not self.verify_addr(addr, peer_ip):
+            # The peers of the network of an address the minion does not
+            # connect from are not returned, it fetches the whole file from
+            # the master
+            log.warning('Minion %s reported the peer address %s, but '
+                        'connected from %s', minion_id, addr, peer_ip)
+            return {'chunk_size': self.chunk_size,
+                    'chunks': chunks,
+                    'peers': peers}
+        for chunk, _ in chunks:
+            chunk_peers = self.peers(chunk, minion_id, addr)
+            if chunk_peers:
+                peers[chunk] = chunk_peers
+        return {'chunk_size': self.chunk_size,
+                'chunks': chunks,
+                'peers': peers}
+
+    def register(self, minion_id, addr, chunks, peer_ip=None):
+        '''
+        Record that a minion holds chunks, if the address it reported is the
+        one it connected from
+        '''
+        if not self.verify_addr(addr, peer_ip):
+            log.warning('Not recording the chunks of minion %s, the peer '
+                        'address %s is not the address it connected from, %s',
+                        minion_id, addr, peer_ip)
+            return False
+        now = time.time()
+        for chunk in chunks:
+            if valid_chunk(chunk):
+                self.cache.store(CHUNKS_BANK.format(chunk), minion_id,
+                                 {'addr': addr, 'time': now})
+        return True
+
+
+class ChunkStore(object):
+    '''
+    The chunks held by a minion, in its cachedir
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.path = os.path.join(opts['cachedir'], 'file_peers')
+
+    def _path(self, chunk):
+        return os.path.join(self.path, chunk)
+
+    def get(self, chunk):
+        '''
+        Return the data of a chunk, or None if the store does not hold it
+        '''
+        path = self._path(chunk)
+        try:
+            with salt.utils.files.fopen(path, 'rb') as fp_:
+                data = fp_.read()
+        except (IOError, OSError):
+            return None
+        if chunk_hash(data) != chunk:
+            log.warning('Removing the corrupted chunk %s', path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            # Keep the recently used chunks when pruning
+            os.utime(path, None)
+        except OSError:
+            pass
+        return data
+
+    def put(self, chunk, data):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        with salt.utils.atomicfile.atomic_open(self._path(chunk), 'wb') as fp_:
+            fp_.write(data)
+
+    def prune(self):
+        '''
+        Remove the least recently used chunks beyond file_peer_cache_size
+        '''
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return
+        chunks = []
+        for name in names:
+            if not valid_chunk(name):
+                continue
+            try:
+                stat = os.stat(self._path(name))
+            except OSError:
+                continue
+            chunks.append((stat.st_mtime, stat.st_size, name))
+        size = sum(chunk[1] for chunk in chunks)
+        for _, chunk_size, name in sorted(chunks):
+            if size <= self.opts['file_peer_cache_size']:
+                break
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                continue
+            size -= chunk_size
+
+
+def fetch_chunk(addr, chunk, timeout=FETCH_TIMEOUT):
+    '''
+    Fetch a chunk from a peer, returning None if it cannot be fetched or is
+    not the expected one
+    '''
+    url = 'http://{0}/chunks/{1}'.format(addr, chunk)
+    try:
+        with contextlib.closing(urlopen(url, timeout=timeout)) as resp:
+            data = resp.read()
+    except (URLError, IOError, OSError, socket.timeout) as exc:
+        log.debug('Unable to fetch chunk %s from %s: %s', chunk, addr, exc)
+        return None
+    if chunk_hash(data) != chunk:
+        log.warning('Peer %s sent a bad copy of chunk %s', addr, chunk)
+        return None
+    return data
+
+
+def start_server(opts, io_loop=None):
+    '''
+    Serve the chunks held by the minion to its peers
+    '''
+    # Avoid importing tornado.web where it is not needed
+    import tornado.httpserver
+    import tornado.web
+
+    store = ChunkStore(opts)
+    if not os.path.isdir(store.path):
+        os.makedirs(store.path)
+    app = tornado.web.Application([
+        (r'/chunks/([0-9a-f]{64})', tornado.web.StaticFileHandler,
+         {'path': store.path}),
+    ])
+    server = tornado.httpserver.HTTPServer(app, io_loop=io_loop)
+    interface = server_interface(opts)
+    server.listen(opts['file_peer_port'], address=interface)
+    log.info('Serving file chunks to the peers on %s:%s',
+             interface, opts['file_peer_port'])
+    return server
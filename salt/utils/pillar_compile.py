@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+'''
+Compile the pillar of minions in a dedicated process pool of the master.
+
+Compiling a pillar can take seconds, and with :conf_master:`pillar_compile_async`
+disabled it takes up an MWorker for all of that time, so many minions
+refreshing their pillar at once starve returns, authentication and file
+requests. With it enabled the MWorkers hand the pillar requests over to the
+:class:`PillarCompiler` process, which queues them, merges identical requests
+which are still queued, and compiles them on its pool of
+:conf_master:`pillar_compile_workers` processes.
+
+The minion sends a nonce with its pillar request. Until the pillar is
+compiled the MWorker answers right away with a ``__pillar_pending__`` marker,
+and the minion repeats the same request, with the same nonce, after the
+number of seconds the marker asks for. The pillar is returned to the first
+request after it was compiled. Masters without the option, and requests
+without a nonce, compile the pillar in the MWorker like before.
+
+.. versionadded:: Neon
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, unicode_literals
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.connection import (
+    Client, Listener, answer_challenge, deliver_challenge)
+
+# Import Salt Libs
+import salt.cache
+import salt.payload
+import salt.utils.event
+import salt.utils.hashutils
+import salt.utils.platform
+import salt.utils.process
+from salt.ext import six
+from salt.utils.odict import OrderedDict
+
+log = logging.getLogger(__name__)
+
+# The key of the reply telling the minion to repeat its request
+PENDING = '__pillar_pending__'
+
+# Seconds after which the compiled pillar of a minion which stopped asking
+# for it is dropped
+RESULT_TTL = 300
+
+# Seconds to wait for the PillarCompiler process to answer an MWorker
+IPC_TIMEOUT = 5
+
+# The state of a pillar compilation worker process
+_WORKER = {}
+
+
+def address(opts):
+    '''
+    Return the address the PillarCompiler process listens on
+    '''
+    if salt.utils.platform.is_windows():
+        return r'\\.\pipe\salt-pillar-compile-{0}'.format(
+            salt.utils.hashutils.md5_digest(opts['sock_dir']))
+    return os.path.join(opts['sock_dir'], 'pillar_compile.ipc')
+
+
+def request_key(load):
+    '''
+    Return the key identifying the pillar a request asks for. Requests with
+    the same key, which are queued at the same time, are compiled only once.
+    '''
+    serial = salt.payload.Serial('msgpack')
+    return salt.utils.hashutils.sha256_digest(serial.dumps([
+        load['id'],
+        load.get('grains'),
+        load.get('saltenv', load.get('env')),
+        load.get('pillarenv'),
+        load.get('ext'),
+        load.get('pillar_override'),
+        load.get('extra_minion_data'),
+    ]))
+
+
+def compile_pillar(opts, load):
+    '''
+    Compile the pillar of the minion sending the pillar request ``load``
+    '''
+    # Avoid circular import
+    import salt.pillar
+    pillar = salt.pillar.get_pillar(
+        opts,
+        load['grains'],
+        load['id'],
+        load.get('saltenv', load.get('env')),
+        ext=load.get('ext'),
+        pillar_override=load.get('pillar_override', {}),
+        pillarenv=load.get('pillarenv'),
+        extra_minion_data=load.get('extra_minion_data'))
+    return pillar.compile_pillar()
+
+
+def store_minion_data(opts, load, data, cache, event):
+    '''
+    Store the grains and the compiled pillar in the minion data cache
+    '''
+    if opts.get('minion_data_cache', False):
+        cache.store('minions/{0}'.format(load['id']),
+                    'data',
+                    {'grains': load['grains'],
+                     'pillar': data})
+        if opts.get('minion_data_cache_events') is True:
+            event.fire_event(
+                {'Minion data cache refresh': load['id']},
+                salt.utils.event.tagify(load['id'], 'refresh', 'minion'))
+
+
+def request(opts, load, secret):
+    '''
+    Hand a pillar request over to the PillarCompiler process. Return the
+    compiled pillar, the reply telling the minion to repeat its request, or
+    None if the pillar has to be compiled in the MWorker.
+
+    :param dict load: The pillar request, with the nonce in ``nonce``
+    :param secret: The shared secret of the master processes
+    '''
+    conn = None
+    try:
+        conn = Client(address(opts))
+        # The secret is rotated with the AES key, so it is read for each
+        # request instead of being handed to Client()
+        answer_challenge(conn, secret.value)
+        deliver_challenge(conn, secret.value)
+        conn.send(load)
+        if not conn.poll(IPC_TIMEOUT):
+            raise IOError('no answer within {0} seconds'.format(IPC_TIMEOUT))
+        return conn.recv()
+    except Exception as exc:  # pylint: disable=broad-except
+        log.warning(
+            'Unable to reach the pillar compiler, compiling the pillar of '
+            '%s in the worker: %s', load.get('id'), exc)
+        return None
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _init_worker(opts):
+    '''
+    Set up a pillar compilation worker process
+    '''
+    salt.utils.process.appendproctitle('PillarCompiler-worker')
+    # The PillarCompiler process terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _WORKER['opts'] = opts
+    _WORKER['cache'] = salt.cache.factory(opts)
+    _WORKER['event'] = salt.utils.event.get_master_event(
+        opts, opts['sock_dir'], listen=False)
+
+
+def _compile(load):
+    '''
+    Compile a pillar in a worker process, return whether it succeeded and the
+    pillar
+    '''
+    try:
+        data = compile_pillar(_WORKER['opts'], load)
+        store_minion_data(
+            _WORKER['opts'], load, data, _WORKER['cache'], _WORKER['event'])
+        return True, data
+    except Exception:  # pylint: disable=broad-except
+        log.error('Error compiling the pillar of %s', load['id'], exc_info=True)
+        return False, None
+
+
+class PillarCompiler(salt.utils.process.SignalHandlingMultiprocessingProcess):
+    '''
+    Queue the pillar requests of the MWorkers and compile them on a pool of
+    worker processes
+
+    :param dict opts: The salt options
+    :param secret: The shared secret of the master processes, a
+        ``multiprocessing.Array``
+    '''
+    def __init__(self, opts, secret, **kwargs):
+        super(PillarCompiler, self).__init__(**kwargs)
+        self.opts = opts
+        self.secret = secret
+        self.workers = max(int(opts.get('pillar_compile_workers', 4)), 1)
+        self.lock = threading.Lock()
+        # Requests waiting for a worker, by request key
+        self.queued = OrderedDict()
+        # The number of requests being compiled
+        self.running = 0
+        # When each minion request waiting for its pillar was made, by
+        # (minion id, nonce)
+        self.waiting = {}
+        # Compiled pillars which were not picked up yet, by (minion id, nonce)
+        self.results = {}
+        self._reset_stats()
+
+    # __setstate__ and __getstate__ are only used on Windows.
+    # We do this so that __init__ will be invoked on Windows in the child
+    # process so that a register_after_fork() equivalent will work on Windows.
+    def __setstate__(self, state):
+        self._is_child = True
+        self.__init__(
+            state['opts'],
+            state['secret'],
+            log_queue=state['log_queue'],
+            log_queue_level=state['log_queue_level']
+        )
+
+    def __getstate__(self):
+        return {
+            'opts': self.opts,
+            'secret': self.secret,
+            'log_queue': self.log_queue,
+            'log_queue_level': self.log_queue_level
+        }
+
+    def _handle_signals(self, signum, sigframe):
+        pool = getattr(self, 'pool', None)
+        if pool is not None:
+            pool.terminate()
+        super(PillarCompiler, self)._handle_signals(signum, sigframe)
+
+    def _reset_stats(self):
+        self.stats = {
+            'requests': 0,
+            'deduplicated': 0,
+            'compiled': 0,
+            'failed': 0,
+            'latency': [],
+            'wait': [],
+        }
+        self.stat_clock = time.time()
+
+    def _retry(self):
+        '''
+        Return the number of seconds the minion should wait before repeating
+        its request
+        '''
+        latency = self.stats['latency']
+        if not latency:
+            return 0.5
+        return min(max(sum(latency) / len(latency) / 2, 0.1), 5)
+
+    def handle(self, load):
+        '''
+        Answer a pillar request of an MWorker
+        '''
+        rkey = (load['id'], load['nonce'])
+        with self.lock:
+            if rkey in self.results:
+                return self.results.pop(rkey)[1]
+            if rkey not in self.waiting:
+                self.stats['requests'] += 1
+                key = request_key(load)
+                if key in self.queued:
+                    self.stats['deduplicated'] += 1
+                else:
+                    self.queued[key] = {'load': load, 'time': time.time(), 'waiting': []}
+                self.queued[key]['waiting'].append(rkey)
+                self.waiting[rkey] = time.time()
+                self._dispatch()
+            return {PENDING: {'retry': self._retry()}}
+
+    def _dispatch(self):
+        '''
+        Start compiling queued requests while there are free workers, with
+        the lock held
+        '''
+        while self.queued and self.running < self.workers:
+            _, entry = self.queued.popitem(last=False)
+            entry['start'] = time.time()
+            self.running += 1
+            kwargs = {'callback': lambda ret, entry=entry: self._done(entry, ret)}
+            if six.PY3:
+                # The result could not be sent back from the worker
+                kwargs['error_callback'] = \
+                    lambda exc, entry=entry: self._done(entry, (False, None))
+            self.pool.apply_async(_compile, (entry['load'],), **kwargs)
+
+    def _done(self, entry, ret):
+        '''
+        Hand a compiled pillar over to the requests waiting for it
+        '''
+        succeeded, data = ret
+        now = time.time()
+        with self.lock:
+            self.running -= 1
+            if succeeded:
+                self.stats['compiled'] += 1
+            else:
+                # The MWorker compiles the pillar when asked again
+                self.stats['failed'] += 1
+                data = None
+            self.stats['latency'].append(now - entry['start'])
+            self.stats['wait'].append(entry['start'] - entry['time'])
+            for rkey in entry['waiting']:
+                if self.waiting.pop(rkey, None) is not None:
+                    self.results[rkey] = (now, data)
+            self._dispatch()
+
+    def _expire(self):
+        '''
+        Drop the requests and pillars of minions which stopped asking for them
+        '''
+        cutoff = time.time() - RESULT_TTL
+        with self.lock:
+            for rkey in [rkey for rkey, (stamp, _) in six.iteritems(self.results)
+                         if stamp < cutoff]:
+                del self.results[rkey]
+            for rkey in [rkey for rkey, stamp in six.iteritems(self.waiting)
+                         if stamp < cutoff]:
+                del self.waiting[rkey]
+
+    def _post_stats(self):
+        '''
+        Fire an event with the queue depth and the compilation latency
+        '''
+        def _summary(values):
+            if not values:
+                return {'mean': 0, 'max': 0}
+            return {'mean': sum(values) / len(values), 'max': max(values)}
+
+        with self.lock:
+            data = {
+                'time': time.time() - self.stat_clock,
+                'queue_depth': len(self.queued),
+                'running': self.running,
+                'waiting': len(self.waiting),
+                'requests': self.stats['requests'],
+                'deduplicated': self.stats['deduplicated'],
+                'compiled': self.stats['compiled'],
+                'failed': self.stats['failed'],
+                'latency': _summary(self.stats['latency']),
+                'wait': _summary(self.stats['wait']),
+            }
+            self._reset_stats()
+        self.event.fire_event(data, salt.utils.event.tagify('pillar_compile', 'stats'))
+
+    def _maintain(self):
+        '''
+        Expire abandoned requests and fire the stats events
+        '''
+        while True:
+            time.sleep(1)
+            try:
+                self._expire()
+                if self.opts.get('master_stats') and \
+                        time.time() - self.stat_clock > self.opts['master_stats_event_iter']:
+                    self._post_stats()
+            except Exception:  # pylint: disable=broad-except
+                log.error('Error maintaining the pillar compiler', exc_info=True)
+
+    def _serve(self, conn):
+        try:
+            deliver_challenge(conn, self.secret.value)
+            answer_challenge(conn, self.secret.value)
+            if not conn.poll(IPC_TIMEOUT):
+                return
+            conn.send(self.handle(conn.recv()))
+        except Exception as exc:  # pylint: disable=broad-except
+            log.warning('Error answering a pillar request: %s', exc)
+        finally:
+            conn.close()
+
+    def run(self):
+        '''
+        Answer the pillar requests of the MWorkers
+        '''
+        salt.utils.process.appendproctitle(self.__class__.__name__)
+        # Start the workers before any thread of this process
+        self.pool = multiprocessing.Pool(
+            self.workers, initializer=_init_worker, initargs=(self.opts,))
+        self.event = salt.utils.event.get_master_event(
+            self.opts, self.opts['sock_dir'], listen=False)
+
+        path = address(self.opts)
+        if not salt.utils.platform.is_windows() and os.path.exists(path):
+            os.remove(path)
+        listener = Listener(path)
+        if not salt.utils.platform.is_windows():
+            os.chmod(path, 0o600)
+
+        thread = threading.Thread(target=self._maintain, name='PillarCompilerMaintenance')
+        thread.daemon = True
+        thread.start()
+        log.info('Compiling pillars on %d worker processes', self.workers)
+        while True:
+            self._serve(listener.accept())
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+'''
+A table of the minions present on the master.
+
+When :conf_master:`presence_table` is enabled, a master process follows the
+master event bus and records, for each minion, when it was last seen, whether
+its transport connection is up and an estimate of the round trip time of its
+requests. A minion is seen when it connects, authenticates, returns a job or
+fires an event on the master, like the ``minion_ping`` heartbeats sent every
+:conf_minion:`ping_interval` minutes. The table is saved in the cachedir, so
+the runners and targeting can tell which minions are present without
+publishing a ``test.ping``.
+
+A minion is present while its transport connection is up, or when it was seen
+in the last :conf_master:`presence_timeout` seconds and has not disconnected
+since.
+
+.. versionadded:: Neon
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, unicode_literals
+import fnmatch
+import logging
+import os
+import time
+
+# Import Salt Libs
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.event
+import salt.utils.files
+import salt.utils.process
+from salt.ext import six
+
+log = logging.getLogger(__name__)
+
+# The weight of a new round trip time sample in the estimate, as for TCP
+RTT_ALPHA = 0.125
+
+# The tags of the events whose data holds the id of the minion which sent it
+_ID_TAGS = ('salt/job/*/ret/*', 'salt/auth', 'minion_ping', 'minion_start')
+
+# The snapshots read by load(), by path
+_SNAPSHOTS = {}
+
+
+def table_path(opts):
+    '''
+    Return the path of the presence table saved by the master
+    '''
+    return os.path.join(opts['cachedir'], 'presence.p')
+
+
+def is_present(entry, timeout, now=None):
+    '''
+    Return whether a minion of the presence table is present
+    '''
+    if entry.get('connected'):
+        return True
+    if now is None:
+        now = time.time()
+    return now - entry['seen'] <= timeout and entry['seen'] > entry.get('lost', 0)
+
+
+class PresenceTable(object):
+    '''
+    The presence of the minions, updated from the events of the master
+
+    :param dict opts: The master options
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.path = table_path(opts)
+        self.minions = {}
+        self.dirty = False
+
+    def _entry(self, id_, now):
+        if id_ not in self.minions:
+            self.minions[id_] = {'seen': now, 'connected': False, 'rtt': None}
+        self.dirty = True
+        return self.minions[id_]
+
+    def seen(self, id_, now=None, rtt=None):
+        '''
+        Record that a minion was seen, and a sample of its round trip time
+        '''
+        if not isinstance(id_, six.string_types):
+            return
+        now = now or time.time()
+        entry = self._entry(id_, now)
+        entry['seen'] = now
+        if isinstance(rtt, (float, six.integer_types)) and rtt >= 0:
+            if entry['rtt'] is None:
+                entry['rtt'] = float(rtt)
+            else:
+                entry['rtt'] += RTT_ALPHA * (rtt - entry['rtt'])
+
+    def connected(self, id_, now=None):
+        '''
+        Record that the transport connection of a minion came up
+        '''
+        now = now or time.time()
+        self.seen(id_, now)
+        if id_ in self.minions and not self.minions[id_]['connected']:
+            self.minions[id_]['connected'] = True
+
+    def disconnected(self, id_, now=None):
+        '''
+        Record that the transport connection of a minion went down
+        '''
+        if id_ in self.minions and self.minions[id_]['connected']:
+            self.minions[id_]['connected'] = False
+            self.minions[id_]['lost'] = now or time.time()
+            self.dirty = True
+
+    def update(self, tag, data, now=None):
+        '''
+        Update the table from an event of the master event bus
+        '''
+        if not isinstance(data, dict):
+            return
+        now = now or time.time()
+        if tag == salt.utils.event.tagify('change', 'presence'):
+            for id_ in data.get('new') or []:
+                self.connected(id_, now)
+            for id_ in data.get('lost') or []:
+                self.disconnected(id_, now)
+        elif tag == salt.utils.event.tagify('present', 'presence'):
+            present = set(data.get('present') or [])
+            for id_ in present:
+                self.connected(id_, now)
+            for id_ in list(self.minions):
+                if id_ not in present:
+                    self.disconnected(id_, now)
+        elif tag.startswith('salt/key') and data.get('act') == 'delete':
+            if self.minions.pop(data.get('id'), None) is not None:
+                self.dirty = True
+        elif tag.startswith('salt/beacon/'):
+            self.seen(tag.split('/')[2], now)
+        elif data.get('cmd') == '_minion_event':
+            rtt = None
+            if tag == 'minion_ping' and isinstance(data.get('data'), dict):
+                rtt = data['data'].get('rtt')
+            self.seen(data.get('id'), now, rtt)
+        elif any(fnmatch.fnmatch(tag, pattern) for pattern in _ID_TAGS):
+            if tag != 'salt/auth' or data.get('act') == 'accept':
+                self.seen(data.get('id'), now)
+
+    def present(self, now=None):
+        '''
+        Return the set of the ids of the present minions
+        '''
+        now = now or time.time()
+        timeout = self.opts.get('presence_timeout', 300)
+        return set(id_ for id_, entry in six.iteritems(self.minions)
+                   if is_present(entry, timeout, now))
+
+    def load(self):
+        '''
+        Load the table saved by a previous master process. Since the minions
+        reconnect to the new master, they are not connected until they do.
+        '''
+        try:
+            with salt.utils.files.fopen(self.path, 'rb') as fp_:
+                minions = self.serial.load(fp_)
+        except (IOError, OSError):
+            return
+        except Exception as exc:  # pylint: disable=broad-except
+            log.error('Discarding the unreadable presence table %s: %s', self.path, exc)
+            return
+        if not isinstance(minions, dict):
+            return
+        now = time.time()
+        for entry in six.itervalues(minions):
+            if entry.get('connected'):
+                entry['connected'] = False
+                entry['lost'] = now
+        self.minions = minions
+
+    def save(self):
+        '''
+        Save the table if it changed
+        '''
+        if not self.dirty:
+            return
+        with salt.utils.atomicfile.atomic_open(self.path, 'wb') as fp_:
+            self.serial.dump(self.minions, fp_)
+        self.dirty = False
+
+
+def load(opts):
+    '''
+    Return the presence table saved by the master, as a dict of the entries of
+    the minions by id. The table is only read again when it changed.
+    '''
+    path = table_path(opts)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if path in _SNAPSHOTS and _SNAPSHOTS[path][0] == mtime:
+        return _SNAPSHOTS[path][1]
+    try:
+        with salt.utils.files.fopen(path, 'rb') as fp_:
+            minions = salt.payload.Serial(opts).load(fp_)
+    except Exception as exc:  # pylint: disable=broad-except
+        log.error('Unable to read the presence table %s: %s', path, exc)
+        return {}
+    _SNAPSHOTS[path] = (mtime, minions)
+    return minions
+
+
+def present(opts, minions=None):
+    '''
+    Return the sorted list of the ids of the present minions, among the given
+    minions or all of them
+    '''
+    now = time.time()
+    timeout = opts.get('presence_timeout', 300)
+    table = load(opts)
+    if minions is None:
+        minions = table
+    return sorted(id_ for id_ in minions
+                  if id_ in table and is_present(table[id_], timeout, now))
+
+
+class PresenceTracker(salt.utils.process.SignalHandlingMultiprocessingProcess):
+    '''
+    The master process keeping the presence table up to date
+    '''
+    def __init__(self, opts, **kwargs):
+        super(PresenceTracker, self).__init__(**kwargs)
+        self.opts = opts
+
+    # __setstate__ and __getstate__ are only used on Windows.
+    # We do this so that __init__ will be invoked on Windows in the child
+    # process so that a register_after_fork() equivalent will work on Windows.
+    def __setstate__(self, state):
+        self._is_child = True
+        self.__init__(
+            state['opts'],
+            log_queue=state['log_queue'],
+            log_queue_level=state['log_queue_level']
+        )
+
+    def __getstate__(self):
+        return {
+            'opts': self.opts,
+            'log_queue': self.log_queue,
+            'log_queue_level': self.log_queue_level
+        }
+
+    def run(self):
+        '''
+        Follow the master event bus and save the table every
+        presence_save_interval seconds when it changed
+        '''
+        salt.utils.process.appendproctitle(self.__class__.__name__)
+        table = PresenceTable(self.opts)
+        table.load()
+        interval = self.opts.get('presence_save_interval', 1)
+        saved = 0
+        with salt.utils.event.get_master_event(
+                self.opts, self.opts['sock_dir'], listen=True) as event:
+            while True:
+                data = event.get_event(wait=interval, full=True)
+                if data is not None:
+                    table.update(data['tag'], data['data'])
+                now = time.time()
+                if now - saved >= interval:
+                    try:
+                        table.save()
+                    except (IOError, OSError) as exc:
+                        log.error('Unable to save the presence table: %s', exc)
+                    saved = now
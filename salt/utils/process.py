@@ -5,7 +5,9 @@ Functions for daemonizing and otherwise modifying running processes
 
 # Import python libs
 from __future__ import absolute_import, with_statement, print_function, unicode_literals
+import collections
 import copy
+import itertools
 import os
 import sys
 import time
@@ -344,6 +346,150 @@ class ThreadPool(object):
                 log.debug(err, exc_info=True)
 
 
+class KeyedThreadPool(object):
+    '''
+    A thread pool running the tasks fired with the same key one after the
+    other, in the order they were fired, and the tasks of different keys
+    concurrently. The tasks fired without a key are not ordered.
+
+    Each task may also be of a kind, ``limits`` mapping kinds to the maximum
+    number of tasks of that kind running at once.
+
+    Like ThreadPool, it only supports daemonized threads and will *not*
+    return results.
+    '''
+    def __init__(self,
+                 num_threads=None,
+                 queue_size=0,
+                 limits=None):
+        if num_threads is None:
+            num_threads = multiprocessing.cpu_count()
+        self.num_threads = num_threads
+        self.queue_size = queue_size
+        self.limits = limits or {}
+
+        self._cond = threading.Condition()
+        # The tasks waiting, by key
+        self._pending = {}
+        # The keys with a task waiting and no task running, by kind of their
+        # next task, with the sequence number of the key becoming ready
+        self._ready = {}
+        self._seq = itertools.count()
+        self._running_keys = set()
+        self._running_kinds = collections.defaultdict(int)
+        self._size = 0
+
+        self._workers = []
+        for _ in range(num_threads):
+            thread = threading.Thread(target=self._thread_target)
+            thread.daemon = True
+            thread.start()
+            self._workers.append(thread)
+
+    def qsize(self):
+        '''
+        Return the number of tasks waiting to run
+        '''
+        return self._size
+
+    def full(self):
+        '''
+        Return whether the queue is full
+        '''
+        return 0 < self.queue_size <= self._size
+
+    def fire_async(self, func, args=None, kwargs=None, key=None, kind=None):
+        '''
+        Queue a task, returning False if the queue is full
+        '''
+        if args is None:
+            args = []
+        if kwargs is None:
+            kwargs = {}
+        if key is None:
+            # Not ordered with any other task
+            key = object()
+        with self._cond:
+            if self.full():
+                return False
+            tasks = self._pending.get(key)
+            if tasks is None:
+                tasks = self._pending[key] = collections.deque()
+                tasks.append((kind, func, args, kwargs))
+                if key not in self._running_keys:
+                    self._make_ready(key)
+            else:
+                tasks.append((kind, func, args, kwargs))
+            self._size += 1
+            self._cond.notify()
+        return True
+
+    def _make_ready(self, key):
+        '''
+        Queue a key whose next task may run, the condition being held
+        '''
+        kind = self._pending[key][0][0]
+        keys = self._ready.get(kind)
+        if keys is None:
+            keys = self._ready[kind] = collections.deque()
+        keys.append((next(self._seq), key))
+
+    def _next_task(self):
+        '''
+        Pop the next task which may run, the condition being held
+
+        Of the first ready keys of the kinds below their limit, the one which
+        became ready first runs, so a dequeue only takes a step per kind.
+        '''
+        next_kind = next_keys = None
+        for kind, keys in six.iteritems(self._ready):
+            limit = self.limits.get(kind)
+            if limit is not None and self._running_kinds[kind] >= limit:
+                continue
+            if next_keys is None or keys[0][0] < next_keys[0][0]:
+                next_kind, next_keys = kind, keys
+        if next_keys is None:
+            return None, None
+        keys = next_keys
+        _, key = keys.popleft()
+        if not keys:
+            del self._ready[next_kind]
+        tasks = self._pending[key]
+        task = tasks.popleft()
+        if not tasks:
+            del self._pending[key]
+        self._running_keys.add(key)
+        self._running_kinds[next_kind] += 1
+        self._size -= 1
+        return key, task
+
+    def _thread_target(self):
+        while True:
+            with self._cond:
+                key, task = self._next_task()
+                if task is None:
+                    # 1s timeout so that if the parent dies this thread will
+                    # die within 1s
+                    self._cond.wait(1)
+                    continue
+            kind, func, args, kwargs = task
+            try:
+                log.debug(
+                    'KeyedThreadPool executing func: %s with args=%s kwargs=%s',
+                    func, args, kwargs
+                )
+                func(*args, **kwargs)
+            except Exception as err:
+                log.debug(err, exc_info=True)
+            finally:
+                with self._cond:
+                    self._running_keys.discard(key)
+                    self._running_kinds[kind] -= 1
+                    if key in self._pending:
+                        self._make_ready(key)
+                    self._cond.notify_all()
+
+
 class ProcessManager(object):
     '''
     A class which will manage processes that should be running
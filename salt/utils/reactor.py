@@ -7,9 +7,15 @@ Functions which implement running reactor jobs
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
 import collections
+import copy
+import datetime
 import fnmatch
 import glob
+import hashlib
 import logging
+import os
+import re
+import threading
 import time
 
 # Import salt libs
@@ -21,6 +27,8 @@ import salt.utils.cache
 import salt.utils.data
 import salt.utils.event
 import salt.utils.files
+import salt.payload
+import salt.utils.atomicfile
 import salt.utils.master
 import salt.utils.process
 import salt.utils.yaml
@@ -44,6 +52,87 @@ REACTOR_INTERNAL_KEYWORDS = frozenset([
 ])
 
 
+# The glob special characters
+_GLOB_CHARS_RE = re.compile(r'[*?[]')
+
+# The renderers whose output only depends on the event, for the reactor SLS
+# files which do not call salt functions
+_CACHEABLE_RENDERERS = frozenset(['jinja', 'yaml', 'yamlex', 'json'])
+
+# The number of renderings cached for each reactor SLS file
+RENDER_CACHE_SIZE = 128
+
+
+def _event_digest(opts, data):
+    '''
+    Return the digest of the data of an event, without its timestamp
+    '''
+    if isinstance(data, dict):
+        data = dict((key, val) for key, val in six.iteritems(data) if key != '_stamp')
+    return hashlib.sha256(salt.payload.Serial(opts).dumps(data)).hexdigest()
+
+
+def _new_stats():
+    return {'mean': 0, 'latency': 0, 'runs': 0}
+
+
+class ReactorMap(object):
+    '''
+    The reactor map compiled for dispatching the events: the literal tags are
+    looked up in a dict, the globs whose only wildcard is a trailing ``*`` in
+    a prefix trie, and the other globs are matched as compiled regular
+    expressions. The reactors are returned in the order of the map.
+    '''
+    def __init__(self, react_map):
+        self.literals = {}
+        self.trie = {}
+        self.patterns = []
+        self.reactors = []
+        for ropt in react_map or []:
+            if not isinstance(ropt, dict):
+                continue
+            if len(ropt) != 1:
+                continue
+            key = next(six.iterkeys(ropt))
+            val = ropt[key]
+            if isinstance(val, six.string_types):
+                val = [val]
+            elif not isinstance(val, list):
+                continue
+            key = six.text_type(key)
+            idx = len(self.reactors)
+            self.reactors.append(val)
+            if not _GLOB_CHARS_RE.search(key):
+                self.literals.setdefault(key, []).append(idx)
+            elif key.endswith('*') and not _GLOB_CHARS_RE.search(key[:-1]):
+                node = self.trie
+                for char in key[:-1]:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, []).append(idx)
+            else:
+                self.patterns.append((idx, re.compile(fnmatch.translate(key))))
+
+    def match(self, tag):
+        '''
+        Return the list of the reactors matching a tag
+        '''
+        matches = list(self.literals.get(tag, ()))
+        node = self.trie
+        matches.extend(node.get(None, ()))
+        for char in tag:
+            node = node.get(char)
+            if node is None:
+                break
+            matches.extend(node.get(None, ()))
+        for idx, pattern in self.patterns:
+            if pattern.match(tag):
+                matches.append(idx)
+        reactors = []
+        for idx in sorted(matches):
+            reactors.extend(self.reactors[idx])
+        return reactors
+
+
 class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.state.Compiler):
     '''
     Read in the reactor configuration variable and compare it to events
@@ -55,16 +144,31 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
         'cmd': 'local',
     }
 
-    def __init__(self, opts, **kwargs):
+    def __init__(self, opts, shared_event=None, **kwargs):
         super(Reactor, self).__init__(**kwargs)
+        # The SharedEvent of an engine host to read the events from, instead
+        # of subscribing to the bus
+        self.shared_event = shared_event
         local_minion_opts = opts.copy()
         local_minion_opts['file_client'] = 'local'
         self.minion = salt.minion.MasterMinion(local_minion_opts)
         salt.state.Compiler.__init__(self, opts, self.minion.rend)
         self.event = salt.utils.event.get_master_event(opts, opts['sock_dir'], listen=False)
-        self.stats = collections.defaultdict(lambda: {'mean': 0, 'latency': 0, 'runs': 0})
+        self.stats = collections.defaultdict(_new_stats)
+        self.reactor_stats = collections.defaultdict(_new_stats)
         self.stat_clock = time.time()
         self.is_leader = True
+        # The compiled reactor map and the key telling when to compile it
+        # again
+        self._reactor_map = None
+        self._reactor_map_key = None
+        # The renderings of the reactor SLS files by event, and the reactions
+        # compiled from them
+        self._render_cache = {}
+        self._reaction_cache = {}
+        # The time the recently handled events were received at, to coalesce
+        # the repeated ones
+        self._recent_events = collections.OrderedDict()
 
     # We need __setstate__ and __getstate__ to avoid pickling errors since
     # 'self.rend' (from salt.state.Compiler) contains a function reference
@@ -93,16 +197,92 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
         end_time = time.time()
         if end_time - self.stat_clock > self.opts['master_stats_event_iter']:
             # Fire the event with the stats and wipe the tracker
-            self.event.fire_event({'time': end_time - self.stat_clock, 'worker': self.name, 'stats': stats}, tagify(self.name, 'stats'))
-            self.stats = collections.defaultdict(lambda: {'mean': 0, 'latency': 0, 'runs': 0})
+            self.event.fire_event({'time': end_time - self.stat_clock,
+                                   'worker': self.name,
+                                   'stats': stats,
+                                   'reactors': self.reactor_stats},
+                                  tagify(self.name, 'stats'))
+            self.stats = collections.defaultdict(_new_stats)
+            self.reactor_stats = collections.defaultdict(_new_stats)
             self.stat_clock = end_time
 
-    def render_reaction(self, glob_ref, tag, data):
+    def _update_reactor_stats(self, reactors, start_time, data):
         '''
-        Execute the render system against a single reaction file and return
-        the data structure
+        Update the mean duration of the reactions of each reactor SLS, and
+        their mean latency since the event was fired
+        '''
+        end_time = time.time()
+        latency = None
+        try:
+            stamp = datetime.datetime.strptime(data['_stamp'], '%Y-%m-%dT%H:%M:%S.%f')
+            latency = start_time - (stamp - datetime.datetime(1970, 1, 1)).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            pass
+        for fn_ in reactors:
+            stats = self.reactor_stats[fn_]
+            stats['runs'] += 1
+            stats['mean'] += (end_time - start_time - stats['mean']) / stats['runs']
+            if latency is not None:
+                stats['latency'] += (latency - stats['latency']) / stats['runs']
+
+    def _cacheable(self, fn_):
+        '''
+        Return whether the renderers of a reactor SLS file only use the event,
+        read from its shebang line or the renderer option
+        '''
+        try:
+            with salt.utils.files.fopen(fn_, 'r') as fp_:
+                line = fp_.readline()
+        except (IOError, OSError):
+            return False
+        pipe = line[2:] if line.startswith('#!') else self.opts.get('renderer', '')
+        renderers = [part.split()[0] for part in pipe.split('|') if part.strip()]
+        return bool(renderers) and all(
+            renderer in _CACHEABLE_RENDERERS for renderer in renderers)
+
+    def _cached_render(self, fn_, tag, data):
+        '''
+        Return the cache entry of the rendering of a reactor SLS file for an
+        event, whose ``high`` is None until the file is rendered. Return None
+        if the file cannot be cached.
+        '''
+        if not self.opts.get('reactor_render_cache', False):
+            return None
+        try:
+            stat = os.stat(fn_)
+        except OSError:
+            return None
+        file_key = (fn_, stat.st_mtime, stat.st_size)
+        renders = self._render_cache.get(fn_)
+        if renders is None or renders['key'] != file_key:
+            renders = {'key': file_key,
+                       'cacheable': self._cacheable(fn_),
+                       'entries': collections.OrderedDict()}
+            self._render_cache[fn_] = renders
+        if not renders['cacheable']:
+            return None
+        try:
+            key = (file_key, tag, _event_digest(self.opts, data))
+        except Exception:
+            return None
+        entries = renders['entries']
+        entry = entries.pop(key, None)
+        if entry is None:
+            entry = {'key': key, 'high': None}
+            if len(entries) >= RENDER_CACHE_SIZE:
+                entries.popitem(last=False)
+        # The most recently used renderings are the last ones
+        entries[key] = entry
+        return entry
+
+    def _render_reaction(self, glob_ref, tag, data):
+        '''
+        Render a reaction file, returning the data structure and the cache
+        keys of the files rendered, or None as keys if a rendering cannot be
+        cached. The renderings from the cache are not copied.
         '''
         react = {}
+        keys = []
 
         if glob_ref.startswith('salt://'):
             glob_ref = self.minion.functions['cp.cache_file'](glob_ref) or ''
@@ -110,6 +290,14 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
         if not globbed_ref:
             log.error('Can not render SLS %s for tag %s. File missing or not found.', glob_ref, tag)
         for fn_ in globbed_ref:
+            entry = self._cached_render(fn_, tag, data)
+            if entry is None:
+                keys = None
+            elif entry['high'] is not None:
+                react.update(entry['high'])
+                if keys is not None:
+                    keys.append(entry['key'])
+                continue
             try:
                 res = self.render_template(
                     fn_,
@@ -121,10 +309,51 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                 for name in res:
                     res[name]['__sls__'] = fn_
 
+                if entry is not None:
+                    entry['high'] = copy.deepcopy(res)
+                    if keys is not None:
+                        keys.append(entry['key'])
                 react.update(res)
             except Exception:
+                keys = None
                 log.exception('Failed to render "%s": ', fn_)
-        return react
+        return react, keys
+
+    def render_reaction(self, glob_ref, tag, data):
+        '''
+        Execute the render system against a single reaction file and return
+        the data structure
+        '''
+        return copy.deepcopy(self._render_reaction(glob_ref, tag, data)[0])
+
+    def reactor_map(self):
+        '''
+        Return the compiled reactor map, only compiling it again when it
+        changed
+        '''
+        reactor = self.opts['reactor']
+        if isinstance(reactor, six.string_types):
+            try:
+                key = (reactor, os.path.getmtime(reactor))
+            except OSError:
+                key = None
+        else:
+            key = id(reactor)
+        if key is None or key != self._reactor_map_key:
+            react_map = []
+            if isinstance(reactor, six.string_types):
+                try:
+                    with salt.utils.files.fopen(reactor) as fp_:
+                        react_map = salt.utils.yaml.safe_load(fp_)
+                except (OSError, IOError):
+                    log.error('Failed to read reactor map: "%s"', reactor)
+                except Exception:
+                    log.error('Failed to parse YAML in reactor map: "%s"', reactor)
+            else:
+                react_map = reactor
+            self._reactor_map = ReactorMap(react_map)
+            self._reactor_map_key = key
+        return self._reactor_map
 
     def list_reactors(self, tag):
         '''
@@ -132,30 +361,32 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
         process
         '''
         log.debug('Gathering reactors for tag %s', tag)
-        reactors = []
-        if isinstance(self.opts['reactor'], six.string_types):
-            try:
-                with salt.utils.files.fopen(self.opts['reactor']) as fp_:
-                    react_map = salt.utils.yaml.safe_load(fp_)
-            except (OSError, IOError):
-                log.error('Failed to read reactor map: "%s"', self.opts['reactor'])
-            except Exception:
-                log.error('Failed to parse YAML in reactor map: "%s"', self.opts['reactor'])
-        else:
-            react_map = self.opts['reactor']
-        for ropt in react_map:
-            if not isinstance(ropt, dict):
-                continue
-            if len(ropt) != 1:
-                continue
-            key = next(six.iterkeys(ropt))
-            val = ropt[key]
-            if fnmatch.fnmatch(tag, key):
-                if isinstance(val, six.string_types):
-                    reactors.append(val)
-                elif isinstance(val, list):
-                    reactors.extend(val)
-        return reactors
+        return self.reactor_map().match(tag)
+
+    def coalesce(self, tag, data):
+        '''
+        Return whether an event repeats an event handled less than
+        reactor_coalesce_window seconds ago, with the same tag and data
+        '''
+        window = self.opts.get('reactor_coalesce_window', 0)
+        if not window:
+            return False
+        now = time.time()
+        # The events are ordered by the time they were received at
+        while self._recent_events:
+            key, received = next(six.iteritems(self._recent_events))
+            if now - received < window:
+                break
+            del self._recent_events[key]
+        try:
+            digest = _event_digest(self.opts, data)
+        except Exception:
+            return False
+        key = (tag, digest)
+        if key in self._recent_events:
+            return True
+        self._recent_events[key] = now
+        return False
 
     def list_all(self):
         '''
@@ -189,6 +420,7 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                 return {'status': False, 'comment': 'Reactor already exists.'}
 
         self.minion.opts['reactor'].append({tag: reaction})
+        self._reactor_map_key = None
         return {'status': True, 'comment': 'Reactor added.'}
 
     def delete_reactor(self, tag):
@@ -200,10 +432,25 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
             _tag = next(six.iterkeys(reactor))
             if _tag == tag:
                 self.minion.opts['reactor'].remove(reactor)
+                self._reactor_map_key = None
                 return {'status': True, 'comment': 'Reactor deleted.'}
 
         return {'status': False, 'comment': 'Reactor does not exists.'}
 
+    def filter_publisher(self, event):
+        '''
+        Ask the event publisher to only send the events matching a reactor
+        or managing the reactors
+        '''
+        if not isinstance(self.minion.opts['reactor'], list):
+            # The reactors are read again for each event
+            return
+        tags = ['*salt/reactors/manage*']
+        for ropt in self.minion.opts['reactor']:
+            if isinstance(ropt, dict) and len(ropt) == 1:
+                tags.append(next(six.iterkeys(ropt)))
+        event.filter_publisher(tags, match_type='fnmatch')
+
     def resolve_aliases(self, chunks):
         '''
         Preserve backward compatibility by rewriting the 'state' key in the low
@@ -221,9 +468,22 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
         log.debug('Compiling reactions for tag %s', tag)
         high = {}
         chunks = []
+        cache_keys = []
         try:
             for fn_ in reactors:
-                high.update(self.render_reaction(fn_, tag, data))
+                react, keys = self._render_reaction(fn_, tag, data)
+                high.update(react)
+                if keys is None or cache_keys is None:
+                    cache_keys = None
+                else:
+                    cache_keys.extend(keys)
+            reactors_key = tuple(reactors)
+            if cache_keys is not None:
+                cached = self._reaction_cache.get(reactors_key)
+                if cached is not None and cached[0] == cache_keys:
+                    return copy.deepcopy(cached[1])
+            # The renderings from the cache are shared
+            high = copy.deepcopy(high)
             if high:
                 errors = self.verify_high(high)
                 if errors:
@@ -236,16 +496,32 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                 chunks = self.order_chunks(self.compile_high_data(high))
         except Exception as exc:
             log.exception('Exception encountered while compiling reactions')
+            cache_keys = None
 
         self.resolve_aliases(chunks)
+        if cache_keys is not None:
+            self._reaction_cache[reactors_key] = (cache_keys, copy.deepcopy(chunks))
         return chunks
 
-    def call_reactions(self, chunks):
+    def reaction_key(self, data):
+        '''
+        Return the key ordering the reactions to an event, the value of the
+        reactor_queue_key field of its data
+        '''
+        field = self.opts.get('reactor_queue_key')
+        if not field or not isinstance(data, dict):
+            return None
+        key = data.get(field)
+        if isinstance(key, (list, dict)):
+            return None
+        return key
+
+    def call_reactions(self, chunks, key=None):
         '''
         Execute the reaction state
         '''
         for chunk in chunks:
-            self.wrap.run(chunk)
+            self.wrap.run(chunk, key=key)
 
     def run(self):
         '''
@@ -254,13 +530,17 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
         salt.utils.process.appendproctitle(self.__class__.__name__)
 
         # instantiate some classes inside our new process
-        with salt.utils.event.get_event(
+        event = self.shared_event
+        if event is None:
+            event = salt.utils.event.get_event(
                 self.opts['__role'],
                 self.opts['sock_dir'],
                 self.opts['transport'],
                 opts=self.opts,
-                listen=True) as event:
+                listen=True)
+        with event:
             self.wrap = ReactWrap(self.opts)
+            self.filter_publisher(event)
 
             for data in event.iter_events(full=True):
                 # skip all events fired by ourselves
@@ -287,6 +567,7 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                 if data['tag'].endswith('salt/reactors/manage/add'):
                     _data = data['data']
                     res = self.add_reactor(_data['event'], _data['reactors'])
+                    self.filter_publisher(event)
                     event.fire_event({'reactors': self.list_all(),
                                            'result': res,
                                            'user': self.wrap.event_user},
@@ -294,6 +575,7 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                 elif data['tag'].endswith('salt/reactors/manage/delete'):
                     _data = data['data']
                     res = self.delete_reactor(_data['event'])
+                    self.filter_publisher(event)
                     event.fire_event({'reactors': self.list_all(),
                                            'result': res,
                                            'user': self.wrap.event_user},
@@ -310,17 +592,23 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                     reactors = self.list_reactors(data['tag'])
                     if not reactors:
                         continue
+                    if self.coalesce(data['tag'], data['data']):
+                        log.debug('Coalescing the repeated event %s', data['tag'])
+                        continue
+                    reaction_start = time.time()
                     chunks = self.reactions(data['tag'], data['data'], reactors)
                     if chunks:
                         if self.opts['master_stats']:
                             _data = data['data']
                             start = time.time()
                         try:
-                            self.call_reactions(chunks)
+                            self.call_reactions(
+                                chunks, key=self.reaction_key(data['data']))
                         except SystemExit:
                             log.warning('Exit ignored by reactor')
 
                         if self.opts['master_stats']:
+                            self._update_reactor_stats(reactors, reaction_start, _data)
                             stats = salt.utils.event.update_stats(self.stats, start, _data)
                             self._post_stats(stats)
 
@@ -340,15 +628,34 @@ class ReactWrap(object):
         'caller': salt.client.Caller,
     }
 
+    # The minimum number of seconds between two backpressure events
+    backpressure_interval = 1
+
     def __init__(self, opts):
         self.opts = opts
         if ReactWrap.client_cache is None:
             ReactWrap.client_cache = salt.utils.cache.CacheDict(opts['reactor_refresh_interval'])
 
-        self.pool = salt.utils.process.ThreadPool(
-            self.opts['reactor_worker_threads'],  # number of workers for runner/wheel
-            queue_size=self.opts['reactor_worker_hwm']  # queue size for those workers
+        # The reactions sharing a key run in order, at most
+        # reactor_worker_limits[type] reactions of a type running at once
+        self.pool = salt.utils.process.KeyedThreadPool(
+            self.opts['reactor_worker_threads'],  # number of workers
+            queue_size=self.opts['reactor_worker_hwm'],  # queue size for those workers
+            limits=self.opts.get('reactor_worker_limits')
         )
+        # The key of the reaction being run by each thread
+        self._local = threading.local()
+        # Held while firing reactions, so that the spooled ones keep their
+        # order
+        self._lock = threading.RLock()
+        self._event = None
+        self._backpressure_time = 0
+        self._dropped = 0
+        self.spool_dir = os.path.join(self.opts['cachedir'], 'reactor_spool')
+        self._spool_seq = 0
+        self._spool_thread = None
+        if self.opts.get('reactor_spool') and self._spooled():
+            self._start_spool_thread()
 
     def populate_client_cache(self, low):
         '''
@@ -375,11 +682,161 @@ class ReactWrap(object):
                 self.client_cache[reaction_type] = \
                     self.reaction_class[reaction_type](self.opts['conf_file'])
 
-    def run(self, low):
+    def _fire_event(self, data, tag):
+        if self._event is None:
+            self._event = salt.utils.event.get_event(
+                self.opts.get('__role', 'master'),
+                self.opts['sock_dir'],
+                self.opts['transport'],
+                opts=self.opts,
+                listen=False)
+        data['user'] = self.event_user
+        self._event.fire_event(data, tag)
+
+    def _backpressure(self, kind):
+        '''
+        Let the listeners of the event bus know the reactions are piling up
+        '''
+        now = time.time()
+        if now - self._backpressure_time < self.backpressure_interval:
+            return
+        self._backpressure_time = now
+        try:
+            self._fire_event({'type': kind,
+                              'queued': self.pool.qsize(),
+                              'hwm': self.opts['reactor_worker_hwm'],
+                              'dropped': self._dropped,
+                              'spooled': len(self._spooled())},
+                             'salt/reactor/backpressure')
+        except Exception as exc:
+            log.error('Failed to fire the reactor backpressure event: %s', exc)
+        self._dropped = 0
+
+    def _spooled(self):
+        '''
+        Return the paths of the spooled reactions, in order
+        '''
+        try:
+            names = sorted(os.listdir(self.spool_dir))
+        except OSError:
+            return []
+        return [os.path.join(self.spool_dir, name) for name in names
+                if name.endswith('.p')]
+
+    def _spool(self, kind, key, args, kwargs):
+        '''
+        Write a reaction the workers have no room for to the spool
+        '''
+        if not os.path.isdir(self.spool_dir):
+            os.makedirs(self.spool_dir)
+        self._spool_seq += 1
+        path = os.path.join(
+            self.spool_dir,
+            '{0:020d}-{1:010d}.p'.format(int(time.time() * 1000000), self._spool_seq))
+        try:
+            with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+                salt.payload.Serial(self.opts).dump(
+                    {'type': kind, 'key': key, 'args': list(args), 'kwargs': kwargs},
+                    fp_)
+        except Exception as exc:
+            log.error('Failed to spool a %s reaction: %s', kind, exc)
+            return False
+        self._start_spool_thread()
+        return True
+
+    def _client_func(self, kind):
+        '''
+        Return the function of the client of a type which runs its reactions
+        '''
+        self.populate_client_cache({'state': kind})
+        client = self.client_cache[kind]
+        if kind in ('runner', 'wheel'):
+            return client.low
+        if kind == 'local':
+            return client.cmd_async
+        return client.cmd
+
+    def drain_spool(self):
+        '''
+        Queue the spooled reactions the workers have room for, in order,
+        returning whether the spool is empty
+        '''
+        with self._lock:
+            for path in self._spooled():
+                if self.pool.full():
+                    return False
+                try:
+                    with salt.utils.files.fopen(path, 'rb') as fp_:
+                        spooled = salt.payload.Serial(self.opts).load(fp_)
+                    func = self._client_func(spooled['type'])
+                    self.pool.fire_async(func,
+                                         args=spooled['args'],
+                                         kwargs=spooled['kwargs'],
+                                         key=spooled['key'],
+                                         kind=spooled['type'])
+                except Exception as exc:
+                    log.error('Failed to run the spooled reaction %s: %s', path, exc)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return True
+
+    def _drain_spool_loop(self):
+        while True:
+            try:
+                if self.drain_spool():
+                    break
+            except Exception as exc:
+                log.error('Failed to drain the reactor spool: %s', exc)
+            time.sleep(0.1)
+        with self._lock:
+            self._spool_thread = None
+            if self._spooled():
+                # Spooled while the thread was exiting
+                self._start_spool_thread()
+
+    def _start_spool_thread(self):
+        with self._lock:
+            if self._spool_thread is not None:
+                return
+            self._spool_thread = threading.Thread(target=self._drain_spool_loop)
+            self._spool_thread.daemon = True
+            self._spool_thread.start()
+
+    def _fire(self, kind, func, args=(), kwargs=None):
+        '''
+        Queue a reaction with the key of the reaction being run, spooling it
+        when the queue is full and reactor_spool is enabled. Return False if
+        the reaction is dropped.
+        '''
+        if kwargs is None:
+            kwargs = {}
+        key = getattr(self._local, 'key', None)
+        with self._lock:
+            spool = self.opts.get('reactor_spool')
+            # Once a reaction is spooled the next ones are too, until the
+            # spool is drained, so that they run in order
+            if not (spool and self._spool_thread is not None) \
+                    and self.pool.fire_async(func, args=args, kwargs=kwargs,
+                                             key=key, kind=kind):
+                return True
+            if spool and self._spool(kind, key, args, kwargs):
+                ret = True
+            else:
+                self._dropped += 1
+                ret = False
+            self._backpressure(kind)
+            return ret
+
+    def run(self, low, key=None):
         '''
         Execute a reaction by invoking the proper wrapper func
+
+        The reactions run with the same key run in order.
         '''
         self.populate_client_cache(low)
+        self._local.key = key
         try:
             l_fun = getattr(self, low['state'])
         except AttributeError:
@@ -488,27 +945,45 @@ class ReactWrap(object):
                 'Reactor \'%s\' failed to execute %s \'%s\'',
                 low['__id__'], low['state'], low['fun'], exc_info=True
             )
+        finally:
+            self._local.key = None
 
     def runner(self, fun, **kwargs):
         '''
         Wrap RunnerClient for executing :ref:`runner modules <all-salt.runners>`
         '''
-        return self.pool.fire_async(self.client_cache['runner'].low, args=(fun, kwargs))
+        return self._fire('runner', self.client_cache['runner'].low, args=(fun, kwargs))
 
     def wheel(self, fun, **kwargs):
         '''
         Wrap Wheel to enable executing :ref:`wheel modules <all-salt.wheel>`
         '''
-        return self.pool.fire_async(self.client_cache['wheel'].low, args=(fun, kwargs))
+        return self._fire('wheel', self.client_cache['wheel'].low, args=(fun, kwargs))
+
+    def _queue_all(self):
+        '''
+        Return whether the local and caller reactions are queued on the
+        workers, only when the reactions are ordered by reactor_queue_key.
+        Otherwise they run inline and are never dropped.
+        '''
+        return bool(self.opts.get('reactor_queue_key'))
 
     def local(self, fun, tgt, **kwargs):
         '''
         Wrap LocalClient for running :ref:`execution modules <all-salt.modules>`
         '''
-        self.client_cache['local'].cmd_async(tgt, fun, **kwargs)
+        if not self._queue_all():
+            self.client_cache['local'].cmd_async(tgt, fun, **kwargs)
+            return None
+        return self._fire('local', self.client_cache['local'].cmd_async,
+                          args=(tgt, fun), kwargs=kwargs)
 
     def caller(self, fun, **kwargs):
         '''
         Wrap LocalCaller to execute remote exec functions locally on the Minion
         '''
-        self.client_cache['caller'].cmd(fun, *kwargs['arg'], **kwargs['kwarg'])
+        if not self._queue_all():
+            self.client_cache['caller'].cmd(fun, *kwargs['arg'], **kwargs['kwarg'])
+            return None
+        return self._fire('caller', self.client_cache['caller'].cmd,
+                          args=[fun] + list(kwargs['arg']), kwargs=kwargs['kwarg'])
@@ -0,0 +1,565 @@
+# -*- coding: utf-8 -*-
+'''
+Record what a render depends on and cache rendered pillar SLS files.
+
+While a :class:`Recorder` is active, the files read by the renderers, the
+grains, pillar and minion specific options read through a
+:class:`TrackingDict` and the execution functions looked up through
+:class:`TrackingFunctions` are noted on it. A rendered pillar SLS file can be
+reused for as long as none of these changed, which is what
+:class:`RenderCache` checks. As the output only depends on what was noted, it
+can also be reused for other minions for which these are the same.
+
+.. versionadded:: Neon
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, unicode_literals
+import contextlib
+import copy
+import fnmatch
+import functools
+import logging
+import os
+import threading
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+# Import Salt Libs
+import salt.payload
+import salt.utils.hashutils
+import salt.utils.yamldumper
+from salt.defaults import DEFAULT_TARGET_DELIM
+from salt.ext import six
+from salt.utils.odict import OrderedDict
+
+log = logging.getLogger(__name__)
+
+SHARED_BANK = 'pillar_render_shared'
+
+# Execution functions which read the grains or pillar key given as their first
+# argument
+KEY_FUNCTIONS = {'grains.get': 'grains', 'pillar.get': 'pillar'}
+
+# The options a pillar SLS file may read which differ between minions
+MINION_OPTS = frozenset(('id', 'minion_id', 'pillarenv', 'saltenv'))
+
+_LOCAL = threading.local()
+
+_STATS = {'hits': 0, 'misses': 0, 'uncacheable': 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _count(stat):
+    with _STATS_LOCK:
+        _STATS[stat] += 1
+
+
+def stats(reset=False):
+    '''
+    Return the number of cache hits, misses and renders which could not be
+    cached in this process, and optionally start counting from zero again
+    '''
+    with _STATS_LOCK:
+        ret = dict(_STATS)
+        if reset:
+            for stat in _STATS:
+                _STATS[stat] = 0
+    return ret
+
+
+def _recorders():
+    return getattr(_LOCAL, 'recorders', ())
+
+
+@contextlib.contextmanager
+def paused():
+    '''
+    Do not note anything on the active recorders within a ``with`` block
+    '''
+    recorders = _recorders()
+    _LOCAL.recorders = ()
+    try:
+        yield
+    finally:
+        _LOCAL.recorders = recorders
+
+
+def note(kind, name):
+    '''
+    Note that the active recorders depend on ``name``. ``kind`` is one of
+    ``files``, ``grains``, ``pillar``, ``opts`` or ``functions``. A name of
+    None means the whole grains or pillar dict.
+    '''
+    for recorder in _recorders():
+        getattr(recorder, kind).add(name)
+
+
+def note_uncacheable(reason):
+    '''
+    Note that the output of the active recorders cannot be cached
+    '''
+    for recorder in _recorders():
+        recorder.uncacheable = reason
+
+
+class Recorder(object):
+    '''
+    Collect the dependencies of the renders run within a ``with`` block
+    '''
+    def __init__(self):
+        self.files = set()
+        self.grains = set()
+        self.pillar = set()
+        self.opts = set()
+        self.functions = set()
+        self.uncacheable = None
+
+    def __enter__(self):
+        _LOCAL.recorders = _recorders() + (self,)
+        return self
+
+    def __exit__(self, *exc_info):
+        _LOCAL.recorders = tuple(rec for rec in _recorders() if rec is not self)
+
+
+class TrackingDict(dict):
+    '''
+    A dict which notes the keys read from it on the active recorders. Anything
+    which looks at all of its keys is noted as depending on the whole dict.
+
+    If ``watch`` is given only reads of these keys are noted, and reads of the
+    whole dict are not.
+    '''
+    def __init__(self, kind, *args, **kwargs):
+        self.watch = kwargs.pop('watch', None)
+        super(TrackingDict, self).__init__(*args, **kwargs)
+        self.kind = kind
+
+    def __reduce_ex__(self, protocol):
+        return (TrackingDict, (self.kind, dict(self)), {'watch': self.watch})
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def _note(self, key):
+        if self.watch is None or key in self.watch:
+            note(self.kind, key)
+
+    def _note_all(self):
+        if self.watch is None:
+            note(self.kind, None)
+
+    def __getitem__(self, key):
+        self._note(key)
+        return super(TrackingDict, self).__getitem__(key)
+
+    def __contains__(self, key):
+        self._note(key)
+        return super(TrackingDict, self).__contains__(key)
+
+    def get(self, key, default=None):
+        self._note(key)
+        return super(TrackingDict, self).get(key, default)
+
+    def setdefault(self, key, default=None):
+        self._note(key)
+        return super(TrackingDict, self).setdefault(key, default)
+
+    def pop(self, key, *args):
+        self._note(key)
+        return super(TrackingDict, self).pop(key, *args)
+
+    def __iter__(self):
+        self._note_all()
+        return super(TrackingDict, self).__iter__()
+
+    def __len__(self):
+        self._note_all()
+        return super(TrackingDict, self).__len__()
+
+    def __eq__(self, other):
+        self._note_all()
+        return super(TrackingDict, self).__eq__(other)
+
+    def __ne__(self, other):
+        self._note_all()
+        return super(TrackingDict, self).__ne__(other)
+
+    __hash__ = None
+
+    def keys(self):
+        self._note_all()
+        return super(TrackingDict, self).keys()
+
+    def values(self):
+        self._note_all()
+        return super(TrackingDict, self).values()
+
+    def items(self):
+        self._note_all()
+        return super(TrackingDict, self).items()
+
+    def copy(self):
+        self._note_all()
+        return dict(super(TrackingDict, self).items())
+
+    if six.PY2:
+        def has_key(self, key):
+            return key in self
+
+        def iterkeys(self):
+            self._note_all()
+            return super(TrackingDict, self).iterkeys()
+
+        def itervalues(self):
+            self._note_all()
+            return super(TrackingDict, self).itervalues()
+
+        def iteritems(self):
+            self._note_all()
+            return super(TrackingDict, self).iteritems()
+
+
+# Templates may dump the grains or pillar with the yaml filter
+for _dumper in (salt.utils.yamldumper.OrderedDumper,
+                salt.utils.yamldumper.SafeOrderedDumper):
+    _dumper.add_representer(
+        TrackingDict,
+        salt.utils.yamldumper.yaml.representer.SafeRepresenter.represent_dict
+    )
+
+
+def _track_function(name, func):
+    '''
+    Note that the function ``name`` was looked up and return it, wrapped to
+    note the key it reads if it is one of the KEY_FUNCTIONS
+    '''
+    note('functions', name)
+    if name not in KEY_FUNCTIONS or not callable(func):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(key, *args, **kwargs):
+        if kwargs.get('pillarenv') or kwargs.get('saltenv'):
+            note_uncacheable('{0} compiles the pillar of another environment'.format(name))
+        delimiter = kwargs.get('delimiter', DEFAULT_TARGET_DELIM)
+        note(KEY_FUNCTIONS[name], six.text_type(key).split(delimiter)[0])
+        return func(key, *args, **kwargs)
+    return wrapper
+
+
+class _TrackingNamespace(object):
+    '''
+    Note the functions looked up with ``salt.<module>.<function>``
+    '''
+    def __init__(self, mod_name, wrapped):
+        self._mod_name = mod_name
+        self._wrapped = wrapped
+
+    def __getattr__(self, name):
+        return _track_function(
+            '{0}.{1}'.format(self._mod_name, name), getattr(self._wrapped, name))
+
+
+class TrackingFunctions(MutableMapping):
+    '''
+    Wrap the execution module loader handed to the renderers and note the
+    functions which are looked up
+    '''
+    def __init__(self, functions):
+        self._functions = functions
+
+    def __getitem__(self, key):
+        return _track_function(key, self._functions[key])
+
+    def __setitem__(self, key, value):
+        self._functions[key] = value
+
+    def __delitem__(self, key):
+        del self._functions[key]
+
+    def __contains__(self, key):
+        return key in self._functions
+
+    def __iter__(self):
+        return iter(self._functions)
+
+    def __len__(self):
+        return len(self._functions)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        attr = getattr(self._functions, name)
+        if hasattr(type(self._functions), name):
+            # An attribute of the loader itself rather than a module
+            return attr
+        return _TrackingNamespace(name, attr)
+
+
+class RenderCache(object):
+    '''
+    Cache the rendered pillar SLS files and external pillar data of a minion
+
+    A rendered SLS file is reused for as long as the files, grains, pillar
+    keys and minion specific options it read are unchanged and it only looked
+    up execution functions matching
+    :conf_master:`pillar_render_cache_functions`.
+
+    The entries of a minion are kept together in the ``pillar_render/<minion
+    id>`` bank of the minion data cache. With
+    :conf_master:`pillar_render_cache_shared` the rendered SLS files are
+    instead kept in the ``pillar_render_shared`` bank, each with the variants
+    rendered for the different inputs it read, and are reused by all minions.
+    The shared entries used last are also kept in memory.
+
+    :param dict opts: The options of the Pillar being compiled
+    :param str minion_id: The minion the pillar is compiled for
+    :param cache: The ``salt.cache`` instance to use, the minion data cache
+        configured in ``opts`` by default
+    '''
+    # The shared entries used last by this process, most recent last
+    _memory = OrderedDict()
+    # Hashes of the files read by renders, by path, with their mtime and size
+    _file_stats = {}
+    _lock = threading.Lock()
+
+    def __init__(self, opts, minion_id, cache=None):
+        # Avoid circular import
+        import salt.cache
+        self.opts = opts
+        self.cache = cache or salt.cache.factory(opts)
+        self.serial = salt.payload.Serial(opts)
+        self.bank = 'pillar_render/{0}'.format(minion_id)
+        # Pillars compiled with different roots, such as git_pillar, and
+        # different pillarenvs get entries of their own
+        self.key = self.hash(
+            [opts.get('pillar_roots', {}), opts.get('pillarenv')])[:16]
+        self.functions = opts.get('pillar_render_cache_functions', [])
+        self.shared = opts.get('pillar_render_cache_shared', False)
+        self.variants = opts.get('pillar_render_cache_variants', 16)
+        self.memory_size = opts.get('pillar_render_cache_size', 1000)
+        self.entries = None
+        self.used = set()
+        self.dirty = False
+        self._file_hashes = {}
+
+    def hash(self, data):
+        '''
+        Return a hash of serializable data
+        '''
+        return salt.utils.hashutils.sha256_digest(self.serial.dumps(data))
+
+    def _value_hash(self, data, key):
+        if key is None:
+            return self.hash(dict(dict.items(data)))
+        if not dict.__contains__(data, key):
+            return None
+        return self.hash(dict.__getitem__(data, key))
+
+    def _file_hash(self, path):
+        # Files which were looked for but did not exist are hashed as None,
+        # creating them invalidates the render as well
+        if path not in self._file_hashes:
+            try:
+                fstat = os.stat(path)
+            except OSError:
+                self._file_hashes[path] = None
+                return None
+            stamp = (fstat.st_mtime, fstat.st_size)
+            cached = self._file_stats.get(path)
+            if cached is not None and cached[0] == stamp:
+                self._file_hashes[path] = cached[1]
+            else:
+                try:
+                    fhash = salt.utils.hashutils.get_hash(path)
+                except (IOError, OSError):
+                    fhash = None
+                self._file_stats[path] = (stamp, fhash)
+                self._file_hashes[path] = fhash
+        return self._file_hashes[path]
+
+    def _load(self):
+        if self.entries is None:
+            try:
+                entries = self.cache.fetch(self.bank, self.key)
+            except Exception as exc:  # pylint: disable=broad-except
+                log.warning('Unable to read the pillar render cache: %s', exc)
+                entries = None
+            self.entries = entries if isinstance(entries, dict) else {}
+        return self.entries
+
+    def deps(self, recorder, inputs):
+        '''
+        Return what the renders recorded by ``recorder`` depend on, or None if
+        their output cannot be cached. ``inputs`` maps ``grains``, ``pillar``
+        and ``opts`` to the dicts the renders read them from.
+        '''
+        if recorder.uncacheable:
+            log.trace('Not caching render: %s', recorder.uncacheable)
+            _count('uncacheable')
+            return None
+        keys = {
+            'grains': set(recorder.grains),
+            'pillar': set(recorder.pillar),
+            'opts': set(recorder.opts),
+        }
+        for fun in recorder.functions:
+            if not any(fnmatch.fnmatch(fun, pat) for pat in self.functions):
+                log.trace('Not caching render, it calls %s', fun)
+                _count('uncacheable')
+                return None
+            if fun in KEY_FUNCTIONS:
+                continue
+            # These read the grains and pillar of the execution modules,
+            # which are not tracked
+            if fun.startswith(('grains.', 'config.')):
+                keys['grains'].add(None)
+            if fun.startswith(('pillar.', 'config.')):
+                keys['pillar'].add(None)
+        deps = {'files': dict((path, self._file_hash(path)) for path in recorder.files)}
+        for kind, kind_keys in six.iteritems(keys):
+            deps[kind] = dict(
+                (key, self._value_hash(inputs[kind], key)) for key in kind_keys)
+        return deps
+
+    def valid(self, deps, inputs):
+        '''
+        Return whether the recorded dependencies are unchanged
+        '''
+        for path, fhash in six.iteritems(deps['files']):
+            if self._file_hash(path) != fhash:
+                return False
+        for kind in ('grains', 'pillar', 'opts'):
+            for key, vhash in six.iteritems(deps.get(kind, {})):
+                if self._value_hash(inputs[kind], key) != vhash:
+                    return False
+        return True
+
+    def _files_valid(self, deps):
+        return all(
+            self._file_hash(path) == fhash
+            for path, fhash in six.iteritems(deps['files'])
+        )
+
+    def _shared_variants(self, ckey, reload=False):
+        '''
+        Return the variants of a shared entry, from memory unless ``reload``
+        '''
+        with self._lock:
+            variants = self._memory.get(ckey)
+            if variants is not None and not reload:
+                self._memory[ckey] = self._memory.pop(ckey)
+                return variants, True
+        try:
+            variants = self.cache.fetch(SHARED_BANK, ckey)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.warning('Unable to read the shared pillar render cache: %s', exc)
+            variants = None
+        if not isinstance(variants, list):
+            variants = []
+        self._remember(ckey, variants)
+        return variants, False
+
+    def _remember(self, ckey, variants):
+        with self._lock:
+            self._memory.pop(ckey, None)
+            self._memory[ckey] = variants
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def fetch(self, key, inputs):
+        '''
+        Return the cached output for ``key``, or None if there is none or one
+        of its dependencies changed
+        '''
+        ckey = self.hash([self.key, key])
+        if not self.shared:
+            entry = self._load().get(ckey)
+            if entry is None or not self.valid(entry['deps'], inputs):
+                _count('misses')
+                return None
+            self.used.add(ckey)
+            _count('hits')
+            return copy.deepcopy(entry['value'])
+
+        variants, in_memory = self._shared_variants(ckey)
+        for variant in variants:
+            if self.valid(variant['deps'], inputs):
+                _count('hits')
+                return copy.deepcopy(variant['value'])
+        if in_memory:
+            # Another process may have added the variant since
+            for variant in self._shared_variants(ckey, reload=True)[0]:
+                if self.valid(variant['deps'], inputs):
+                    _count('hits')
+                    return copy.deepcopy(variant['value'])
+        _count('misses')
+        return None
+
+    def store(self, key, deps, value):
+        '''
+        Cache the output for ``key``
+        '''
+        ckey = self.hash([self.key, key])
+        entry = {'deps': deps, 'value': copy.deepcopy(value)}
+        if not self.shared or 'fingerprint' in deps:
+            self._load()[ckey] = entry
+            self.used.add(ckey)
+            self.dirty = True
+            return
+
+        # Variants rendered from files which changed since are of no use
+        variants = [
+            variant for variant in self._shared_variants(ckey, reload=True)[0]
+            if self._files_valid(variant['deps'])
+        ]
+        variants.insert(0, entry)
+        del variants[self.variants:]
+        try:
+            self.cache.store(SHARED_BANK, ckey, variants)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.warning('Unable to write the shared pillar render cache: %s', exc)
+        self._remember(ckey, variants)
+
+    def fetch_ext(self, key, fingerprint):
+        '''
+        Return the cached output of an external pillar, if it was cached with
+        the same fingerprint
+        '''
+        ckey = self.hash([self.key, key])
+        entry = self._load().get(ckey)
+        if entry is None or entry['deps'] != {'fingerprint': self.hash(fingerprint)}:
+            _count('misses')
+            return None
+        self.used.add(ckey)
+        _count('hits')
+        return copy.deepcopy(entry['value'])
+
+    def store_ext(self, key, fingerprint, value):
+        '''
+        Cache the output of an external pillar with its fingerprint
+        '''
+        self.store(key, {'fingerprint': self.hash(fingerprint)}, value)
+
+    def save(self):
+        '''
+        Write the entries of the minion back, dropping the ones which were
+        not used by this compilation
+        '''
+        if self.entries is None and self.shared:
+            return
+        entries = self._load()
+        unused = set(entries) - self.used
+        if not self.dirty and not unused:
+            return
+        for ckey in unused:
+            del entries[ckey]
+        try:
+            self.cache.store(self.bank, self.key, entries)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.warning('Unable to write the pillar render cache: %s', exc)
+        self.dirty = False
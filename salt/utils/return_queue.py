@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+'''
+A persistent, coalescing queue for minion job returns.
+
+Job processes hand their return loads to the main minion process, which
+collects them in a :class:`ReturnQueue`. The queue batches whatever returns
+are pending into a single ``_return`` request, sends it over one long-lived
+request channel and keeps a copy of every pending return on disk, so returns
+produced while the master is unreachable are delivered once it comes back
+instead of being lost (the jobs themselves are never replayed).
+
+.. versionadded:: Neon
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, unicode_literals
+import itertools
+import logging
+import os
+import time
+
+# Import Salt Libs
+import salt.payload
+import salt.transport.client
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.hashutils
+from salt.exceptions import SaltReqTimeoutError
+from salt.ext import six
+from salt.utils.odict import OrderedDict
+
+# Import 3rd-party libs
+import tornado.gen
+import tornado.ioloop
+
+log = logging.getLogger(__name__)
+
+
+def queue_dir(opts):
+    '''
+    Return the directory pending returns to the configured master(s) are
+    persisted in.
+    '''
+    master = opts.get('master', '')
+    if isinstance(master, list):
+        master = ','.join(master)
+    return os.path.join(
+        opts['cachedir'],
+        'return_queue',
+        salt.utils.hashutils.sha1_digest(six.text_type(master))[:16]
+    )
+
+
+class ReturnQueue(object):
+    '''
+    Coalesce job returns into multi-load ``_return`` requests
+
+    :param dict opts: The minion options
+    :param io_loop: The io_loop the queue flushes on, defaults to the current
+        io_loop
+    :param retry_timer: A callable returning the number of seconds to wait
+        before retrying a failed send
+    '''
+    def __init__(self, opts, io_loop=None, retry_timer=None):
+        self.opts = opts
+        self.io_loop = io_loop or tornado.ioloop.IOLoop.current()
+        self.serial = salt.payload.Serial(opts)
+        self.pid = os.getpid()
+        self.batch_size = max(1, opts.get('return_queue_batch_size', 100))
+        self.flush_interval = opts.get('return_queue_flush_interval', 0.05)
+        self.persist = opts.get('return_queue_persist', True)
+        self.queue_dir = queue_dir(opts)
+        self.retry_timer = retry_timer or (lambda: opts.get('return_retry_timer', 5))
+        self.pending = OrderedDict()
+        self.channel = None
+        self._seq = itertools.count()
+        self._flushing = False
+        self._flush_handle = None
+        if self.persist:
+            self._load_pending()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def _load_pending(self):
+        '''
+        Requeue returns persisted by a previous minion process
+        '''
+        if not os.path.isdir(self.queue_dir):
+            return
+        for fn_ in sorted(os.listdir(self.queue_dir)):
+            if not fn_.endswith('.p'):
+                continue
+            path = os.path.join(self.queue_dir, fn_)
+            try:
+                with salt.utils.files.fopen(path, 'rb') as fp_:
+                    load = self.serial.load(fp_)
+            except Exception as exc:  # pylint: disable=broad-except
+                log.error('Discarding unreadable queued return %s: %s', path, exc)
+                self._remove(fn_[:-2])
+                continue
+            self.pending[fn_[:-2]] = load
+        if self.pending:
+            log.info(
+                'Requeued %d return(s) that could not be delivered to the '
+                'master before the minion stopped', len(self.pending)
+            )
+
+    def _path(self, key):
+        return os.path.join(self.queue_dir, '{0}.p'.format(key))
+
+    def _store(self, key, load):
+        if not os.path.isdir(self.queue_dir):
+            os.makedirs(self.queue_dir)
+        with salt.utils.atomicfile.atomic_open(self._path(key), 'wb') as fp_:
+            self.serial.dump(load, fp_)
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except (OSError, IOError):
+            pass
+
+    def put(self, load):
+        '''
+        Queue a single ``_return`` load and schedule a flush
+        '''
+        # Zero-padded so that a directory listing sorts in arrival order
+        key = '{0:020d}_{1:08d}'.format(int(time.time() * 1000000), next(self._seq))
+        if self.persist:
+            try:
+                self._store(key, load)
+            except (OSError, IOError) as exc:
+                log.warning('Unable to persist return for job %s: %s', load.get('jid'), exc)
+        self.pending[key] = load
+        if len(self.pending) >= self.batch_size:
+            self._schedule_flush(0)
+        else:
+            self._schedule_flush(self.flush_interval)
+
+    def _schedule_flush(self, delay):
+        if self._flush_handle is not None:
+            if delay:
+                # A flush is already scheduled, the new return rides along
+                return
+            self.io_loop.remove_timeout(self._flush_handle)
+        self._flush_handle = self.io_loop.call_later(delay, self._run_flush)
+
+    def _run_flush(self):
+        self._flush_handle = None
+        self.io_loop.spawn_callback(self.flush)
+
+    def _get_channel(self):
+        if self.channel is None:
+            self.channel = salt.transport.client.AsyncReqChannel.factory(
+                self.opts, io_loop=self.io_loop)
+        return self.channel
+
+    def _close_channel(self):
+        if self.channel is not None:
+            self.channel.close()
+            self.channel = None
+
+    @tornado.gen.coroutine
+    def flush(self, timeout=60):
+        '''
+        Send everything that is pending, ``batch_size`` returns per request.
+        Failed batches stay queued and are retried after ``retry_timer``
+        seconds.
+        '''
+        if self._flushing:
+            return
+        self._flushing = True
+        try:
+            while self.pending:
+                keys = list(itertools.islice(self.pending, self.batch_size))
+                loads = [self.pending[key] for key in keys]
+                if len(loads) == 1:
+                    load = loads[0]
+                else:
+                    load = {'cmd': '_return', 'load': loads}
+                try:
+                    yield self._get_channel().send(load, timeout=timeout)
+                except SaltReqTimeoutError:
+                    retry = self.retry_timer()
+                    log.warning(
+                        'The minion failed to return %d queued job(s) to the '
+                        'master, retrying in %s seconds', len(loads), retry
+                    )
+                    self._schedule_flush(retry)
+                    break
+                except Exception as exc:  # pylint: disable=broad-except
+                    retry = self.retry_timer()
+                    log.error(
+                        'Error returning %d queued job(s) to the master, '
+                        'retrying in %s seconds: %s', len(loads), retry, exc
+                    )
+                    self._close_channel()
+                    self._schedule_flush(retry)
+                    break
+                log.debug('Returned %d queued job(s) to the master', len(loads))
+                for key in keys:
+                    self.pending.pop(key, None)
+                    if self.persist:
+                        self._remove(key)
+        finally:
+            self._flushing = False
+
+    def close(self):
+        '''
+        Stop flushing and release the channel. Anything still pending stays
+        on disk for the next minion process.
+        '''
+        if self._flush_handle is not None:
+            self.io_loop.remove_timeout(self._flush_handle)
+            self._flush_handle = None
+        self._close_channel()
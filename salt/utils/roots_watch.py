@@ -0,0 +1,536 @@
+# -*- coding: utf-8 -*-
+'''
+Keep the trees of the :conf_master:`file_roots` in memory, updated through
+inotify, so that the ``roots`` fileserver backend does not have to walk them.
+
+The trees are maintained by the ``FileserverUpdate`` process of the master when
+:conf_master:`roots_inotify` is enabled. After each batch of changes it writes a
+snapshot of the trees, from which the other processes serve the file lists and
+find files. The snapshot also records the modification time of each directory,
+so that after a restart only the directories changed in the meantime are read
+again.
+
+The snapshot is only used while the watcher is running: it is removed when the
+watcher starts and when it stops, and it is ignored once the process which
+wrote it is gone. The file_roots are walked otherwise.
+
+.. versionadded:: Neon
+
+:depends: - pyinotify Python module >= 0.9.5
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import logging
+import os
+import threading
+import time
+
+# Import Salt Libs
+import salt.fileserver
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.data
+import salt.utils.event
+import salt.utils.files
+import salt.utils.path
+import salt.utils.process
+from salt.ext import six
+
+# Import Third Party Libs
+try:
+    import pyinotify
+    HAS_PYINOTIFY = True
+    WATCH_MASK = pyinotify.IN_CREATE | pyinotify.IN_DELETE | \
+        pyinotify.IN_MOVED_FROM | pyinotify.IN_MOVED_TO | \
+        pyinotify.IN_CLOSE_WRITE | pyinotify.IN_DELETE_SELF | \
+        pyinotify.IN_MOVE_SELF
+except ImportError:
+    HAS_PYINOTIFY = False
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+# Seconds to wait for more changes before applying them, and the longest time
+# changes are held back while more keep coming
+SETTLE_TIME = 0.2
+MAX_DELAY = 1.0
+
+# The snapshot loaded in this process and the file it was loaded from, see
+# load()
+_LOADED = {'key': None, 'pid': None, 'trees': None, 'lists': {}}
+_LOADED_LOCK = threading.Lock()
+
+
+def snapshot_path(opts):
+    '''
+    Return the path of the snapshot of the trees
+    '''
+    return os.path.join(opts['cachedir'], 'roots', 'tree.p')
+
+
+def remove_snapshot(opts):
+    '''
+    Remove the snapshot of the trees, so that the file_roots are walked
+    '''
+    try:
+        os.remove(snapshot_path(opts))
+    except OSError:
+        pass
+
+
+class RootTree(object):
+    '''
+    The tree of a single file_roots directory
+
+    :param str root: The directory
+    :param bool followlinks: Descend into symlinked directories, like
+        :conf_master:`fileserver_followsymlinks`
+    :param watch: Called with each directory before it is read
+    '''
+    def __init__(self, root, followlinks=True, watch=None):
+        self.root = root
+        self.followlinks = followlinks
+        self.watch = watch
+        # Path relative to the root => (is_dir, is_link, link target if the
+        # link does not point outside of the root)
+        self.entries = {}
+        # Directory relative to the root ('' for the root) => set of the names
+        # it contains, for the directories which were read
+        self.children = {}
+        # Directory relative to the root => mtime when it was read
+        self.mtimes = {}
+
+    def _abs(self, rel):
+        return os.path.join(self.root, rel) if rel else self.root
+
+    def _link_dest(self, abs_path):
+        '''
+        Return the target of a symlink if it points inside of the root,
+        otherwise None
+        '''
+        link_dest = salt.utils.path.readlink(abs_path)
+        if link_dest.startswith('..'):
+            joined = os.path.join(abs_path, link_dest)
+        else:
+            joined = os.path.join(os.path.dirname(abs_path), link_dest)
+        rel_dest = os.path.relpath(
+            os.path.realpath(os.path.normpath(joined)),
+            os.path.realpath(self.root))
+        return None if rel_dest.startswith('..') else link_dest
+
+    def scan(self, rel_dir=''):
+        '''
+        Read a directory, and the new directories inside of it. Directories
+        which were read before are not read again. Returns the paths of the
+        entries which were added and removed.
+        '''
+        added, removed = set(), set()
+        pending = [rel_dir]
+        while pending:
+            rel_dir = pending.pop()
+            abs_dir = self._abs(rel_dir)
+            if self.watch is not None:
+                self.watch(abs_dir)
+            try:
+                mtime = os.stat(abs_dir).st_mtime
+                names = set(os.listdir(abs_dir))
+            except OSError:
+                if rel_dir:
+                    removed.update(self.remove(rel_dir))
+                continue
+            for name in self.children.get(rel_dir, set()) - names:
+                removed.update(self.remove(os.path.join(rel_dir, name)))
+            self.children[rel_dir] = names
+            self.mtimes[rel_dir] = mtime
+            for name in names:
+                rel = os.path.join(rel_dir, name)
+                abs_path = os.path.join(abs_dir, name)
+                is_link = salt.utils.path.islink(abs_path)
+                is_dir = os.path.isdir(abs_path)
+                link_dest = None
+                if is_link:
+                    try:
+                        link_dest = self._link_dest(abs_path)
+                    except OSError:
+                        pass
+                descend = is_dir and (self.followlinks or not is_link)
+                if not descend and rel in self.children:
+                    # A directory was replaced by a file
+                    for child in list(self.children[rel]):
+                        removed.update(self.remove(os.path.join(rel, child)))
+                    del self.children[rel]
+                    self.mtimes.pop(rel, None)
+                if rel not in self.entries:
+                    added.add(rel)
+                self.entries[rel] = (is_dir, is_link, link_dest)
+                if descend and rel not in self.children:
+                    pending.append(rel)
+        return added, removed
+
+    def remove(self, rel):
+        '''
+        Remove an entry and everything below it, return the removed paths
+        '''
+        parent, name = os.path.split(rel)
+        self.children.get(parent, set()).discard(name)
+        removed = set()
+        pending = [rel]
+        while pending:
+            rel = pending.pop()
+            if self.entries.pop(rel, None) is not None:
+                removed.add(rel)
+            self.mtimes.pop(rel, None)
+            for name in self.children.pop(rel, ()):
+                pending.append(os.path.join(rel, name))
+        return removed
+
+    def refresh(self):
+        '''
+        Read again the directories modified since they were read, return the
+        paths of the entries which were added and removed
+        '''
+        added, removed = set(), set()
+        for rel_dir in sorted(self.mtimes, key=len):
+            if rel_dir not in self.mtimes:
+                # Removed with its parent
+                continue
+            try:
+                mtime = os.stat(self._abs(rel_dir)).st_mtime
+            except OSError:
+                mtime = None
+            if mtime != self.mtimes[rel_dir]:
+                # Force the directory to be read again
+                self.children.setdefault(rel_dir, set())
+                new, old = self.scan(rel_dir)
+                added.update(new)
+                removed.update(old)
+            elif self.watch is not None:
+                self.watch(self._abs(rel_dir))
+        return added, removed
+
+    def dump(self):
+        '''
+        Return the tree in a form which can be serialized
+        '''
+        return {'entries': self.entries, 'mtimes': self.mtimes}
+
+    @classmethod
+    def load(cls, root, data, followlinks=True, watch=None):
+        '''
+        Return a tree from its serialized form
+        '''
+        tree = cls(root, followlinks=followlinks, watch=watch)
+        tree.entries = dict(
+            (rel, tuple(entry))
+            for rel, entry in six.iteritems(data['entries']))
+        tree.mtimes = data['mtimes']
+        for rel_dir in tree.mtimes:
+            tree.children[rel_dir] = set()
+        for rel in tree.entries:
+            parent, name = os.path.split(rel)
+            if parent in tree.children:
+                tree.children[parent].add(name)
+        return tree
+
+
+def file_lists(opts, trees, saltenv):
+    '''
+    Return the files, dirs, empty_dirs and links of an environment, like
+    salt.fileserver.roots._file_lists does, from the trees of its roots.
+    Returns None if a root is not in the trees.
+    '''
+    ret = {'files': set(), 'dirs': set(), 'empty_dirs': set(), 'links': {}}
+    for root in opts['file_roots'][saltenv]:
+        tree = trees.get(root)
+        if tree is None:
+            return None
+        for rel, (is_dir, is_link, link_dest) in six.iteritems(tree.entries):
+            if is_link and opts['fileserver_ignoresymlinks']:
+                continue
+            if salt.fileserver.is_file_ignored(opts, rel):
+                continue
+            ret['dirs' if is_dir else 'files'].add(rel)
+            if is_dir and rel in tree.children and not tree.children[rel]:
+                ret['empty_dirs'].add(rel)
+            if link_dest is not None:
+                ret['links'][rel] = link_dest
+    ret['files'] = sorted(ret['files'])
+    ret['dirs'] = sorted(ret['dirs'])
+    ret['empty_dirs'] = sorted(ret['empty_dirs'])
+    return ret
+
+
+def load(opts):
+    '''
+    Return the trees in the snapshot, keyed by root, or None if there is no
+    snapshot or the watcher which wrote it is not running anymore. The
+    snapshot is only read again when it was replaced.
+    '''
+    path = snapshot_path(opts)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (stat.st_ino, stat.st_mtime, stat.st_size)
+    with _LOADED_LOCK:
+        if _LOADED['key'] == key:
+            if not salt.utils.process.os_is_running(_LOADED['pid']):
+                return None
+            return _LOADED['trees']
+        try:
+            with salt.utils.files.fopen(path, 'rb') as fp_:
+                data = salt.utils.data.decode(
+                    salt.payload.Serial(opts).load(fp_))
+        except Exception as exc:  # pylint: disable=broad-except
+            log.warning('Unable to read the file_roots snapshot: %s', exc)
+            return None
+        if not isinstance(data, dict) \
+                or data.get('version') != SNAPSHOT_VERSION \
+                or not salt.utils.process.os_is_running(data['pid']):
+            return None
+        _LOADED['key'] = key
+        _LOADED['pid'] = data['pid']
+        _LOADED['trees'] = dict(
+            (root, RootTree.load(root, tree))
+            for root, tree in six.iteritems(data['roots']))
+        _LOADED['lists'] = {}
+        return _LOADED['trees']
+
+
+def cached_file_lists(opts, saltenv):
+    '''
+    Return the file lists of an environment from the snapshot, or None if
+    they are not in it
+    '''
+    trees = load(opts)
+    if trees is None:
+        return None
+    with _LOADED_LOCK:
+        if _LOADED['trees'] is not trees:
+            # Replaced meanwhile, don't mix up the lists of two snapshots
+            return file_lists(opts, trees, saltenv)
+        if saltenv not in _LOADED['lists']:
+            _LOADED['lists'][saltenv] = file_lists(opts, trees, saltenv)
+        return _LOADED['lists'][saltenv]
+
+
+def alive(opts):
+    '''
+    Return whether a watcher is running and serving the trees
+    '''
+    return load(opts) is not None
+
+
+def find_roots(opts, path, roots):
+    '''
+    Return which of the roots contain the file, or None if a root is not in
+    the snapshot
+    '''
+    trees = load(opts)
+    if trees is None:
+        return None
+    ret = []
+    for root in roots:
+        tree = trees.get(root)
+        if tree is None:
+            return None
+        entry = tree.entries.get(path)
+        if entry is not None and not entry[0]:
+            ret.append(root)
+    return ret
+
+
+class RootsWatcher(object):
+    '''
+    Maintain the trees of all of the file_roots through inotify and write
+    their snapshot
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.followlinks = opts.get('fileserver_followsymlinks', True)
+        self.trees = {}
+        self.watches = {}
+        self.wm = None
+        self.notifier = None
+        self.dirty = set()
+        self.changed = set()
+
+    def roots(self):
+        '''
+        Return the configured file_roots directories
+        '''
+        ret = set()
+        for roots in six.itervalues(self.opts['file_roots']):
+            ret.update(roots)
+        return sorted(ret)
+
+    def _watch(self, abs_dir):
+        if self.wm is None or abs_dir in self.watches:
+            return
+        wdd = self.wm.add_watch(abs_dir, WATCH_MASK, quiet=True)
+        if wdd.get(abs_dir, -1) >= 0:
+            self.watches[abs_dir] = wdd[abs_dir]
+
+    def _enqueue(self, event):
+        '''
+        Note the directory an inotify event happened in
+        '''
+        if event.mask & pyinotify.IN_Q_OVERFLOW:
+            # Events were lost, read all of the modified directories
+            self.dirty.add(None)
+        elif event.mask & (pyinotify.IN_DELETE_SELF | pyinotify.IN_MOVE_SELF
+                           | pyinotify.IN_IGNORED):
+            self.watches.pop(event.path, None)
+            self.dirty.add(os.path.dirname(event.path))
+        elif event.mask & pyinotify.IN_CLOSE_WRITE:
+            self.changed.add(event.pathname)
+        else:
+            self.dirty.add(event.path)
+
+    def start(self):
+        '''
+        Load the snapshot, read the directories which changed since it was
+        written and start watching them
+        '''
+        self.wm = pyinotify.WatchManager()
+        self.notifier = pyinotify.Notifier(self.wm, self._enqueue, timeout=0)
+        previous = {}
+        try:
+            with salt.utils.files.fopen(snapshot_path(self.opts), 'rb') as fp_:
+                data = salt.utils.data.decode(
+                    salt.payload.Serial(self.opts).load(fp_))
+            if data.get('version') == SNAPSHOT_VERSION \
+                    and data.get('followlinks') == self.followlinks:
+                previous = data['roots']
+        except Exception:  # pylint: disable=broad-except
+            pass
+        # Until it is written again, the snapshot of a previous run would be
+        # served without the changes made since
+        remove_snapshot(self.opts)
+        start = time.time()
+        for root in self.roots():
+            if root in previous:
+                tree = RootTree.load(
+                    root, previous[root],
+                    followlinks=self.followlinks, watch=self._watch)
+                tree.refresh()
+            else:
+                tree = RootTree(
+                    root, followlinks=self.followlinks, watch=self._watch)
+                tree.scan()
+            self.trees[root] = tree
+        log.debug(
+            'Loaded the trees of %d file_roots in %.2f seconds (%d from the '
+            'snapshot)', len(self.trees), time.time() - start,
+            len(set(previous) & set(self.trees)))
+        self.write()
+
+    def _rel(self, abs_dir):
+        '''
+        Return the tree and the relative path of a watched directory
+        '''
+        for root, tree in six.iteritems(self.trees):
+            if abs_dir == root:
+                return tree, ''
+            if abs_dir.startswith(root.rstrip(os.sep) + os.sep):
+                return tree, os.path.relpath(abs_dir, root)
+        return None, None
+
+    def apply(self):
+        '''
+        Read again the directories in which changes happened, return the
+        data of the fileserver event
+        '''
+        dirty, self.dirty = self.dirty, set()
+        changed, self.changed = self.changed, set()
+        added, removed = set(), set()
+        if None in dirty:
+            for tree in six.itervalues(self.trees):
+                new, old = tree.refresh()
+                added.update(os.path.join(tree.root, x) for x in new)
+                removed.update(os.path.join(tree.root, x) for x in old)
+        else:
+            for abs_dir in dirty:
+                tree, rel_dir = self._rel(abs_dir)
+                if tree is None:
+                    continue
+                if rel_dir and rel_dir not in tree.children:
+                    # The directory itself is new, read it from its parent
+                    rel_dir = os.path.dirname(rel_dir)
+                new, old = tree.scan(rel_dir)
+                added.update(os.path.join(tree.root, x) for x in new)
+                removed.update(os.path.join(tree.root, x) for x in old)
+        for abs_dir in [x for x in self.watches if x in removed]:
+            self.wm.rm_watch(self.watches.pop(abs_dir), quiet=True)
+        return {'changed': bool(added or removed or changed),
+                'files': {'changed': sorted(changed - added),
+                          'added': sorted(added),
+                          'removed': sorted(removed)},
+                'backend': 'roots'}
+
+    def write(self):
+        '''
+        Write the snapshot of the trees
+        '''
+        path = snapshot_path(self.opts)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        data = {'version': SNAPSHOT_VERSION,
+                'pid': os.getpid(),
+                'followlinks': self.followlinks,
+                'roots': dict((root, tree.dump())
+                              for root, tree in six.iteritems(self.trees))}
+        with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+            fp_.write(salt.payload.Serial(self.opts).dumps(data))
+
+    def fire(self, data):
+        if not self.opts.get('fileserver_events', False):
+            return
+        with salt.utils.event.get_event(
+                'master',
+                self.opts['sock_dir'],
+                self.opts['transport'],
+                opts=self.opts,
+                listen=False) as event:
+            event.fire_event(
+                data,
+                salt.utils.event.tagify(['roots', 'update'], prefix='fileserver'))
+
+    def run(self):
+        '''
+        Apply the changes in the file_roots as they happen. The snapshot is
+        removed if the watcher stops.
+        '''
+        try:
+            self._run()
+        except Exception:  # pylint: disable=broad-except
+            log.exception(
+                'The file_roots watcher stopped, the file_roots will be walked '
+                'to list the files')
+        finally:
+            remove_snapshot(self.opts)
+
+    def _run(self):
+        self.start()
+        first = None
+        while True:
+            if self.notifier.check_events(int(SETTLE_TIME * 1000)):
+                self.notifier.read_events()
+                self.notifier.process_events()
+                if first is None:
+                    first = time.time()
+                if time.time() - first < MAX_DELAY:
+                    continue
+            if first is None:
+                continue
+            first = None
+            try:
+                data = self.apply()
+                if data['files']['added'] or data['files']['removed']:
+                    self.write()
+                if data['changed']:
+                    self.fire(data)
+            except Exception:  # pylint: disable=broad-except
+                log.exception('Exception caught while updating the file_roots trees')
@@ -22,6 +22,7 @@ import itertools
 import threading
 import logging
 import errno
+import heapq
 import random
 import weakref
 
@@ -153,6 +154,7 @@ class Schedule(object):
         self.schedule_returner = self.option('schedule_returner')
         # Keep track of the lowest loop interval needed in this variable
         self.loop_interval = six.MAXSIZE
+        self._reset_eval_index()
         if not self.standalone:
             clean_proc_dir(opts)
         if cleanup:
@@ -389,6 +391,7 @@ class Schedule(object):
         # ensure job exists, then enable it
         if name in self.opts['schedule']:
             self.opts['schedule'][name]['enabled'] = True
+            self._eval_dirty.add(name)
             log.info('Enabling job %s in scheduler', name)
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
@@ -409,6 +412,7 @@ class Schedule(object):
         # ensure job exists, then disable it
         if name in self.opts['schedule']:
             self.opts['schedule'][name]['enabled'] = False
+            self._eval_dirty.add(name)
             log.info('Disabling job %s in scheduler', name)
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
@@ -556,6 +560,7 @@ class Schedule(object):
                 self.opts['schedule'][name]['run_explicit'] = []
             self.opts['schedule'][name]['run_explicit'].append({'time': new_time,
                                                                 'time_fmt': time_fmt})
+            self._eval_dirty.add(name)
 
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
@@ -580,6 +585,7 @@ class Schedule(object):
                 self.opts['schedule'][name]['skip_explicit'] = []
             self.opts['schedule'][name]['skip_explicit'].append({'time': time,
                                                                  'time_fmt': time_fmt})
+            self._eval_dirty.add(name)
 
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
@@ -643,6 +649,62 @@ class Schedule(object):
                         running = True
         return running
 
+    def _reset_eval_index(self):
+        '''
+        Forget all precomputed evaluation times, so that the next call to
+        eval() evaluates every job
+        '''
+        # Heap of (evaluation time, job name) tuples
+        self._eval_heap = []
+        # The next time each job needs to be evaluated, None means every loop
+        self._eval_due = {}
+        # The job data each job was last evaluated with
+        self._eval_data = {}
+        # Jobs modified in place since they were last evaluated
+        self._eval_dirty = set()
+        self._eval_state = None
+        self._eval_last = None
+
+    def _next_eval_time(self, data, now, loop_interval):
+        '''
+        Return the earliest time at which evaluating the job can have any
+        effect, based on the fire times computed by its last evaluation.
+        Returns None for jobs which need to be evaluated on every loop.
+        '''
+        if not isinstance(data, dict) or data.get('_error'):
+            return None
+        if not self.enabled or not data.get('enabled', True):
+            # The fire time of disabled interval jobs moves on every loop
+            return None
+        if data.get('_run_on_start') or 'run_explicit' in data:
+            return None
+
+        next_fire_time = data.get('_next_fire_time')
+        if not isinstance(next_fire_time, datetime.datetime):
+            return None
+        if isinstance(data.get('_splay'), datetime.datetime):
+            # Once a splay has been added, the job fires at the splayed time
+            next_fire_time = data['_splay']
+        # Fire times are compared to the second
+        next_fire_time -= datetime.timedelta(microseconds=next_fire_time.microsecond)
+
+        if '_seconds' in data or 'cron' in data:
+            return next_fire_time
+        if 'once' in data:
+            if data.get('splay'):
+                return None
+            if data['_next_fire_time'] < now - loop_interval:
+                # Already ran, or missed, and can never run again
+                return datetime.datetime.max
+            if next_fire_time > now:
+                return next_fire_time
+            return None
+        if 'when' in data:
+            if data.get('_run') and next_fire_time > now:
+                return next_fire_time
+            return None
+        return None
+
     def handle_func(self, multiprocessing_enabled, func, data):
         '''
         Execute this method in a multiprocess or thread
@@ -1359,12 +1421,49 @@ class Schedule(object):
                    'skip_function',
                    'skip_during_range',
                    'splay']
+
+        if not now:
+            now = datetime.datetime.now()
+
+        # Jobs are only evaluated when they are new or modified, or when their
+        # precomputed evaluation time has come. Changes to the global settings,
+        # the pillar and grains "whens" or the clock going backwards invalidate
+        # every precomputed time.
+        eval_state = (self.enabled,
+                      repr(self.skip_function),
+                      repr(self.skip_during_range),
+                      repr(self.splay),
+                      loop_interval,
+                      repr(self.opts.get('pillar', {}).get('whens')),
+                      repr(self.opts.get('grains', {}).get('whens')))
+        if eval_state != self._eval_state or \
+                (self._eval_last is not None and now < self._eval_last):
+            self._reset_eval_index()
+            self._eval_state = eval_state
+        self._eval_last = now
+
+        due = set()
+        while self._eval_heap and self._eval_heap[0][0] <= now:
+            eval_time, job = heapq.heappop(self._eval_heap)
+            if self._eval_due.get(job) == eval_time:
+                due.add(job)
+
+        evaluated = []
         for job, data in six.iteritems(schedule):
 
             # Skip anything that is a global setting
             if job in _hidden:
                 continue
 
+            if job not in due and \
+                    self._eval_due.get(job) is not None and \
+                    self._eval_data.get(job) is data and \
+                    job not in self._eval_dirty:
+                # Nothing to do for this job yet
+                continue
+            self._eval_dirty.discard(job)
+            evaluated.append((job, data))
+
             # Clear these out between runs
             for item in ['_continue',
                          '_error',
@@ -1415,9 +1514,6 @@ class Schedule(object):
                     '_run_on_start' not in data:
                 data['_run_on_start'] = True
 
-            if not now:
-                now = datetime.datetime.now()
-
             # Used for quick lookups when detecting invalid option
             # combinations.
             schedule_keys = set(data.keys())
@@ -1675,6 +1771,25 @@ class Schedule(object):
                     elif run:
                         data['_next_fire_time'] = now + datetime.timedelta(seconds=data['_seconds'])
 
+        for job, data in evaluated:
+            self._eval_data[job] = data
+            eval_time = self._next_eval_time(data, now, loop_interval)
+            self._eval_due[job] = eval_time
+            if eval_time is not None:
+                heapq.heappush(self._eval_heap, (eval_time, job))
+
+        if len(self._eval_data) > len(schedule) or \
+                len(self._eval_heap) > 2 * len(self._eval_due) + 64:
+            # Drop deleted jobs and stale heap entries
+            for job in list(self._eval_data):
+                if job not in schedule:
+                    del self._eval_data[job]
+                    del self._eval_due[job]
+            self._eval_heap = [(eval_time, job)
+                               for job, eval_time in six.iteritems(self._eval_due)
+                               if eval_time is not None]
+            heapq.heapify(self._eval_heap)
+
     def _run_job(self, func, data):
         job_dry_run = data.get('dry_run', False)
         if job_dry_run:
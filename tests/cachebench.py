@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Benchmark the minion data cache by storing and fetching the data of many
+minions one key at a time and with the batch API.
+
+Run a local redis-server (``redis-server --port 6379 --save ''``) to benchmark
+the redis driver, or use ``--driver localfs``.
+'''
+# pylint: disable=resource-leakage
+# Import Python Libs
+from __future__ import absolute_import, print_function
+import optparse
+import os
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.cache
+import salt.config
+from salt.ext.six.moves import range  # pylint: disable=import-error,redefined-builtin
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option(
+        '-m',
+        '--minions',
+        dest='minions',
+        default=5000,
+        type='int',
+        help='The number of minions in the cache, default 5000')
+    parser.add_option(
+        '-d',
+        '--driver',
+        dest='driver',
+        default='redis',
+        help='The cache driver, default redis')
+    parser.add_option(
+        '--host',
+        dest='host',
+        default='localhost',
+        help='The host of the redis server, default localhost')
+    parser.add_option(
+        '--port',
+        dest='port',
+        default=6379,
+        type='int',
+        help='The port of the redis server, default 6379')
+    options, _ = parser.parse_args()
+    return options
+
+
+def _timed(label, count, fun, *args):
+    start = time.time()
+    ret = fun(*args)
+    duration = time.time() - start
+    print('{0}: {1:.3f}s, {2:.0f} keys/s'.format(label, duration, count / duration))
+    return ret
+
+
+def run(options):
+    '''
+    Fill the cache and read it back
+    '''
+    root_dir = tempfile.mkdtemp()
+    try:
+        opts = salt.config.master_config(None)
+        opts['cachedir'] = os.path.join(root_dir, 'cache')
+        opts['cache'] = options.driver
+        opts['cache.redis.host'] = options.host
+        opts['cache.redis.port'] = options.port
+        opts['cache.redis.bank_prefix'] = '$BENCHBANK'
+        opts['cache.redis.bank_keys_prefix'] = '$BENCHBANKEYS'
+        opts['cache.redis.key_prefix'] = '$BENCHKEY'
+        cache = salt.cache.Cache(opts)
+
+        items = [('minions/minion{0}'.format(num), 'data',
+                  {'grains': {'id': 'minion{0}'.format(num), 'os': 'Linux',
+                              'ipv4': ['10.0.{0}.{1}'.format(num // 256, num % 256)]},
+                   'pillar': {'role': 'web' if num % 2 else 'db'}})
+                 for num in range(options.minions)]
+        keys = [(bank, key) for bank, key, _ in items]
+
+        def store():
+            for bank, key, data in items:
+                cache.store(bank, key, data)
+
+        def fetch():
+            return [cache.fetch(bank, key) for bank, key in keys]
+
+        def fetch_many():
+            return list(cache.fetch_many(keys))
+
+        _timed('store', len(items), store)
+        _timed('store_many', len(items), cache.store_many, items)
+        single = _timed('fetch', len(keys), fetch)
+        batch = _timed('fetch_many', len(keys), fetch_many)
+        assert single == batch
+        cache.flush('minions')
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run(parse())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Load test the reactor with synthetic events
+
+By default the reactions to the events are run through the reactor workers
+with a fake runner client, to measure their throughput and check the
+reactions of each minion run in order. With --sock-dir, the events are fired
+on the event bus of a running master instead.
+'''
+# pylint: disable=resource-leakage
+# Import Python Libs
+from __future__ import absolute_import, print_function
+import collections
+import optparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Import salt libs
+import salt.config
+import salt.utils.event
+import salt.utils.reactor
+from salt.ext.six.moves import range  # pylint: disable=import-error,redefined-builtin
+
+# Import third party libs
+from tests.support.mock import MagicMock, patch
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option(
+        '-e',
+        '--events',
+        dest='events',
+        default=20000,
+        type='int',
+        help='The number of events to fire, default 20000')
+    parser.add_option(
+        '-m',
+        '--minions',
+        dest='minions',
+        default=500,
+        type='int',
+        help='The number of minions the events come from, default 500')
+    parser.add_option(
+        '--tag',
+        dest='tag',
+        default='salt/minion/{0}/start',
+        help='The tag of the events, formatted with the minion id, '
+             'default salt/minion/{0}/start')
+    parser.add_option(
+        '-s',
+        '--sock-dir',
+        dest='sock_dir',
+        default=None,
+        help='Fire the events on the event bus of the master using this '
+             'sock_dir, instead of running the reactions locally')
+    parser.add_option(
+        '-w',
+        '--work',
+        dest='work',
+        default=0.001,
+        type='float',
+        help='The number of seconds each fake reaction takes, default 0.001')
+    parser.add_option(
+        '-t',
+        '--threads',
+        dest='threads',
+        default=10,
+        type='int',
+        help='The number of reactor worker threads, default 10')
+    parser.add_option(
+        '--hwm',
+        dest='hwm',
+        default=10000,
+        type='int',
+        help='The queue size of the reactor workers, default 10000')
+    parser.add_option(
+        '--spool',
+        dest='spool',
+        default=False,
+        action='store_true',
+        help='Spool the reactions to disk when the queue is full')
+    options, _ = parser.parse_args()
+    return options
+
+
+def fire(options):
+    '''
+    Fire the events on the event bus of a running master
+    '''
+    opts = salt.config.master_config(None)
+    opts['sock_dir'] = options.sock_dir
+    event = salt.utils.event.get_master_event(opts, options.sock_dir, listen=False)
+    start = time.time()
+    for num in range(options.events):
+        minion = 'minion{0}'.format(num % options.minions)
+        event.fire_event({'id': minion, 'num': num}, options.tag.format(minion))
+    duration = time.time() - start
+    print('Fired {0} events in {1:.3f}s, {2:.0f} events/s'.format(
+        options.events, duration, options.events / duration))
+
+
+def run(options):
+    '''
+    Run the reactions to the events through the reactor workers
+    '''
+    root_dir = tempfile.mkdtemp()
+    try:
+        opts = salt.config.master_config(None)
+        opts['cachedir'] = os.path.join(root_dir, 'cache')
+        opts['sock_dir'] = os.path.join(root_dir, 'socks')
+        opts['reactor_worker_threads'] = options.threads
+        opts['reactor_worker_hwm'] = options.hwm
+        opts['reactor_spool'] = options.spool
+
+        lock = threading.Lock()
+        runs = collections.defaultdict(list)
+
+        def low(fun, kwargs):
+            time.sleep(options.work)
+            with lock:
+                runs[kwargs['kwarg']['id']].append(kwargs['kwarg']['num'])
+
+        runner = MagicMock()
+        runner.low = low
+        wrap = salt.utils.reactor.ReactWrap(opts)
+        backpressure = MagicMock()
+        with patch.object(wrap, 'client_cache', {'runner': runner}), \
+                patch.object(wrap, '_fire_event', backpressure):
+            start = time.time()
+            for num in range(options.events):
+                minion = 'minion{0}'.format(num % options.minions)
+                chunk = {'state': 'runner',
+                         'fun': 'test.arg',
+                         '__id__': 'bench',
+                         'name': 'bench',
+                         'args': [{'id': minion}, {'num': num}]}
+                wrap.run(chunk, key=minion)
+            fired = time.time() - start
+            # The backpressure events count the reactions dropped since the
+            # previous one
+            dropped = wrap._dropped + sum(  # pylint: disable=protected-access
+                call[0][0]['dropped'] for call in backpressure.call_args_list)
+            # Wait for the reactions which were not dropped to run
+            timeout = time.time() + 60 + options.events * options.work
+            while time.time() < timeout:
+                with lock:
+                    ran = sum(len(nums) for nums in runs.values())
+                if ran + dropped >= options.events:
+                    break
+                time.sleep(0.01)
+            duration = time.time() - start
+
+        print('Queued {0} reactions in {1:.3f}s, ran {2} in {3:.3f}s, '
+              '{4:.0f} reactions/s'.format(
+                  options.events, fired, ran, duration, ran / duration))
+        print('Dropped {0} reactions, fired {1} backpressure events'.format(
+            dropped, backpressure.call_count))
+        unordered = [minion for minion, nums in runs.items() if nums != sorted(nums)]
+        print('Reactions out of order for {0} minions'.format(len(unordered)))
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    OPTIONS = parse()
+    if OPTIONS.sock_dir:
+        fire(OPTIONS)
+    else:
+        run(OPTIONS)
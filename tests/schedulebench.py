@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Benchmark the scheduler by ticking Schedule.eval over a large schedule of
+interval and cron jobs, none of which actually run
+'''
+# pylint: disable=resource-leakage
+# Import Python Libs
+from __future__ import absolute_import, print_function
+import copy
+import datetime
+import optparse
+import os
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.utils.schedule
+from salt.ext.six.moves import range  # pylint: disable=import-error,redefined-builtin
+from salt.modules.test import ping
+
+# Import third party libs
+from tests.support.mock import MagicMock, patch
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option(
+        '-j',
+        '--jobs',
+        dest='jobs',
+        default=10000,
+        type='int',
+        help='The number of scheduled jobs, default 10000')
+    parser.add_option(
+        '-t',
+        '--ticks',
+        dest='ticks',
+        default=60,
+        type='int',
+        help='The number of one second loop intervals to evaluate, default 60')
+    parser.add_option(
+        '--cron',
+        dest='cron',
+        default=False,
+        action='store_true',
+        help='Schedule every other job with cron instead of seconds')
+    options, _ = parser.parse_args()
+    return options
+
+
+def run(options):
+    '''
+    Build the schedule and tick it
+    '''
+    root_dir = tempfile.mkdtemp()
+    try:
+        opts = salt.config.minion_config(None)
+        opts['root_dir'] = opts['conf_dir'] = root_dir
+        opts['cachedir'] = os.path.join(root_dir, 'cache')
+        opts['sock_dir'] = os.path.join(root_dir, 'socks')
+        opts['loop_interval'] = 1
+        opts['schedule'] = {}
+        for num in range(options.jobs):
+            job = {'function': 'test.ping', 'dry_run': True}
+            if options.cron and num % 2:
+                job['cron'] = '{0} * * * *'.format(num % 60)
+            else:
+                job['seconds'] = 60 + num % 3600
+            opts['schedule']['job{0}'.format(num)] = job
+
+        with patch('salt.utils.schedule.clean_proc_dir', MagicMock(return_value=None)):
+            schedule = salt.utils.schedule.Schedule(
+                copy.deepcopy(opts), {'test.ping': ping}, returners={},
+                new_instance=True)
+
+        now = datetime.datetime.now()
+        start = time.time()
+        schedule.eval(now)
+        print('Priming {0} jobs took {1:.3f}s'.format(options.jobs, time.time() - start))
+
+        durations = []
+        for tick in range(1, options.ticks + 1):
+            start = time.time()
+            schedule.eval(now + datetime.timedelta(seconds=tick))
+            durations.append(time.time() - start)
+        durations.sort()
+        print('{0} ticks: mean {1:.4f}s, median {2:.4f}s, max {3:.4f}s'.format(
+            options.ticks,
+            sum(durations) / len(durations),
+            durations[len(durations) // 2],
+            durations[-1]))
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run(parse())
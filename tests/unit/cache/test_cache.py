@@ -12,6 +12,7 @@ from tests.support.unit import skipIf, TestCase
 from tests.support.mock import (
     NO_MOCK,
     NO_MOCK_REASON,
+    MagicMock,
     patch,
 )
 
@@ -40,6 +41,29 @@ class CacheFunctionsTest(TestCase):
         ret = salt.cache.factory(self.opts)
         self.assertIsInstance(ret, salt.cache.MemCache)
 
+    @patch('salt.payload.Serial')
+    def test_fetch_many(self, serial_mock):
+        fetch = MagicMock(side_effect=lambda bank, key, **kwargs: key)
+        cache = salt.cache.factory(self.opts)
+        # Without a batch function in the driver, the keys are fetched one by one
+        with patch('salt.loader.cache', return_value={'localfs.fetch': fetch}):
+            self.assertEqual(list(cache.fetch_many([('bank', 'key1'), ('bank', 'key2')])),
+                             ['key1', 'key2'])
+        self.assertEqual(fetch.call_count, 2)
+
+        fetch_many = MagicMock(side_effect=lambda items, **kwargs: [key for _, key in items])
+        cache = salt.cache.factory(self.opts)
+        with patch('salt.loader.cache', return_value={'localfs.fetch': fetch,
+                                                      'localfs.fetch_many': fetch_many}), \
+                patch('salt.cache.FETCH_CHUNK_SIZE', 2):
+            self.assertEqual(
+                list(cache.fetch_many([('bank', 'key1'), ('bank', 'key2'), ('bank', 'key3')])),
+                ['key1', 'key2', 'key3'])
+        # The keys are fetched in chunks
+        self.assertEqual([call[0][0] for call in fetch_many.call_args_list],
+                         [[('bank', 'key1'), ('bank', 'key2')], [('bank', 'key3')]])
+        self.assertEqual(fetch.call_count, 2)
+
 
 @skipIf(NO_MOCK, NO_MOCK_REASON)
 class MemCacheTest(TestCase):
@@ -217,3 +241,21 @@ class MemCacheTest(TestCase):
         # Check debug data
         self.assertEqual(self.cache.call, 6)
         self.assertEqual(self.cache.hit, 3)
+
+    @patch('salt.cache.Cache.fetch_many', return_value=['fake_data2', 'fake_data3'])
+    @patch('salt.loader.cache', return_value={})
+    def test_fetch_many(self, loader_mock, cache_fetch_many_mock):
+        with patch('time.time', return_value=0), \
+                patch('salt.cache.Cache.store_many') as cache_store_many_mock:
+            self.cache.store_many([('bank', 'key1', 'fake_data1')])
+        cache_store_many_mock.assert_called_once_with([('bank', 'key1', 'fake_data1')])
+        # Only the keys which are not in memory are fetched, in one request
+        with patch('time.time', return_value=1):
+            ret = list(self.cache.fetch_many([('bank', 'key2'), ('bank', 'key1'), ('bank', 'key3')]))
+        self.assertEqual(ret, ['fake_data2', 'fake_data1', 'fake_data3'])
+        cache_fetch_many_mock.assert_called_once_with([('bank', 'key2'), ('bank', 'key3')])
+        self.assertDictEqual(salt.cache.MemCache.data['fake_driver'], {
+            ('bank', 'key1'): [1, 'fake_data1'],
+            ('bank', 'key2'): [1, 'fake_data2'],
+            ('bank', 'key3'): [1, 'fake_data3'],
+            })
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for the redis cache
+'''
+
+# Import Python libs
+from __future__ import absolute_import, print_function, unicode_literals
+
+# Import Salt Testing libs
+from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.unit import skipIf, TestCase
+from tests.support.mock import (
+    NO_MOCK,
+    NO_MOCK_REASON,
+    MagicMock,
+    patch,
+)
+
+# Import Salt libs
+import salt.payload
+import salt.cache.redis_cache as redis_cache
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class RedisCacheTest(TestCase, LoaderModuleMockMixin):
+    '''
+    Validate the batch functions of the redis cache
+    '''
+    def setup_loader_modules(self):
+        return {redis_cache: {'__opts__': {},
+                              '__context__': {'serial': salt.payload.Serial('msgpack')}}}
+
+    def test_fetch_many(self):
+        serial = salt.payload.Serial('msgpack')
+        server = MagicMock()
+        server.mget.return_value = [serial.dumps({'grains': {}}), None]
+        with patch.object(redis_cache, '_get_redis_server', MagicMock(return_value=server)):
+            ret = redis_cache.fetch_many([('minions/alpha', 'data'), ('minions/beta', 'data')])
+        # A single request for all the keys
+        server.mget.assert_called_once_with(['$KEY_minions/alpha/data', '$KEY_minions/beta/data'])
+        self.assertEqual(ret, [{'grains': {}}, {}])
+
+    def test_store_many(self):
+        server = MagicMock()
+        pipe = server.pipeline.return_value
+        with patch.object(redis_cache, '_get_redis_server', MagicMock(return_value=server)):
+            redis_cache.store_many([('minions/alpha', 'data', {}),
+                                    ('minions/alpha', 'mine', {}),
+                                    ('minions/beta', 'data', {})])
+        pipe.execute.assert_called_once_with()
+        self.assertEqual(pipe.set.call_count, 3)
+        # The bank hierarchy is only built once per bank
+        self.assertEqual([call[0] for call in pipe.sadd.call_args_list],
+                         [('$BANK_minions', 'alpha'),
+                          ('$BANKEYS_minions/alpha', 'data'),
+                          ('$BANKEYS_minions/alpha', 'mine'),
+                          ('$BANK_minions', 'beta'),
+                          ('$BANKEYS_minions/beta', 'data')])
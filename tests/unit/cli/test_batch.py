@@ -73,3 +73,22 @@ class BatchTestCase(TestCase):
         '''
         ret = Batch.get_bnum(self.batch)
         self.assertEqual(ret, None)
+
+    def test_gather_minions_presence(self):
+        '''
+        The presence table is only used when the presence target type is
+        selected
+        '''
+        opts = {'batch': '', 'conf_file': {}, 'tgt': 'web*', 'transport': '',
+                'timeout': 5, 'gather_job_timeout': 5, 'presence_table': True}
+        present = MagicMock(return_value=['web1'])
+        check_minions = MagicMock(return_value={'minions': ['web1', 'web2']})
+        with patch('salt.client.get_local_client', MagicMock()), \
+                patch('salt.utils.presence.present', present), \
+                patch('salt.utils.minions.CkMinions.check_minions', check_minions):
+            Batch(dict(opts), quiet=True)
+            present.assert_not_called()
+            opts['selected_target_option'] = 'presence'
+            batch = Batch(dict(opts), quiet=True)
+        self.assertEqual(batch.minions, ['web1'])
+        self.assertEqual(batch.down_minions, set(['web2']))
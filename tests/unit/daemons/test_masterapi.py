@@ -563,6 +563,9 @@ class FakeCache(object):
     def fetch(self, bank, key):
         return self.data[bank, key]
 
+    def fetch_many(self, items):
+        return [self.fetch(bank, key) for bank, key in items]
+
 
 class RemoteFuncsTestCase(TestCase):
     '''
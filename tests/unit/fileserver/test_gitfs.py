@@ -10,6 +10,8 @@ import os
 import shutil
 import tempfile
 import textwrap
+import threading
+import time
 import tornado.ioloop
 import logging
 import stat
@@ -22,13 +24,15 @@ except ImportError:
 from tests.support.runtests import RUNTIME_VARS
 from tests.support.mixins import LoaderModuleMockMixin
 from tests.support.unit import TestCase, skipIf
-from tests.support.mock import NO_MOCK, NO_MOCK_REASON, patch
+from tests.support.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
 from tests.support.helpers import patched_environ
 
 # Import salt libs
 import salt.fileserver.gitfs as gitfs
 import salt.utils.files
+import salt.utils.hashutils
 import salt.utils.platform
+import salt.utils.stringutils
 import salt.utils.win_functions
 import salt.utils.yaml
 import salt.ext.six
@@ -381,6 +385,165 @@ class GitFSTestFuncs(object):
             # the envs list, but the branches should not.
             self.assertEqual(ret, ['base', 'world'])
 
+    def test_find_file(self):
+        with patch.dict(gitfs.__opts__, {'hash_type': 'sha256', 'file_buffer_size': 262144}):
+            self._test_find_file()
+
+    def _test_find_file(self):
+        gitfs.update()
+        fnd = gitfs.find_file('testfile', 'base')
+        self.assertEqual(fnd['rel'], 'testfile')
+        with salt.utils.files.fopen(os.path.join(self.tmp_repo_dir, 'testfile'), 'rb') as fp_:
+            contents = fp_.read()
+        with salt.utils.files.fopen(fnd['path'], 'rb') as fp_:
+            self.assertEqual(fp_.read(), contents)
+        # The blob is cached once for all of the refs it is the same in
+        self.assertEqual(gitfs.find_file('testfile', UNICODE_ENVNAME)['path'], fnd['path'])
+        self.assertEqual(gitfs.find_file('testfile', TAG_NAME)['path'], fnd['path'])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_cachedir, 'gitfs', 'refs')))
+
+        load = {'path': 'testfile', 'saltenv': 'base', 'loc': 0}
+        fnd['back'] = 'gitfs'
+        self.assertEqual(
+            gitfs.file_hash(load, fnd)['hsum'],
+            salt.utils.hashutils.get_hash(fnd['path'], 'sha256'))
+        self.assertEqual(
+            salt.utils.stringutils.to_bytes(gitfs.serve_file(load, fnd)['data']), contents)
+
+        self.assertEqual(gitfs.find_file('grail', 'base')['path'], '')
+        self.assertEqual(gitfs.find_file('nonexistent', 'base')['path'], '')
+
+    def test_tree_index_update(self):
+        '''
+        The tree index of an environment is updated from the diff of the old
+        and the new tree
+        '''
+        repo = git.Repo(self.tmp_repo_dir)
+        self.addCleanup(repo.git.branch, '-D', 'index_test')
+        repo.create_head('index_test', 'HEAD')
+        gitfs.update()
+        # Index all of the environments
+        for saltenv in gitfs.envs():
+            gitfs.find_file('testfile', saltenv)
+        old = gitfs.find_file('testfile', 'index_test')
+        self.assertNotEqual(old['path'], '')
+        self.assertEqual(gitfs.find_file('newfile', 'index_test')['path'], '')
+
+        with patched_environ(USERNAME=str('root')):
+            repo.git.checkout('index_test')
+            try:
+                with salt.utils.files.fopen(
+                        os.path.join(self.tmp_repo_dir, 'testfile'), 'w') as fp_:
+                    fp_.write('changed\n')
+                with salt.utils.files.fopen(
+                        os.path.join(self.tmp_repo_dir, 'newfile'), 'w') as fp_:
+                    fp_.write('new\n')
+                repo.index.add(['testfile', 'newfile'])
+                repo.index.commit('Change')
+            finally:
+                repo.git.checkout('master')
+
+        provider = type(gitfs._gitfs().remotes[0])
+        with patch.object(provider, 'walk_tree', side_effect=AssertionError('tree walked')):
+            gitfs.update()
+            new = gitfs.find_file('testfile', 'index_test')
+            self.assertNotEqual(new['path'], old['path'])
+            with salt.utils.files.fopen(new['path']) as fp_:
+                self.assertEqual(fp_.read(), 'changed\n')
+            self.assertNotEqual(gitfs.find_file('newfile', 'index_test')['path'], '')
+            self.assertIn('newfile', gitfs.file_list({'saltenv': 'index_test'}))
+            # The other environments are unchanged
+            self.assertEqual(gitfs.find_file('testfile', 'base')['path'], old['path'])
+            self.assertEqual(gitfs.find_file('newfile', 'base')['path'], '')
+
+    def test_find_file_keeps_blob(self):
+        '''
+        A blob which is served is not reaped, even if no environment uses it
+        anymore
+        '''
+        gitfs.update()
+        path = gitfs.find_file('testfile', 'base')['path']
+        old = time.time() - 2 * salt.utils.gitfs.BLOB_REAP_AGE
+        os.utime(path, (old, old))
+        self.assertEqual(gitfs.find_file('testfile', 'base')['path'], path)
+        self.assertGreater(os.path.getmtime(path), old)
+        git_fs = gitfs._gitfs()
+        provider = type(git_fs.remotes[0])
+        with patch.object(provider, 'tree_index', MagicMock(return_value={})):
+            git_fs.reap_blobs()
+        self.assertTrue(os.path.isfile(path))
+        # While the blobs no environment uses for long are removed
+        os.utime(path, (old, old))
+        with patch.object(provider, 'tree_index', MagicMock(return_value={})):
+            git_fs.reap_blobs()
+        self.assertFalse(os.path.isfile(path))
+        gitfs.find_file('testfile', 'base')
+
+    def test_fetch_backoff(self):
+        with patch.dict(gitfs.__opts__, {'gitfs_fetch_backoff': 3600}):
+            repo = gitfs._gitfs().remotes[0]
+            with patch.object(type(repo), '_fetch',
+                              MagicMock(side_effect=Exception('unreachable'))) as fetch:
+                gitfs.update()
+                self.assertIsNone(repo.next_fetch)
+                gitfs.update()
+                self.assertEqual(fetch.call_count, 2)
+                self.assertEqual(repo.fetch_failures, 2)
+                self.assertGreater(repo.next_fetch, time.time())
+                # The remote is backing off
+                gitfs.update()
+                self.assertEqual(fetch.call_count, 2)
+                gitfs.update(force=True)
+                self.assertEqual(fetch.call_count, 3)
+                # Still backing off after the failed forced fetch
+                gitfs.update()
+                self.assertEqual(fetch.call_count, 3)
+            gitfs.update(force=True)
+            stats = gitfs._gitfs().fetch_stats()[repo.id]
+            self.assertEqual(stats['failures'], 0)
+            self.assertIsNone(stats['next_fetch'])
+            self.assertGreaterEqual(stats['staleness'], 0)
+            self.assertGreaterEqual(stats['duration'], 0)
+
+    def test_fetch_backoff_disabled(self):
+        '''
+        Failing remotes are fetched every time by default
+        '''
+        repo = gitfs._gitfs().remotes[0]
+        with patch.object(type(repo), '_fetch',
+                          MagicMock(side_effect=Exception('unreachable'))) as fetch:
+            for _ in range(3):
+                gitfs.update()
+            self.assertEqual(fetch.call_count, 3)
+            self.assertEqual(repo.fetch_failures, 3)
+            self.assertIsNone(repo.next_fetch)
+        gitfs.update(force=True)
+
+    def test_fetch_remotes_concurrent(self):
+        '''
+        The remotes are fetched at the same time
+        '''
+        fetching = threading.Event()
+
+        def _fetch_first():
+            # Only returns True if the other remote is fetched meanwhile
+            return fetching.wait(5)
+
+        def _fetch_second():
+            fetching.set()
+            return None
+
+        git_fs = gitfs._gitfs()
+        remotes = [
+            MagicMock(id='first', fetch=_fetch_first,
+                      backoff=MagicMock(return_value=(None, 0))),
+            MagicMock(id='second', fetch=_fetch_second,
+                      backoff=MagicMock(return_value=(None, 0))),
+        ]
+        with patch.object(git_fs, 'remotes', remotes), \
+                patch.dict(git_fs.opts, {'gitfs_fetch_workers': 2}):
+            self.assertTrue(git_fs.fetch_remotes())
+
 
 class GitFSTestBase(object):
 
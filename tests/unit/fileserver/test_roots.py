@@ -23,6 +23,7 @@ import salt.fileclient
 import salt.utils.files
 import salt.utils.hashutils
 import salt.utils.platform
+import salt.utils.roots_watch
 
 try:
     import win32file
@@ -179,6 +180,33 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
             if self.test_symlink_list_file_roots:
                 self.opts['file_roots'] = orig_file_roots
 
+    def test_roots_inotify(self):
+        '''
+        The file lists and the files found from the snapshot of the trees are
+        the same as with walking the file_roots
+        '''
+        cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(salt.utils.files.rm_rf, cachedir)
+        with patch.dict(roots.__opts__, {'cachedir': cachedir,
+                                         'fileserver_list_cache_time': 0}):
+            watcher = salt.utils.roots_watch.RootsWatcher(roots.__opts__)
+            for root in watcher.roots():
+                watcher.trees[root] = salt.utils.roots_watch.RootTree(root)
+                watcher.trees[root].scan()
+            watcher.write()
+
+            load = {'saltenv': 'base'}
+            expected = [roots.file_list(load), roots.dir_list(load),
+                        roots.file_list_emptydirs(load), roots.symlink_list(load),
+                        roots.find_file('testfile'), roots.find_file('nonexistent')]
+            with patch.dict(roots.__opts__, {'roots_inotify': True}), \
+                    patch('salt.utils.path.os_walk', side_effect=AssertionError):
+                self.assertEqual(
+                    [roots.file_list(load), roots.dir_list(load),
+                     roots.file_list_emptydirs(load), roots.symlink_list(load),
+                     roots.find_file('testfile'), roots.find_file('nonexistent')],
+                    expected)
+
     def test_dynamic_file_roots(self):
         dyn_root_dir = tempfile.mkdtemp(dir=TMP)
         top_sls = os.path.join(dyn_root_dir, 'top.sls')
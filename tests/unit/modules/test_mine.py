@@ -5,11 +5,15 @@
 
 # Import Python Libs
 from __future__ import absolute_import, print_function, unicode_literals
+import shutil
+import tempfile
 
 # Import Salt Testing Libs
 from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.runtests import RUNTIME_VARS
 from tests.support.unit import TestCase, skipIf
 from tests.support.mock import (
+    MagicMock,
     patch,
     NO_MOCK,
     NO_MOCK_REASON
@@ -122,3 +126,41 @@ class MineTestCase(TestCase, LoaderModuleMockMixin):
                                      ('172.17.42.1:80', 'abcdefhjhi1234567899'),
                                      ('192.168.0.1:80', 'abcdefhjhi1234567899'),
                                  ])}}})
+
+    def test_update_mine_delta(self):
+        '''
+        Test that mine.update only sends the functions whose results changed
+        when mine_delta is enabled
+        '''
+        cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, cachedir, ignore_errors=True)
+        opts = {'id': 'minion',
+                'master': 'salt',
+                'cachedir': cachedir,
+                'file_client': 'remote',
+                'mine_delta': True,
+                'mine_delta_full_interval': 3600}
+        results = {'grains.get': 'a', 'test.ping': True}
+        salt_mock = {
+            'config.merge': MagicMock(side_effect=lambda *args: {'grains.get': [], 'test.ping': []}),
+            'grains.get': MagicMock(side_effect=lambda: results['grains.get']),
+            'test.ping': MagicMock(side_effect=lambda: results['test.ping']),
+        }
+        send = MagicMock(return_value=True)
+        with patch.dict(mine.__opts__, opts), \
+                patch.dict(mine.__salt__, salt_mock), \
+                patch.object(mine, '_mine_send', send):
+            self.assertTrue(mine.update())
+            self.assertEqual(send.call_args[0][0]['data'], results)
+
+            send.reset_mock()
+            self.assertTrue(mine.update())
+            send.assert_not_called()
+
+            results['grains.get'] = 'b'
+            self.assertTrue(mine.update())
+            self.assertEqual(send.call_args[0][0]['data'], {'grains.get': 'b'})
+
+            send.reset_mock()
+            self.assertTrue(mine.update(clear=True))
+            self.assertEqual(send.call_args[0][0]['data'], results)
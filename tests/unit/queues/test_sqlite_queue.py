@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for the sqlite queue
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import shutil
+import sqlite3
+import os
+import tempfile
+
+# Import Salt Testing Libs
+from tests.support.runtests import RUNTIME_VARS
+from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.mock import patch
+from tests.support.unit import TestCase
+
+# Import Salt Libs
+import salt.queues.sqlite_queue as sqlite_queue
+from salt.exceptions import SaltInvocationError
+
+
+class SqliteQueueTestCase(TestCase, LoaderModuleMockMixin):
+    '''
+    Validate salt.queues.sqlite_queue
+    '''
+    def setup_loader_modules(self):
+        self.queue_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.queue_dir, ignore_errors=True)
+        self.addCleanup(self._close)
+        return {sqlite_queue: {'__opts__': {'sqlite_queue_dir': self.queue_dir}}}
+
+    def _close(self):
+        for con in sqlite_queue._CONNECTIONS.values():  # pylint: disable=protected-access
+            con.close()
+        sqlite_queue._CONNECTIONS.clear()  # pylint: disable=protected-access
+
+    def test_insert_pop(self):
+        self.assertTrue(sqlite_queue.insert('myqueue', ['minion3', 'minion1', 'minion2']))
+        self.assertTrue(sqlite_queue.insert('myqueue', {'fun': 'test.ping'}))
+        self.assertIn('already exists', sqlite_queue.insert('myqueue', 'minion1'))
+        self.assertIn('already exists', sqlite_queue.insert('myqueue', ['minion4', 'minion1']))
+        self.assertEqual(sqlite_queue.list_length('myqueue'), 4)
+        self.assertEqual(sqlite_queue.list_queues(), ['myqueue'])
+
+        # The items are popped in insertion order
+        self.assertEqual(sqlite_queue.pop('myqueue', 2), ['minion3', 'minion1'])
+        self.assertEqual(sqlite_queue.pop('myqueue', 'all'), ['minion2', '{"fun": "test.ping"}'])
+        self.assertEqual(sqlite_queue.pop('myqueue'), [])
+        self.assertRaises(SaltInvocationError, sqlite_queue.pop, 'myqueue', 'foo')
+        self.assertRaises(SaltInvocationError, sqlite_queue.list_length, 'my queue')
+
+    def test_pop_runner(self):
+        sqlite_queue.insert('runners', [{'fun': 'test.ping', 'args': ["it's"], 'kwargs': {}}])
+        self.assertEqual(sqlite_queue.pop('runners', is_runner=True),
+                         [{'fun': 'test.ping', 'args': ["it's"], 'kwargs': {}}])
+        # Items stored by an earlier release
+        with sqlite_queue._transaction('runners') as cur:  # pylint: disable=protected-access
+            cur.execute('INSERT INTO runners(name) VALUES(?)',
+                        ("{'fun': 'test.ping', 'args': [], 'kwargs': {}}",))
+        self.assertEqual(sqlite_queue.pop('runners', is_runner=True),
+                         [{'fun': 'test.ping', 'args': [], 'kwargs': {}}])
+
+    def test_visibility_timeout(self):
+        sqlite_queue.insert('myqueue', ['minion1', 'minion2', 'minion3'])
+        with patch('time.time', return_value=1000):
+            self.assertEqual(sqlite_queue.pop('myqueue', 2, visibility_timeout=60),
+                             ['minion1', 'minion2'])
+            self.assertEqual(sqlite_queue.pop('myqueue', 'all'), ['minion3'])
+            self.assertEqual(sqlite_queue.list_items('myqueue'), ['minion1', 'minion2'])
+            sqlite_queue.delete('myqueue', 'minion1')
+        # The items which were not deleted come back after the timeout
+        with patch('time.time', return_value=1061):
+            self.assertEqual(sqlite_queue.pop('myqueue', 'all'), ['minion2'])
+        self.assertEqual(sqlite_queue.list_length('myqueue'), 0)
+
+    def test_upgrade(self):
+        con = sqlite3.connect(os.path.join(self.queue_dir, 'old.db'))
+        with con:
+            con.execute('CREATE TABLE old(id INTEGER PRIMARY KEY, name TEXT UNIQUE)')
+            con.execute("INSERT INTO old(name) VALUES('minion1')")
+        con.close()
+        self.assertEqual(sqlite_queue.pop('old', visibility_timeout=60), ['minion1'])
+        self.assertEqual(sqlite_queue.pop('old'), [])
@@ -52,3 +52,31 @@ class PGJsonbCleanOldJobsTestCase(TestCase, LoaderModuleMockMixin):
             with patch.dict(pgjsonb.__salt__, {'config.option': MagicMock()}):
                 with patch.dict(pgjsonb.__opts__, {'archive_jobs': 1}):
                     self.assertEqual(pgjsonb.clean_old_jobs(), None)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class PGJsonbEventReturnTestCase(TestCase, LoaderModuleMockMixin):
+    '''
+    Tests for the pgjsonb.event_return function.
+    '''
+    def setup_loader_modules(self):
+        return {pgjsonb: {'__opts__': {'id': 'master'}}}
+
+    def test_event_return_copy(self):
+        '''
+        Tests that the events are loaded with a single COPY
+        '''
+        rows = []
+        cursor = MagicMock()
+        cursor.copy_expert.side_effect = lambda sql, fp_: rows.append(fp_.read())
+        connect_mock = MagicMock()
+        connect_mock.return_value.__enter__.return_value = cursor
+        events = [{'tag': 'salt/test', 'data': {'a': 'b\tc'}},
+                  {'tag': 'salt/test\\2', 'data': 'd'}]
+        with patch.object(pgjsonb, '_get_serv', connect_mock):
+            pgjsonb.event_return(events)
+        cursor.copy_expert.assert_called_once()
+        self.assertEqual(
+            rows,
+            ['salt/test\t{"a": "b\\\\tc"}\tmaster\n'
+             'salt/test\\\\2\t"d"\tmaster\n'])
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for the manage runner
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+
+# Import Salt Testing Libs
+from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.unit import skipIf, TestCase
+from tests.support.mock import (
+    NO_MOCK,
+    NO_MOCK_REASON,
+    MagicMock,
+    patch
+)
+
+# Import Salt Libs
+import salt.runners.manage as manage
+from salt.exceptions import SaltInvocationError
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ManageTest(TestCase, LoaderModuleMockMixin):
+    '''
+    Validate the manage runner
+    '''
+    def setup_loader_modules(self):
+        return {manage: {'__opts__': {'presence_table': True,
+                                      'timeout': 5,
+                                      'gather_job_timeout': 10}}}
+
+    def test_status_presence(self):
+        ping = MagicMock(return_value=(['web1'], ['web2']))
+        presence = MagicMock(return_value=(['web2'], ['web1']))
+        with patch.object(manage, '_ping', ping), \
+                patch.object(manage, '_presence', presence):
+            # The minions are pinged unless the table is asked for
+            self.assertEqual(manage.status(), {'up': ['web1'], 'down': ['web2']})
+            presence.assert_not_called()
+            self.assertEqual(manage.up(presence=True), ['web2'])
+            ping.assert_called_once_with('*', 'glob', 5, 10)
+
+    def test_down_removekeys_presence(self):
+        with patch.object(manage, '_presence', MagicMock(return_value=([], ['web1']))):
+            self.assertRaises(SaltInvocationError, manage.down,
+                              removekeys=True, presence=True)
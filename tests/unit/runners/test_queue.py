@@ -67,3 +67,23 @@ class QueueTest(TestCase, LoaderModuleMockMixin):
             queue_pop.assert_called_once_with(is_runner=True, queue='salt', quantity=1, backend='pgjsonb')
             test_stdout_print.assert_called_once_with()
             queue_pop.assert_called_once_with(is_runner=True, queue='salt', quantity=1, backend='pgjsonb')
+
+    def test_process_queue_publish(self):
+        queue_pop = MagicMock(return_value=['minion1', 'minion2'])
+        queue_delete = MagicMock(return_value=True)
+        local_client = MagicMock()
+        local_client.cmd_async.return_value = '20191019120000000000'
+        with patch.dict(queue_mod.__opts__, {'conf_file': 'master'}), \
+                patch.object(queue_mod, 'pop', queue_pop), \
+                patch.object(queue_mod, 'delete', queue_delete), \
+                patch('salt.client.get_local_client', MagicMock(return_value=local_client)), \
+                patch('salt.utils.event.MasterEvent.fire_event', MagicMock()):
+            ret = queue_mod.process_queue('salt', 2, fun='test.ping', visibility_timeout=60)
+        queue_pop.assert_called_once_with(queue='salt', quantity=2, backend='sqlite',
+                                          is_runner=False, visibility_timeout=60)
+        # A single job targets all the popped minions
+        local_client.cmd_async.assert_called_once_with(
+            ['minion1', 'minion2'], 'test.ping', arg=[], tgt_type='list')
+        queue_delete.assert_called_once_with(queue='salt', items=['minion1', 'minion2'],
+                                             backend='sqlite')
+        self.assertEqual(ret['jid'], '20191019120000000000')
@@ -4,6 +4,7 @@ unit tests for the Salt engines
 '''
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import threading
 
 # Import Salt Testing Libs
 from tests.support.mixins import LoaderModuleMockMixin
@@ -17,6 +18,9 @@ from tests.support.mock import (
 import salt.beacons as beacons
 import salt.config
 
+# Import 3rd-party libs
+import tornado.testing
+
 import logging
 log = logging.getLogger(__name__)
 
@@ -45,3 +49,56 @@ class BeaconsTestCase(TestCase, LoaderModuleMockMixin):
                           'data': {'id': u'minion', u'apache2': u'Stopped'},
                           'beacon_name': 'ps'}]
             self.assertEqual(ret, _expected)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class BeaconsAsyncTestCase(tornado.testing.AsyncTestCase, TestCase):
+    '''
+    Test cases for salt.beacons.Beacon.process_async
+    '''
+    def setUp(self):
+        super(BeaconsAsyncTestCase, self).setUp()
+        self.opts = salt.config.DEFAULT_MINION_OPTS.copy()
+        self.opts['id'] = 'minion'
+        self.opts['beacons_timeout'] = 0.1
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def _beacon(self):
+        def fast(config):
+            return [{'tag': 'fast'}]
+
+        def slow(config):
+            self.release.wait(5)
+            return [{'tag': 'slow'}]
+
+        with patch('salt.loader.beacons', return_value={}):
+            beacon = salt.beacons.Beacon(self.opts, [])
+        beacon.beacons = {'fast.beacon': fast, 'slow.beacon': slow}
+        self.addCleanup(beacon.stop)
+        return beacon
+
+    @tornado.testing.gen_test
+    def test_process_async_slow_beacon(self):
+        '''
+        A slow beacon does not hold up the events of the others, its events
+        are returned once it finished and it is not run again meanwhile
+        '''
+        beacon = self._beacon()
+        config = {'fast': [], 'slow': []}
+        ret = yield beacon.process_async(config, {})
+        self.assertEqual([evt['tag'] for evt in ret],
+                         ['salt/beacon/minion/fast/fast'])
+        self.assertIn('slow', beacon.in_flight)
+
+        ret = yield beacon.process_async(config, {})
+        self.assertEqual([evt['tag'] for evt in ret],
+                         ['salt/beacon/minion/fast/fast'])
+
+        self.release.set()
+        beacon.in_flight['slow'].result(5)
+        ret = yield beacon.process_async(config, {}, triggered=set(['fast']))
+        self.assertEqual(sorted(evt['tag'] for evt in ret),
+                         ['salt/beacon/minion/fast/fast',
+                          'salt/beacon/minion/slow/slow'])
+        self.assertEqual(beacon.in_flight, {})
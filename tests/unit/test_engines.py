@@ -11,15 +11,18 @@ from tests.support.unit import skipIf, TestCase
 from tests.support.mock import (
     NO_MOCK,
     NO_MOCK_REASON,
+    MagicMock,
     patch)
 
 # Import Salt Libs
 import salt.engines as engines
 import salt.config
+import salt.utils.event
 import salt.utils.process
 
 # Import 3rd-party libs
 from salt.ext import six
+from salt.ext.six.moves import queue  # pylint: disable=import-error
 
 import logging
 log = logging.getLogger(__name__)
@@ -57,3 +60,108 @@ class EngineTestCase(TestCase, LoaderModuleMockMixin):
 
             # Ensure there were two engine started
             self.assertEqual(count, len(mock_opts['engines']))
+
+    def test_engines_host(self):
+        '''
+        Test the engines run in a single engine host
+        '''
+        mock_opts = salt.config.DEFAULT_MINION_OPTS.copy()
+        mock_opts['__role'] = 'minion'
+        mock_opts['engines_host'] = True
+        mock_opts['engines'] = [{'test_one': {'engine_module': 'test',
+                                              'engine_tags': ['salt/job/*']}},
+                                {'test_two': {'engine_module': 'test',
+                                              'engine_restart': 'never'}}]
+
+        process_manager = MagicMock()
+        with patch.dict(engines.__opts__, mock_opts):
+            salt.engines.start_engines(mock_opts, process_manager)
+        process_manager.add_process.assert_called_once()
+        args = process_manager.add_process.call_args[1]['args']
+        self.assertEqual(process_manager.add_process.call_args[0][0],
+                         engines.EngineHost)
+        self.assertEqual(
+            [(fun, config, host_opts) for _, fun, config, host_opts in args[1]],
+            [('test.start', {}, {'engine_tags': ['salt/job/*']}),
+             ('test.start', {}, {'engine_restart': 'never'})])
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class EngineHostTestCase(TestCase):
+    '''
+    Test cases for salt.engines.EngineHost
+    '''
+    def setUp(self):
+        self.opts = salt.config.DEFAULT_MINION_OPTS.copy()
+        self.opts['__role'] = 'minion'
+        self.host = engines.EngineHost(self.opts, [], None, None, None)
+
+    def tearDown(self):
+        del self.opts
+        del self.host
+
+    def test_dispatch(self):
+        job_events = queue.Queue()
+        all_events = queue.Queue()
+        self.host.queues = [(['salt/job/*'], job_events), (None, all_events)]
+        data = {'id': 'minion'}
+        self.host.dispatch({'tag': 'salt/job/1/ret/minion', 'data': data})
+        self.host.dispatch({'tag': 'salt/auth', 'data': data})
+        self.assertEqual(job_events.qsize(), 1)
+        self.assertEqual(all_events.qsize(), 2)
+        # Each engine gets its own copy of the data
+        self.assertIsNot(job_events.get()['data'], all_events.get()['data'])
+
+    def test_supervise(self):
+        events = queue.Queue()
+        events.put({'tag': 'salt/job/1/ret/minion', 'data': {'id': 'minion'}})
+        received = []
+
+        def _start(shared_event=None):
+            with shared_event as event_bus:
+                # The engine gets the events of the host
+                self.assertIsInstance(event_bus, salt.utils.event.SharedEvent)
+                received.append(event_bus.get_event(no_block=True, full=True))
+            if len(received) == 1:
+                raise Exception('failed')
+
+        self.host.engine = {'test.start': _start}
+        with patch('time.sleep') as sleep_mock:
+            self.host.supervise('test', 'test.start', None, 'on-failure', events)
+        # Restarted once after the failure, not after it returned
+        self.assertEqual(received,
+                         [{'tag': 'salt/job/1/ret/minion', 'data': {'id': 'minion'}},
+                          None])
+        sleep_mock.assert_called_once_with(1)
+
+    def test_supervise_no_shared_event(self):
+        '''
+        Test the engines which do not take a shared_event argument are started
+        with their configuration only
+        '''
+        start = MagicMock()
+
+        def _start(interval=1):
+            start(interval)
+
+        self.host.engine = {'test.start': _start}
+        self.host.supervise('test', 'test.start', {'interval': 5}, 'never', queue.Queue())
+        start.assert_called_once_with(5)
+
+    def test_shared_event_pending(self):
+        '''
+        Test the events read while waiting for a tag are kept for the next
+        reads
+        '''
+        events = queue.Queue()
+        shared = salt.utils.event.SharedEvent('minion', opts=self.opts, events=events)
+        self.addCleanup(shared.close)
+        for tag in ('salt/auth', 'salt/job/1/ret/minion', 'salt/job/2/ret/minion'):
+            events.put({'tag': tag, 'data': {}})
+        ret = shared.get_event(tag='salt/job/2', no_block=True, full=True)
+        self.assertEqual(ret['tag'], 'salt/job/2/ret/minion')
+        # Another caller still gets the other events, in order
+        self.assertEqual(shared.get_event(tag='salt/job/1', no_block=True, full=True)['tag'],
+                         'salt/job/1/ret/minion')
+        self.assertEqual(shared.get_event(no_block=True, full=True)['tag'], 'salt/auth')
+        self.assertIsNone(shared.get_event(no_block=True))
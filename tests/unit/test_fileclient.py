@@ -234,6 +234,81 @@ class FileclientCacheTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderMod
                     self.assertTrue(SUBDIR in content)
                     self.assertTrue(saltenv in content)
 
+    def test_cache_dir_prefetch_hashes(self):
+        '''
+        Ensure the hashes of the files of a directory are requested at once
+        when the master does not provide manifests
+        '''
+        patched_opts = dict((x, y) for x, y in six.iteritems(self.minion_opts))
+        patched_opts.update(self.MOCKED_OPTS)
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            fs_ = client.channel.fs
+            with patch.object(fs_, 'file_manifest', MagicMock(return_value={})), \
+                    patch.object(fs_, 'file_hashes',
+                              MagicMock(side_effect=fs_.file_hashes)), \
+                    patch.object(fs_, 'file_hash',
+                                 MagicMock(side_effect=fs_.file_hash)):
+                self.assertTrue(
+                    client.cache_dir('salt://{0}'.format(SUBDIR), 'base',
+                                     cachedir=None))
+                fs_.file_hashes.assert_called_once()
+                self.assertEqual(
+                    sorted(fs_.file_hashes.call_args[0][0]['paths']),
+                    sorted('{0}/{1}'.format(SUBDIR, x) for x in SUBDIR_FILES))
+                fs_.file_hash.assert_not_called()
+            for subdir_file in SUBDIR_FILES:
+                cache_loc = os.path.join(fileclient.__opts__['cachedir'],
+                                         'files', 'base', SUBDIR, subdir_file)
+                self.assertTrue(os.path.isfile(cache_loc))
+
+    def test_cache_dir_manifest(self):
+        '''
+        Ensure the files of a directory which differ from the cache are
+        fetched in a single bundle
+        '''
+        patched_opts = dict((x, y) for x, y in six.iteritems(self.minion_opts))
+        patched_opts.update(self.MOCKED_OPTS)
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            fs_ = client.channel.fs
+            with patch.object(fs_, 'file_bundle',
+                              MagicMock(side_effect=fs_.file_bundle)), \
+                    patch.object(fs_, 'serve_file',
+                                 MagicMock(side_effect=fs_.serve_file)):
+                ret = client.cache_dir('salt://{0}'.format(SUBDIR), 'base',
+                                       cachedir=None)
+                self.assertEqual(len(ret), len(SUBDIR_FILES))
+                fs_.file_bundle.assert_called_once()
+                fs_.serve_file.assert_not_called()
+
+                # Only the modified file is fetched again
+                path = os.path.join(self.FS_ROOT, 'base', SUBDIR,
+                                    SUBDIR_FILES[0])
+                with salt.utils.files.fopen(path, 'w') as fp_:
+                    fp_.write('modified')
+                fs_.file_bundle.reset_mock()
+                self.assertEqual(
+                    client.cache_dir('salt://{0}'.format(SUBDIR), 'base',
+                                     cachedir=None),
+                    ret)
+                self.assertEqual(
+                    fs_.file_bundle.call_args[0][0]['paths'],
+                    ['{0}/{1}'.format(SUBDIR, SUBDIR_FILES[0])])
+                with salt.utils.files.fopen(
+                        os.path.join(fileclient.__opts__['cachedir'], 'files',
+                                     'base', SUBDIR, SUBDIR_FILES[0])) as fp_:
+                    self.assertEqual(fp_.read(), 'modified')
+
+                # Nothing is fetched when the cache is up to date
+                fs_.file_bundle.reset_mock()
+                client.cache_dir('salt://{0}'.format(SUBDIR), 'base',
+                                 cachedir=None)
+                fs_.file_bundle.assert_not_called()
+                fs_.serve_file.assert_not_called()
+
     def test_cache_dir_with_alternate_cachedir_and_absolute_path(self):
         '''
         Ensure entire directory is cached to correct location when an alternate
@@ -6,6 +6,8 @@ from __future__ import absolute_import
 # Import Salt libs
 import salt.config
 import salt.master
+import salt.payload
+import salt.utils.event_batcher
 
 # Import Salt Testing Libs
 from tests.support.unit import TestCase
@@ -15,6 +17,47 @@ from tests.support.mock import (
 )
 
 
+class AESFuncsTestCase(TestCase):
+    '''
+    TestCase for salt.master.AESFuncs class
+    '''
+
+    def setUp(self):
+        self.aes_funcs = salt.master.AESFuncs.__new__(salt.master.AESFuncs)
+        self.aes_funcs.serial = salt.payload.Serial({})
+        self.aes_funcs.masterapi = MagicMock()
+        self.aes_funcs._handle_minion_event = MagicMock()
+
+    def test_minion_event_batch_invalid_entries(self):
+        '''
+        The invalid entries of an event batch are skipped, the others fired
+        '''
+        entries = [
+            {'tag': 'first', 'data': {}},
+            {'tag': 'missing/data'},
+            {'events': ['not a dict']},
+            {'tag': 'failing', 'data': {}},
+            {'tag': 'last', 'data': {}},
+        ]
+
+        def _minion_event(load):
+            if load['tag'] == 'failing':
+                raise KeyError('data')
+        self.aes_funcs.masterapi._minion_event.side_effect = _minion_event
+        load = {'id': 'minion', 'tok': 'tok', 'cmd': '_minion_event',
+                'batch': salt.utils.event_batcher.pack(
+                    self.aes_funcs.serial, entries)}
+        with patch.object(self.aes_funcs, '_AESFuncs__verify_load',
+                          MagicMock(side_effect=lambda load, _: load)):
+            self.aes_funcs._minion_event(load)
+        fired = [call[0][0]['tag'] for call in
+                 self.aes_funcs.masterapi._minion_event.call_args_list]
+        self.assertEqual(fired, ['first', 'failing', 'last'])
+        handled = [call[0][0]['tag'] for call in
+                   self.aes_funcs._handle_minion_event.call_args_list]
+        self.assertEqual(handled, ['first', 'last'])
+
+
 class ClearFuncsTestCase(TestCase):
     '''
     TestCase for salt.master.ClearFuncs class
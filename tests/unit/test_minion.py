@@ -15,6 +15,7 @@ from tests.support.mixins import AdaptedConfigurationTestCaseMixin
 from tests.support.helpers import skip_if_not_root
 # Import salt libs
 import salt.minion
+import salt.utils.decorators
 import salt.utils.event as event
 from salt.exceptions import SaltSystemExit, SaltMasterUnresolvableError
 import salt.syspaths
@@ -35,6 +36,25 @@ class MinionTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
         with patch.dict(self.opts, {'ipv6': False, 'master': float('127.0'), 'master_port': '4555', 'retry_dns': False}):
             self.assertRaises(SaltSystemExit, salt.minion.resolve_dns, self.opts)
 
+    def test_send_req_signed_once(self):
+        '''
+        A load which is already signed, like the returns handed to the return
+        queue, is not signed again
+        '''
+        minion = salt.minion.Minion.__new__(salt.minion.Minion)
+        minion.opts = {'minion_sign_messages': True, 'pki_dir': '/tmp'}
+        sign_message = MagicMock(return_value='new-sig')
+        with patch('salt.crypt.sign_message', sign_message), \
+                patch('salt.transport.client.ReqChannel.factory', MagicMock()):
+            load = {'cmd': '_return', 'sig': 'sig'}
+            minion._send_req_sync(load, 60)
+            sign_message.assert_not_called()
+            self.assertEqual(load['sig'], 'sig')
+
+            load = {'cmd': '_return'}
+            minion._send_req_sync(load, 60)
+            self.assertEqual(load['sig'], 'new-sig')
+
     def test_source_int_name_local(self):
         '''
         test when file_client local and
@@ -235,6 +255,34 @@ class MinionTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
             finally:
                 minion.destroy()
 
+    def test_handle_decoded_payload_inline_functions(self):
+        '''
+        Tests that functions listed in inline_functions and marked inline_safe run in the minion's thread
+        pool, while everything else is still forked.
+        '''
+        with patch('salt.minion.Minion._target', MagicMock()), \
+                patch('salt.utils.process.SignalHandlingMultiprocessingProcess.start', MagicMock(return_value=True)), \
+                patch('salt.utils.process.SignalHandlingMultiprocessingProcess.join', MagicMock(return_value=True)):
+            mock_opts = salt.config.DEFAULT_MINION_OPTS.copy()
+            mock_opts['inline_functions'] = ['test.*']
+            io_loop = tornado.ioloop.IOLoop()
+            minion = salt.minion.Minion(mock_opts, jid_queue=[], io_loop=io_loop)
+            try:
+                minion.functions = {
+                    'test.ping': salt.utils.decorators.inline_safe(lambda: True),
+                    'test.sleep': lambda length: True,
+                }
+                io_loop.run_sync(lambda: minion._handle_decoded_payload({'fun': 'test.ping', 'jid': 1}))
+                self.assertEqual(salt.minion.Minion._target.call_count, 1)
+                self.assertFalse(salt.minion.Minion._target.call_args[0][1]['multiprocessing'])
+                self.assertEqual(salt.utils.process.SignalHandlingMultiprocessingProcess.start.call_count, 0)
+
+                io_loop.run_sync(lambda: minion._handle_decoded_payload({'fun': 'test.sleep', 'jid': 2}))
+                self.assertEqual(salt.minion.Minion._target.call_count, 1)
+                self.assertEqual(salt.utils.process.SignalHandlingMultiprocessingProcess.start.call_count, 1)
+            finally:
+                minion.destroy()
+
     def test_beacons_before_connect(self):
         '''
         Tests that the 'beacons_before_connect' option causes the beacons to be initialized before connect.
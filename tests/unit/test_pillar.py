@@ -13,6 +13,8 @@ import os
 import shutil
 import tempfile
 import textwrap
+import threading
+import time
 
 # Import Salt Testing libs
 from tests.support.runtests import RUNTIME_VARS
@@ -24,9 +26,13 @@ from tests.support.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
 import salt.exceptions
 import salt.fileclient
 import salt.pillar
+import salt.utils.ext_pillar
+import salt.utils.pillar_compile
+import salt.utils.render_cache
 import salt.utils.stringutils
 
 from salt.utils.files import fopen
+from salt.utils.odict import OrderedDict
 
 
 class MockFileclient(object):
@@ -823,6 +829,148 @@ sub_with_slashes:
             'test.sub.with.slashes': {'path': '', 'dest': sub_with_slashes_sls.name},
         }
 
+    @with_tempdir()
+    def test_render_cache(self, tempdir):
+        opts = {
+            'optimization_order': [0, 1, 2],
+            'renderer': 'jinja|yaml',
+            'renderer_blacklist': [],
+            'renderer_whitelist': [],
+            'state_top': '',
+            'pillar_roots': {'base': [tempdir]},
+            'extension_modules': '',
+            'saltenv': 'base',
+            'file_roots': [],
+            'cachedir': os.path.join(tempdir, 'cache'),
+            'cache': 'localfs',
+            'pillar_render_cache': True,
+            'pillar_render_cache_functions': ['grains.get'],
+        }
+        grains = {'os': 'Ubuntu', 'kernel': 'Linux'}
+        files = {
+            'top': 'base:\n  \'*\':\n    - os\n    - static\n',
+            'os': 'os: {{ grains[\'os\'] }}\n',
+            'static': 'static: value\n',
+        }
+        sls_files = {}
+        for sls, contents in files.items():
+            path = os.path.join(tempdir, '{0}.sls'.format(sls))
+            with fopen(path, 'w') as fp_:
+                fp_.write(contents)
+            sls_files[sls] = {'path': '', 'dest': path}
+        fc_mock = MockFileclient(
+            cache_file=sls_files['top']['dest'],
+            get_state=sls_files,
+            list_states=list(files),
+        )
+
+        def compile_pillar(grains):
+            pillar = salt.pillar.Pillar(opts, grains, 'minion', 'base')
+            pillar.matchers['confirm_top.confirm_top'] = lambda *x, **y: True
+            with patch('salt.pillar.compile_template',
+                       MagicMock(side_effect=salt.pillar.compile_template)) as render:
+                ret = pillar.compile_pillar()
+            rendered = set(
+                os.path.basename(call[0][0])[:-4] for call in render.call_args_list)
+            return ret, rendered - set(['top'])
+
+        with patch.object(salt.fileclient, 'get_file_client',
+                          MagicMock(return_value=fc_mock)):
+            ret, rendered = compile_pillar(dict(grains))
+            self.assertEqual(ret, {'os': 'Ubuntu', 'static': 'value'})
+            self.assertEqual(rendered, set(['os', 'static']))
+
+            # Nothing changed
+            ret, rendered = compile_pillar(dict(grains))
+            self.assertEqual(ret, {'os': 'Ubuntu', 'static': 'value'})
+            self.assertEqual(rendered, set())
+
+            # A grain which is not read changed
+            ret, rendered = compile_pillar(dict(grains, kernel='Darwin'))
+            self.assertEqual(rendered, set())
+
+            # A grain which is read changed
+            ret, rendered = compile_pillar(dict(grains, os='Debian'))
+            self.assertEqual(ret, {'os': 'Debian', 'static': 'value'})
+            self.assertEqual(rendered, set(['os']))
+
+            # An SLS file changed
+            with fopen(sls_files['static']['dest'], 'w') as fp_:
+                fp_.write('static: changed\n')
+            ret, rendered = compile_pillar(dict(grains, os='Debian'))
+            self.assertEqual(ret, {'os': 'Debian', 'static': 'changed'})
+            self.assertEqual(rendered, set(['static']))
+
+    @with_tempdir()
+    def test_render_cache_shared(self, tempdir):
+        opts = {
+            'optimization_order': [0, 1, 2],
+            'renderer': 'jinja|yaml',
+            'renderer_blacklist': [],
+            'renderer_whitelist': [],
+            'state_top': '',
+            'pillar_roots': {'base': [tempdir]},
+            'extension_modules': '',
+            'saltenv': 'base',
+            'file_roots': [],
+            'cachedir': os.path.join(tempdir, 'cache'),
+            'cache': 'localfs',
+            'pillar_render_cache': True,
+            'pillar_render_cache_shared': True,
+            'pillar_render_cache_functions': ['grains.get'],
+        }
+        files = {
+            'top': 'base:\n  \'*\':\n    - common\n    - id\n',
+            'common': 'os: {{ salt[\'grains.get\'](\'os\') }}\n',
+            'id': 'id: {{ opts[\'id\'] }}\n',
+        }
+        sls_files = {}
+        for sls, contents in files.items():
+            path = os.path.join(tempdir, '{0}.sls'.format(sls))
+            with fopen(path, 'w') as fp_:
+                fp_.write(contents)
+            sls_files[sls] = {'path': '', 'dest': path}
+        fc_mock = MockFileclient(
+            cache_file=sls_files['top']['dest'],
+            get_state=sls_files,
+            list_states=list(files),
+        )
+
+        def compile_pillar(minion_id, os_):
+            grains = {'id': minion_id, 'os': os_}
+            pillar = salt.pillar.Pillar(opts, grains, minion_id, 'base')
+            pillar.matchers['confirm_top.confirm_top'] = lambda *x, **y: True
+            with patch('salt.pillar.compile_template',
+                       MagicMock(side_effect=salt.pillar.compile_template)) as render:
+                ret = pillar.compile_pillar()
+            rendered = set(
+                os.path.basename(call[0][0])[:-4] for call in render.call_args_list)
+            return ret, rendered - set(['top'])
+
+        salt.utils.render_cache.stats(reset=True)
+        with patch.object(salt.fileclient, 'get_file_client',
+                          MagicMock(return_value=fc_mock)):
+            ret, rendered = compile_pillar('minion1', 'Ubuntu')
+            self.assertEqual(ret, {'os': 'Ubuntu', 'id': 'minion1'})
+            self.assertEqual(rendered, set(['common', 'id']))
+
+            # The render of common.sls is shared
+            ret, rendered = compile_pillar('minion2', 'Ubuntu')
+            self.assertEqual(ret, {'os': 'Ubuntu', 'id': 'minion2'})
+            self.assertEqual(rendered, set(['id']))
+
+            ret, rendered = compile_pillar('minion3', 'Debian')
+            self.assertEqual(ret, {'os': 'Debian', 'id': 'minion3'})
+            self.assertEqual(rendered, set(['common', 'id']))
+
+            # Both variants are kept
+            ret, rendered = compile_pillar('minion1', 'Ubuntu')
+            self.assertEqual(ret, {'os': 'Ubuntu', 'id': 'minion1'})
+            self.assertEqual(rendered, set())
+        self.assertEqual(
+            salt.utils.render_cache.stats(),
+            {'hits': 3, 'misses': 5, 'uncacheable': 0})
+
     @with_tempdir()
     def test_relative_include(self, tempdir):
         join = os.path.join
@@ -960,6 +1108,175 @@ sub_with_slashes:
         self.assertEqual(compiled_pillar['found'], 'my precious')
         self.assertEqual(compiled_pillar['mojo'], "bad risin'")
 
+    def _ext_pillar_sources(self, ext_pillars, sources, minion_id='minion', **opts):
+        opts.update({
+            'optimization_order': [0, 1, 2],
+            'renderer': 'yaml',
+            'renderer_blacklist': [],
+            'renderer_whitelist': [],
+            'state_top': '',
+            'pillar_roots': {'base': []},
+            'file_roots': {'base': []},
+            'extension_modules': '',
+            'ext_pillar': [{key: {}} for key in ext_pillars],
+            'ext_pillar_sources': sources,
+        })
+        self.addCleanup(salt.utils.ext_pillar._BREAKERS.clear)
+        with patch('salt.loader.pillars', MagicMock(return_value=ext_pillars)):
+            return salt.pillar.Pillar(opts, {}, minion_id, 'base')
+
+    def test_ext_pillar_concurrent(self):
+        started = threading.Event()
+        seen = {}
+
+        def one(minion_id, pillar):
+            seen['one'] = dict(pillar)
+            # Only returns early if two runs at the same time
+            started.wait(5)
+            return {'order': 'one', 'one': started.is_set()}
+
+        def two(minion_id, pillar):
+            seen['two'] = dict(pillar)
+            started.set()
+            return {'order': 'two'}
+
+        def three(minion_id, pillar):
+            seen['three'] = dict(pillar)
+            return {'three': True}
+
+        pillar = self._ext_pillar_sources(
+            OrderedDict([('one', one), ('two', two), ('three', three)]),
+            {'one': {'concurrent': True}, 'two': {'concurrent': True}})
+        ret, errors = pillar.ext_pillar({'sls': 'data'}, [])
+        self.assertEqual(errors, [])
+        # Merged in the configured order
+        self.assertEqual(
+            ret, {'sls': 'data', 'order': 'two', 'one': True, 'three': True})
+        self.assertEqual(seen['one'], {'sls': 'data'})
+        self.assertEqual(seen['two'], {'sls': 'data'})
+        self.assertEqual(seen['three'], {'sls': 'data', 'order': 'two', 'one': True})
+
+    def test_ext_pillar_timeout(self):
+        calls = []
+
+        def slow(minion_id, pillar):
+            calls.append(minion_id)
+            time.sleep(0.5)
+            return {'slow': True}
+
+        def fast(minion_id, pillar):
+            return {'fast': True}
+
+        pillar = self._ext_pillar_sources(
+            OrderedDict([('slow', slow), ('fast', fast)]),
+            {'slow': {'timeout': 0.1, 'failures': 1, 'retry': 60}})
+        ret, errors = pillar.ext_pillar({}, [])
+        self.assertEqual(ret, {'fast': True})
+        self.assertEqual(
+            errors, ['Failed to load ext_pillar slow: timed out after 0.1 seconds'])
+
+        # The circuit breaker skips the external pillar now
+        ret, errors = pillar.ext_pillar({}, [])
+        self.assertEqual(ret, {'fast': True})
+        self.assertEqual(len(errors), 1)
+        self.assertIn('too many failures', errors[0])
+        self.assertEqual(len(calls), 1)
+
+        # Until the retry interval passed
+        salt.utils.ext_pillar._BREAKERS['slow:0']['open_until'] = time.time() - 1
+        with patch.dict(pillar.opts['ext_pillar_sources']['slow'], {'timeout': 5}):
+            ret, errors = pillar.ext_pillar({}, [])
+        self.assertEqual(ret, {'fast': True, 'slow': True})
+        self.assertEqual(errors, [])
+        self.assertEqual(salt.utils.ext_pillar._BREAKERS, {})
+
+    def test_ext_pillar_entries(self):
+        '''
+        The entries of the same external pillar have their own options and
+        circuit breaker
+        '''
+        calls = []
+
+        def db(minion_id, pillar, host):
+            calls.append(host)
+            if host == 'down':
+                raise Exception('unreachable')
+            return {host: True}
+
+        pillar = self._ext_pillar_sources(
+            {'db': db}, {'db': {'failures': 1, 'retry': 60},
+                         'db:1': {'failures': 2}})
+        pillar.opts['ext_pillar'] = [{'db': {'host': 'down'}},
+                                     {'db': {'host': 'up'}},
+                                     {'db': {'host': 'down'}}]
+        for _ in range(2):
+            ret, errors = pillar.ext_pillar({}, [])
+            self.assertEqual(ret, {'up': True})
+            self.assertEqual(len(errors), 2)
+        # Both failing entries are skipped after their first failure, the
+        # other one still runs
+        self.assertEqual(calls, ['down', 'up', 'down', 'up'])
+        self.assertEqual(sorted(salt.utils.ext_pillar._BREAKERS), ['db:0', 'db:2'])
+        self.assertEqual(salt.utils.ext_pillar.source_opts(pillar.opts, 'db', 1)['failures'], 2)
+
+    def test_ext_pillar_timeout_hung(self):
+        '''
+        The external pillars which timed out do not take up the thread pool
+        '''
+        hung = threading.Event()
+        self.addCleanup(hung.set)
+
+        def slow(minion_id, pillar):
+            hung.wait(10)
+            return {'slow': True}
+
+        def fast(minion_id, pillar):
+            return {'fast': True}
+
+        pillar = self._ext_pillar_sources(
+            OrderedDict([('slow', slow), ('fast', fast)]),
+            {'slow': {'timeout': 0.1},
+             'fast': {'concurrent': True}})
+        pillar.opts['ext_pillar_workers'] = 1
+        start = time.time()
+        with patch.object(salt.utils.ext_pillar, '_POOL', [None, None]):
+            for _ in range(3):
+                ret, errors = pillar.ext_pillar({}, [])
+                self.assertEqual(ret, {'fast': True})
+                self.assertEqual(len(errors), 1)
+        # The concurrent external pillar did not wait for a free thread
+        self.assertLess(time.time() - start, 5)
+
+    @with_tempdir()
+    def test_ext_pillar_cache(self, tempdir):
+        calls = []
+
+        def shared(minion_id, pillar):
+            calls.append(minion_id)
+            return {'shared': len(calls)}
+
+        sources = {'shared': {'cache_ttl': 60, 'cache_scope': 'global'}}
+        cache_opts = {'cachedir': tempdir, 'cache': 'localfs'}
+        for minion_id in ('m1', 'm2'):
+            pillar = self._ext_pillar_sources(
+                {'shared': shared}, sources, minion_id, **cache_opts)
+            ret, errors = pillar.ext_pillar({}, [])
+            self.assertEqual(ret, {'shared': 1})
+        self.assertEqual(calls, ['m1'])
+
+        # Not shared between minions by default
+        sources['shared']['cache_scope'] = 'minion'
+        for minion_id in ('m1', 'm2', 'm1'):
+            pillar = self._ext_pillar_sources(
+                {'shared': shared}, sources, minion_id, **cache_opts)
+            pillar.ext_pillar({}, [])
+        self.assertEqual(calls, ['m1', 'm1', 'm2'])
+
+        # Expired
+        with patch('time.time', MagicMock(return_value=time.time() + 61)):
+            pillar.ext_pillar({}, [])
+        self.assertEqual(calls, ['m1', 'm1', 'm2', 'm1'])
+
 
 @skipIf(NO_MOCK, NO_MOCK_REASON)
 @patch('salt.transport.client.ReqChannel.factory', MagicMock())
@@ -1066,7 +1383,8 @@ class RemotePillarTestCase(TestCase):
             pillar = salt.pillar.RemotePillar(opts, self.grains,
                                               'mocked_minion', 'fake_env')
 
-        ret = pillar.compile_pillar()
+        with patch('uuid.uuid4', MagicMock(return_value=MagicMock(hex='fake_nonce'))):
+            ret = pillar.compile_pillar()
         self.assertEqual(pillar.channel, mock_channel)
         mock_channel.crypted_transfer_decode_dictentry.assert_called_once_with(
             {'cmd': '_pillar', 'ver': '2',
@@ -1075,9 +1393,49 @@ class RemotePillarTestCase(TestCase):
              'saltenv': 'fake_env',
              'pillarenv': 'fake_pillar_env',
              'pillar_override': {},
-             'extra_minion_data': {'path_to_add': 'fake_data'}},
+             'extra_minion_data': {'path_to_add': 'fake_data'},
+             'nonce': 'fake_nonce'},
             dictkey='pillar')
 
+    def test_pillar_pending(self):
+        pending = {salt.utils.pillar_compile.PENDING: {'retry': 0}}
+        mock_channel = MagicMock(
+            crypted_transfer_decode_dictentry=MagicMock(
+                side_effect=[pending, pending, {'key': 'value'}]))
+        with patch('salt.transport.client.ReqChannel.factory',
+                   MagicMock(return_value=mock_channel)):
+            pillar = salt.pillar.RemotePillar({'pillarenv': None}, self.grains,
+                                              'mocked_minion', 'base')
+
+        self.assertEqual(pillar.compile_pillar(), {'key': 'value'})
+        calls = mock_channel.crypted_transfer_decode_dictentry.call_args_list
+        self.assertEqual(len(calls), 3)
+        # The same request is repeated, with the same nonce
+        self.assertEqual(calls[0], calls[2])
+
+    def test_pillar_pending_timeout(self):
+        pending = {salt.utils.pillar_compile.PENDING: {'retry': 10}}
+        mock_channel = MagicMock(
+            crypted_transfer_decode_dictentry=MagicMock(return_value=pending))
+        with patch('salt.transport.client.ReqChannel.factory',
+                   MagicMock(return_value=mock_channel)):
+            pillar = salt.pillar.RemotePillar({'pillarenv': None,
+                                               'pillar_compile_timeout': 25},
+                                              self.grains, 'mocked_minion', 'base')
+
+        clock = [1000]
+
+        def _sleep(seconds):
+            clock[0] += seconds
+
+        with patch('time.time', MagicMock(side_effect=lambda: clock[0])), \
+                patch('time.sleep', MagicMock(side_effect=_sleep)) as sleep_mock:
+            with self.assertRaises(salt.exceptions.SaltClientError):
+                pillar.compile_pillar()
+        # Gave up rather than waiting past the timeout
+        self.assertEqual(sleep_mock.call_count, 2)
+        self.assertEqual(mock_channel.crypted_transfer_decode_dictentry.call_count, 3)
+
 
 @skipIf(NO_MOCK, NO_MOCK_REASON)
 @patch('salt.transport.client.AsyncReqChannel.factory', MagicMock())
@@ -1120,7 +1478,8 @@ class AsyncRemotePillarTestCase(TestCase):
             pillar = salt.pillar.RemotePillar(opts, self.grains,
                                               'mocked_minion', 'fake_env')
 
-        ret = pillar.compile_pillar()
+        with patch('uuid.uuid4', MagicMock(return_value=MagicMock(hex='fake_nonce'))):
+            ret = pillar.compile_pillar()
         mock_channel.crypted_transfer_decode_dictentry.assert_called_once_with(
             {'cmd': '_pillar', 'ver': '2',
              'id': 'mocked_minion',
@@ -1128,5 +1487,6 @@ class AsyncRemotePillarTestCase(TestCase):
              'saltenv': 'fake_env',
              'pillarenv': 'fake_pillar_env',
              'pillar_override': {},
-             'extra_minion_data': {'path_to_add': 'fake_data'}},
+             'extra_minion_data': {'path_to_add': 'fake_data'},
+             'nonce': 'fake_nonce'},
             dictkey='pillar')
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for the thorium runtime and register
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+
+# Import Salt Testing Libs
+from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+from tests.support.unit import TestCase, skipIf
+
+# Import Salt Libs
+import salt.state
+import salt.thorium
+import salt.thorium.reg as reg
+
+
+def _event(tag, **data):
+    return {'tag': tag, 'data': {'data': data}}
+
+
+class RegTestCase(TestCase, LoaderModuleMockMixin):
+    '''
+    Validate salt.thorium.reg
+    '''
+    def setup_loader_modules(self):
+        return {reg: {'__reg__': {}, '__events__': []}}
+
+    def _call(self, fun, events, *args, **kwargs):
+        with patch.object(reg, '__events__', events):
+            return fun(*args, **kwargs)
+
+    def test_list_prune(self):
+        events = [_event('my/event', val=num) for num in range(5)]
+        self._call(reg.list_, events, 'foo', 'val', 'my/event', prune=3)
+        self.assertEqual(list(reg.__reg__['foo']['val']),
+                         [{'val': 2}, {'val': 3}, {'val': 4}])
+
+    def test_mean(self):
+        events = [_event('my/event', val='2'), _event('my/event', val='x'),
+                  _event('my/event', other=1), _event('my/event', val=4)]
+        self._call(reg.mean, events, 'foo', 'val', 'my/event')
+        self.assertEqual(reg.__reg__['foo']['count'], 2)
+        self.assertEqual(reg.__reg__['foo']['val'], 3)
+
+    def test_window(self):
+        events = [_event('my/event', val=num) for num in range(5)]
+        self._call(reg.window, events, 'foo', 'val', 'my/event', size=3)
+        self.assertEqual(list(reg.__reg__['foo']['val']), [2, 3, 4])
+        self.assertEqual(reg.__reg__['foo']['total'], 9)
+        self.assertEqual(reg.__reg__['foo']['count'], 3)
+        self.assertEqual(reg.__reg__['foo']['mean'], 3)
+        self._call(reg.window, [_event('my/event', val=10)],
+                   'foo', 'val', 'my/event', size=3)
+        self.assertEqual(reg.__reg__['foo']['total'], 17)
+        self.assertEqual(reg.__reg__['foo']['count'], 3)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ThorRuntimeTestCase(TestCase):
+    '''
+    Validate salt.thorium.ThorRuntime
+    '''
+    def setUp(self):
+        self.register = salt.thorium.Register()
+        self.runtime = salt.thorium.ThorRuntime.__new__(salt.thorium.ThorRuntime)
+        self.runtime.opts = {}
+        self.runtime.incremental = True
+        self.runtime.inject_globals = {'__reg__': self.register}
+        self.runtime.reset()
+        self.calls = []
+
+    def tearDown(self):
+        del self.register
+        del self.runtime
+        del self.calls
+
+    def _state_call(self, low, chunks=None, running=None, retries=1):
+        self.calls.append(low['__id__'])
+        if low['state'] == 'reg':
+            self.register.setdefault(low['name'], {'val': []})
+            self.register[low['name']]['val'].append(1)
+        else:
+            self.register.get(low['name'])
+        return {'name': low['name'], 'changes': {'ran': True}, 'result': True}
+
+    def _tick(self, events):
+        chunks = [
+            {'__id__': 'foo', 'name': 'foo', 'state': 'reg', 'fun': 'list',
+             'match': 'my/event'},
+            {'__id__': 'check', 'name': 'foo', 'state': 'check', 'fun': 'len_gt'},
+            {'__id__': 'bar', 'name': 'bar', 'state': 'check', 'fun': 'gt'},
+        ]
+        self.calls = []
+        self.runtime.events = events
+        self.runtime._matched = {}  # pylint: disable=protected-access
+        return [self.runtime.call(chunk) for chunk in chunks]
+
+    def test_call(self):
+        with patch.object(salt.state.State, 'call',
+                          MagicMock(side_effect=self._state_call)):
+            self._tick([_event('my/event')])
+            self.assertEqual(self.calls, ['foo', 'check', 'bar'])
+            # Nothing changed
+            ret = self._tick([_event('other/event')])
+            self.assertEqual(self.calls, [])
+            self.assertEqual(ret[0]['changes'], {})
+            self.assertEqual(ret[1]['changes'], {'ran': True})
+            # Only the readers of the changed entry run again
+            self._tick([_event('my/event')])
+            self.assertEqual(self.calls, ['foo', 'check'])
+            # Everything runs when disabled
+            self.runtime.incremental = False
+            self._tick([_event('other/event')])
+            self.assertEqual(self.calls, ['foo', 'check', 'bar'])
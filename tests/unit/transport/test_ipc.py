@@ -10,6 +10,7 @@ import errno
 import socket
 import threading
 import logging
+import time
 
 import tornado.gen
 import tornado.ioloop
@@ -272,3 +273,19 @@ class IPCMessagePubSubCase(tornado.testing.AsyncTestCase):
         ret2 = client2.read_sync()
         self.assertEqual(ret1, 'TEST')
         self.assertEqual(ret2, 'TEST')
+
+    def test_subscription(self):
+        client1 = self.sub_channel
+        client2 = self._get_sub_channel()
+        client1.subscribe([['startswith', 'salt/job/1'], ['fnmatch', '*/ret']])
+
+        # Wait for the publisher to read the subscription
+        timeout_at = time.time() + 5
+        while not self.pub_channel.subscriptions and time.time() < timeout_at:
+            self.io_loop.run_sync(lambda: tornado.gen.sleep(0.01))
+
+        self.pub_channel.publish('A', tag='salt/job/2/new')
+        self.pub_channel.publish('B', tag='salt/job/1/new')
+        self.pub_channel.publish('C', tag='salt/job/2/ret')
+        self.assertEqual([client1.read_sync() for _ in range(2)], ['B', 'C'])
+        self.assertEqual([client2.read_sync() for _ in range(3)], ['A', 'B', 'C'])
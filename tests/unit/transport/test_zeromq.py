@@ -323,6 +323,39 @@ class AsyncReqMessageClientPoolTest(TestCase):
         self.assertEqual([], self.message_client_pool.message_clients)
 
 
+class PeerDeviceTest(TestCase):
+    '''
+    The queue device forwards the IP address the requests came from
+    '''
+    def test_peer_device(self):
+        # The device runs until its process exits, so the context is not
+        # terminated
+        context = zmq.Context()
+        channel = salt.transport.zeromq.ZeroMQReqServerChannel.__new__(
+            salt.transport.zeromq.ZeroMQReqServerChannel)
+        channel.clients = context.socket(zmq.ROUTER)
+        port = channel.clients.bind_to_random_port('tcp://127.0.0.1')
+        channel.workers = context.socket(zmq.DEALER)
+        channel.workers.bind('inproc://workers')
+        worker = context.socket(zmq.REP)
+        worker.connect('inproc://workers')
+        client = context.socket(zmq.REQ)
+        client.connect('tcp://127.0.0.1:{0}'.format(port))
+        for sock in (client, worker):
+            sock.setsockopt(zmq.LINGER, 0)
+            sock.setsockopt(zmq.RCVTIMEO, 5000)
+            self.addCleanup(sock.close)
+
+        thread = threading.Thread(target=channel._peer_device)  # pylint: disable=protected-access
+        thread.daemon = True
+        thread.start()
+
+        client.send(b'payload')
+        self.assertEqual(worker.recv_multipart(), [b'payload', b'127.0.0.1'])
+        worker.send(b'reply')
+        self.assertEqual(client.recv(), b'reply')
+
+
 class ZMQConfigTest(TestCase):
     def test_master_uri(self):
         '''
@@ -13,6 +13,8 @@ import os
 import hashlib
 import time
 import shutil
+import tempfile
+import threading
 
 # Import Salt Testing libs
 from tests.support.unit import expectedFailure, skipIf, TestCase
@@ -20,6 +22,7 @@ from tests.support.runtests import RUNTIME_VARS
 from tests.support.events import eventpublisher_process, eventsender_process
 
 # Import salt libs
+import salt.config
 import salt.utils.event
 import salt.utils.stringutils
 
@@ -280,6 +283,26 @@ class TestSaltEvent(TestCase):
                 evt = me.get_event(tag='testevents')
                 self.assertGotEvent(evt, {'data': '{0}'.format(i)}, 'Event {0}'.format(i))
 
+    def test_event_publisher_filter(self):
+        '''Test the publisher only sends the filtered events'''
+        with eventpublisher_process(self.sock_dir):
+            me = salt.utils.event.MasterEvent(self.sock_dir, listen=True)
+            me.filter_publisher(['evt1'])
+            me.subscribe('evt3')
+            # The publisher reads the filter asynchronously
+            time.sleep(0.5)
+            me.fire_event({'data': 'foo2'}, 'evt2')
+            me.fire_event({'data': 'foo1'}, 'evt1')
+            me.fire_event({'data': 'foo3'}, 'evt3')
+            evt1 = me.get_event(full=True)
+            evt3 = me.get_event(full=True)
+            self.assertGotEvent(evt1, {'tag': 'evt1'})
+            self.assertGotEvent(evt3, {'tag': 'evt3'})
+            self.assertIsNotNone(me.publisher_filter)
+            # Waiting for an event which is not filtered on stops the filtering
+            self.assertIsNone(me.get_event(tag='evt2', wait=0.1))
+            self.assertIsNone(me.publisher_filter)
+
     # Test the fire_master function. As it wraps the underlying fire_event,
     # we don't need to perform extensive testing.
     def test_send_master_event(self):
@@ -325,3 +348,74 @@ class TestAsyncEventPublisher(AsyncTestCase):
         self.assertEqual(self.tag, 'evt1')
         self.data.pop('_stamp')  # drop the stamp
         self.assertEqual(self.data, {'data': 'foo1'})
+
+
+class TestEventReturnQueue(TestCase):
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        self.opts = dict(salt.config.DEFAULT_MASTER_OPTS,
+                         cachedir=self.cachedir,
+                         event_return_queue_batches=1,
+                         event_return_spool=True)
+        self.stored = []
+        self.release = threading.Event()
+
+    def tearDown(self):
+        del self.opts
+        del self.stored
+        del self.release
+
+    def _store(self, batch):
+        # A returner which does not keep up until it is released
+        self.release.wait(10)
+        self.stored.append([event['data']['num'] for event in batch])
+
+    def _batch(self, *nums):
+        return salt.utils.event.EventBatch(
+            [{'tag': 'salt/test', 'data': {'num': num}} for num in nums])
+
+    def test_event_batch(self):
+        batch = self._batch(1, 2)
+        self.assertEqual(batch.tags, ['salt/test', 'salt/test'])
+        self.assertIs(batch.json_data(), batch.json_data())
+        self.assertEqual(batch.json_events(),
+                         ['{"tag": "salt/test", "data": {"num": 1}}',
+                          '{"tag": "salt/test", "data": {"num": 2}}'])
+        self.assertIs(salt.utils.event.event_batch(batch), batch)
+        self.assertEqual(salt.utils.event.event_batch([]), [])
+
+    def test_spool(self):
+        returner_queue = salt.utils.event.EventReturnQueue(
+            self.opts, 'test', self._store)
+        returner_queue.compress_size = 200
+        # The first batch is being stored, the second one is queued, the next
+        # ones are spooled
+        self.assertTrue(returner_queue.put(self._batch(1)))
+        time.sleep(0.5)
+        self.assertTrue(returner_queue.put(self._batch(2)))
+        self.assertTrue(returner_queue.put(self._batch(3)))
+        self.assertTrue(returner_queue.put(self._batch(*range(4, 50))))
+        spooled = os.listdir(returner_queue.spool_dir)
+        self.assertEqual(len(spooled), 2)
+        # The large batch is compressed
+        self.assertEqual(sorted(name.rsplit('.', 1)[1] for name in spooled),
+                         ['p', 'pz'])
+
+        self.release.set()
+        returner_queue.stop()
+        self.assertEqual(self.stored,
+                         [[1], [2], [3], list(range(4, 50))])
+        self.assertEqual(os.listdir(returner_queue.spool_dir), [])
+
+    def test_drop(self):
+        self.opts['event_return_spool'] = False
+        returner_queue = salt.utils.event.EventReturnQueue(
+            self.opts, 'test', self._store)
+        self.assertTrue(returner_queue.put(self._batch(1)))
+        time.sleep(0.5)
+        self.assertTrue(returner_queue.put(self._batch(2)))
+        self.assertFalse(returner_queue.put(self._batch(3)))
+        self.release.set()
+        returner_queue.stop()
+        self.assertEqual(self.stored, [[1], [2]])
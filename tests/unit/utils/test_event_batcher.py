@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for salt.utils.event_batcher
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import os
+import zlib
+
+# Import Salt Testing Libs
+from tests.support.unit import skipIf, TestCase
+from tests.support.mock import (
+    NO_MOCK,
+    NO_MOCK_REASON,
+    MagicMock,
+    patch
+)
+
+# Import Salt Libs
+import salt.payload
+import salt.utils.event_batcher
+
+# Import 3rd-party libs
+import tornado.gen
+import tornado.testing
+from tornado.testing import AsyncTestCase
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class EventBatcherTestCase(AsyncTestCase, TestCase):
+    '''
+    Validate salt.utils.event_batcher.EventBatcher
+    '''
+    def setUp(self):
+        super(EventBatcherTestCase, self).setUp()
+        self.opts = {'id': 'minion',
+                     'master_event_batch_size': 3,
+                     'master_event_batch_interval': 0.01,
+                     'master_event_coalesce': ['salt/beacon/*/load/'],
+                     'master_event_compress_size': 0}
+        self.serial = salt.payload.Serial(self.opts)
+        self.sent = []
+
+    def _batcher(self):
+        @tornado.gen.coroutine
+        def send(load, timeout=60):
+            self.sent.append(load)
+            raise tornado.gen.Return('')
+        batcher = salt.utils.event_batcher.EventBatcher(
+            self.opts, io_loop=self.io_loop, tok=lambda: 'tok')
+        batcher.channel = MagicMock(send=send)
+        return batcher
+
+    def _entries(self, load):
+        return salt.utils.event_batcher.unpack(self.serial, load['batch'])
+
+    @tornado.testing.gen_test
+    def test_flush(self):
+        '''
+        Pending events are sent in batches of master_event_batch_size
+        '''
+        batcher = self._batcher()
+        with patch.object(batcher, '_schedule_flush', MagicMock()):
+            batcher.put({'foo': 1}, 'custom/tag')
+            batcher.put(events=[{'tag': 'salt/beacon/minion/load/', 'data': {'1m': 1}},
+                                {'tag': 'salt/beacon/minion/inotify/', 'data': {}}])
+            batcher.put(events=[{'tag': 'salt/beacon/minion/load/', 'data': {'1m': 2}}])
+            batcher.put({'foo': 2}, 'custom/tag', pretag='pre')
+        yield batcher.flush()
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual(self.sent[0]['tok'], 'tok')
+        self.assertEqual(self.sent[0]['cmd'], '_minion_event')
+        # Only the most recent load event is sent, the other tags are kept
+        self.assertEqual(
+            self._entries(self.sent[0]),
+            [{'data': {'foo': 1}, 'tag': 'custom/tag', 'pretag': None},
+             {'events': [{'tag': 'salt/beacon/minion/inotify/', 'data': {}}], 'pretag': None},
+             {'events': [{'tag': 'salt/beacon/minion/load/', 'data': {'1m': 2}}], 'pretag': None}])
+        self.assertEqual(
+            self._entries(self.sent[1]),
+            [{'data': {'foo': 2}, 'tag': 'custom/tag', 'pretag': 'pre'}])
+        self.assertEqual(len(batcher), 0)
+
+    def test_compress(self):
+        entries = [{'data': {'foo': 'x' * 1000}, 'tag': 'custom/tag', 'pretag': None}]
+        batch = salt.utils.event_batcher.pack(self.serial, entries, 100)
+        self.assertIn('zlib', batch)
+        self.assertEqual(salt.utils.event_batcher.unpack(self.serial, batch), entries)
+        self.assertEqual(salt.utils.event_batcher.pack(self.serial, entries, 0),
+                         {'entries': entries})
+
+    def test_unpack_invalid(self):
+        for batch in ('foo', {'entries': 'foo'}, {'zlib': b'foo'}):
+            self.assertRaises(ValueError, salt.utils.event_batcher.unpack, self.serial, batch)
+        with patch.object(salt.utils.event_batcher, 'MAX_BATCH_SIZE', 100):
+            self.assertRaises(ValueError, salt.utils.event_batcher.unpack, self.serial,
+                              {'zlib': zlib.compress(os.urandom(1000))})
+
+    def test_valid_entry(self):
+        valid = (
+            {'tag': 'custom/tag', 'data': {'foo': 1}, 'pretag': None},
+            {'tag': 'custom/tag', 'data': {'foo': 1}, 'pretag': 'pre'},
+            {'events': [{'tag': 'salt/beacon/minion/load/', 'data': {}}]},
+        )
+        invalid = (
+            'foo',
+            {'tag': 'custom/tag'},
+            {'tag': 1, 'data': {}},
+            {'tag': 'custom/tag', 'data': {}, 'pretag': 1},
+            {'events': 'foo'},
+            {'events': ['foo']},
+            {'events': [{'data': {}}]},
+        )
+        for entry in valid:
+            self.assertTrue(salt.utils.event_batcher.valid_entry(entry), entry)
+        for entry in invalid:
+            self.assertFalse(salt.utils.event_batcher.valid_entry(entry), entry)
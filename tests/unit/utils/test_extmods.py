@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for salt.utils.extmods
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing Libs
+from tests.support.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+from tests.support.unit import TestCase, skipIf
+
+# Import Salt Libs
+import salt.utils.extmods
+import salt.utils.files
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ExtmodsSyncTestCase(TestCase):
+    '''
+    Validate salt.utils.extmods.sync with the manifests of the master
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        self.opts = {'cachedir': self.cachedir,
+                     'extension_modules': os.path.join(self.cachedir, 'extmods'),
+                     'extmod_whitelist': {},
+                     'extmod_blacklist': {},
+                     'utils_dirs': [],
+                     'clean_dynamic_modules': True}
+        self.fileclient = MagicMock()
+        self.fileclient.file_manifest.return_value = {
+            'digest': 'abc', 'hash_type': 'sha256', 'files': {}}
+        self.fileclient.cache_manifest.side_effect = self._cache_manifest
+
+    def tearDown(self):
+        del self.opts
+        del self.fileclient
+
+    def _cache_manifest(self, manifest, saltenv, **kwargs):
+        path = os.path.join(self.cachedir, 'files', saltenv, '_modules',
+                            'mymod.py')
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with salt.utils.files.fopen(path, 'w') as fp_:
+            fp_.write(manifest['digest'])
+        return [path]
+
+    def _sync(self):
+        with patch('salt.fileclient.get_file_client',
+                   MagicMock(return_value=self.fileclient)):
+            return salt.utils.extmods.sync(self.opts, 'modules')
+
+    def test_sync_unchanged(self):
+        self.assertEqual(self._sync(), (['modules.mymod'], True))
+        self.assertEqual(self.fileclient.cache_manifest.call_count, 1)
+        self.fileclient.cache_dir.assert_not_called()
+
+        # The digest did not change, nothing is cached nor cleaned
+        self.assertEqual(self._sync(), ([], False))
+        self.assertEqual(self.fileclient.cache_manifest.call_count, 1)
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.opts['extension_modules'], 'modules',
+                         'mymod.py')))
+
+        # The module was removed locally
+        os.remove(os.path.join(self.opts['extension_modules'], 'modules',
+                               'mymod.py'))
+        self.assertEqual(self._sync(), (['modules.mymod'], True))
+        self.assertEqual(self.fileclient.cache_manifest.call_count, 2)
+
+        # The digest changed
+        self.fileclient.file_manifest.return_value['digest'] = 'def'
+        self.assertEqual(self._sync(), (['modules.mymod'], True))
+        self.assertEqual(self.fileclient.cache_manifest.call_count, 3)
+
+    def test_sync_filters_changed(self):
+        self._sync()
+        self.opts['extmod_blacklist'] = {'modules': ['mymod']}
+        self.assertEqual(self._sync(), ([], True))
+        self.assertEqual(self.fileclient.cache_manifest.call_count, 2)
+        self.assertFalse(os.path.isfile(
+            os.path.join(self.opts['extension_modules'], 'modules',
+                         'mymod.py')))
+
+    def test_sync_without_manifest(self):
+        '''
+        The directory is cached file by file from a master without manifests
+        '''
+        self.fileclient.file_manifest.return_value = None
+        self.fileclient.cache_dir.return_value = []
+        self.assertEqual(self._sync()[0], [])
+        self.fileclient.cache_dir.assert_called_once()
+        self.fileclient.cache_manifest.assert_not_called()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for salt.utils.hash_index
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing Libs
+from tests.support.mock import NO_MOCK, NO_MOCK_REASON, MagicMock
+from tests.support.unit import TestCase, skipIf
+
+# Import Salt Libs
+import salt.utils.files
+import salt.utils.hashutils
+import salt.utils.hash_index
+
+
+class FakeFileserver(object):
+    '''
+    A fileserver with a single backend serving the files of a directory in
+    the base saltenv
+    '''
+    def __init__(self, opts, root):
+        self.opts = opts
+        self.root = root
+        self.file_hash = MagicMock(side_effect=self._file_hash)
+        self.servers = {
+            'fake.envs': lambda: ['base'],
+            'fake.file_list': self._file_list,
+            'fake.find_file': self._find_file,
+            'fake.file_hash': self.file_hash,
+        }
+
+    def backends(self, back=None):
+        return ['fake']
+
+    def _file_list(self, load):
+        return sorted(os.listdir(self.root))
+
+    def _find_file(self, path, saltenv):
+        full = os.path.join(self.root, path)
+        if not os.path.isfile(full):
+            return {'path': '', 'rel': ''}
+        return {'path': full, 'rel': path, 'stat': list(os.stat(full))}
+
+    def _file_hash(self, load, fnd):
+        return {'hsum': salt.utils.hashutils.get_hash(fnd['path'], 'sha256'),
+                'hash_type': 'sha256'}
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class HashIndexTestCase(TestCase):
+    '''
+    Validate salt.utils.hash_index.HashIndex
+    '''
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cachedir = tempfile.mkdtemp()
+        for path in (self.root, self.cachedir):
+            self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        self._write('top.sls', 'base:')
+        self._write('web.sls', 'nginx')
+        self.opts = {'hash_type': 'sha256', 'cachedir': self.cachedir}
+        self.fs_ = FakeFileserver(self.opts, self.root)
+        self.index = salt.utils.hash_index.HashIndex(self.fs_)
+
+    def _write(self, rel, content):
+        with salt.utils.files.fopen(os.path.join(self.root, rel), 'w') as fp_:
+            fp_.write(content)
+
+    def test_update(self):
+        self.index.update()
+        self.assertEqual(self.fs_.file_hash.call_count, 2)
+        self.assertEqual(sorted(self.index.backends['fake']['base']),
+                         ['top.sls', 'web.sls'])
+
+        # Only the new and modified files are hashed again
+        self.fs_.file_hash.reset_mock()
+        self._write('web.sls', 'nginx and more')
+        self._write('db.sls', 'postgres')
+        os.remove(os.path.join(self.root, 'top.sls'))
+        self.index.update()
+        self.assertEqual(
+            sorted(call[0][0]['path']
+                   for call in self.fs_.file_hash.call_args_list),
+            ['db.sls', 'web.sls'])
+        self.assertEqual(sorted(self.index.backends['fake']['base']),
+                         ['db.sls', 'web.sls'])
+
+    def test_lookup(self):
+        self.index.update()
+        # Another process reads the index file
+        index = salt.utils.hash_index.HashIndex(self.fs_)
+        hsum, stat = index.hash_and_stat('web.sls', 'base')
+        self.assertEqual(
+            hsum,
+            {'hsum': salt.utils.hashutils.get_hash(
+                os.path.join(self.root, 'web.sls'), 'sha256'),
+             'hash_type': 'sha256'})
+        self.assertEqual(stat, list(os.stat(os.path.join(self.root, 'web.sls'))))
+        self.assertEqual(index.find_file('web.sls', 'base')['path'],
+                         os.path.join(self.root, 'web.sls'))
+        # Missing files
+        self.assertEqual(index.hash_and_stat('missing.sls', 'base'), ('', None))
+        self.assertEqual(index.find_file('missing.sls', 'base'),
+                         {'path': '', 'rel': ''})
+        # The fileserver has to answer
+        self.assertIsNone(index.lookup('web.sls', 'dev'))
+        self.assertIsNone(index.lookup('web.sls?saltenv=dev', 'base'))
+        self.assertIsNone(index.lookup('../web.sls', 'base'))
+
+    def test_hash_type_changed(self):
+        '''
+        An index of another hash type is not used
+        '''
+        self.index.update()
+        opts = dict(self.opts, hash_type='md5')
+        index = salt.utils.hash_index.HashIndex(FakeFileserver(opts, self.root))
+        self.assertIsNone(index.lookup('web.sls', 'base'))
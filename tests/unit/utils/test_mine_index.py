@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for salt.utils.mine_index
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import shutil
+import tempfile
+
+# Import Salt Testing Libs
+from tests.support.runtests import RUNTIME_VARS
+from tests.support.unit import TestCase
+
+# Import Salt Libs
+import salt.cache
+import salt.config
+import salt.utils.mine_index
+
+
+class MineIndexTestCase(TestCase):
+    '''
+    Validate salt.utils.mine_index
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+        self.opts['cachedir'] = self.cachedir
+        self.opts['mine_index'] = True
+        self.cache = salt.cache.factory(self.opts)
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    def _store(self, minion_id, data):
+        self.cache.store('minions/{0}'.format(minion_id), 'mine', data)
+        salt.utils.mine_index.mark(self.opts, minion_id, cache=self.cache)
+
+    def test_get_without_index(self):
+        '''
+        No index is used before one has been built
+        '''
+        self._store('web', {'network.arp': {}})
+        self.assertIsNone(salt.utils.mine_index.get(
+            self.opts, ['web'], ['network.arp'], cache=self.cache))
+
+    def test_get(self):
+        '''
+        The index returns the data of the requested minions, including changes
+        which have not been folded into the index yet
+        '''
+        self._store('web', {'network.arp': 1, 'test.ping': True})
+        self._store('db', {'network.arp': 2})
+        salt.utils.mine_index.update(self.opts, cache=self.cache)
+        self.assertEqual(self.cache.list(salt.utils.mine_index.PENDING_BANK), [])
+        self.assertEqual(
+            salt.utils.mine_index.get(
+                self.opts, ['web', 'db', 'app'], ['network.arp', 'test.ping'],
+                cache=self.cache),
+            {'network.arp': {'web': 1, 'db': 2}, 'test.ping': {'web': True}})
+
+        self._store('web', {'network.arp': 3})
+        expected = {'network.arp': {'web': 3}, 'test.ping': {}}
+        self.assertEqual(
+            salt.utils.mine_index.get(
+                self.opts, ['web'], ['network.arp', 'test.ping'], cache=self.cache),
+            expected)
+        salt.utils.mine_index.update(self.opts, cache=self.cache)
+        self.assertEqual(self.cache.list(salt.utils.mine_index.PENDING_BANK), [])
+        self.assertEqual(
+            salt.utils.mine_index.get(
+                self.opts, ['web'], ['network.arp', 'test.ping'], cache=self.cache),
+            expected)
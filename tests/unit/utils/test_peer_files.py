@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for salt.utils.peer_files
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Import Salt Testing Libs
+from tests.support.helpers import get_unused_localhost_port
+from tests.support.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+from tests.support.unit import TestCase, skipIf
+
+# Import Salt Libs
+import salt.config
+import salt.fileclient
+import salt.utils.files
+import salt.utils.hashutils
+import salt.utils.peer_files
+from salt.utils.peer_files import ChunkStore, ChunkTracker, chunk_hash
+
+# Import 3rd-party libs
+import tornado.ioloop
+
+CHUNK_SIZE = 1024
+
+
+class ChunkTrackerTestCase(TestCase):
+    '''
+    Validate salt.utils.peer_files.ChunkTracker
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        self.path = os.path.join(self.cachedir, 'artifact')
+        with salt.utils.files.fopen(self.path, 'wb') as fp_:
+            fp_.write(os.urandom(CHUNK_SIZE * 2 + 100))
+        self.tracker = ChunkTracker(dict(salt.config.DEFAULT_MASTER_OPTS,
+                                         cachedir=self.cachedir,
+                                         file_peer_chunk_size=CHUNK_SIZE,
+                                         file_peer_max_peers=2))
+
+    def tearDown(self):
+        del self.tracker
+
+    def _file_peers(self, minion_id, addr):
+        return self.tracker.file_peers(self.path, 'abc', minion_id, addr,
+                                       peer_ip=addr.split(':')[0])
+
+    def _register(self, minion_id, addr, chunks):
+        return self.tracker.register(minion_id, addr, chunks,
+                                     peer_ip=addr.split(':')[0])
+
+    def test_file_peers(self):
+        ret = self._file_peers('minion1', '10.0.0.1:4507')
+        self.assertEqual(ret['chunk_size'], CHUNK_SIZE)
+        self.assertEqual([size for _, size in ret['chunks']],
+                         [CHUNK_SIZE, CHUNK_SIZE, 100])
+        self.assertEqual(ret['peers'], {})
+
+        chunks = [chunk for chunk, _ in ret['chunks']]
+        self._register('minion1', '10.0.0.1:4507', chunks)
+        self._register('minion2', '10.0.0.2:4507', chunks[:1])
+        self._register('minion3', '10.0.1.3:4507', chunks)
+        ret = self._file_peers('minion4', '10.0.0.4:4507')
+        # Only the peers of the same network are returned
+        self.assertEqual(sorted(ret['peers'][chunks[0]]),
+                         ['10.0.0.1:4507', '10.0.0.2:4507'])
+        self.assertEqual(ret['peers'][chunks[1]], ['10.0.0.1:4507'])
+        # A minion is not its own peer
+        ret = self._file_peers('minion1', '10.0.0.1:4507')
+        self.assertEqual(ret['peers'], {chunks[0]: ['10.0.0.2:4507']})
+
+    def test_verify_addr(self):
+        '''
+        The master only hands out the address a minion connected from
+        '''
+        self.assertTrue(self.tracker.verify_addr('10.0.0.1:4507', '10.0.0.1'))
+        self.assertTrue(self.tracker.verify_addr('10.0.0.1:4507', '::ffff:10.0.0.1'))
+        self.assertTrue(self.tracker.verify_addr('[fd00::1]:4507', 'fd00::1'))
+        self.assertFalse(self.tracker.verify_addr('10.0.0.2:4507', '10.0.0.1'))
+        self.assertFalse(self.tracker.verify_addr('10.0.0.1:4507', None))
+        self.assertFalse(self.tracker.verify_addr('minion:4507', '10.0.0.1'))
+        chunks = [chunk for chunk, _ in self.tracker.chunks(self.path, 'abc')]
+        self.assertFalse(self.tracker.register('minion1', '10.0.0.2:4507', chunks,
+                                               peer_ip='10.0.0.1'))
+        # Without the address of the connection, nothing is recorded
+        self.assertFalse(self.tracker.register('minion1', '10.0.0.1:4507', chunks))
+        self.assertEqual(self.tracker.peers(chunks[0], 'minion4', '10.0.0.4:4507'), [])
+        # Nor the peers of the network of another minion
+        self.assertTrue(self._register('minion2', '10.0.0.2:4507', chunks))
+        ret = self.tracker.file_peers(self.path, 'abc', 'minion3', '10.0.0.3:4507',
+                                      peer_ip='10.0.1.3')
+        self.assertEqual(ret['peers'], {})
+
+    def test_peers_expire(self):
+        chunk = self.tracker.chunks(self.path, 'abc')[0][0]
+        self._register('minion1', '10.0.0.1:4507', [chunk])
+        with patch('time.time', MagicMock(return_value=time.time() + 2 * 86400)):
+            self.assertEqual(self.tracker.peers(chunk, 'minion2', '10.0.0.2:4507'), [])
+        self.assertEqual(self.tracker.peers(chunk, 'minion2', '10.0.0.2:4507'), [])
+
+
+class ChunkStoreTestCase(TestCase):
+    '''
+    Validate salt.utils.peer_files.ChunkStore
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        self.store = ChunkStore({'cachedir': self.cachedir,
+                                 'file_peer_cache_size': CHUNK_SIZE * 2})
+
+    def tearDown(self):
+        del self.store
+
+    def test_get_put(self):
+        data = os.urandom(CHUNK_SIZE)
+        chunk = chunk_hash(data)
+        self.assertIsNone(self.store.get(chunk))
+        self.store.put(chunk, data)
+        self.assertEqual(self.store.get(chunk), data)
+        # Corrupted chunks are removed
+        with salt.utils.files.fopen(os.path.join(self.store.path, chunk), 'wb') as fp_:
+            fp_.write(b'corrupted')
+        self.assertIsNone(self.store.get(chunk))
+        self.assertFalse(os.path.exists(os.path.join(self.store.path, chunk)))
+
+    def test_prune(self):
+        chunks = []
+        for idx in range(3):
+            data = os.urandom(CHUNK_SIZE)
+            chunks.append(chunk_hash(data))
+            self.store.put(chunks[-1], data)
+            os.utime(os.path.join(self.store.path, chunks[-1]),
+                     (time.time() - 10 + idx, time.time() - 10 + idx))
+        # The first chunk was used recently
+        self.store.get(chunks[0])
+        self.store.prune()
+        self.assertEqual(sorted(os.listdir(self.store.path)),
+                         sorted([chunks[0], chunks[2]]))
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class PeerDistributionTestCase(TestCase):
+    '''
+    Distribute a file between two minions running on the same host
+    '''
+    def setUp(self):
+        self.master_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.master_dir, ignore_errors=True)
+        self.path = os.path.join(self.master_dir, 'artifact')
+        with salt.utils.files.fopen(self.path, 'wb') as fp_:
+            fp_.write(os.urandom(CHUNK_SIZE * 3 + 10))
+        self.tracker = ChunkTracker(dict(salt.config.DEFAULT_MASTER_OPTS,
+                                         cachedir=self.master_dir,
+                                         file_peer_chunk_size=CHUNK_SIZE))
+        self.hash_server = {
+            'hsum': salt.utils.hashutils.get_hash(self.path, 'sha256'),
+            'hash_type': 'sha256'}
+        self.serve_file = MagicMock(side_effect=self._serve_file)
+        self.minions = [self._minion('minion{0}'.format(idx)) for idx in range(2)]
+
+    def tearDown(self):
+        del self.tracker
+        del self.hash_server
+        del self.serve_file
+        del self.minions
+
+    def _serve_file(self, load):
+        with salt.utils.files.fopen(self.path, 'rb') as fp_:
+            fp_.seek(load['loc'])
+            return {'data': fp_.read(CHUNK_SIZE // 2), 'dest': 'artifact'}
+
+    def _send(self, minion_id, load, raw=False):
+        if load['cmd'] == '_file_peers':
+            return self.tracker.file_peers(
+                self.path, self.hash_server['hsum'], minion_id, load['addr'],
+                peer_ip='127.0.0.1')
+        if load['cmd'] == '_file_peers_have':
+            self.tracker.register(minion_id, load['addr'], load['chunks'],
+                                  peer_ip='127.0.0.1')
+            return True
+        if load['cmd'] == '_serve_file':
+            return self.serve_file(load)
+        return {}
+
+    def _minion(self, minion_id):
+        cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cachedir, ignore_errors=True)
+        opts = dict(salt.config.DEFAULT_MINION_OPTS,
+                    id=minion_id,
+                    cachedir=cachedir,
+                    file_peer_port=get_unused_localhost_port(),
+                    file_peer_address='127.0.0.1')
+        channel = MagicMock()
+        channel.send.side_effect = \
+            lambda load, raw=False: self._send(minion_id, load, raw)
+        with patch('salt.transport.client.ReqChannel.factory',
+                   MagicMock(return_value=channel)):
+            client = salt.fileclient.RemoteClient(opts)
+
+        io_loop = tornado.ioloop.IOLoop()
+        server = salt.utils.peer_files.start_server(opts, io_loop=io_loop)
+        thread = threading.Thread(target=io_loop.start)
+        thread.daemon = True
+        thread.start()
+
+        def _stop():
+            io_loop.add_callback(server.stop)
+            io_loop.add_callback(io_loop.stop)
+            thread.join(10)
+            io_loop.close()
+        self.addCleanup(_stop)
+        return client
+
+    def _get_file(self, client):
+        dest = os.path.join(client.opts['cachedir'], 'artifact')
+        self.assertEqual(
+            client._get_file_from_peers(  # pylint: disable=protected-access
+                'salt://artifact', 'base', dest, self.hash_server),
+            dest)
+        self.assertEqual(salt.utils.hashutils.get_hash(dest, 'sha256'),
+                         self.hash_server['hsum'])
+
+    def test_distribution(self):
+        # The first minion gets the file from the master
+        self._get_file(self.minions[0])
+        self.assertEqual(self.serve_file.call_count, 7)
+
+        # The second one from the first one
+        self.serve_file.reset_mock()
+        self._get_file(self.minions[1])
+        self.serve_file.assert_not_called()
+        chunk = self.tracker.chunks(self.path, self.hash_server['hsum'])[0][0]
+        self.assertEqual(
+            sorted(self.tracker.cache.list(
+                salt.utils.peer_files.CHUNKS_BANK.format(chunk))),
+            ['minion0', 'minion1'])
+
+    def test_bad_peer(self):
+        '''
+        The chunks the peers do not send are fetched from the master
+        '''
+        self._get_file(self.minions[0])
+        shutil.rmtree(os.path.join(self.minions[0].opts['cachedir'], 'file_peers'))
+        self.serve_file.reset_mock()
+        self._get_file(self.minions[1])
+        self.assertEqual(self.serve_file.call_count, 7)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for salt.utils.pillar_compile
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import ctypes
+import multiprocessing
+import shutil
+import tempfile
+import threading
+from multiprocessing.connection import Listener
+
+# Import Salt Testing Libs
+from tests.support.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+from tests.support.unit import TestCase, skipIf
+
+# Import Salt Libs
+import salt.config
+import salt.utils.pillar_compile
+import salt.utils.platform
+from salt.utils.pillar_compile import PENDING
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class PillarCompilerTestCase(TestCase):
+    '''
+    Validate salt.utils.pillar_compile.PillarCompiler
+    '''
+    def setUp(self):
+        self.opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+        self.opts['pillar_compile_workers'] = 1
+        self.compiler = salt.utils.pillar_compile.PillarCompiler(self.opts, MagicMock())
+        self.compiler.pool = MagicMock()
+
+    def _load(self, nonce, minion_id='minion', **kwargs):
+        load = {'id': minion_id, 'grains': {'os': 'Linux'}, 'nonce': nonce}
+        load.update(kwargs)
+        return load
+
+    def _finish(self, index, ret):
+        '''
+        Complete the compilation started by the index-th apply_async call
+        '''
+        call = self.compiler.pool.apply_async.call_args_list[index]
+        call[1]['callback'](ret)
+
+    def test_deduplicate(self):
+        '''
+        Identical requests queued at the same time are compiled once
+        '''
+        self.assertIn(PENDING, self.compiler.handle(self._load('n1')))
+        self.assertEqual(self.compiler.pool.apply_async.call_count, 1)
+        # The only worker is busy, these are queued and merged
+        self.assertIn(PENDING, self.compiler.handle(self._load('n2')))
+        self.assertIn(PENDING, self.compiler.handle(self._load('n3')))
+        # A request for other grains is not merged
+        self.assertIn(PENDING, self.compiler.handle(self._load('n4', grains={})))
+        # Repeated requests are not counted again
+        self.assertIn(PENDING, self.compiler.handle(self._load('n1')))
+        self.assertEqual(len(self.compiler.queued), 2)
+        self.assertEqual(self.compiler.stats['requests'], 4)
+        self.assertEqual(self.compiler.stats['deduplicated'], 1)
+
+        self._finish(0, (True, {'first': True}))
+        self.assertEqual(self.compiler.pool.apply_async.call_count, 2)
+        self.assertEqual(self.compiler.handle(self._load('n1')), {'first': True})
+        self.assertIn(PENDING, self.compiler.handle(self._load('n2')))
+
+        self._finish(1, (True, {'second': True}))
+        self.assertEqual(self.compiler.handle(self._load('n2')), {'second': True})
+        self.assertEqual(self.compiler.handle(self._load('n3')), {'second': True})
+        self.assertIn(PENDING, self.compiler.handle(self._load('n4', grains={})))
+        self._finish(2, (True, {}))
+        self.assertEqual(self.compiler.handle(self._load('n4', grains={})), {})
+        self.assertEqual(self.compiler.stats['compiled'], 3)
+        self.assertEqual(self.compiler.results, {})
+        self.assertEqual(self.compiler.waiting, {})
+
+    def test_nonce_per_minion(self):
+        '''
+        The pillar is only returned to the minion it was compiled for
+        '''
+        self.compiler.handle(self._load('n1'))
+        self._finish(0, (True, {'secret': True}))
+        self.assertIn(PENDING, self.compiler.handle(self._load('n1', minion_id='other')))
+        self.assertEqual(self.compiler.handle(self._load('n1')), {'secret': True})
+
+    def test_failed(self):
+        '''
+        The MWorker compiles the pillar when the pool failed to
+        '''
+        self.compiler.handle(self._load('n1'))
+        self._finish(0, (False, None))
+        self.assertIsNone(self.compiler.handle(self._load('n1')))
+        self.assertEqual(self.compiler.stats['failed'], 1)
+        self.assertEqual(self.compiler.running, 0)
+
+    def test_expire(self):
+        self.compiler.handle(self._load('n1'))
+        self.compiler.handle(self._load('n2', minion_id='other'))
+        self._finish(0, (True, {}))
+        with patch('time.time', MagicMock(
+                return_value=self.compiler.stat_clock + salt.utils.pillar_compile.RESULT_TTL + 10)):
+            self.compiler._expire()
+        self.assertEqual(self.compiler.results, {})
+        self.assertEqual(self.compiler.waiting, {})
+
+    def test_post_stats(self):
+        self.compiler.event = MagicMock()
+        self.compiler.handle(self._load('n1'))
+        self.compiler.handle(self._load('n2', minion_id='other'))
+        self._finish(0, (True, {}))
+        self.compiler._post_stats()
+        data = self.compiler.event.fire_event.call_args[0][0]
+        self.assertEqual(data['queue_depth'], 0)
+        self.assertEqual(data['running'], 1)
+        self.assertEqual(data['requests'], 2)
+        self.assertEqual(data['compiled'], 1)
+        self.assertEqual(
+            self.compiler.event.fire_event.call_args[0][1], 'salt/stats/pillar_compile')
+        self.assertEqual(self.compiler.stats['requests'], 0)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+@skipIf(salt.utils.platform.is_windows(), 'Unix sockets are not available on Windows')
+class PillarCompileRequestTestCase(TestCase):
+    '''
+    Validate salt.utils.pillar_compile.request
+    '''
+    def setUp(self):
+        self.sock_dir = tempfile.mkdtemp()
+        # Removed after the listener
+        self.addCleanup(shutil.rmtree, self.sock_dir, ignore_errors=True)
+        self.opts = {'sock_dir': self.sock_dir}
+        self.secret = multiprocessing.Array(ctypes.c_char, b'secret')
+
+    def _serve(self, secret):
+        compiler = salt.utils.pillar_compile.PillarCompiler(self.opts, secret)
+        compiler.handle = lambda load: {'pillar_of': load['id']}
+        listener = Listener(salt.utils.pillar_compile.address(self.opts))
+        thread = threading.Thread(target=lambda: compiler._serve(listener.accept()))
+        thread.start()
+        self.addCleanup(listener.close)
+        self.addCleanup(thread.join)
+
+    def test_request(self):
+        self._serve(self.secret)
+        self.assertEqual(
+            salt.utils.pillar_compile.request(self.opts, {'id': 'minion'}, self.secret),
+            {'pillar_of': 'minion'})
+
+    def test_request_wrong_key(self):
+        self._serve(multiprocessing.Array(ctypes.c_char, b'other'))
+        self.assertIsNone(
+            salt.utils.pillar_compile.request(self.opts, {'id': 'minion'}, self.secret))
+
+    def test_request_not_running(self):
+        self.assertIsNone(
+            salt.utils.pillar_compile.request(self.opts, {'id': 'minion'}, self.secret))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for salt.utils.presence
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import shutil
+import tempfile
+
+# Import Salt Testing Libs
+from tests.support.runtests import RUNTIME_VARS
+from tests.support.unit import TestCase
+
+# Import Salt Libs
+import salt.utils.presence
+from salt.utils.presence import PresenceTable
+
+
+class PresenceTableTestCase(TestCase):
+    '''
+    Validate salt.utils.presence.PresenceTable
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        self.opts = {'cachedir': self.cachedir, 'presence_timeout': 300}
+        self.table = PresenceTable(self.opts)
+
+    def tearDown(self):
+        del self.table
+
+    def test_update(self):
+        self.table.update('minion_ping',
+                          {'id': 'minion1', 'cmd': '_minion_event', 'data': {'rtt': 0.2}},
+                          now=1000)
+        self.table.update('minion_ping',
+                          {'id': 'minion1', 'cmd': '_minion_event', 'data': {'rtt': 0.1}},
+                          now=1001)
+        self.table.update('salt/job/1/ret/minion2', {'id': 'minion2', 'return': True}, now=1000)
+        self.table.update('salt/beacon/minion3/load/', {'1m': 1}, now=1000)
+        self.table.update('salt/presence/change', {'new': ['minion4'], 'lost': []}, now=1000)
+        # Failed authentications do not count
+        self.table.update('salt/auth', {'id': 'minion5', 'act': 'reject'}, now=1000)
+
+        self.assertEqual(self.table.minions['minion1']['seen'], 1001)
+        self.assertAlmostEqual(self.table.minions['minion1']['rtt'], 0.1875)
+        self.assertEqual(self.table.present(now=1100),
+                         set(['minion1', 'minion2', 'minion3', 'minion4']))
+        # The connected minions stay present
+        self.assertEqual(self.table.present(now=2000), set(['minion4']))
+        # The disconnected ones do not, until they are seen again
+        self.table.update('salt/presence/change', {'new': [], 'lost': ['minion4']}, now=1100)
+        self.assertEqual(self.table.present(now=1100),
+                         set(['minion1', 'minion2', 'minion3']))
+        self.table.update('salt/key', {'id': 'minion1', 'act': 'delete'}, now=1100)
+        self.assertNotIn('minion1', self.table.minions)
+
+    def test_save_load(self):
+        self.table.update('salt/presence/present', {'present': ['minion1']})
+        self.table.update('salt/job/1/ret/minion2', {'id': 'minion2', 'return': True})
+        self.table.save()
+        self.assertFalse(self.table.dirty)
+        self.assertEqual(salt.utils.presence.present(self.opts), ['minion1', 'minion2'])
+        self.assertEqual(salt.utils.presence.present(self.opts, ['minion2', 'minion3']),
+                         ['minion2'])
+
+        # The minions are not connected to a new master process
+        table = PresenceTable(self.opts)
+        table.load()
+        self.assertFalse(table.minions['minion1']['connected'])
+        self.assertEqual(table.present(), set(['minion2']))
@@ -6,6 +6,7 @@ import os
 import sys
 import time
 import signal
+import threading
 import multiprocessing
 import functools
 
@@ -212,6 +213,89 @@ class TestThreadPool(TestCase):
         self.assertEqual(pool._job_queue.qsize(), 1)
 
 
+class TestKeyedThreadPool(TestCase):
+
+    def _wait(self, pool):
+        timeout_at = time.time() + 10
+        while (pool.qsize() or pool._running_keys) and time.time() < timeout_at:
+            time.sleep(0.01)
+
+    def test_ordered_per_key(self):
+        '''
+        Make sure the tasks of a key run in order, one at a time
+        '''
+        runs = []
+        running = set()
+        overlaps = []
+
+        def task(key, num):
+            if key in running:
+                overlaps.append(key)
+            running.add(key)
+            time.sleep(0.001)
+            runs.append((key, num))
+            running.discard(key)
+
+        pool = salt.utils.process.KeyedThreadPool(4)
+        for num in range(20):
+            for key in ('a', 'b', 'c'):
+                self.assertTrue(pool.fire_async(task, args=(key, num), key=key))
+        self._wait(pool)
+        self.assertEqual(overlaps, [])
+        for key in ('a', 'b', 'c'):
+            self.assertEqual([num for rkey, num in runs if rkey == key],
+                             list(range(20)))
+
+    def test_limits(self):
+        '''
+        Make sure at most limits[kind] tasks of a kind run at once
+        '''
+        lock = threading.Lock()
+        running = {'slow': 0, 'max': 0}
+
+        def task():
+            with lock:
+                running['slow'] += 1
+                running['max'] = max(running['max'], running['slow'])
+            time.sleep(0.01)
+            with lock:
+                running['slow'] -= 1
+
+        pool = salt.utils.process.KeyedThreadPool(4, limits={'slow': 2})
+        for _ in range(10):
+            pool.fire_async(task, kind='slow')
+        self._wait(pool)
+        self.assertEqual(running['max'], 2)
+
+    def test_limits_order(self):
+        '''
+        Make sure the tasks of a kind at its limit wait without holding up
+        the tasks of the other kinds, which run in firing order
+        '''
+        pool = salt.utils.process.KeyedThreadPool(0, limits={'slow': 1})
+        pool._running_kinds['slow'] = 1
+        for num in range(3):
+            pool.fire_async(lambda: None, key='s{0}'.format(num), kind='slow')
+            pool.fire_async(lambda: None, key='f{0}'.format(num), kind='fast')
+        pool.fire_async(lambda: None, key='n', kind=None)
+        with pool._cond:
+            keys = [pool._next_task()[0] for _ in range(5)]
+            self.assertEqual(keys, ['f0', 'f1', 'f2', 'n', None])
+            pool._running_kinds['slow'] = 0
+            self.assertEqual(pool._next_task()[0], 's0')
+        self.assertEqual(pool.qsize(), 2)
+
+    def test_full_queue(self):
+        '''
+        Make sure that a full pool refuses the tasks
+        '''
+        pool = salt.utils.process.KeyedThreadPool(0, 1)
+        self.assertTrue(pool.fire_async(lambda: None, key='a'))
+        self.assertTrue(pool.full())
+        self.assertFalse(pool.fire_async(lambda: None, key='b'))
+        self.assertEqual(pool.qsize(), 1)
+
+
 class TestProcess(TestCase):
 
     @skipIf(NO_MOCK, NO_MOCK_REASON)
@@ -5,7 +5,9 @@ import codecs
 import glob
 import logging
 import os
+import shutil
 import textwrap
+import time
 
 import salt.loader
 import salt.utils.data
@@ -462,6 +464,144 @@ class TestReactor(TestCase, AdaptedConfigurationTestCaseMixin):
                                     self.assertEqual(reactions, LOW_CHUNKS[tag])
 
 
+class TestReactorMap(TestCase):
+    '''
+    Tests for the compiled reactor map
+    '''
+    def test_match(self):
+        react_map = reactor.ReactorMap([
+            {'salt/minion/*/start': ['/srv/reactor/start.sls']},
+            {'salt/auth': '/srv/reactor/auth.sls'},
+            {'salt/job/*': ['/srv/reactor/job.sls']},
+            {'*': ['/srv/reactor/all.sls']},
+            {'salt/key': 'not a list'},
+            'not a dict',
+            {'salt/run/*/ret': ['/srv/reactor/run.sls'],
+             'salt/wheel/*/ret': ['/srv/reactor/wheel.sls']},
+            {'salt/job/[0-9]*/ret/*': ['/srv/reactor/ret.sls']},
+            {'salt/auth': ['/srv/reactor/auth2.sls']},
+        ])
+        # The reactors are listed in the order of the map, like fnmatch
+        # against each key would
+        for tag, expected in (
+                ('salt/minion/web1/start', ['start', 'all']),
+                ('salt/auth', ['auth', 'all', 'auth2']),
+                ('salt/job/20190101/ret/web1', ['job', 'all', 'ret']),
+                ('salt/job/abc/ret/web1', ['job', 'all']),
+                ('salt/run/20190101/ret', ['all']),
+                ('', ['all'])):
+            self.assertEqual(
+                react_map.match(tag),
+                ['/srv/reactor/{0}.sls'.format(name) for name in expected])
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class TestReactorCache(TestCase, AdaptedConfigurationTestCaseMixin):
+    '''
+    Tests for the caching of the reactor map and renderings
+    '''
+    def setUp(self):
+        self.opts = self.get_temp_config('master')
+        self.reactor_dir = os.path.join(self.opts['cachedir'], 'test_reactors')
+        os.makedirs(self.reactor_dir)
+        self.addCleanup(shutil.rmtree, self.reactor_dir, ignore_errors=True)
+        self.static = self._write('static.sls', textwrap.dedent('''\
+            update_fileserver:
+              runner.fileserver.update
+            '''))
+        self.dynamic = self._write('dynamic.sls', textwrap.dedent('''\
+            ping:
+              local.test.ping:
+                - tgt: {{ data['id'] }}
+            '''))
+        self.opts['reactor'] = [{'static': [self.static]},
+                                {'dynamic': [self.dynamic]}]
+        self.opts['reactor_render_cache'] = True
+        self.reactor = reactor.Reactor(self.opts)
+
+    def tearDown(self):
+        del self.opts
+        del self.reactor
+
+    def _write(self, name, content):
+        path = os.path.join(self.reactor_dir, name)
+        with salt.utils.files.fopen(path, 'w') as fp_:
+            fp_.write(content)
+        return path
+
+    def test_reactor_map_file(self):
+        map_file = self._write('reactor.conf', '- static:\n  - /srv/a.sls\n')
+        self.reactor.opts['reactor'] = map_file
+        with patch('salt.utils.yaml.safe_load',
+                   MagicMock(side_effect=salt.utils.yaml.safe_load)) as load:
+            self.assertEqual(self.reactor.list_reactors('static'), ['/srv/a.sls'])
+            self.assertEqual(self.reactor.list_reactors('static'), ['/srv/a.sls'])
+            self.assertEqual(load.call_count, 1)
+
+    def test_render_cache(self):
+        render = MagicMock(side_effect=self.reactor.render_template)
+        with patch.object(self.reactor, 'render_template', render):
+            static = self.reactor.reactions(
+                'static', {'id': 'web1', '_stamp': '1'}, [self.static])
+            self.assertEqual(static[0]['fun'], 'fileserver.update')
+            static[0]['fun'] = 'changed'
+            self.assertEqual(
+                self.reactor.reactions(
+                    'static', {'id': 'web1', '_stamp': '2'}, [self.static])[0]['fun'],
+                'fileserver.update')
+            self.assertEqual(render.call_count, 1)
+
+            # Rendered for each event
+            for minion in ('web1', 'web2', 'web1'):
+                self.assertEqual(
+                    self.reactor.reactions('dynamic', {'id': minion}, [self.dynamic])[0]['tgt'],
+                    minion)
+            self.assertEqual(render.call_count, 3)
+
+            # A modified file is rendered again
+            self._write('static.sls', 'update_fileserver:\n  runner.fileserver.clear_cache\n')
+            os.utime(self.static, (time.time() + 10, time.time() + 10))
+            self.assertEqual(
+                self.reactor.reactions('static', {'id': 'web1'}, [self.static])[0]['fun'],
+                'fileserver.clear_cache')
+            self.assertEqual(render.call_count, 4)
+
+    def test_render_cache_renderers(self):
+        self.assertIsNotNone(self.reactor._cached_render(self.static, 'tag', {}))  # pylint: disable=protected-access
+        path = self._write('yaml.sls', '#!jinja | yaml\nping: {}\n')
+        self.assertIsNotNone(self.reactor._cached_render(path, 'tag', {}))  # pylint: disable=protected-access
+        # The other renderers may not only depend on the event
+        for line in ('#!py\n', '#!mako|yaml\n', '#!jinja|py\n'):
+            path = self._write('other.sls', line + 'def run():\n    return {}\n')
+            os.utime(path, (time.time() + 10, time.time() + 10))
+            self.assertIsNone(self.reactor._cached_render(path, 'tag', {}))  # pylint: disable=protected-access
+        # Off by default
+        self.reactor.opts['reactor_render_cache'] = False
+        self.assertIsNone(self.reactor._cached_render(self.static, 'tag', {}))  # pylint: disable=protected-access
+
+    def test_coalesce(self):
+        self.assertFalse(self.reactor.coalesce('tag', {'id': 'web1'}))
+        self.reactor.opts['reactor_coalesce_window'] = 5
+        self.assertFalse(self.reactor.coalesce('tag', {'id': 'web1', '_stamp': '1'}))
+        self.assertTrue(self.reactor.coalesce('tag', {'id': 'web1', '_stamp': '2'}))
+        self.assertFalse(self.reactor.coalesce('tag', {'id': 'web2'}))
+        self.assertFalse(self.reactor.coalesce('other', {'id': 'web1'}))
+        with patch('time.time', MagicMock(return_value=time.time() + 10)):
+            self.assertFalse(self.reactor.coalesce('tag', {'id': 'web1'}))
+
+
+class SyncPool(object):
+    '''
+    A pool running the tasks when they are fired
+    '''
+    def fire_async(self, func, args=None, kwargs=None, key=None, kind=None):
+        func(*(args or ()), **(kwargs or {}))
+        return True
+
+    def full(self):
+        return False
+
+
 @skipIf(NO_MOCK, NO_MOCK_REASON)
 class TestReactWrap(TestCase, AdaptedConfigurationTestCaseMixin):
     '''
@@ -488,7 +628,10 @@ class TestReactWrap(TestCase, AdaptedConfigurationTestCaseMixin):
                 self.wrap.run(chunk)
             thread_pool.fire_async.assert_called_with(
                 self.wrap.client_cache['runner'].low,
-                args=WRAPPER_CALLS[tag]
+                args=WRAPPER_CALLS[tag],
+                kwargs={},
+                key=None,
+                kind='runner'
             )
 
     def test_wheel(self):
@@ -504,7 +647,10 @@ class TestReactWrap(TestCase, AdaptedConfigurationTestCaseMixin):
                 self.wrap.run(chunk)
             thread_pool.fire_async.assert_called_with(
                 self.wrap.client_cache['wheel'].low,
-                args=WRAPPER_CALLS[tag]
+                args=WRAPPER_CALLS[tag],
+                kwargs={},
+                key=None,
+                kind='wheel'
             )
 
     def test_local(self):
@@ -516,13 +662,37 @@ class TestReactWrap(TestCase, AdaptedConfigurationTestCaseMixin):
             chunk = LOW_CHUNKS[tag][0]
             client_cache = {'local': Mock()}
             client_cache['local'].cmd_async = Mock()
-            with patch.object(self.wrap, 'client_cache', client_cache):
+            with patch.object(self.wrap, 'client_cache', client_cache), \
+                    patch.object(self.wrap, 'pool', SyncPool()):
                 self.wrap.run(chunk)
             client_cache['local'].cmd_async.assert_called_with(
                 *WRAPPER_CALLS[tag]['args'],
                 **WRAPPER_CALLS[tag]['kwargs']
             )
 
+    def test_local_queued(self):
+        '''
+        Test local reactions only go through the workers, which may drop
+        them, when the reactions are ordered by reactor_queue_key
+        '''
+        chunk = LOW_CHUNKS['new_local'][0]
+        client_cache = {'local': Mock()}
+        pool = Mock()
+        pool.fire_async = Mock(return_value=False)
+        with patch.object(self.wrap, 'client_cache', client_cache), \
+                patch.object(self.wrap, 'pool', pool):
+            self.wrap.run(chunk)
+            pool.fire_async.assert_not_called()
+            client_cache['local'].cmd_async.assert_called_once_with(
+                *WRAPPER_CALLS['new_local']['args'],
+                **WRAPPER_CALLS['new_local']['kwargs']
+            )
+            with patch.dict(self.wrap.opts, {'reactor_queue_key': 'id'}):
+                self.wrap.run(chunk, key='minion1')
+            pool.fire_async.assert_called_once()
+            self.assertEqual(pool.fire_async.call_args[1]['key'], 'minion1')
+        client_cache['local'].cmd_async.assert_called_once()
+
     def test_cmd(self):
         '''
         Test cmd reactions (alias for 'local') using both the old and new
@@ -533,7 +703,8 @@ class TestReactWrap(TestCase, AdaptedConfigurationTestCaseMixin):
             chunk = LOW_CHUNKS[tag][0]
             client_cache = {'local': Mock()}
             client_cache['local'].cmd_async = Mock()
-            with patch.object(self.wrap, 'client_cache', client_cache):
+            with patch.object(self.wrap, 'client_cache', client_cache), \
+                    patch.object(self.wrap, 'pool', SyncPool()):
                 self.wrap.run(chunk)
             client_cache['local'].cmd_async.assert_called_with(
                 *WRAPPER_CALLS[tag]['args'],
@@ -549,9 +720,53 @@ class TestReactWrap(TestCase, AdaptedConfigurationTestCaseMixin):
             chunk = LOW_CHUNKS[tag][0]
             client_cache = {'caller': Mock()}
             client_cache['caller'].cmd = Mock()
-            with patch.object(self.wrap, 'client_cache', client_cache):
+            with patch.object(self.wrap, 'client_cache', client_cache), \
+                    patch.object(self.wrap, 'pool', SyncPool()):
                 self.wrap.run(chunk)
             client_cache['caller'].cmd.assert_called_with(
                 *WRAPPER_CALLS[tag]['args'],
                 **WRAPPER_CALLS[tag]['kwargs']
             )
+
+    def test_spool(self):
+        '''
+        Test the reactions are spooled while the queue is full, then run in
+        order
+        '''
+        opts = self.get_temp_config('master')
+        opts['reactor_spool'] = True
+        wrap = reactor.ReactWrap(opts)
+        self.addCleanup(shutil.rmtree, wrap.spool_dir, ignore_errors=True)
+        chunk = LOW_CHUNKS['new_runner'][0]
+        runner = Mock()
+        runner.low = Mock()
+        pool = Mock()
+        pool.fire_async = Mock(side_effect=[True, False])
+        pool.full = Mock(return_value=True)
+        with patch.object(wrap, 'client_cache', {'runner': runner}), \
+                patch.object(wrap, 'pool', pool), \
+                patch.object(wrap, '_start_spool_thread', Mock()), \
+                patch.object(wrap, '_fire_event', Mock()) as fire_event:
+            # Queued
+            wrap.run(chunk, key='minion1')
+            # Spooled as the queue is full, then as a reaction was spooled
+            wrap.run(chunk, key='minion1')
+            wrap._spool_thread = True
+            wrap.run(chunk, key='minion2')
+            self.assertEqual(pool.fire_async.call_count, 2)
+            self.assertEqual(len(wrap._spooled()), 2)
+            fire_event.assert_called_once()
+            self.assertEqual(fire_event.call_args[0][1], 'salt/reactor/backpressure')
+
+            # The workers catch up
+            pool.full.return_value = False
+            pool.fire_async = Mock(return_value=True)
+            self.assertTrue(wrap.drain_spool())
+            self.assertEqual(wrap._spooled(), [])
+            self.assertEqual(
+                [call[1]['key'] for call in pool.fire_async.call_args_list],
+                ['minion1', 'minion2'])
+            args, kwargs = pool.fire_async.call_args
+            self.assertEqual(args, (runner.low,))
+            self.assertEqual(kwargs['args'][0], WRAPPER_CALLS['new_runner'][0])
+            self.assertEqual(kwargs['kind'], 'runner')
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for salt.utils.return_queue
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing Libs
+from tests.support.runtests import RUNTIME_VARS
+from tests.support.unit import skipIf, TestCase
+from tests.support.mock import (
+    NO_MOCK,
+    NO_MOCK_REASON,
+    MagicMock,
+    patch
+)
+
+# Import Salt Libs
+import salt.utils.return_queue
+from salt.exceptions import SaltReqTimeoutError
+
+# Import 3rd-party libs
+import tornado.gen
+import tornado.testing
+from tornado.testing import AsyncTestCase
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ReturnQueueTestCase(AsyncTestCase, TestCase):
+    '''
+    Validate salt.utils.return_queue.ReturnQueue
+    '''
+    def setUp(self):
+        super(ReturnQueueTestCase, self).setUp()
+        self.cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.opts = {'cachedir': self.cachedir,
+                     'master': 'salt',
+                     'return_queue_batch_size': 2,
+                     'return_queue_flush_interval': 0.01,
+                     'return_queue_persist': True}
+        self.sent = []
+
+    def tearDown(self):
+        super(ReturnQueueTestCase, self).tearDown()
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    def _channel(self, fail=False):
+        @tornado.gen.coroutine
+        def send(load, timeout=60):
+            if fail:
+                raise SaltReqTimeoutError('Message timed out')
+            self.sent.append(load)
+            raise tornado.gen.Return('')
+        return MagicMock(send=send)
+
+    def _queue(self, channel):
+        queue = salt.utils.return_queue.ReturnQueue(
+            self.opts, io_loop=self.io_loop, retry_timer=lambda: 60)
+        queue.channel = channel
+        return queue
+
+    @tornado.testing.gen_test
+    def test_flush_coalesces_returns(self):
+        '''
+        Pending returns are sent in batches of return_queue_batch_size
+        '''
+        queue = self._queue(self._channel())
+        with patch.object(queue, '_schedule_flush', MagicMock()):
+            for jid in ('1', '2', '3'):
+                queue.put({'id': 'minion', 'jid': jid, 'return': True})
+        yield queue.flush()
+        self.assertEqual(self.sent[0]['cmd'], '_return')
+        self.assertEqual([load['jid'] for load in self.sent[0]['load']], ['1', '2'])
+        # A single remaining return is sent as a plain load
+        self.assertEqual(self.sent[1]['jid'], '3')
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(os.listdir(queue.queue_dir), [])
+
+    @tornado.testing.gen_test
+    def test_pending_returns_survive_restart(self):
+        '''
+        Returns which could not be sent are persisted and requeued
+        '''
+        queue = self._queue(self._channel(fail=True))
+        with patch.object(queue, '_schedule_flush', MagicMock()):
+            queue.put({'id': 'minion', 'jid': '1', 'return': True})
+            yield queue.flush()
+        self.assertEqual(len(queue), 1)
+        queue.close()
+
+        queue = self._queue(self._channel())
+        self.assertEqual(len(queue), 1)
+        yield queue.flush()
+        self.assertEqual(self.sent, [{'id': 'minion', 'jid': '1', 'return': True}])
+        self.assertEqual(os.listdir(queue.queue_dir), [])
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for salt.utils.roots_watch
+'''
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing Libs
+from tests.support.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+from tests.support.unit import TestCase, skipIf
+
+# Import Salt Libs
+import salt.utils.files
+import salt.utils.platform
+import salt.utils.roots_watch
+from salt.utils.roots_watch import RootTree
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+@skipIf(salt.utils.platform.is_windows(), 'inotify is not available on Windows')
+class RootTreeTestCase(TestCase):
+    '''
+    Validate salt.utils.roots_watch.RootTree
+    '''
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self._write('top.sls')
+        self._write('web/init.sls')
+        self._write('web/files/nginx.conf')
+        os.makedirs(os.path.join(self.root, 'empty'))
+        os.symlink('web/init.sls', os.path.join(self.root, 'web.sls'))
+
+    def _write(self, rel):
+        path = os.path.join(self.root, rel)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with salt.utils.files.fopen(path, 'w') as fp_:
+            fp_.write(rel)
+
+    def _set_mtime(self, tree, rel_dir):
+        '''
+        Make a directory look modified since it was read
+        '''
+        tree.mtimes[rel_dir] -= 10
+
+    def test_scan(self):
+        watch = MagicMock()
+        tree = RootTree(self.root, watch=watch)
+        added, removed = tree.scan()
+        self.assertEqual(
+            added,
+            set(['top.sls', 'web', 'web/init.sls', 'web/files',
+                 'web/files/nginx.conf', 'empty', 'web.sls']))
+        self.assertEqual(removed, set())
+        self.assertEqual(tree.entries['web'], (True, False, None))
+        self.assertEqual(tree.entries['web.sls'], (False, True, 'web/init.sls'))
+        self.assertEqual(tree.children['empty'], set())
+        self.assertEqual(watch.call_count, 4)
+
+    def test_scan_changes(self):
+        tree = RootTree(self.root)
+        tree.scan()
+        shutil.rmtree(os.path.join(self.root, 'web', 'files'))
+        self._write('web/map.jinja')
+        self._write('db/init.sls')
+        with patch('os.listdir', MagicMock(side_effect=os.listdir)) as listdir:
+            self.assertEqual(tree.scan('web'),
+                             (set(['web/map.jinja']),
+                              set(['web/files', 'web/files/nginx.conf'])))
+            # Only the directory which changed is read
+            listdir.assert_called_once_with(os.path.join(self.root, 'web'))
+            self.assertEqual(tree.scan(), (set(['db', 'db/init.sls']), set()))
+            # Directories which were read before are not read again
+            self.assertEqual(listdir.call_count, 3)
+        self.assertNotIn('web/files', tree.children)
+
+    def test_refresh(self):
+        '''
+        A tree loaded from a snapshot only reads the modified directories
+        '''
+        tree = RootTree(self.root)
+        tree.scan()
+        tree = RootTree.load(self.root, tree.dump())
+        self.assertEqual(tree.refresh(), (set(), set()))
+
+        os.remove(os.path.join(self.root, 'web', 'files', 'nginx.conf'))
+        self._write('empty/new.sls')
+        self._set_mtime(tree, 'web/files')
+        self._set_mtime(tree, 'empty')
+        with patch('os.listdir', MagicMock(side_effect=os.listdir)) as listdir:
+            self.assertEqual(tree.refresh(),
+                             (set(['empty/new.sls']),
+                              set(['web/files/nginx.conf'])))
+            self.assertEqual(listdir.call_count, 2)
+        self.assertEqual(tree.children['web/files'], set())
+
+    def test_file_lists(self):
+        tree = RootTree(self.root)
+        tree.scan()
+        opts = {'file_roots': {'base': [self.root]},
+                'fileserver_ignoresymlinks': False,
+                'file_ignore_regex': None,
+                'file_ignore_glob': ['*.conf']}
+        ret = salt.utils.roots_watch.file_lists(opts, {self.root: tree}, 'base')
+        self.assertEqual(ret['files'], ['top.sls', 'web.sls', 'web/init.sls'])
+        self.assertEqual(ret['dirs'], ['empty', 'web', 'web/files'])
+        self.assertEqual(ret['empty_dirs'], ['empty'])
+        self.assertEqual(ret['links'], {'web.sls': 'web/init.sls'})
+        self.assertIsNone(
+            salt.utils.roots_watch.file_lists(opts, {}, 'base'))
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+@skipIf(salt.utils.platform.is_windows(), 'inotify is not available on Windows')
+class RootsWatcherTestCase(TestCase):
+    '''
+    Validate salt.utils.roots_watch.RootsWatcher
+    '''
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cachedir = tempfile.mkdtemp()
+        for path in (self.root, self.cachedir):
+            self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        os.makedirs(os.path.join(self.root, 'web'))
+        self.opts = {'file_roots': {'base': [self.root]},
+                     'cachedir': self.cachedir,
+                     'fileserver_ignoresymlinks': False,
+                     'file_ignore_regex': None,
+                     'file_ignore_glob': None}
+        self.watcher = salt.utils.roots_watch.RootsWatcher(self.opts)
+        self.watcher.trees[self.root] = RootTree(self.root)
+        self.watcher.trees[self.root].scan()
+        self.watcher.write()
+
+    def test_apply(self):
+        web = os.path.join(self.root, 'web')
+        init = os.path.join(web, 'init.sls')
+        with salt.utils.files.fopen(init, 'w'):
+            pass
+        self.watcher.dirty.add(web)
+        self.watcher.changed.add(init)
+        data = self.watcher.apply()
+        self.assertEqual(data['files'],
+                         {'added': [init], 'removed': [], 'changed': []})
+        self.assertTrue(data['changed'])
+        self.assertEqual(self.watcher.dirty, set())
+
+        self.watcher.changed.add(init)
+        data = self.watcher.apply()
+        self.assertEqual(data['files'],
+                         {'added': [], 'removed': [], 'changed': [init]})
+
+    def test_snapshot(self):
+        '''
+        The other processes read the snapshot again when it was replaced
+        '''
+        self.assertEqual(
+            salt.utils.roots_watch.cached_file_lists(self.opts, 'base')['dirs'],
+            ['web'])
+        self.assertEqual(
+            salt.utils.roots_watch.find_roots(self.opts, 'top.sls', [self.root]),
+            [])
+        with salt.utils.files.fopen(os.path.join(self.root, 'top.sls'), 'w'):
+            pass
+        self.watcher.dirty.add(self.root)
+        self.watcher.apply()
+        self.watcher.write()
+        self.assertEqual(
+            salt.utils.roots_watch.cached_file_lists(self.opts, 'base')['files'],
+            ['top.sls'])
+        self.assertEqual(
+            salt.utils.roots_watch.find_roots(self.opts, 'top.sls', [self.root]),
+            [self.root])
+        self.assertIsNone(
+            salt.utils.roots_watch.find_roots(self.opts, 'top.sls', ['/other']))
+
+    def test_snapshot_dead_watcher(self):
+        '''
+        The snapshot is not used once the watcher is gone
+        '''
+        self.assertTrue(salt.utils.roots_watch.alive(self.opts))
+        with patch('salt.utils.process.os_is_running', MagicMock(return_value=False)):
+            self.assertFalse(salt.utils.roots_watch.alive(self.opts))
+            self.assertIsNone(
+                salt.utils.roots_watch.cached_file_lists(self.opts, 'base'))
+
+        # A watcher which stops removes its snapshot
+        with patch.object(self.watcher, 'start', MagicMock(side_effect=OSError)):
+            self.watcher.run()
+        self.assertFalse(os.path.exists(salt.utils.roots_watch.snapshot_path(self.opts)))
+        self.assertFalse(salt.utils.roots_watch.alive(self.opts))
@@ -418,3 +418,31 @@ class ScheduleTestCase(TestCase):
         self.assertIn('_error', self.schedule.opts['schedule']['testjob'])
         _expected = 'Number of arguments is less than the number of functions. Ignoring job.'
         self.assertEqual(self.schedule.opts['schedule']['testjob']['_error'], _expected)
+
+    def test_eval_skips_jobs_not_due(self):
+        '''
+        Tests that eval only evaluates jobs which are due or were modified
+        '''
+        self.schedule.opts.update({'pillar': {'schedule': {}}})
+        self.schedule.opts.update({'schedule': {'testjob': {'function': 'test.true', 'seconds': 60}}})
+        now = datetime.datetime.now().replace(microsecond=0)
+
+        # Run eval once to prime the scheduler
+        self.schedule.eval(now)
+
+        with patch.object(self.schedule, '_next_eval_time', MagicMock(return_value=None)) as next_eval_time, \
+                patch.object(self.schedule, '_run_job', MagicMock()):
+            # Not due yet, the job is not evaluated at all
+            self.schedule.eval(now + datetime.timedelta(seconds=30))
+            next_eval_time.assert_not_called()
+
+            # Modifying the job gets it evaluated again
+            self.schedule.disable_job('testjob', persist=False)
+            self.schedule.eval(now + datetime.timedelta(seconds=31))
+            self.assertEqual(next_eval_time.call_count, 1)
+            self.schedule.enable_job('testjob', persist=False)
+
+        # Due, the job is evaluated and run
+        with patch.object(self.schedule, '_run_job', MagicMock()) as run_job:
+            self.schedule.eval(now + datetime.timedelta(seconds=91))
+            self.assertEqual(run_job.call_count, 1)